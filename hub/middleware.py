@@ -1,7 +1,13 @@
+import json
+import random
+
 from django.conf import settings
 from django.middleware.locale import LocaleMiddleware as DjangoLocaleMiddleware
 from django.utils.deprecation import MiddlewareMixin
 
+from kpi.utils import server_timing
+from kpi.utils.log import logging
+
 
 class LocaleMiddleware(DjangoLocaleMiddleware):
 
@@ -39,3 +45,90 @@ class UsernameInResponseHeaderMiddleware(MiddlewareMixin):
         if user.is_authenticated:
             response['X-KoBoNaUt'] = request.user.username
         return response
+
+
+class ServerTimingMiddleware:
+    """
+    Record where the time of each request is spent (queries to each database,
+    MongoDB, KoBoCAT and the cache) and expose it in the `Server-Timing` HTTP
+    header. `app` is the time left, i.e. spent in Python.
+
+    Slow requests are logged too, see
+    `SERVER_TIMING_SLOW_REQUEST_THRESHOLD`.
+
+    This middleware is only enabled with `SERVER_TIMING_ENABLED`. The body of
+    streamed responses is sent after the header, thus it is not measured.
+    """
+
+    UNITS = {
+        'cache_hits': 'keys',
+        'cache_misses': 'keys',
+        'kobocat': 'requests',
+        'mongo': 'calls',
+    }
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        server_timing.instrument_caches()
+        token = server_timing.activate()
+        try:
+            with server_timing.record_database_queries():
+                response = self.get_response(request)
+            timings = server_timing.get_timings()
+            elapsed = timings.elapsed
+        finally:
+            server_timing.deactivate(token)
+
+        metrics = [
+            (
+                metric,
+                timings.counts[metric],
+                timings.durations[metric] * 1000,
+            )
+            for metric in sorted(timings.counts)
+        ]
+        app_duration = elapsed * 1000 - sum(
+            duration for _, _, duration in metrics
+        )
+        response['Server-Timing'] = ', '.join(
+            [
+                f'{metric};desc="{count} {self._get_unit(metric)}"'
+                f';dur={duration:.1f}'
+                for metric, count, duration in metrics
+            ]
+            + [f'app;dur={app_duration:.1f}', f'total;dur={elapsed * 1000:.1f}']
+        )
+
+        if (
+            elapsed >= settings.SERVER_TIMING_SLOW_REQUEST_THRESHOLD
+            and random.random()
+            < settings.SERVER_TIMING_SLOW_REQUEST_LOG_SAMPLE_RATE
+        ):
+            logging.warning(
+                'Slow request: %s',
+                json.dumps(
+                    {
+                        'method': request.method,
+                        'path': request.path,
+                        'status': response.status_code,
+                        'duration': round(elapsed * 1000, 1),
+                        'app': round(app_duration, 1),
+                        'metrics': {
+                            metric: {
+                                'count': count,
+                                'duration': round(duration, 1),
+                            }
+                            for metric, count, duration in metrics
+                        },
+                    }
+                ),
+            )
+
+        return response
+
+    def _get_unit(self, metric: str) -> str:
+        if metric.startswith('db_'):
+            return 'queries'
+        return self.UNITS.get(metric, 'calls')
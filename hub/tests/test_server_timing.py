@@ -0,0 +1,110 @@
+# coding: utf-8
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from kpi.models import Asset
+from kpi.urls.router_api_v2 import URL_NAMESPACE as ROUTER_URL_NAMESPACE
+from kpi.utils import server_timing
+
+SERVER_TIMING_MIDDLEWARE = 'hub.middleware.ServerTimingMiddleware'
+
+
+@override_settings(
+    MIDDLEWARE=[SERVER_TIMING_MIDDLEWARE] + settings.MIDDLEWARE,
+    SERVER_TIMING_SLOW_REQUEST_THRESHOLD=60,
+)
+class ServerTimingTestCase(TestCase):
+    fixtures = ['test_data']
+
+    def setUp(self):
+        self.someuser = User.objects.get(username='someuser')
+        self.asset = Asset.objects.create(
+            owner=self.someuser,
+            asset_type='survey',
+            content={'survey': [{'name': 'q1', 'type': 'text', 'label': 'Q1'}]},
+        )
+        self.asset.deploy(backend='mock', active=True)
+        self.asset.deployment.mock_submissions(
+            [
+                {
+                    '__version__': self.asset.latest_deployed_version.uid,
+                    'q1': 'answer',
+                }
+            ]
+        )
+        self.asset.deployment.set_namespace(ROUTER_URL_NAMESPACE)
+        self.client.login(username='someuser', password='someuser')
+
+    def _get_server_timing(self, response) -> dict:
+        metrics = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_server_timing_header(self):
+        response = self.client.get(
+            self.asset.deployment.submission_list_url, {'format': 'json'}
+        )
+        assert response.status_code == 200
+        metrics = self._get_server_timing(response)
+        assert {'db_default', 'mongo', 'app', 'total'}.issubset(metrics)
+        assert metrics['db_default']['desc'].endswith(' queries"')
+        assert float(metrics['total']['dur']) >= float(
+            metrics['mongo']['dur']
+        )
+
+    @override_settings(MIDDLEWARE=settings.MIDDLEWARE)
+    def test_no_server_timing_header_when_disabled(self):
+        response = self.client.get(
+            self.asset.deployment.submission_list_url, {'format': 'json'}
+        )
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response
+
+    @override_settings(
+        SERVER_TIMING_SLOW_REQUEST_THRESHOLD=0,
+        SERVER_TIMING_SLOW_REQUEST_LOG_SAMPLE_RATE=1,
+    )
+    def test_slow_request_is_logged(self):
+        with self.assertLogs('console_logger', level='WARNING') as logs:
+            self.client.get(
+                self.asset.deployment.submission_list_url, {'format': 'json'}
+            )
+        records = [
+            record
+            for record in logs.records
+            if record.msg.startswith('Slow request')
+        ]
+        assert len(records) == 1
+        details = json.loads(records[0].args[0])
+        assert details['path'] == self.asset.deployment.submission_list_url
+        assert details['status'] == 200
+        assert 'mongo' in details['metrics']
+
+    @override_settings(
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+            }
+        }
+    )
+    def test_cache_hits_and_misses(self):
+        server_timing.instrument_caches()
+        cache.set('hit', 'value')
+        token = server_timing.activate()
+        try:
+            assert cache.get('hit') == 'value'
+            assert cache.get('miss', 'default') == 'default'
+            assert cache.get_many(['hit', 'miss', 'other_miss']) == {
+                'hit': 'value'
+            }
+            timings = server_timing.get_timings()
+        finally:
+            server_timing.deactivate(token)
+        assert timings.counts[server_timing.CACHE_HITS] == 2
+        assert timings.counts[server_timing.CACHE_MISSES] == 3
@@ -10,9 +10,12 @@ class KpiConfig(AppConfig):
     name = 'kpi'
 
     def ready(self, *args, **kwargs):
-        # Register signals only when the app is ready to avoid issues with models
-        # not loaded yet.
+        # Register signals (and checks relying on models) only when the app is
+        # ready to avoid issues with models not loaded yet.
         import kpi.signals
+        from kpi.utils.mongo_indexes import check_required_indexes
+
+        register(check_required_indexes, Tags.database)
 
         return super().ready(*args, **kwargs)
 
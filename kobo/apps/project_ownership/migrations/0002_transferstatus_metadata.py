@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_ownership', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transferstatus',
+            name='metadata',
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -10,6 +10,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as t
 
 from kobo.apps.help.models import InAppMessage, InAppMessageUsers
+from kobo.apps.trackers.models import MonthlyUsageRollup
 from kpi.constants import PERM_MANAGE_ASSET
 from kpi.deployment_backends.kc_access.utils import (
     assign_applicable_kc_permissions,
@@ -120,6 +121,7 @@ class Transfer(models.Model):
                             [self.asset.owner_id, new_owner.pk]
                         ):
                             # Update counters
+                            previous_owner_id = self.asset.owner_id
                             deployment.transfer_counters_ownership(new_owner)
                             previous_owner_username = self.asset.owner.username
                             self._reassign_project_permissions(
@@ -129,6 +131,11 @@ class Transfer(models.Model):
 
                         self._sent_in_app_messages()
 
+                # Counters of the previous and the new owners have changed.
+                MonthlyUsageRollup.roll_up(
+                    user_ids=[previous_owner_id, new_owner.pk]
+                )
+
                 # Move submissions, media files and attachments in background
                 # tasks because it can take a while to complete on big projects
 
@@ -321,6 +328,8 @@ class TransferStatus(models.Model):
         db_index=True
     )
     error = models.TextField(null=True)
+    # Progress of the asynchronous task, e.g. throughput of moved files
+    metadata = models.JSONField(default=dict)
     date_created = models.DateTimeField(default=timezone.now)
     date_modified = models.DateTimeField(default=timezone.now)
 
@@ -101,4 +101,5 @@ class TransferStatusSerializer(serializers.ModelSerializer):
             'status',
             'status_type',
             'error',
+            'metadata',
         )
@@ -0,0 +1,181 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from mock import PropertyMock, patch
+
+from kpi.models import Asset
+from ..models import (
+    Invite,
+    Transfer,
+    TransferStatusChoices,
+    TransferStatusTypeChoices,
+)
+from ..utils import _move_attachment, move_attachments
+
+
+class FakeFieldFile:
+
+    def __init__(self, name: str, storage: 'FakeStorage'):
+        self.name = name
+        self.storage = storage
+
+    def move(self, target_folder: str) -> bool:
+        if self.name in self.storage.broken_paths:
+            raise OSError(f'Cannot move {self.name}')
+        if not self.storage.exists(self.name):
+            return False
+        new_path = f'{target_folder}/{self.name.split("/")[-1]}'
+        self.storage.paths.remove(self.name)
+        self.storage.paths.add(new_path)
+        self.name = new_path
+        return True
+
+
+class FakeStorage:
+
+    def __init__(self, paths: list[str]):
+        self.paths = set(paths)
+        self.broken_paths = set()
+
+    def exists(self, path: str) -> bool:
+        return path in self.paths
+
+
+class FakeAttachmentManager:
+    """
+    Simulate `KobocatAttachment.all_objects`. Rows are stored as a dict of
+    paths indexed by primary key, and only saved by `bulk_update()`.
+    """
+
+    def __init__(self, rows: dict, storage: FakeStorage, pks=None):
+        self.rows = rows
+        self.storage = storage
+        self.pks = sorted(rows) if pks is None else pks
+
+    def __getitem__(self, key):
+        return [
+            SimpleNamespace(
+                pk=pk, media_file=FakeFieldFile(self.rows[pk], self.storage)
+            )
+            for pk in self.pks[key]
+        ]
+
+    def bulk_update(self, objs, fields):
+        for obj in objs:
+            self.rows[obj.pk] = obj.media_file.name
+
+    def exclude(self, media_file__startswith):
+        return self._clone(
+            pk for pk in self.pks
+            if not self.rows[pk].startswith(media_file__startswith)
+        )
+
+    def filter(self, pk__gt=0, **kwargs):
+        return self._clone(pk for pk in self.pks if pk > pk__gt)
+
+    def only(self, *args):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def _clone(self, pks):
+        return FakeAttachmentManager(self.rows, self.storage, list(pks))
+
+
+@override_settings(
+    PROJECT_OWNERSHIP_ATTACHMENT_BATCH_SIZE=2,
+    PROJECT_OWNERSHIP_ATTACHMENT_MAX_WORKERS=2,
+)
+class ProjectOwnershipMoveAttachmentsTestCase(TestCase):
+
+    fixtures = ['test_data']
+
+    def setUp(self):
+        User = get_user_model()  # noqa
+        someuser = User.objects.get(username='someuser')
+        anotheruser = User.objects.get(username='anotheruser')
+        invite = Invite.objects.create(sender=someuser, recipient=anotheruser)
+        # Ownership is transferred before attachments are moved
+        Asset.objects.filter(pk=1).update(owner=anotheruser)
+        self.transfer = Transfer.objects.create(
+            invite=invite, asset=Asset.objects.get(pk=1)
+        )
+        self.transfer.statuses.filter(
+            status_type=TransferStatusTypeChoices.SUBMISSIONS
+        ).update(status=TransferStatusChoices.SUCCESS)
+
+        paths = [
+            f'someuser/attachments/abc/{pk}/image{pk}.jpg' for pk in range(1, 6)
+        ]
+        self.storage = FakeStorage(paths)
+        self.attachments = FakeAttachmentManager(
+            dict(zip(range(1, 6), paths)), self.storage
+        )
+
+        kobocat_attachment = patch(
+            'kobo.apps.project_ownership.utils.KobocatAttachment'
+        ).start()
+        kobocat_attachment.all_objects = self.attachments
+        patch.object(
+            Asset,
+            'deployment',
+            new_callable=PropertyMock,
+            return_value=SimpleNamespace(xform_id=1),
+        ).start()
+        self.addCleanup(patch.stopall)
+
+    def _get_status(self):
+        return self.transfer.statuses.get(
+            status_type=TransferStatusTypeChoices.ATTACHMENTS
+        )
+
+    def test_move_attachments_by_batches(self):
+        move_attachments(self.transfer)
+
+        assert all(
+            path.startswith('anotheruser/')
+            for path in self.attachments.rows.values()
+        )
+        assert self.storage.paths == set(self.attachments.rows.values())
+        status = self._get_status()
+        assert status.status == TransferStatusChoices.SUCCESS
+        assert status.metadata['moved_files'] == 5
+
+    def test_resume_move_attachments_after_batch_failure(self):
+        # The second batch (attachments 3 and 4) fails on attachment 3
+        self.storage.broken_paths.add(self.attachments.rows[3])
+
+        with self.assertRaises(OSError):
+            move_attachments(self.transfer)
+
+        # Attachment 4 has been moved and saved anyway. Attachment 5 (next
+        # batch) has not been processed.
+        assert self.attachments.rows[3].startswith('someuser/')
+        assert self.attachments.rows[4].startswith('anotheruser/')
+        assert self.attachments.rows[5].startswith('someuser/')
+        status = self._get_status()
+        assert status.status != TransferStatusChoices.SUCCESS
+        assert status.metadata['moved_files'] == 3
+
+        self.storage.broken_paths.clear()
+        with patch(
+            'kobo.apps.project_ownership.utils._move_attachment',
+            wraps=_move_attachment,
+        ) as move_attachment:
+            move_attachments(self.transfer)
+
+        # Only the remaining attachments are moved, and the progress of the
+        # previous run is carried over
+        moved_pks = sorted(
+            call.args[0].pk for call in move_attachment.call_args_list
+        )
+        assert moved_pks == [3, 5]
+        assert all(
+            path.startswith('anotheruser/')
+            for path in self.attachments.rows.values()
+        )
+        status = self._get_status()
+        assert status.status == TransferStatusChoices.SUCCESS
+        assert status.metadata['moved_files'] == 5
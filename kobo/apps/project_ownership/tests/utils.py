@@ -7,7 +7,7 @@ class MockServiceUsageSerializer:
     def _get_storage_usage(self):
 
         assets = Asset.objects.annotate(user_id=F('owner_id')).filter(
-            self._user_id_query
+            user_id__in=self._user_ids
         )
 
         self._total_storage_bytes = 0
@@ -25,7 +25,7 @@ class MockServiceUsageSerializer:
             'current_month': 0,
         }
         assets = Asset.objects.annotate(user_id=F('owner_id')).filter(
-            self._user_id_query
+            user_id__in=self._user_ids
         )
         for asset in assets:
             if asset.has_deployment:
@@ -1,7 +1,11 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional
 
 from django.apps import apps
+from django.conf import settings
 from django.utils import timezone
 
 from kpi.deployment_backends.kc_access.shadow_models import (
@@ -42,46 +46,71 @@ def move_attachments(transfer: 'project_ownership.Transfer'):
             '`_userform_id` has not been updated successfully'
         )
 
-    submissions = transfer.asset.deployment.get_submissions(
-        transfer.asset.owner, fields=['_id']
-    )
-
-    submission_ids = [
-        s['_id']
-        for s in submissions
-    ]
+    previous_owner_username = transfer.invite.sender.username
+    new_owner_username = transfer.invite.recipient.username
 
-    if not submission_ids:
-        _mark_task_as_successful(transfer, async_task_type)
-        return
+    # Select attachments through their submission XForm instead of a (huge)
+    # list of submission ids. Attachments already moved to the new owner's
+    # folder are skipped, which lets the task resume where it stopped in case
+    # of failure.
+    attachments = (
+        KobocatAttachment.all_objects.filter(
+            instance__xform_id=transfer.asset.deployment.xform_id
+        )
+        .exclude(media_file__startswith=f'{transfer.asset.owner.username}/')
+        .only('pk', 'media_file')
+        .order_by('pk')
+    )
 
-    attachments = KobocatAttachment.all_objects.filter(
-        instance_id__in=submission_ids
-    ).exclude(media_file__startswith=f'{transfer.asset.owner.username}/')
+    batch_size = settings.PROJECT_OWNERSHIP_ATTACHMENT_BATCH_SIZE
+    # Resume the progress of a previous run, if any
+    metadata = transfer.statuses.get(status_type=async_task_type).metadata
+    moved_count = metadata.get('moved_files', 0)
+    start_time = time.monotonic() - metadata.get('elapsed_seconds', 0)
+    last_pk = 0
+    move_attachment = partial(
+        _move_attachment,
+        previous_owner_username=previous_owner_username,
+        new_owner_username=new_owner_username,
+    )
 
-    for attachment in attachments.iterator():
-        # Pretty slow but it should run in celery task. We want to be the
-        # path of the file is saved right away. It lets us resume when it stopped
-        # in case of failure.
-        if not (
-            target_folder := get_target_folder(
-                transfer.invite.sender.username,
-                transfer.invite.recipient.username,
-                attachment.media_file.name,
+    with ThreadPoolExecutor(
+        max_workers=settings.PROJECT_OWNERSHIP_ATTACHMENT_MAX_WORKERS
+    ) as executor:
+        while batch := list(attachments.filter(pk__gt=last_pk)[:batch_size]):
+            last_pk = batch[-1].pk
+            futures = [
+                executor.submit(move_attachment, attachment)
+                for attachment in batch
+            ]
+            moved_attachments = []
+            error = None
+            for attachment, future in zip(batch, futures):
+                try:
+                    if future.result():
+                        moved_attachments.append(attachment)
+                except Exception as e:
+                    error = error or e
+
+            # Save new paths of the whole batch right away, even if some files
+            # could not be moved. It lets us resume when it stopped in case of
+            # failure.
+            KobocatAttachment.all_objects.bulk_update(
+                moved_attachments, fields=['media_file']
             )
-        ):
-            continue
-        else:
-            attachment.media_file.move(target_folder)
-            attachment.save(update_fields=['media_file'])
+            moved_count += len(moved_attachments)
 
-            # We only need to update `date_modified` to update task heart beat.
-            # No need to use `TransferStatus.update_status()` and
-            # its lock mechanism.
+            # We only need to update `date_modified` (and progress) to update
+            # task heart beat. No need to use `TransferStatus.update_status()`
+            # and its lock mechanism.
             transfer.statuses.filter(status_type=async_task_type).update(
-                date_modified=timezone.now()
+                date_modified=timezone.now(),
+                metadata=_get_throughput(moved_count, start_time),
             )
 
+            if error:
+                raise error
+
     _mark_task_as_successful(transfer, async_task_type)
 
 
@@ -159,6 +188,15 @@ def rewrite_mongo_userform_id(transfer: 'project_ownership.Transfer'):
     )
 
 
+def _get_throughput(moved_count: int, start_time: float) -> dict:
+    elapsed = time.monotonic() - start_time
+    return {
+        'moved_files': moved_count,
+        'elapsed_seconds': round(elapsed, 2),
+        'files_per_second': round(moved_count / elapsed, 2) if elapsed else 0,
+    }
+
+
 def _mark_task_as_successful(
     transfer: 'project_ownership.Transfer', async_task_type: str
 ):
@@ -166,3 +204,35 @@ def _mark_task_as_successful(
     TransferStatus.update_status(
         transfer.pk, TransferStatusChoices.SUCCESS, async_task_type
     )
+
+
+def _move_attachment(
+    attachment: KobocatAttachment,
+    previous_owner_username: str,
+    new_owner_username: str,
+) -> bool:
+    """
+    Move the file of `attachment` to the new owner's folder and update
+    its path (without saving it). Return whether its path has changed.
+    """
+    if not (
+        target_folder := get_target_folder(
+            previous_owner_username,
+            new_owner_username,
+            attachment.media_file.name,
+        )
+    ):
+        return False
+
+    if attachment.media_file.move(target_folder):
+        return True
+
+    # The file may have been moved by a previous run which stopped before
+    # its new path was saved.
+    basename = os.path.basename(attachment.media_file.name)
+    new_path = f'{target_folder}/{basename}'
+    if attachment.media_file.storage.exists(new_path):
+        attachment.media_file.name = new_path
+        return True
+
+    return False
@@ -22,10 +22,14 @@ def build_formpack(asset, submission_stream=None, use_all_form_versions=True):
     """
 
     if asset.has_deployment:
+        # Fetch the content of each version along with it, i.e. in one query
+        deployed_versions = asset.deployed_versions.select_related(
+            'content_blob'
+        )
         if use_all_form_versions:
-            _versions = asset.deployed_versions
+            _versions = deployed_versions
         else:
-            _versions = [asset.deployed_versions.first()]
+            _versions = [deployed_versions.first()]
     else:
         # Use the newest version only if the asset was never deployed
         _versions = [asset.asset_versions.first()]
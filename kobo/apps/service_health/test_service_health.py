@@ -1,30 +1,125 @@
+import time
+
 import responses
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from kobo.apps.service_health import views
+
 
+@override_settings(SERVICE_HEALTH_CACHE_TIMEOUT=0)
 class ServiceHealthTestCase(TestCase):
     url = reverse('service-health')
+    readiness_url = reverse('service-health-readiness')
 
-    @responses.activate
-    def test_service_health(self):
-        responses.add(responses.GET, settings.ENKETO_INTERNAL_URL, status=200)
+    def setUp(self):
+        views._cached_checks['expires'] = 0
+
+    def _add_responses(self, enketo_status: int = 200):
+        responses.add(
+            responses.GET, settings.ENKETO_INTERNAL_URL, status=enketo_status
+        )
         responses.add(
             responses.GET,
             settings.KOBOCAT_INTERNAL_URL + '/service_health/',
             status=200,
         )
+
+    @responses.activate
+    def test_service_health(self):
+        self._add_responses()
         res = self.client.get(self.url)
         self.assertContains(res, "OK")
 
     @responses.activate
     def test_service_health_failure(self):
-        responses.add(responses.GET, settings.ENKETO_INTERNAL_URL, status=500)
+        self._add_responses(enketo_status=500)
+        res = self.client.get(self.url)
+        self.assertContains(res, "HTTPError", status_code=500)
+
+    @responses.activate
+    def test_service_health_readiness(self):
+        self._add_responses()
+        res = self.client.get(self.readiness_url)
+        assert res.status_code == 200
+        data = res.json()
+        assert data['status'] == 'OK'
+        assert 'Kobocat' in data['checks']
+        for check in data['checks'].values():
+            assert check['status'] == 'OK'
+            assert check['error'] is None
+            assert check['duration'] >= 0
+
+    @responses.activate
+    def test_service_health_readiness_failure(self):
+        self._add_responses(enketo_status=500)
+        res = self.client.get(self.readiness_url)
+        assert res.status_code == 503
+        data = res.json()
+        assert data['status'] == 'FAIL'
+        assert data['checks']['Enketo']['status'] == 'FAIL'
+        assert data['checks']['Enketo']['error'] == "'HTTPError'"
+        assert data['checks']['Mongo']['status'] == 'OK'
+
+    @override_settings(SERVICE_HEALTH_CHECK_TIMEOUT=1)
+    @responses.activate
+    def test_service_health_readiness_timeout(self):
+        def hanging_enketo(request):
+            time.sleep(2)
+            return 200, {}, ''
+
+        responses.add_callback(
+            responses.GET, settings.ENKETO_INTERNAL_URL, callback=hanging_enketo
+        )
         responses.add(
             responses.GET,
             settings.KOBOCAT_INTERNAL_URL + '/service_health/',
             status=200,
         )
+        start = time.monotonic()
+        res = self.client.get(self.readiness_url)
+        assert time.monotonic() - start < 2
+        assert res.status_code == 503
+        data = res.json()
+        assert (
+            data['checks']['Enketo']['error']
+            == 'TimeoutError: check exceeded 1 s'
+        )
+        assert data['checks']['Kobocat']['status'] == 'OK'
+
+        # The hanging check is not run again until it returns
+        res = self.client.get(self.readiness_url)
+        data = res.json()
+        assert data['checks']['Enketo']['error'].startswith(
+            'TimeoutError: check still running'
+        )
+
+        # Once it has returned, it is run again
+        future, _ = views._running_checks['Enketo']
+        future.result()
+        assert len(responses.calls) == 3
+        responses.replace(
+            responses.GET, settings.ENKETO_INTERNAL_URL, status=200
+        )
+        res = self.client.get(self.readiness_url)
+        assert res.status_code == 200
+        assert len(responses.calls) == 5
+
+    @override_settings(SERVICE_HEALTH_CACHE_TIMEOUT=60)
+    @responses.activate
+    def test_service_health_results_are_cached(self):
+        self._add_responses()
+        res = self.client.get(self.readiness_url)
+        assert res.status_code == 200
+        assert len(responses.calls) == 2
+
+        # Enketo fails, but the cached results are still returned
+        responses.replace(
+            responses.GET, settings.ENKETO_INTERNAL_URL, status=500
+        )
+        res = self.client.get(self.readiness_url)
+        assert res.status_code == 200
         res = self.client.get(self.url)
-        self.assertContains(res, "HTTPError", status_code=500)
+        assert res.status_code == 200
+        assert len(responses.calls) == 2
@@ -13,3 +13,8 @@ class ServiceHealthMinimalTestCase(TestCase):
         with self.assertNumQueries(0):
             res = self.client.get(self.url)
         self.assertContains(res, 'ok')
+
+    def test_service_health_liveness(self):
+        with self.assertNumQueries(0):
+            res = self.client.get(reverse('service-health-liveness'))
+        self.assertContains(res, 'ok')
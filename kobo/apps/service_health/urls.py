@@ -1,6 +1,10 @@
 from django.urls import path
 
-from .views import service_health, service_health_minimal
+from .views import (
+    service_health,
+    service_health_minimal,
+    service_health_readiness,
+)
 
 urlpatterns = [
     path('service_health/', service_health, name="service-health"),
@@ -9,4 +13,14 @@ urlpatterns = [
         service_health_minimal,
         name="service-health-minimal",
     ),
+    path(
+        'service_health/live/',
+        service_health_minimal,
+        name="service-health-liveness",
+    ),
+    path(
+        'service_health/ready/',
+        service_health_readiness,
+        name="service-health-readiness",
+    ),
 ]
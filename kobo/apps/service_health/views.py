@@ -1,43 +1,28 @@
 # coding: utf-8
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from typing import Callable, Optional, Tuple
 
 import requests
 from django.conf import settings
 from django.core.cache import cache, caches
-from django.http import HttpResponse
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
 
 from kobo.celery import celery_app
 from kpi.models import Asset
 from kpi.utils.log import logging
 
-
-def get_response(url_):
-    message = "OK"
-    failure = False
-    content = None
-
-    try:
-        # response timeout changed to 10 seconds from 45 as requested in
-        # issue linked here https://github.com/kobotoolbox/kpi/issues/2642
-        response_ = requests.get(url_, timeout=10)
-        response_.raise_for_status()
-        content = response_.text
-    except Exception as e:
-        response_ = None
-        message = repr(e)
-        failure = True
-    else:
-        # Response can be something else than 200. We need to validate this.
-        # For example: if domain name doesn't match, nginx returns a 204 status code.
-        status_code = response_.status_code
-        if status_code != 200:
-            response_ = None
-            content = None
-            failure = True
-            message = "Response status code is {}".format(status_code)
-
-    return failure, message, content
+# Results of the last checks, shared by the requests received by this
+# process within `settings.SERVICE_HEALTH_CACHE_TIMEOUT` seconds
+_cached_checks = {'results': None, 'expires': 0}
+_cached_checks_lock = threading.Lock()
+# Checks run by `_executor` which have not returned yet, as
+# `{service_name: (future, start_time)}`. Only read and written while
+# `_cached_checks_lock` is held.
+_running_checks = {}
+_executor = None
 
 
 def check_status(
@@ -61,47 +46,48 @@ def check_status(
     return error, cache_time
 
 
+def get_checks(request) -> dict:
+    """
+    Return the results of all the checks, run concurrently, as a dictionary
+    of `{service_name: {'error': ..., 'duration': ...}}`. `error` is `None`
+    if the service is healthy.
+
+    Each check is given `settings.SERVICE_HEALTH_CHECK_TIMEOUT` seconds; a
+    hanging check is reported as failed but keeps its thread until it
+    returns, and is not run again meanwhile. Results are cached for
+    `settings.SERVICE_HEALTH_CACHE_TIMEOUT` seconds to avoid hammering the
+    services with frequent health checks, e.g. from load balancers.
+    """
+    with _cached_checks_lock:
+        if _cached_checks['expires'] > time.monotonic():
+            return _cached_checks['results']
+
+        results = _run_checks(request)
+        _cached_checks['results'] = results
+        _cached_checks['expires'] = (
+            time.monotonic() + settings.SERVICE_HEALTH_CACHE_TIMEOUT
+        )
+        return results
+
+
 def service_health(request):
     """
     Return a HTTP 200 if some very basic runtime tests of the application
     pass. Otherwise, return HTTP 500
     """
-    all_checks = {
-        'Mongo': lambda: settings.MONGO_DB.instances.find_one(),
-        'Postgres': lambda: Asset.objects.order_by().exists(),
-        'Cache': lambda: cache.set('a', True, 1),
-        'Broker': lambda: celery_app.backend.client.ping(),
-        'Session': lambda: request.session.save(),
-        'Enketo': lambda: requests.get(
-            settings.ENKETO_INTERNAL_URL, timeout=10
-        ).raise_for_status(),
-        'Enketo Redis (main)': lambda: caches['enketo_redis_main'].set('a', True, 1),
-    }
-
+    checks = get_checks(request)
+    any_failure = any(check['error'] for check in checks.values())
     check_results = []
-    any_failure = False
-    for service_name, check_function in all_checks.items():
-        service_message, service_time = check_status(
-            service_name, check_function
-        )
-        any_failure = True if service_message else any_failure
+    for service_name, check in checks.items():
         check_results.append(
-            f"{service_name}: {service_message or 'OK'} in {service_time:.3} seconds"
+            f"{service_name}: {check['error'] or 'OK'} in "
+            f"{check['duration']:.3} seconds"
         )
 
-    t0 = time.time()
-    failure, kobocat_message, kobocat_content = get_response(
-        settings.KOBOCAT_INTERNAL_URL + '/service_health/'
-    )
-    any_failure = True if failure else any_failure
-    kobocat_time = time.time() - t0
-    check_results.append(
-        f'Kobocat: {kobocat_message} in {kobocat_time:.3} seconds'
-    )
-
     output = f"{'FAIL' if any_failure else 'OK'} KPI\r\n\r\n"
     output += "\r\n".join(check_results)
 
+    kobocat_content = checks['Kobocat'].get('content')
     if kobocat_content:
         output += (
             '\r\n\r\n'
@@ -116,4 +102,124 @@ def service_health(request):
 
 
 def service_health_minimal(request):
+    """
+    Liveness check: makes no connections to databases or other services
+    """
     return HttpResponse("ok", content_type="text/plain")
+
+
+def service_health_readiness(request):
+    """
+    Readiness check: return a HTTP 200 with the status and the duration (in
+    seconds) of each check if all services are healthy. Otherwise, return
+    HTTP 503.
+    """
+    checks = get_checks(request)
+    any_failure = any(check['error'] for check in checks.values())
+    return JsonResponse(
+        {
+            'status': 'FAIL' if any_failure else 'OK',
+            'checks': {
+                service_name: {
+                    'status': 'FAIL' if check['error'] else 'OK',
+                    'error': check['error'],
+                    'duration': round(check['duration'], 3),
+                }
+                for service_name, check in checks.items()
+            },
+        },
+        status=503 if any_failure else 200,
+    )
+
+
+def _check_status_in_thread(*args) -> Tuple[Optional[str], float]:
+    """
+    Wrap `check_status()` to close the DB connections opened by the worker
+    thread.
+    """
+    try:
+        return check_status(*args)
+    finally:
+        connections.close_all()
+
+
+def _run_checks(request) -> dict:
+    timeout = settings.SERVICE_HEALTH_CHECK_TIMEOUT
+    kobocat_response = {}
+
+    def check_kobocat():
+        response = requests.get(
+            settings.KOBOCAT_INTERNAL_URL + '/service_health/', timeout=timeout
+        )
+        response.raise_for_status()
+        # Response can be something else than 200. For example: if domain name
+        # doesn't match, nginx returns a 204 status code.
+        if response.status_code != 200:
+            raise requests.HTTPError(
+                f'Response status code is {response.status_code}'
+            )
+        kobocat_response['content'] = response.text
+
+    all_checks = {
+        'Mongo': lambda: settings.MONGO_DB.instances.find_one(),
+        'Postgres': lambda: Asset.objects.order_by().exists(),
+        'Cache': lambda: cache.set('a', True, 1),
+        'Broker': lambda: celery_app.backend.client.ping(),
+        'Session': lambda: request.session.save(),
+        'Enketo': lambda: requests.get(
+            settings.ENKETO_INTERNAL_URL, timeout=timeout
+        ).raise_for_status(),
+        'Enketo Redis (main)': lambda: caches['enketo_redis_main'].set('a', True, 1),
+        'Kobocat': check_kobocat,
+    }
+
+    global _executor
+    if _executor is None:
+        # One thread per check is enough, since a check is never run again
+        # while it hangs
+        _executor = ThreadPoolExecutor(
+            max_workers=len(all_checks), thread_name_prefix='service_health'
+        )
+
+    start = time.monotonic()
+    results = {}
+    for service_name, check_function in all_checks.items():
+        if service_name in _running_checks:
+            future, check_start = _running_checks[service_name]
+            if not future.done():
+                # Do not pile up threads behind a hanging check
+                results[service_name] = {
+                    'error': (
+                        f'TimeoutError: check still running after '
+                        f'{start - check_start:.0f} s'
+                    ),
+                    'duration': start - check_start,
+                }
+                continue
+        _running_checks[service_name] = (
+            _executor.submit(
+                _check_status_in_thread, service_name, check_function
+            ),
+            start,
+        )
+
+    for service_name in all_checks:
+        if service_name in results:
+            continue
+        future, _ = _running_checks[service_name]
+        # All checks started at the same time, thus each one gets what is left
+        # of the timeout
+        remaining = max(timeout - (time.monotonic() - start), 0)
+        try:
+            error, duration = future.result(timeout=remaining)
+        except TimeoutError:
+            logging.error(f'Service health {service_name} check timed out')
+            error = f'TimeoutError: check exceeded {timeout} s'
+            duration = timeout
+        else:
+            del _running_checks[service_name]
+        results[service_name] = {'error': error, 'duration': duration}
+
+    results = {service_name: results[service_name] for service_name in all_checks}
+    results['Kobocat']['content'] = kobocat_response.get('content')
+    return results
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2024-06-10 09:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trackers', '0005_remove_year_and_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('last_day', models.DateField(db_index=True)),
+                ('submission_count', models.PositiveIntegerField(default=0)),
+                ('total_asr_seconds', models.PositiveIntegerField(default=0)),
+                ('total_mt_characters', models.PositiveIntegerField(default=0)),
+                ('date_modified', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_usage_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyusagerollup',
+            constraint=models.UniqueConstraint(fields=('user', 'month'), name='unique_user_month_rollup'),
+        ),
+    ]
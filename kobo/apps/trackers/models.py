@@ -1,6 +1,14 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Max, Min, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
 from django.db.models.constraints import UniqueConstraint
 from django.db.models.signals import post_delete
 
@@ -53,6 +61,362 @@ class NLPUsageCounter(models.Model):
             )
 
 
+class MonthlyUsageRollup(models.Model):
+    """
+    Monthly totals of the raw daily usage counters, per user:
+        - submissions, from `KobocatDailyXFormSubmissionCounter`;
+        - NLP usage, from `NLPUsageCounter`.
+
+    The nightly task `roll_up_usage` recomputes the months touched since the
+    previous run, up to yesterday. `last_day` is the last day included in a
+    row, and the greatest `last_day` of the table is the date the whole table
+    is rolled up through.
+
+    Usage over any period is read with `get_usage_totals()`: whole months come
+    from this table and the remaining days (i.e. the head of a period which
+    does not start on the first day of a month, and the days since the last
+    roll-up) from the raw counters. Organization usage is the sum of its
+    members' rows.
+
+    `check_consistency()` compares the rows with the raw counters.
+    """
+
+    user = models.ForeignKey(
+        User, related_name='monthly_usage_rollups', on_delete=models.CASCADE
+    )
+    month = models.DateField()
+    last_day = models.DateField(db_index=True)
+    submission_count = models.PositiveIntegerField(default=0)
+    total_asr_seconds = models.PositiveIntegerField(default=0)
+    total_mt_characters = models.PositiveIntegerField(default=0)
+    date_modified = models.DateTimeField(default=timezone.now)
+
+    COUNTER_FIELDS = (
+        'submission_count',
+        'total_asr_seconds',
+        'total_mt_characters',
+    )
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'month'], name='unique_user_month_rollup'
+            ),
+        ]
+
+    @classmethod
+    def get_rolled_up_through(cls) -> Optional[date]:
+        return cls.objects.aggregate(last_day=Max('last_day'))['last_day']
+
+    @classmethod
+    def get_usage_totals(
+        cls,
+        user_ids: Iterable[int],
+        start_dates: dict[str, Optional[date]],
+        today: Optional[date] = None,
+    ) -> dict[str, dict[str, int]]:
+        """
+        Return the usage of users `user_ids` from each date of `start_dates`
+        (`None` meaning all time) through `today`, e.g.:
+
+            {
+                'current_month': {
+                    'submission_count': 12,
+                    'total_asr_seconds': 42,
+                    'total_mt_characters': 0,
+                },
+                ...
+            }
+        """
+        # Avoid circular import
+        from kpi.deployment_backends.kc_access.shadow_models import (
+            KobocatDailyXFormSubmissionCounter,
+        )
+
+        if today is None:
+            today = timezone.now().date()
+
+        user_ids = list(user_ids)
+        rolled_up_through = cls.get_rolled_up_through()
+
+        rollup_aggregates = {}
+        raw_filters = {}
+        for key, start_date in start_dates.items():
+            if start_date is None or start_date.day == 1:
+                first_full_month = start_date
+            else:
+                first_full_month = _get_next_month(start_date)
+
+            if rolled_up_through is None:
+                raw_filters[key] = _date_range(start_date, today)
+                continue
+
+            rollup_filter = Q(month__lte=rolled_up_through)
+            if first_full_month:
+                rollup_filter &= Q(month__gte=first_full_month)
+            for field in cls.COUNTER_FIELDS:
+                rollup_aggregates[f'{field}_{key}'] = Coalesce(
+                    Sum(field, filter=rollup_filter), 0
+                )
+
+            # Days before the first whole month of the period, and days which
+            # have not been rolled up yet
+            tail_start = rolled_up_through + timedelta(days=1)
+            if first_full_month:
+                tail_start = max(tail_start, first_full_month)
+            raw_filter = _date_range(tail_start, today)
+            if first_full_month and start_date != first_full_month:
+                raw_filter |= _date_range(
+                    start_date, first_full_month - timedelta(days=1)
+                )
+            raw_filters[key] = raw_filter
+
+        totals = {
+            key: {field: 0 for field in cls.COUNTER_FIELDS}
+            for key in start_dates
+        }
+
+        if rollup_aggregates:
+            rollups = cls.objects.filter(user_id__in=user_ids).aggregate(
+                **rollup_aggregates
+            )
+            for key in start_dates:
+                for field in cls.COUNTER_FIELDS:
+                    totals[key][field] += rollups[f'{field}_{key}']
+
+        raw_filter = Q()
+        for filter_ in raw_filters.values():
+            raw_filter |= filter_
+
+        submission_aggregates = {}
+        nlp_aggregates = {}
+        for key, filter_ in raw_filters.items():
+            submission_aggregates[f'submission_count_{key}'] = Coalesce(
+                Sum('counter', filter=filter_), 0
+            )
+            for field in ('total_asr_seconds', 'total_mt_characters'):
+                nlp_aggregates[f'{field}_{key}'] = Coalesce(
+                    Sum(field, filter=filter_), 0
+                )
+
+        raw_totals = KobocatDailyXFormSubmissionCounter.objects.filter(
+            raw_filter, user_id__in=user_ids
+        ).aggregate(**submission_aggregates)
+        raw_totals.update(
+            NLPUsageCounter.objects.filter(
+                raw_filter, user_id__in=user_ids
+            ).aggregate(**nlp_aggregates)
+        )
+        for key in start_dates:
+            for field in cls.COUNTER_FIELDS:
+                totals[key][field] += raw_totals[f'{field}_{key}']
+
+        return totals
+
+    @classmethod
+    @transaction.atomic
+    def roll_up(
+        cls,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        user_ids: Optional[Iterable[int]] = None,
+    ):
+        """
+        Recompute the rows of the months from `since` (the first counter if
+        `None`) through `until` (yesterday if `None`), from the raw counters.
+
+        If `user_ids` is provided, only the rows of these users are
+        recomputed, and not beyond `get_rolled_up_through()`.
+        """
+        if user_ids is not None:
+            # Other users' rows stop at the last roll-up. Going beyond it
+            # would count the days after it twice for these users.
+            rolled_up_through = cls.get_rolled_up_through()
+            if rolled_up_through is None:
+                return
+            until = min(until or rolled_up_through, rolled_up_through)
+        elif until is None:
+            until = timezone.now().date() - timedelta(days=1)
+
+        user_filters = {}
+        if user_ids is not None:
+            user_filters['user_id__in'] = list(user_ids)
+
+        if since is None:
+            since = _get_first_counter_date(**user_filters)
+            if since is None:
+                return
+        since = since.replace(day=1)
+        if since > until:
+            return
+
+        rows = {}
+        for user_id, month, totals in _iter_raw_monthly_totals(
+            since, until, **user_filters
+        ):
+            if (user_id, month) not in rows:
+                rows[(user_id, month)] = cls(
+                    user_id=user_id,
+                    month=month,
+                    last_day=min(
+                        _get_next_month(month) - timedelta(days=1), until
+                    ),
+                )
+            for field, value in totals.items():
+                setattr(rows[(user_id, month)], field, value)
+
+        # Rows whose raw counters are gone (e.g. transferred to another user)
+        # are reset rather than left stale.
+        cls.objects.filter(
+            month__gte=since, month__lte=until, **user_filters
+        ).update(
+            submission_count=0,
+            total_asr_seconds=0,
+            total_mt_characters=0,
+            date_modified=timezone.now(),
+        )
+        cls.objects.bulk_create(
+            rows.values(),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user', 'month'],
+            update_fields=[*cls.COUNTER_FIELDS, 'last_day', 'date_modified'],
+        )
+
+    @classmethod
+    def check_consistency(
+        cls,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        user_ids: Optional[Iterable[int]] = None,
+    ) -> list[dict]:
+        """
+        Compare the rows of the months from `since` through `until` (the
+        date the table is rolled up through if `None`) with the raw counters.
+
+        Return the mismatches, e.g.:
+
+            [
+                {
+                    'user_id': 1,
+                    'month': date(2024, 1, 1),
+                    'field': 'submission_count',
+                    'rollup': 10,
+                    'raw': 12,
+                },
+                ...
+            ]
+        """
+        if until is None:
+            until = cls.get_rolled_up_through()
+            if until is None:
+                return []
+
+        user_filters = {}
+        if user_ids is not None:
+            user_filters['user_id__in'] = list(user_ids)
+
+        if since is None:
+            since = _get_first_counter_date(**user_filters)
+            if since is None:
+                since = until
+        since = since.replace(day=1)
+
+        expected = defaultdict(dict)
+        for user_id, month, totals in _iter_raw_monthly_totals(
+            since, until, **user_filters
+        ):
+            expected[(user_id, month)].update(totals)
+
+        actual = {}
+        for row in cls.objects.filter(
+            month__gte=since, month__lte=until, **user_filters
+        ).values('user_id', 'month', *cls.COUNTER_FIELDS):
+            actual[(row.pop('user_id'), row.pop('month'))] = row
+
+        mismatches = []
+        for user_id, month in sorted(expected.keys() | actual.keys()):
+            for field in cls.COUNTER_FIELDS:
+                raw = expected.get((user_id, month), {}).get(field, 0)
+                rollup = actual.get((user_id, month), {}).get(field, 0)
+                if raw != rollup:
+                    mismatches.append(
+                        {
+                            'user_id': user_id,
+                            'month': month,
+                            'field': field,
+                            'rollup': rollup,
+                            'raw': raw,
+                        }
+                    )
+
+        return mismatches
+
+
+def _date_range(start_date: Optional[date], end_date: date) -> Q:
+    if start_date is None:
+        return Q(date__lte=end_date)
+    return Q(date__range=[start_date, end_date])
+
+
+def _get_first_counter_date(**user_filters) -> Optional[date]:
+    # Avoid circular import
+    from kpi.deployment_backends.kc_access.shadow_models import (
+        KobocatDailyXFormSubmissionCounter,
+    )
+
+    first_dates = [
+        model.objects.filter(**user_filters).aggregate(first=Min('date'))[
+            'first'
+        ]
+        for model in (KobocatDailyXFormSubmissionCounter, NLPUsageCounter)
+    ]
+    first_dates = [first_date for first_date in first_dates if first_date]
+    return min(first_dates) if first_dates else None
+
+
+def _get_next_month(date_: date) -> date:
+    return (date_.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _iter_raw_monthly_totals(since: date, until: date, **user_filters):
+    """
+    Yield `(user_id, month, totals)` from the raw counters between `since`
+    and `until`, with one grouped query per counter table.
+    """
+    # Avoid circular import
+    from kpi.deployment_backends.kc_access.shadow_models import (
+        KobocatDailyXFormSubmissionCounter,
+    )
+
+    submission_totals = (
+        KobocatDailyXFormSubmissionCounter.objects.filter(
+            date__range=[since, until], user_id__isnull=False, **user_filters
+        )
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month')
+        .annotate(submission_count=Sum('counter'))
+        .order_by()
+    )
+    for totals in submission_totals.iterator():
+        yield totals.pop('user_id'), totals.pop('month'), totals
+
+    nlp_totals = (
+        NLPUsageCounter.objects.filter(
+            date__range=[since, until], **user_filters
+        )
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month')
+        .annotate(
+            total_asr_seconds=Sum('total_asr_seconds'),
+            total_mt_characters=Sum('total_mt_characters'),
+        )
+        .order_by()
+    )
+    for totals in nlp_totals.iterator():
+        yield totals.pop('user_id'), totals.pop('month'), totals
+
+
 # signals are fired during cascade deletion (i.e. deletion initiated by the
 # removal of a related object), whereas the `delete()` model method is not
 # called
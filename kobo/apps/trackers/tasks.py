@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+
+from kobo.celery import celery_app
+from .models import MonthlyUsageRollup
+from .utils import flush_nlp_counters as flush_buffered_nlp_counters
+
+
+@celery_app.task(
+    queue='kpi_low_priority_queue',
+    soft_time_limit=settings.CELERY_LONG_RUNNING_TASK_SOFT_TIME_LIMIT,
+    time_limit=settings.CELERY_LONG_RUNNING_TASK_TIME_LIMIT,
+)
+def roll_up_usage():
+    """
+    Roll up raw usage counters through yesterday, starting from the month
+    before the last roll-up to catch counters written late. The first run
+    rolls up the whole history.
+    """
+    since = None
+    if rolled_up_through := MonthlyUsageRollup.get_rolled_up_through():
+        since = (rolled_up_through.replace(day=1) - timedelta(days=1)).replace(
+            day=1
+        )
+
+    MonthlyUsageRollup.roll_up(since=since)
+
+
+@celery_app.task(queue='kpi_low_priority_queue')
+def flush_nlp_counters():
+    flush_buffered_nlp_counters()
@@ -1,9 +1,18 @@
 from datetime import datetime
+from unittest.mock import patch
 
 from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import override_settings
+from django_redis import get_redis_connection
 
 from kobo.apps.trackers.models import NLPUsageCounter
-from kobo.apps.trackers.utils import update_nlp_counter
+from kobo.apps.trackers.utils import (
+    NLP_COUNTER_BUFFER_KEY,
+    NLP_COUNTER_FLUSHING_KEY,
+    flush_nlp_counters,
+    update_nlp_counter,
+)
 from kpi.models.asset import Asset
 from kpi.tests.kpi_test_case import KpiTestCase
 
@@ -32,6 +41,11 @@ class TrackersTestCases(KpiTestCase):
         asset.save()
         return asset
 
+    def _flush_nlp_counters(self) -> int:
+        # The flushed buffer is deleted once the increments are committed
+        with self.captureOnCommitCallbacks(execute=True):
+            return flush_nlp_counters()
+
     def test_asset_deletion(self):
         asset = self._create_asset()
         asset.deploy(backend='mock', active=True)
@@ -97,3 +111,117 @@ class TrackersTestCases(KpiTestCase):
         )
         assert tracker_two_services.counters[new_service] == initial_amount
         assert tracker_two_services.counters[service] == expected_amount
+
+    @override_settings(NLP_COUNTER_BUFFERING=True)
+    def test_buffered_nlp_counters(self):
+        redis_client = get_redis_connection()
+        redis_client.delete(NLP_COUNTER_BUFFER_KEY, NLP_COUNTER_FLUSHING_KEY)
+        asset = self._create_asset()
+
+        for _ in range(3):
+            update_nlp_counter('goog_asr_seconds', 10, self.user.id, asset.id)
+        update_nlp_counter('goog_mt_characters', 5, self.user.id, asset.id)
+        update_nlp_counter('goog_mt_characters', 7, self.user.id)
+
+        # Nothing is written until the buffer is flushed
+        assert not NLPUsageCounter.objects.exists()
+        assert self._flush_nlp_counters() == 2
+        assert not redis_client.exists(NLP_COUNTER_BUFFER_KEY)
+        assert not redis_client.exists(NLP_COUNTER_FLUSHING_KEY)
+
+        tracker = NLPUsageCounter.objects.get(asset_id=asset.id)
+        assert tracker.counters == {
+            'goog_asr_seconds': 30,
+            'goog_mt_characters': 5,
+        }
+        assert tracker.total_asr_seconds == 30
+        assert tracker.total_mt_characters == 5
+        catch_all_tracker = NLPUsageCounter.objects.get(asset=None)
+        assert catch_all_tracker.total_mt_characters == 7
+
+        # Increments add up to existing counters
+        update_nlp_counter('goog_asr_seconds', 10, self.user.id, asset.id)
+        assert self._flush_nlp_counters() == 1
+        tracker.refresh_from_db()
+        assert tracker.total_asr_seconds == 40
+
+    @override_settings(NLP_COUNTER_BUFFERING=True)
+    def test_interrupted_flush_is_resumed(self):
+        redis_client = get_redis_connection()
+        redis_client.delete(NLP_COUNTER_BUFFER_KEY, NLP_COUNTER_FLUSHING_KEY)
+        asset = self._create_asset()
+
+        update_nlp_counter('goog_asr_seconds', 10, self.user.id, asset.id)
+        # Simulate a flush interrupted before its increments were committed
+        redis_client.rename(NLP_COUNTER_BUFFER_KEY, NLP_COUNTER_FLUSHING_KEY)
+        update_nlp_counter('goog_asr_seconds', 5, self.user.id, asset.id)
+
+        self._flush_nlp_counters()
+        assert (
+            NLPUsageCounter.objects.get(asset_id=asset.id).total_asr_seconds
+            == 10
+        )
+        self._flush_nlp_counters()
+        assert (
+            NLPUsageCounter.objects.get(asset_id=asset.id).total_asr_seconds
+            == 15
+        )
+
+    @override_settings(NLP_COUNTER_BUFFERING=True)
+    def test_failed_flush_is_resumed(self):
+        redis_client = get_redis_connection()
+        redis_client.delete(NLP_COUNTER_BUFFER_KEY, NLP_COUNTER_FLUSHING_KEY)
+        asset = self._create_asset()
+
+        update_nlp_counter('goog_asr_seconds', 10, self.user.id, asset.id)
+        with patch(
+            'kobo.apps.trackers.utils._update_nlp_counters',
+            side_effect=DatabaseError,
+        ):
+            with self.assertRaises(DatabaseError):
+                self._flush_nlp_counters()
+
+        # The flushed buffer is kept until its increments are committed
+        assert redis_client.exists(NLP_COUNTER_FLUSHING_KEY)
+        assert not NLPUsageCounter.objects.exists()
+        update_nlp_counter('goog_asr_seconds', 5, self.user.id, asset.id)
+
+        assert self._flush_nlp_counters() == 1
+        assert (
+            NLPUsageCounter.objects.get(asset_id=asset.id).total_asr_seconds
+            == 10
+        )
+        assert self._flush_nlp_counters() == 1
+        assert (
+            NLPUsageCounter.objects.get(asset_id=asset.id).total_asr_seconds
+            == 15
+        )
+        # Increments are written once
+        assert self._flush_nlp_counters() == 0
+
+    @override_settings(NLP_COUNTER_BUFFERING=True)
+    def test_flush_after_user_or_asset_deletion(self):
+        redis_client = get_redis_connection()
+        redis_client.delete(NLP_COUNTER_BUFFER_KEY, NLP_COUNTER_FLUSHING_KEY)
+        asset = self._create_asset()
+        asset_id = asset.pk
+
+        update_nlp_counter('goog_asr_seconds', 10, self.user.id, asset_id)
+        update_nlp_counter('goog_asr_seconds', 5, self.user.id)
+        deleted_user_id = User.objects.order_by('-pk').first().pk + 1
+        update_nlp_counter('goog_asr_seconds', 7, deleted_user_id)
+        asset.delete()
+
+        # The increments of the deleted asset go to the catch-all counter,
+        # those of the deleted user are dropped
+        assert self._flush_nlp_counters() == 1
+        assert not redis_client.exists(NLP_COUNTER_FLUSHING_KEY)
+        assert not NLPUsageCounter.objects.filter(asset_id=asset_id).exists()
+        assert not NLPUsageCounter.objects.filter(
+            user_id=deleted_user_id
+        ).exists()
+        catch_all_counter = NLPUsageCounter.objects.get(
+            user=self.user, asset=None
+        )
+        assert catch_all_counter.total_asr_seconds == 15
+        assert catch_all_counter.counters == {'goog_asr_seconds': 15}
@@ -1,11 +1,101 @@
+import json
+from collections import defaultdict
+from datetime import date
 from typing import Optional
 
 from django.apps import apps
-from django.db.models import F
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import F, Q
 from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
 
 from kpi.utils.django_orm_helper import IncrementValue
 
+NLP_COUNTER_BUFFER_KEY = 'trackers:nlp_counter_buffer'
+# Buffer moved aside to be flushed, while new increments go to a fresh one
+NLP_COUNTER_FLUSHING_KEY = 'trackers:nlp_counter_buffer:flushing'
+NLP_COUNTER_FLUSH_LOCK_KEY = 'trackers:nlp_counter_buffer:lock'
+NLP_COUNTER_FLUSH_LOCK_TIMEOUT = 300  # seconds
+
+
+def buffer_nlp_counter(
+    service: str,
+    amount: int,
+    user_id: int,
+    asset_id: Optional[int] = None,
+):
+    """
+    Add `amount` to the buffered increments of `service`, to be written later
+    to `NLPUsageCounter` by `flush_nlp_counters()`.
+
+    The buffer is a Redis hash, i.e. it does not live in the worker process
+    and survives its shutdown.
+    """
+    field = ':'.join(
+        [
+            timezone.now().date().isoformat(),
+            str(user_id),
+            str(asset_id or ''),
+            service,
+        ]
+    )
+    get_redis_connection().hincrby(NLP_COUNTER_BUFFER_KEY, field, amount)
+
+
+def flush_nlp_counters() -> int:
+    """
+    Write buffered increments to `NLPUsageCounter`, with a few queries
+    whatever the number of counters instead of one update per ASR/MT call.
+
+    The buffer is atomically renamed, so that new increments go to a fresh
+    buffer, and is deleted only once its increments are committed. A buffer
+    left over by an interrupted or failed flush is flushed first.
+
+    Return the number of counters updated.
+    """
+    redis_client = get_redis_connection()
+    lock = redis_client.lock(
+        NLP_COUNTER_FLUSH_LOCK_KEY, timeout=NLP_COUNTER_FLUSH_LOCK_TIMEOUT
+    )
+    if not lock.acquire(blocking=False):
+        # Another flush is in progress
+        return 0
+
+    try:
+        try:
+            # Does nothing if a previous flush left its buffer over
+            redis_client.renamenx(
+                NLP_COUNTER_BUFFER_KEY, NLP_COUNTER_FLUSHING_KEY
+            )
+        except ResponseError:
+            # Nothing has been buffered since the previous flush
+            pass
+
+        increments = defaultdict(lambda: defaultdict(int))
+        for field, amount in redis_client.hgetall(
+            NLP_COUNTER_FLUSHING_KEY
+        ).items():
+            date_, user_id, asset_id, service = field.decode().split(':', 3)
+            criteria = (
+                date.fromisoformat(date_),
+                int(user_id),
+                int(asset_id) if asset_id else None,
+            )
+            increments[criteria][service] += int(amount)
+
+        with transaction.atomic():
+            updated_count = _update_nlp_counters(increments)
+            transaction.on_commit(
+                lambda: redis_client.delete(NLP_COUNTER_FLUSHING_KEY)
+            )
+    finally:
+        lock.release()
+
+    return updated_count
+
 
 def update_nlp_counter(
     service: str,
@@ -24,7 +114,14 @@ def update_nlp_counter(
                 on the service
             user_id (int): id of the asset owner
             asset_id (int) or None: Primary key for Asset Model
+
+    Increments are buffered if `settings.NLP_COUNTER_BUFFERING` is True,
+    unless a specific counter is targeted.
     """
+    if settings.NLP_COUNTER_BUFFERING and not counter_id:
+        buffer_nlp_counter(service, amount, user_id, asset_id)
+        return
+
     # Avoid circular import
     NLPUsageCounter = apps.get_model('trackers', 'NLPUsageCounter')  # noqa
 
@@ -40,14 +137,131 @@ def update_nlp_counter(
         counter, _ = NLPUsageCounter.objects.get_or_create(**criteria)
         counter_id = counter.pk
 
+    NLPUsageCounter.objects.filter(pk=counter_id).update(
+        **_get_increment_kwargs({service: amount})
+    )
+
+
+def _get_increment_kwargs(amounts_by_service: dict[str, int]) -> dict:
     # Update the total counters by the usage amount to keep them current
+    counters = 'counters'
     kwargs = {}
-    if service.endswith('asr_seconds'):
-        kwargs['total_asr_seconds'] = F('total_asr_seconds') + amount
-    if service.endswith('mt_characters'):
-        kwargs['total_mt_characters'] = F('total_mt_characters') + amount
+    for service, amount in amounts_by_service.items():
+        counters = IncrementValue(counters, keyname=service, increment=amount)
+        if service.endswith('asr_seconds'):
+            kwargs['total_asr_seconds'] = (
+                kwargs.get('total_asr_seconds', F('total_asr_seconds'))
+                + amount
+            )
+        if service.endswith('mt_characters'):
+            kwargs['total_mt_characters'] = (
+                kwargs.get('total_mt_characters', F('total_mt_characters'))
+                + amount
+            )
+    kwargs['counters'] = counters
+    return kwargs
 
-    NLPUsageCounter.objects.filter(pk=counter_id).update(
-        counters=IncrementValue('counters', keyname=service, increment=amount),
-        **kwargs,
+
+@transaction.atomic
+def _update_nlp_counters(
+    increments: dict[tuple[date, int, Optional[int]], dict[str, int]]
+) -> int:
+    """
+    Add `increments` to their counters, creating the missing ones, and return
+    the number of counters updated.
+
+    Users and assets may have been deleted since their usage was buffered.
+    Increments of deleted users are dropped, and those of deleted assets go
+    to the catch-all counter of their user (see
+    `NLPUsageCounter.update_catch_all_counters_on_delete()`).
+    """
+    # Avoid circular import
+    Asset = apps.get_model('kpi', 'Asset')  # noqa
+    NLPUsageCounter = apps.get_model('trackers', 'NLPUsageCounter')  # noqa
+
+    if not increments:
+        return 0
+
+    user_ids = set(
+        User.objects.filter(
+            pk__in={user_id for _, user_id, _ in increments}
+        ).values_list('pk', flat=True)
+    )
+    asset_ids = set(
+        Asset.all_objects.filter(
+            pk__in={asset_id for _, _, asset_id in increments if asset_id}
+        ).values_list('pk', flat=True)
+    )
+    valid_increments = defaultdict(lambda: defaultdict(int))
+    for (date_, user_id, asset_id), amounts in increments.items():
+        if user_id not in user_ids:
+            continue
+        if asset_id not in asset_ids:
+            asset_id = None
+        for service, amount in amounts.items():
+            valid_increments[(date_, user_id, asset_id)][service] += amount
+
+    if not valid_increments:
+        return 0
+
+    # Ensure all the counters exist first
+    NLPUsageCounter.objects.bulk_create(
+        [
+            NLPUsageCounter(date=date_, user_id=user_id, asset_id=asset_id)
+            for date_, user_id, asset_id in valid_increments
+        ],
+        ignore_conflicts=True,
     )
+
+    counter_filter = Q()
+    for date_, user_id, asset_id in valid_increments:
+        counter_filter |= Q(date=date_, user_id=user_id, asset_id=asset_id)
+
+    # Update all the counters at once
+    values = []
+    params = []
+    for counter_id, date_, user_id, asset_id in (
+        NLPUsageCounter.objects.filter(counter_filter)
+        .values_list('pk', 'date', 'user_id', 'asset_id')
+    ):
+        amounts = valid_increments[(date_, user_id, asset_id)]
+        values.append('(%s, %s::jsonb, %s, %s)')
+        params.extend(
+            [
+                counter_id,
+                json.dumps(amounts),
+                sum(
+                    amount
+                    for service, amount in amounts.items()
+                    if service.endswith('asr_seconds')
+                ),
+                sum(
+                    amount
+                    for service, amount in amounts.items()
+                    if service.endswith('mt_characters')
+                ),
+            ]
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {NLPUsageCounter._meta.db_table} AS c
+            SET counters = c.counters || (
+                    SELECT jsonb_object_agg(
+                        i.key,
+                        COALESCE((c.counters ->> i.key)::int, 0)
+                        + i.value::int
+                    )
+                    FROM jsonb_each_text(v.increments) AS i
+                ),
+                total_asr_seconds = c.total_asr_seconds + v.asr_seconds,
+                total_mt_characters = c.total_mt_characters + v.mt_characters
+            FROM (VALUES {', '.join(values)})
+                AS v (id, increments, asr_seconds, mt_characters)
+            WHERE c.id = v.id
+            """,
+            params,
+        )
+
+    return len(values)
@@ -1,3 +1,6 @@
 
 DELETE_PROJECT_STR_PREFIX = 'Delete project'
 DELETE_USER_STR_PREFIX = 'Delete user’s'
+# Key of the deployment data where the id of the last deleted submission is
+# stored while a project is emptied
+SUBMISSION_DELETION_CHECKPOINT_KEY = 'trash_last_deleted_submission_id'
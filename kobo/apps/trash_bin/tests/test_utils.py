@@ -1,19 +1,29 @@
 # coding: utf-8
+import uuid
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils.timezone import now
 from django_celery_beat.models import PeriodicTask
 from mock import patch
 
+from rest_framework import status
+
 from kobo.apps.audit_log.models import AuditAction, AuditLog
+from kpi.deployment_backends.mock_backend import MockDeploymentBackend
+from kpi.exceptions import KobocatCommunicationError
 from kpi.models import Asset
-from ..constants import DELETE_PROJECT_STR_PREFIX, DELETE_USER_STR_PREFIX
+from ..constants import (
+    DELETE_PROJECT_STR_PREFIX,
+    DELETE_USER_STR_PREFIX,
+    SUBMISSION_DELETION_CHECKPOINT_KEY,
+)
 from ..models.account import AccountTrash
 from ..models.project import ProjectTrash
 from ..tasks import empty_account
-from ..utils import move_to_trash, put_back
+from ..utils import _delete_submissions, move_to_trash, put_back
 
 
 class AccountTrashTestCase(TestCase):
@@ -279,3 +289,143 @@ class ProjectTrashTestCase(TestCase):
             user=asset.owner,
             action=AuditAction.PUT_BACK,
         ).exists()
+
+
+@override_settings(TRASH_SUBMISSION_DELETION_BATCH_SIZE=2)
+@patch.object(
+    MockDeploymentBackend,
+    'get_orphan_postgres_submissions',
+    return_value=False,
+    create=True,
+)
+class SubmissionDeletionTestCase(TransactionTestCase):
+    """
+    Worker threads use their own DB connections, which only see committed
+    data
+    """
+
+    fixtures = ['test_data']
+
+    def setUp(self):
+        self.someuser = get_user_model().objects.get(username='someuser')
+        self.asset = Asset.objects.create(
+            owner=self.someuser,
+            asset_type='survey',
+            content={
+                'survey': [{'type': 'text', 'label': 'q1', 'name': 'q1'}]
+            },
+        )
+        self.asset.deploy(backend='mock', active=True)
+        self.asset.save()
+        settings.MONGO_DB.instances.drop()
+        self.submission_ids = list(range(1, 8))
+        self.asset.deployment.mock_submissions(
+            [
+                {'_id': submission_id, '_uuid': str(uuid.uuid4()), 'q1': 'a'}
+                for submission_id in self.submission_ids
+            ]
+        )
+
+    def _get_checkpoint(self):
+        self.asset.refresh_from_db()
+        return self.asset.deployment.get_data(
+            SUBMISSION_DELETION_CHECKPOINT_KEY
+        )
+
+    def _get_deleted_submission_ids(self):
+        return list(
+            AuditLog.objects.filter(
+                model_name='instance', action=AuditAction.DELETE
+            ).values_list('object_id', flat=True)
+        )
+
+    def _get_remaining_submission_ids(self):
+        return [
+            submission['_id']
+            for submission in self.asset.deployment.get_submissions(
+                self.someuser, fields=['_id']
+            )
+        ]
+
+    def _fail_on_submission(self, submission_id):
+        delete_submissions = MockDeploymentBackend.delete_submissions
+
+        def side_effect(deployment, data, user):
+            if submission_id in data['submission_ids']:
+                return {'status': status.HTTP_502_BAD_GATEWAY}
+            return delete_submissions(deployment, data, user)
+
+        return patch.object(
+            MockDeploymentBackend,
+            'delete_submissions',
+            autospec=True,
+            side_effect=side_effect,
+        )
+
+    @override_settings(TRASH_SUBMISSION_DELETION_MAX_WORKERS=3)
+    def test_delete_submissions_with_several_workers(self, *args):
+        with patch.object(
+            MockDeploymentBackend,
+            'delete_submissions',
+            autospec=True,
+            side_effect=MockDeploymentBackend.delete_submissions,
+        ) as delete_submissions:
+            _delete_submissions(self.someuser, self.asset)
+
+        # 7 submissions, by batches of 2
+        assert delete_submissions.call_count == 4
+        assert not self._get_remaining_submission_ids()
+        assert sorted(self._get_deleted_submission_ids()) == self.submission_ids
+        assert self._get_checkpoint() == 7
+
+    @override_settings(TRASH_SUBMISSION_DELETION_MAX_WORKERS=1)
+    def test_resume_submission_deletion_from_checkpoint(self, *args):
+        # The second batch fails. Only the first one is acknowledged.
+        with self._fail_on_submission(3):
+            with self.assertRaises(KobocatCommunicationError):
+                _delete_submissions(self.someuser, self.asset)
+
+        assert self._get_checkpoint() == 2
+        assert sorted(self._get_deleted_submission_ids()) == [1, 2]
+        assert self._get_remaining_submission_ids() == [3, 4, 5, 6, 7]
+
+        with patch.object(
+            MockDeploymentBackend,
+            'delete_submissions',
+            autospec=True,
+            side_effect=MockDeploymentBackend.delete_submissions,
+        ) as delete_submissions:
+            _delete_submissions(self.someuser, self.asset)
+
+        # The retry starts after the checkpoint
+        requested_ids = [
+            submission_id
+            for call in delete_submissions.call_args_list
+            for submission_id in call.args[1]['submission_ids']
+        ]
+        assert requested_ids == [3, 4, 5, 6, 7]
+        assert not self._get_remaining_submission_ids()
+        assert sorted(self._get_deleted_submission_ids()) == self.submission_ids
+        assert self._get_checkpoint() == 7
+
+    @override_settings(TRASH_SUBMISSION_DELETION_MAX_WORKERS=3)
+    def test_resume_concurrent_submission_deletion_after_failure(self, *args):
+        with self._fail_on_submission(3):
+            with self.assertRaises(KobocatCommunicationError):
+                _delete_submissions(self.someuser, self.asset)
+
+        # Other workers may have deleted later batches. Each deleted
+        # submission must be logged anyway, and the checkpoint must not go
+        # beyond the failed batch.
+        remaining_ids = self._get_remaining_submission_ids()
+        assert 3 in remaining_ids
+        assert sorted(self._get_deleted_submission_ids()) == sorted(
+            set(self.submission_ids) - set(remaining_ids)
+        )
+        assert self._get_checkpoint() == 2
+
+        _delete_submissions(self.someuser, self.asset)
+
+        assert not self._get_remaining_submission_ids()
+        assert sorted(self._get_deleted_submission_ids()) == self.submission_ids
+        assert self._get_checkpoint() == 7
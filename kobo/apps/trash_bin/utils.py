@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from datetime import timedelta
+from typing import Generator, Iterable
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
-from django.db import IntegrityError, models, transaction
+from django.db import IntegrityError, connections, models, transaction
 from django.db.models import F, Q
 from django.db.models.signals import pre_delete
 from django.utils.timezone import now
@@ -22,7 +25,11 @@ from kpi.exceptions import KobocatCommunicationError
 from kpi.models import Asset, ExportTask, ImportTask
 from kpi.utils.mongo_helper import MongoHelper
 from kpi.utils.storage import rmdir
-from .constants import DELETE_PROJECT_STR_PREFIX, DELETE_USER_STR_PREFIX
+from .constants import (
+    DELETE_PROJECT_STR_PREFIX,
+    DELETE_USER_STR_PREFIX,
+    SUBMISSION_DELETION_CHECKPOINT_KEY,
+)
 from .exceptions import (
     TrashIntegrityError,
     TrashNotImplementedError,
@@ -286,74 +293,151 @@ def replace_user_with_placeholder(
 
 
 def _delete_submissions(request_author: 'auth.User', asset: 'kpi.Asset'):
+    """
+    Delete all submissions of `asset` through its deployment back end.
 
+    Submissions are fetched from MongoDB by ranges of `_id` and deleted by
+    batches of `settings.TRASH_SUBMISSION_DELETION_BATCH_SIZE`. Up to
+    `settings.TRASH_SUBMISSION_DELETION_MAX_WORKERS` bulk delete requests are
+    sent to KoBoCAT concurrently.
+
+    The id of the last deleted submission is saved in the deployment data
+    after each batch, so a retry resumes where the previous attempt stopped.
+    """
+    max_workers = settings.TRASH_SUBMISSION_DELETION_MAX_WORKERS
+    batches = _get_submission_batches(asset)
+
+    if max_workers <= 1:
+        for submissions in batches:
+            audit_logs = _delete_submission_batch(
+                request_author, asset, submissions
+            )
+            _save_submission_deletion_checkpoint(asset, audit_logs)
+    else:
+        # Keep futures in submission order to never save a checkpoint beyond
+        # a batch which has not been deleted yet.
+        futures = deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for submissions in batches:
+                    futures.append(
+                        executor.submit(
+                            _delete_submission_batch_in_thread,
+                            request_author,
+                            asset,
+                            submissions,
+                        )
+                    )
+                    if len(futures) >= max_workers:
+                        _save_submission_deletion_checkpoint(
+                            asset, futures.popleft().result()
+                        )
+                while futures:
+                    _save_submission_deletion_checkpoint(
+                        asset, futures.popleft().result()
+                    )
+            except Exception:
+                # Do not lose the audit logs of the batches which have been
+                # deleted by the other workers.
+                for future in futures:
+                    if not future.cancel() and not future.exception():
+                        AuditLog.objects.bulk_create(future.result())
+                raise
+
+    # Submissions can linger in PostgreSQL even if they do not exist anymore
+    # in MongoDB.
+    while True:
+        if not (
+            queryset_or_false := asset.deployment.get_orphan_postgres_submissions()
+        ):
+            break
+
+        # Make submissions an iterable similar to what
+        # `deployment.get_submissions()` would return
+        if not (
+            submissions := queryset_or_false.annotate(
+                _id=F('pk'), _uuid=F('uuid')
+            ).values('_id', '_uuid')[
+                :settings.TRASH_SUBMISSION_DELETION_BATCH_SIZE
+            ]
+        ):
+            break
+
+        AuditLog.objects.bulk_create(
+            _delete_submission_batch(request_author, asset, submissions)
+        )
+
+
+def _delete_submission_batch(
+    request_author: 'auth.User',
+    asset: 'kpi.Asset',
+    submissions: Iterable[dict],
+) -> list[AuditLog]:
+    """
+    Delete `submissions` through the deployment back end and return the
+    (unsaved) audit logs of the deletion.
+    """
     (
         app_label,
         model_name,
     ) = asset.deployment.submission_model.get_app_label_and_model_name()
 
-    while True:
-        audit_logs = []
-        submissions = list(asset.deployment.get_submissions(
-            asset.owner, fields=['_id', '_uuid'], limit=200
+    audit_logs = []
+    submission_ids = []
+    for submission in submissions:
+        audit_logs.append(AuditLog(
+            app_label=app_label,
+            model_name=model_name,
+            object_id=submission['_id'],
+            user=request_author,
+            user_uid=request_author.extra_details.uid,
+            metadata={
+                'asset_uid': asset.uid,
+                'uuid': submission['_uuid'],
+            },
+            action=AuditAction.DELETE,
         ))
-        if not submissions:
-            if not (
-                queryset_or_false := asset.deployment.get_orphan_postgres_submissions()
-            ):
-                break
-
-            # Make submissions an iterable similar to what
-            # `deployment.get_submissions()` would return
-            if not (
-                submissions := queryset_or_false.annotate(
-                    _id=F('pk'), _uuid=F('uuid')
-                ).values('_id', '_uuid')
-            ):
-                break
-
-        submission_ids = []
-        for submission in submissions:
-            audit_logs.append(AuditLog(
-                app_label=app_label,
-                model_name=model_name,
-                object_id=submission['_id'],
-                user=request_author,
-                user_uid=request_author.extra_details.uid,
-                metadata={
-                    'asset_uid': asset.uid,
-                    'uuid': submission['_uuid'],
-                },
-                action=AuditAction.DELETE,
-            ))
-            submission_ids.append(submission['_id'])
-
-        json_response = asset.deployment.delete_submissions(
-            {'submission_ids': submission_ids, 'query': ''}, request_author
-        )
+        submission_ids.append(submission['_id'])
+
+    if not submission_ids:
+        return audit_logs
+
+    json_response = asset.deployment.delete_submissions(
+        {'submission_ids': submission_ids, 'query': ''}, request_author
+    )
 
-        if json_response['status'] in [
-            status.HTTP_502_BAD_GATEWAY,
-            status.HTTP_504_GATEWAY_TIMEOUT,
-        ]:
-            raise KobocatCommunicationError
+    if json_response['status'] in [
+        status.HTTP_502_BAD_GATEWAY,
+        status.HTTP_504_GATEWAY_TIMEOUT,
+    ]:
+        raise KobocatCommunicationError
 
-        if json_response['status'] not in [
-            status.HTTP_404_NOT_FOUND,
-            status.HTTP_200_OK,
-        ]:
-            raise TrashUnknownKobocatError(response=json_response)
+    if json_response['status'] not in [
+        status.HTTP_404_NOT_FOUND,
+        status.HTTP_200_OK,
+    ]:
+        raise TrashUnknownKobocatError(response=json_response)
 
-        if audit_logs:
-            if json_response['status'] == status.HTTP_404_NOT_FOUND:
-                # Submissions are lingering in MongoDB but XForm has been
-                # already deleted
-                if not MongoHelper.delete(
-                    asset.deployment.mongo_userform_id, submission_ids
-                ):
-                    raise TrashMongoDeleteOrphansError
+    if json_response['status'] == status.HTTP_404_NOT_FOUND:
+        # Submissions are lingering in MongoDB but XForm has been
+        # already deleted
+        if not MongoHelper.delete(
+            asset.deployment.mongo_userform_id, submission_ids
+        ):
+            raise TrashMongoDeleteOrphansError
 
-            AuditLog.objects.bulk_create(audit_logs)
+    return audit_logs
+
+
+def _delete_submission_batch_in_thread(*args) -> list[AuditLog]:
+    """
+    Wrap `_delete_submission_batch()` to close the DB connections opened by
+    the worker thread.
+    """
+    try:
+        return _delete_submission_batch(*args)
+    finally:
+        connections.close_all()
 
 
 def _get_settings(trash_type: str, retain_placeholder: bool = True) -> tuple:
@@ -380,6 +464,38 @@ def _get_settings(trash_type: str, retain_placeholder: bool = True) -> tuple:
     raise TrashNotImplementedError
 
 
+def _get_submission_batches(
+    asset: 'kpi.Asset',
+) -> Generator[list[dict], None, None]:
+    """
+    Yield the submissions of `asset` by batches, starting after the last
+    deleted submission (if any).
+
+    Submissions are retrieved by ranges of `_id` instead of re-reading the
+    first page of the collection after each deletion. Counting documents is
+    skipped.
+    """
+    last_submission_id = asset.deployment.get_data(
+        SUBMISSION_DELETION_CHECKPOINT_KEY, 0
+    )
+    while True:
+        submissions = list(
+            asset.deployment.get_submissions(
+                asset.owner,
+                fields=['_id', '_uuid'],
+                query={'_id': {'$gt': last_submission_id}},
+                sort={'_id': 1},
+                limit=settings.TRASH_SUBMISSION_DELETION_BATCH_SIZE,
+                skip_count=True,
+            )
+        )
+        if not submissions:
+            break
+
+        last_submission_id = submissions[-1]['_id']
+        yield submissions
+
+
 def _remove_pk_from_dict(trashed_object: dict) -> dict:
     """
     Remove `pk` key from `trash_object`
@@ -387,3 +503,20 @@ def _remove_pk_from_dict(trashed_object: dict) -> dict:
     dict_copy = deepcopy(trashed_object)
     del dict_copy['pk']
     return dict_copy
+
+
+def _save_submission_deletion_checkpoint(
+    asset: 'kpi.Asset', audit_logs: list[AuditLog]
+):
+    """
+    Save the audit logs of a deleted batch of submissions and remember the id
+    of its last submission to resume from there if the task is retried.
+    """
+    if not audit_logs:
+        return
+
+    with transaction.atomic():
+        AuditLog.objects.bulk_create(audit_logs)
+        asset.deployment.save_to_db(
+            {SUBMISSION_DELETION_CHECKPOINT_KEY: audit_logs[-1].object_id}
+        )
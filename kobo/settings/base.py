@@ -790,6 +790,18 @@ CAN_LOGIN_AS = lambda request, target_user: request.user.is_superuser
 # Impose a limit on the number of records returned by the submission list
 # endpoint. This overrides any `?limit=` query parameter sent by a client
 SUBMISSION_LIST_LIMIT = 30000
+# Pages of at least this many submissions are encoded one submission at a
+# time while the JSON response is sent, instead of being rendered at once.
+# Use 0 to disable streaming
+SUBMISSION_LIST_STREAMING_THRESHOLD = env.int(
+    'SUBMISSION_LIST_STREAMING_THRESHOLD', 1000
+)
+
+# Primary keys of submissions are cached by UUID (`_uuid` and `meta/rootUuid`)
+# for this many seconds, when a page of submissions is listed or a submission
+# is looked up by UUID. Cached keys are always checked against the UUID before
+# being used. Use 0 to disable the cache.
+SUBMISSION_ID_CACHE_TIMEOUT = env.int('SUBMISSION_ID_CACHE_TIMEOUT', 60 * 60)
 
 # uWSGI, NGINX, etc. allow only a limited amount of time to process a request.
 # Set this value to match their limits
@@ -995,6 +1007,21 @@ ENKETO_VIEW_INSTANCE_ENDPOINT = 'api/v2/instance/view'
 ENKETO_FLUSH_CACHE_ENDPOINT = 'api/v2/survey/cache'
 # How long to wait before flushing an individual preview from Enketo's cache
 ENKETO_FLUSH_CACHED_PREVIEW_DELAY = 1800  # seconds
+# How long to cache the links returned by Enketo for a form. Survey links are
+# voided when the project is redeployed or archived; preview links never
+# outlive `ENKETO_FLUSH_CACHED_PREVIEW_DELAY`. Use 0 to disable the cache.
+ENKETO_LINKS_CACHE_TIMEOUT = env.int('ENKETO_LINKS_CACHE_TIMEOUT', 60 * 60 * 24)
+# When Enketo cannot be reached, survey links are not requested again for this
+# many seconds, to let the project page load without them instead of waiting
+# for Enketo on each request. Use 0 to always request them.
+ENKETO_UNAVAILABLE_CACHE_TIMEOUT = env.int(
+    'ENKETO_UNAVAILABLE_CACHE_TIMEOUT', 0
+)
+# Requests to Enketo share a pool of up to `ENKETO_SESSION_POOL_MAXSIZE`
+# connections (per process)
+ENKETO_SESSION_POOL_MAXSIZE = env.int('ENKETO_SESSION_POOL_MAXSIZE', 10)
+ENKETO_REQUEST_CONNECT_TIMEOUT = env.float('ENKETO_REQUEST_CONNECT_TIMEOUT', 5)
+ENKETO_REQUEST_READ_TIMEOUT = env.float('ENKETO_REQUEST_READ_TIMEOUT', 30)
 
 # Content Security Policy (CSP)
 # CSP should "just work" by allowing any possible configuration
@@ -1109,6 +1136,18 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(minute=0, hour=0),
         'options': {'queue': 'kpi_low_priority_queue'}
     },
+    # Schedule every minute
+    'trackers-flush-nlp-counters': {
+        'task': 'kobo.apps.trackers.tasks.flush_nlp_counters',
+        'schedule': crontab(minute='*'),
+        'options': {'queue': 'kpi_low_priority_queue'}
+    },
+    # Schedule every day at 00:30 UTC
+    'trackers-roll-up-usage': {
+        'task': 'kobo.apps.trackers.tasks.roll_up_usage',
+        'schedule': crontab(minute=30, hour=0),
+        'options': {'queue': 'kpi_low_priority_queue'}
+    },
 }
 
 CELERY_BROKER_TRANSPORT_OPTIONS = {
@@ -1430,6 +1469,12 @@ MONGO_DB = mongo_client[mongo_db_name]
 MONGO_QUERY_TIMEOUT = SYNCHRONOUS_REQUEST_TIME_LIMIT + 5  # seconds
 MONGO_CELERY_QUERY_TIMEOUT = CELERY_TASK_TIME_LIMIT + 10  # seconds
 
+# Create the MongoDB indexes required by KPI (see
+# `kpi.utils.mongo_indexes.REQUIRED_INDEXES`) when system checks run, e.g. on
+# `migrate`, instead of only warning about the missing ones. Indexes are
+# built in the background.
+MONGO_AUTO_CREATE_INDEXES = env.bool('MONGO_AUTO_CREATE_INDEXES', False)
+
 SESSION_ENGINE = 'redis_sessions.session'
 # django-redis-session expects a dictionary with `url`
 redis_session_url = env.cache_url(
@@ -1548,3 +1593,74 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'kpi.password_validation.MostRecentPasswordValidator',
     },
 ]
+
+# Number of submissions deleted per batch when a project is emptied from trash
+TRASH_SUBMISSION_DELETION_BATCH_SIZE = env.int(
+    'TRASH_SUBMISSION_DELETION_BATCH_SIZE', 1000
+)
+# Number of concurrent (bulk) delete requests sent to KoBoCAT when a project is
+# emptied from trash. Use 1 to send them sequentially.
+TRASH_SUBMISSION_DELETION_MAX_WORKERS = env.int(
+    'TRASH_SUBMISSION_DELETION_MAX_WORKERS', 4
+)
+
+# Number of attachments moved per batch when the ownership of a project is
+# transferred, and number of threads moving them concurrently
+PROJECT_OWNERSHIP_ATTACHMENT_BATCH_SIZE = env.int(
+    'PROJECT_OWNERSHIP_ATTACHMENT_BATCH_SIZE', 500
+)
+PROJECT_OWNERSHIP_ATTACHMENT_MAX_WORKERS = env.int(
+    'PROJECT_OWNERSHIP_ATTACHMENT_MAX_WORKERS', 8
+)
+
+# CSV exports (asynchronous only) of at least `EXPORT_PARALLEL_MIN_SUBMISSIONS`
+# submissions are split by ranges of `_id` and generated by up to
+# `EXPORT_PARALLEL_MAX_WORKERS` processes. Use 1 to always export serially.
+EXPORT_PARALLEL_MAX_WORKERS = env.int('EXPORT_PARALLEL_MAX_WORKERS', 1)
+EXPORT_PARALLEL_MIN_SUBMISSIONS = env.int(
+    'EXPORT_PARALLEL_MIN_SUBMISSIONS', 100000
+)
+
+# Exports which would generate the same file (same form, settings,
+# submissions and partial permissions) share it instead of generating it
+# again, whatever their user. Shared files are deleted with the last export
+# referencing them.
+EXPORT_DEDUPLICATION_ENABLED = env.bool('EXPORT_DEDUPLICATION_ENABLED', True)
+
+# Number of media files (form media and paired data) synchronized concurrently
+# with KoBoCAT. Use 1 to synchronize them sequentially.
+MEDIA_FILE_SYNC_MAX_WORKERS = env.int('MEDIA_FILE_SYNC_MAX_WORKERS', 8)
+# Hashes of remote media files (i.e. URLs), built from their `ETag` or
+# `Last-Modified` headers, are cached for this many seconds to avoid sending
+# a `HEAD` request each time. Use 0 to disable the cache.
+REMOTE_FILE_HASH_CACHE_TIMEOUT = env.int('REMOTE_FILE_HASH_CACHE_TIMEOUT', 300)
+
+# Number of assets created per transaction by imports of libraries and ZIP
+# archives. A failed import can be resumed from its last completed batch.
+IMPORT_TASK_BATCH_SIZE = env.int('IMPORT_TASK_BATCH_SIZE', 100)
+
+# Expose where the time of each request is spent (databases, MongoDB,
+# KoBoCAT, cache) in a `Server-Timing` response header. Requests slower than
+# `SERVER_TIMING_SLOW_REQUEST_THRESHOLD` seconds are logged, at a sample rate
+# of `SERVER_TIMING_SLOW_REQUEST_LOG_SAMPLE_RATE` (between 0 and 1).
+SERVER_TIMING_ENABLED = env.bool('SERVER_TIMING_ENABLED', False)
+if SERVER_TIMING_ENABLED:
+    MIDDLEWARE.insert(0, 'hub.middleware.ServerTimingMiddleware')
+SERVER_TIMING_SLOW_REQUEST_THRESHOLD = env.float(
+    'SERVER_TIMING_SLOW_REQUEST_THRESHOLD', 1.0
+)
+SERVER_TIMING_SLOW_REQUEST_LOG_SAMPLE_RATE = env.float(
+    'SERVER_TIMING_SLOW_REQUEST_LOG_SAMPLE_RATE', 0.1
+)
+
+# Each service health check (`/service_health/` and `/service_health/ready/`)
+# fails after this many seconds. Results are cached by each process for
+# `SERVICE_HEALTH_CACHE_TIMEOUT` seconds to spare the services from frequent
+# load balancer probes. Use 0 to disable the cache.
+SERVICE_HEALTH_CHECK_TIMEOUT = env.int('SERVICE_HEALTH_CHECK_TIMEOUT', 10)
+SERVICE_HEALTH_CACHE_TIMEOUT = env.int('SERVICE_HEALTH_CACHE_TIMEOUT', 5)
+
+# Buffer NLP usage increments in Redis (`default` cache) instead of writing
+# them to `NLPUsageCounter` on each ASR/MT call. Buffered increments are
+# written by the periodic task `flush_nlp_counters`.
+NLP_COUNTER_BUFFERING = env.bool('NLP_COUNTER_BUFFERING', False)
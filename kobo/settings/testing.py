@@ -46,3 +46,6 @@ STRIPE_ENABLED = True
 WEBPACK_LOADER['DEFAULT'][
     'LOADER_CLASS'
 ] = 'webpack_loader.loader.FakeWebpackLoader'
+
+# Worker threads would not share the test transaction
+TRASH_SUBMISSION_DELETION_MAX_WORKERS = 1
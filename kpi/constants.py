@@ -63,6 +63,9 @@ CLONE_COMPATIBLE_TYPES = {
 
 ASSET_TYPE_ARG_NAME = "asset_type"
 
+# Export type generated by KPI, in addition to formpack's ones
+EXPORT_TYPE_PARQUET = 'parquet'
+
 # Main app label for shadow models.
 SHADOW_MODEL_APP_LABEL = 'shadow_model'
 # List of app labels that need to read/write data from KoBoCAT database
@@ -74,6 +77,7 @@ SHADOW_MODEL_APP_LABELS = [
 
 # List of nested attributes which bypass 'dots' encoding
 NESTED_MONGO_RESERVED_ATTRIBUTES = [
+    "_geolocation",
     "_validation_status",
 ]
 
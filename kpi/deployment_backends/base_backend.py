@@ -7,13 +7,17 @@ import datetime
 import json
 import os
 import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from contextlib import contextmanager
 from typing import Union, Iterator, Optional
 
 from bson import json_util
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage
+from django.db import connections
 from django.db.models.query import QuerySet
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as t
@@ -30,11 +34,22 @@ from kpi.constants import (
     PERM_PARTIAL_SUBMISSIONS,
     PERM_VIEW_SUBMISSIONS,
 )
-from kpi.exceptions import BulkUpdateSubmissionsClientException
+from kpi.exceptions import (
+    BulkUpdateSubmissionsClientException,
+    MediaFileSyncError,
+)
+from kpi.interfaces.sync_backend_media import SyncBackendMediaInterface
 from kpi.models.asset_file import AssetFile
 from kpi.models.paired_data import PairedData
 from kpi.utils.django_orm_helper import UpdateJSONFieldAttributes
+from kpi.utils.log import logging
+from kpi.utils.mongo_helper import MongoHelper
 from kpi.utils.submission import get_attachment_filenames_and_xpaths
+from kpi.utils.submission_id_cache import (
+    cache_submission_ids,
+    get_cached_submission_id,
+    void_cached_submission_ids,
+)
 from kpi.utils.xml import (
     edit_submission_xml,
     fromstring_preserve_root_xmlns,
@@ -58,11 +73,20 @@ class BaseDeploymentBackend(abc.ABC):
     SUBMISSION_DEPRECATED_UUID_XPATH = 'meta/deprecatedID'
     FORM_UUID_XPATH = 'formhub/uuid'
 
+    # Actions of `sync_media_files()`. All of them but `MEDIA_FILE_VACUUM`,
+    # which only deletes the file in KPI, are sent to the back end.
+    MEDIA_FILE_ADD = 'add'
+    MEDIA_FILE_DELETE = 'delete'
+    MEDIA_FILE_REPLACE = 'replace'
+    MEDIA_FILE_UPDATE_HASH = 'update_hash'
+    MEDIA_FILE_VACUUM = 'vacuum'
+
     def __init__(self, asset):
         self.asset = asset
         # Python-only attribute used by `kpi.views.v2.data.DataViewSet.list()`
         self.current_submission_count = 0
         self.__stored_data_key = None
+        self.__attachment_url_templates = (None, None)
 
     @property
     def active(self):
@@ -145,6 +169,7 @@ class BaseDeploymentBackend(abc.ABC):
         }
 
         kc_responses = []
+        deprecated_uuids = []
         for submission in submissions:
             xml_parsed = fromstring_preserve_root_xmlns(submission)
 
@@ -163,6 +188,9 @@ class BaseDeploymentBackend(abc.ABC):
             )
             deprecated_id.text = instance_id.text
             instance_id.text = uuid_formatted
+            if deprecated_id.text:
+                # Remove UUID prefix
+                deprecated_uuids.append(deprecated_id.text[len('uuid:'):])
 
             # If the form has been updated with new fields and earlier
             # submissions have been selected as part of the bulk update,
@@ -182,6 +210,9 @@ class BaseDeploymentBackend(abc.ABC):
                 }
             )
 
+        # Edited submissions get a new `_uuid`
+        void_cached_submission_ids(self.asset.uid, deprecated_uuids)
+
         return self.prepare_bulk_update_response(kc_responses)
 
 
@@ -324,6 +355,85 @@ class BaseDeploymentBackend(abc.ABC):
             pass
         return None
 
+    def get_submission_id_by_uuid(
+        self,
+        submission_uuid: str,
+        user: 'auth.User',
+        root_uuid: bool = True,
+    ) -> Optional[int]:
+        """
+        Return the primary key of the submission whose `_uuid` (or
+        `meta/rootUuid` if `root_uuid` is `True`) equals `submission_uuid`
+        and which `user` is allowed to access. `None` is returned if no
+        matches are found.
+
+        Results are cached (see `kpi.utils.submission_id_cache`). A cached id
+        is always checked against `submission_uuid` with a lookup by primary
+        key, because submissions can be edited or deleted in KoBoCAT too.
+        """
+        if root_uuid:
+            # `_uuid` is the legacy identifier that changes (per OpenRosa spec)
+            # after every edit; `meta/rootUuid` remains consistent across
+            # edits. prefer the latter when fetching by UUID.
+            query = {
+                '$or': [
+                    {'meta/rootUuid': submission_uuid},
+                    {'_uuid': submission_uuid},
+                ]
+            }
+        else:
+            query = {'_uuid': submission_uuid}
+
+        if cached_id := get_cached_submission_id(
+            self.asset.uid, submission_uuid, root=root_uuid
+        ):
+            if list(
+                self.get_submissions(
+                    user,
+                    submission_ids=[cached_id],
+                    query=query,
+                    fields=['_id'],
+                )
+            ):
+                return cached_id
+            void_cached_submission_ids(self.asset.uid, [submission_uuid])
+
+        candidates = list(
+            self.get_submissions(
+                user, query=query, fields=['_id', 'meta/rootUuid', '_uuid']
+            )
+        )
+        if not candidates:
+            return None
+
+        for submission in candidates:
+            if submission.get('meta/rootUuid') == submission_uuid:
+                submission_id = submission['_id']
+                break
+        else:
+            # no submissions with matching `meta/rootUuid` were found;
+            # get the "first" result, despite there being no order
+            # specified, just for consistency with previous code
+            submission_id = candidates[0]['_id']
+
+        cache_submission_ids(
+            self.asset.uid, {submission_uuid: submission_id}, root=root_uuid
+        )
+        return submission_id
+
+    def get_submission_change_token(self) -> str:
+        """
+        Return a token which changes whenever `record_submission_changes()` is
+        called, i.e. after bulk updates of submissions, which do not update
+        their `date_modified`
+        """
+        token = ShortUUID().random(24)
+        # A missing (e.g. evicted) token is replaced with a new one, i.e.
+        # submissions are considered as changed
+        if cache.add(self._submission_change_token_key, token, None):
+            return token
+        return cache.get(self._submission_change_token_key) or token
+
     @abc.abstractmethod
     def get_submission_detail_url(self, submission_id: int) -> str:
         pass
@@ -334,6 +444,14 @@ class BaseDeploymentBackend(abc.ABC):
         )
         return url
 
+    @abc.abstractmethod
+    def get_submission_watermark(self) -> str:
+        """
+        Return a value which changes whenever submissions are added, edited
+        or deleted, e.g. to tell whether an export is still up to date
+        """
+        pass
+
     @abc.abstractmethod
     def get_submissions(
         self,
@@ -361,6 +479,39 @@ class BaseDeploymentBackend(abc.ABC):
         """
         pass
 
+    @classmethod
+    def get_usage_by_asset_id(
+        cls,
+        assets: list['kpi.models.Asset'],
+        start_dates: dict[str, Optional[datetime.date]],
+    ) -> dict[int, dict]:
+        """
+        Return, for each asset of `assets` deployed with this backend, its
+        attachment storage and its submission counts since each date of
+        `start_dates` (`None` means all time), e.g.:
+        ```
+        {
+            <asset_id>: {
+                'storage_bytes': 1024,
+                'submission_counts': {'current_month': 2, 'all_time': 12},
+            },
+        }
+        ```
+        Backends should override this method to retrieve all counters with a
+        few grouped queries instead of several ones per asset.
+        """
+        usage = {}
+        for asset in assets:
+            deployment = asset.deployment
+            usage[asset.pk] = {
+                'storage_bytes': deployment.attachment_storage_bytes,
+                'submission_counts': {
+                    key: deployment.submission_count_since_date(start_date)
+                    for key, start_date in start_dates.items()
+                },
+            }
+        return usage
+
     @abc.abstractmethod
     def get_validation_status(self, submission_id: int, user: 'auth.User') -> dict:
         """
@@ -380,6 +531,15 @@ class BaseDeploymentBackend(abc.ABC):
     def redeploy(self, active: bool = None):
         pass
 
+    def record_submission_changes(self):
+        """
+        Change the token returned by `get_submission_change_token()`, and
+        thus the submission watermark
+        """
+        cache.set(
+            self._submission_change_token_key, ShortUUID().random(24), None
+        )
+
     def remove_from_kc_only_flag(self, *args, **kwargs):
         # TODO: This exists only to support KoBoCAT (see #1161) and should be
         # removed, along with all places where it is called, once we remove
@@ -502,9 +662,80 @@ class BaseDeploymentBackend(abc.ABC):
     def suspend_submissions(user_ids: list[int]):
         pass
 
-    @abc.abstractmethod
-    def sync_media_files(self, file_type: str = AssetFile.FORM_MEDIA):
-        pass
+    def sync_media_files(self, file_type: str = AssetFile.FORM_MEDIA) -> list:
+        """
+        Synchronize the media files of `file_type` with the back end and
+        return the outcome of each action, e.g.:
+
+            [
+                {
+                    'backend_media_id': 'image.png',
+                    'action': 'add',
+                    'success': True,
+                    'error': None,
+                },
+            ]
+
+        All actions are planned first, by comparing the hashes of KPI files
+        with the ones of the back end. Actions on different files are then
+        sent concurrently (see `settings.MEDIA_FILE_SYNC_MAX_WORKERS`), while
+        actions on the same file (e.g. delete a previous upload, then upload
+        it again) are sent in order. A failure does not stop the
+        synchronization of other files, but `MediaFileSyncError` is raised,
+        with all the outcomes, once they are done.
+        """
+        backend_files = self._get_backend_media_files(file_type)
+        plan = self._get_media_file_sync_plan(file_type, backend_files)
+        if not plan:
+            return []
+
+        max_workers = settings.MEDIA_FILE_SYNC_MAX_WORKERS
+        if max_workers <= 1 or len(plan) == 1:
+            results = [self._sync_media_file_steps(steps) for steps in plan]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(plan))
+            ) as executor:
+                results = list(
+                    executor.map(self._sync_media_file_steps_in_thread, plan)
+                )
+
+        # Changes on KPI side are saved by the main thread, once the back end
+        # has been updated
+        outcomes = []
+        for step_results in results:
+            for (action, file_, backend_file, _), error in step_results:
+                if error is None:
+                    if action in (
+                        self.MEDIA_FILE_DELETE,
+                        self.MEDIA_FILE_VACUUM,
+                    ):
+                        if file_ is not None:
+                            file_.delete(force=True)
+                    else:
+                        file_.synced_with_backend = True
+                        file_.save(update_fields=['synced_with_backend'])
+
+                outcomes.append(
+                    {
+                        'backend_media_id': (
+                            file_.backend_media_id
+                            if file_ is not None
+                            else backend_file['media_id']
+                        ),
+                        'action': action,
+                        'success': error is None,
+                        'error': error,
+                    }
+                )
+
+        if failure_count := sum(not outcome['success'] for outcome in outcomes):
+            raise MediaFileSyncError(
+                f'{failure_count} of {len(outcomes)} media file actions failed',
+                outcomes=outcomes,
+            )
+
+        return outcomes
 
     @abc.abstractmethod
     def transfer_counters_ownership(self, new_owner: 'auth.User'):
@@ -670,70 +901,66 @@ class BaseDeploymentBackend(abc.ABC):
         if PERM_PARTIAL_SUBMISSIONS not in self.asset.get_perms(user):
             return
 
-        allowed_submission_ids = []
-
-        if not submission_ids:
-            # if no submission ids are provided, the back end must rebuild the
-            # query to retrieve the related submissions. Unfortunately, the
-            # current back end (KoBoCAT) does not support row level permissions.
-            # Thus, we need to fetch all the submissions the user is allowed to
-            # see in order to to compare the requested subset of submissions to
-            # all
-            all_submissions = self.get_submissions(
-                user=user,
-                partial_perm=perm,
-                fields=['_id'],
-                skip_count=True,
-            )
-            allowed_submission_ids = [r['_id'] for r in all_submissions]
+        params = self.validate_submission_list_params(
+            user,
+            validate_count=True,
+            partial_perm=perm,
+            submission_ids=submission_ids,
+            query=copy.deepcopy(query),
+        )
 
-            # User should see at least one submission to be allowed to do
-            # something
-            if not allowed_submission_ids:
+        if submission_ids:
+            # Let Mongo count how many of the requested submissions match
+            # `query` and the permission filters at the same time. If some of
+            # them do not, user is not allowed to access all of them.
+            submission_ids = sorted(set(int(id_) for id_ in submission_ids))
+            count = MongoHelper.get_count(
+                self.mongo_userform_id,
+                query=params['query'],
+                submission_ids=submission_ids,
+                permission_filters=params['permission_filters'],
+            )
+            if count != len(submission_ids):
                 raise PermissionDenied
 
-            # if `query` is not provided, the action is performed on all
-            # submissions. There are no needs to go further.
-            if not query:
-                return allowed_submission_ids
-
-        submissions = self.get_submissions(
-            user=user,
-            partial_perm=perm,
+            return submission_ids
+
+        # If no submission ids are provided, the back end must rebuild the
+        # query to retrieve the related submissions. Unfortunately, the
+        # current back end (KoBoCAT) does not support row level permissions.
+        # Thus, we need to stream the ids of the submissions which match
+        # `query` (all of them if `query` is empty) and the permission filters.
+        #
+        # Regardless of whether or not the request contained a query or a
+        # list of IDs, always return IDs here because the results of a
+        # query may contain submissions that the requesting user is not
+        # allowed to access. For example,
+        #   - In submissions 4, 5, and 6, the response to the "state"
+        #       question was "California"
+        #   - Bob is allowed to access only submissions made by Jerry
+        #   - Jerry uploaded submissions 5, 6, and 7
+        #   - Bob submits a query for all submissions where
+        #       `{"state": "California"}`
+        #   - Bob must only see submissions 5 and 6
+        mongo_cursor, _ = MongoHelper.get_instances(
+            self.mongo_userform_id,
+            start=0,
+            sort={'_id': 1},
             fields=['_id'],
-            submission_ids=submission_ids,
-            query=query,
+            query=params['query'],
+            permission_filters=params['permission_filters'],
             skip_count=True,
         )
-
-        requested_submission_ids = [
-            r['_id'] for r in submissions
+        allowed_submission_ids = [
+            submission['_id'] for submission in mongo_cursor
         ]
 
-        if not requested_submission_ids:
+        # User should see at least one submission to be allowed to do
+        # something
+        if not allowed_submission_ids:
             raise PermissionDenied
 
-        submission_ids = [int(id_) for id_ in set(submission_ids)]
-        if (
-            (allowed_submission_ids
-             and set(requested_submission_ids).issubset(allowed_submission_ids))
-            or sorted(requested_submission_ids) == sorted(submission_ids)
-        ):
-            # Regardless of whether or not the request contained a query or a
-            # list of IDs, always return IDs here because the results of a
-            # query may contain submissions that the requesting user is not
-            # allowed to access. For example,
-            #   - In submissions 4, 5, and 6, the response to the "state"
-            #       question was "California"
-            #   - Bob is allowed to access only submissions made by Jerry
-            #   - Jerry uploaded submissions 5, 6, and 7
-            #   - Bob submits a query for all submissions where
-            #       `{"state": "California"}`
-            #   - Bob must only see submissions 5 and 6
-
-            return requested_submission_ids
-
-        raise PermissionDenied
+        return allowed_submission_ids
 
     @property
     def version(self):
@@ -747,6 +974,10 @@ class BaseDeploymentBackend(abc.ABC):
     def _open_rosa_server_storage(self):
         return default_storage
 
+    @property
+    def _submission_change_token_key(self) -> str:
+        return f'submission_change_token:{self.asset.uid}'
+
     def _get_metadata_queryset(self, file_type: str) -> Union[QuerySet, list]:
         """
         Returns a list of objects, or a QuerySet to pass to Celery to
@@ -763,43 +994,237 @@ class BaseDeploymentBackend(abc.ABC):
             queryset = PairedData.objects(self.asset).values()
             return queryset
 
+    @abc.abstractmethod
+    def _get_backend_media_files(self, file_type: str) -> dict:
+        """
+        Return the media files of `file_type` stored by the back end, by
+        `backend_media_id`. Each value must contain:
+            - `pk`: the id of the file in the back end;
+            - `url`: its URL in the back end;
+            - `md5`: its hash;
+            - `from_kpi`: whether it has been uploaded through KPI.
+        """
+        pass
+
+    def _get_media_file_sync_plan(
+        self, file_type: str, backend_files: dict
+    ) -> list[list[tuple]]:
+        """
+        Return the actions `sync_media_files()` needs to send to the back end,
+        grouped by `backend_media_id`. Each action is a tuple
+        `(action, file_, backend_file, md5_hash)`.
+
+        Hashes are read here, by the main thread, because some of them are
+        calculated from the DB or a remote URL.
+        """
+        backend_files = {
+            backend_media_id: {**backend_file, 'media_id': backend_media_id}
+            for backend_media_id, backend_file in backend_files.items()
+        }
+        plan = defaultdict(list)
+
+        for media_file in self._get_metadata_queryset(file_type=file_type):
+            backend_media_id = media_file.backend_media_id
+            steps = plan[backend_media_id]
+
+            # File does not exist in the back end
+            if backend_media_id not in backend_files:
+                if media_file.deleted_at is None:
+                    # New file
+                    steps.append(
+                        (
+                            self.MEDIA_FILE_ADD,
+                            media_file,
+                            None,
+                            media_file.md5_hash,
+                        )
+                    )
+                else:
+                    # Orphan, delete it
+                    steps.append(
+                        (self.MEDIA_FILE_VACUUM, media_file, None, None)
+                    )
+                continue
+
+            backend_file = backend_files[backend_media_id]
+            if media_file.deleted_at is None:
+                md5_hash = media_file.md5_hash
+                # If md5 differs, we need to re-upload it.
+                if md5_hash != backend_file['md5']:
+                    action = (
+                        self.MEDIA_FILE_UPDATE_HASH
+                        if media_file.file_type == AssetFile.PAIRED_DATA
+                        else self.MEDIA_FILE_REPLACE
+                    )
+                    steps.append((action, media_file, backend_file, md5_hash))
+            elif backend_file['from_kpi']:
+                steps.append(
+                    (self.MEDIA_FILE_DELETE, media_file, backend_file, None)
+                )
+            else:
+                # Remote file has been uploaded directly to the back end. We
+                # cannot delete it, but we need to vacuum KPI.
+                steps.append((self.MEDIA_FILE_VACUUM, media_file, None, None))
+                # Keep `backend_media_id` in `backend_files` to avoid a unique
+                # constraint failure in case the user deleted and re-uploaded
+                # the same file in a row between two deployments.
+                # Example:
+                # - User uploads file1.jpg (pk == 1)
+                # - User deletes file1.jpg (pk == 1)
+                # - User re-uploads file1.jpg (pk == 2)
+                # Next time, 'file1.jpg' is encountered in this loop, it would
+                # try to re-upload it if its hash differs from the back-end
+                # version and would fail because 'file1.jpg' already exists
+                # in the back end.
+                continue
+
+            # All files which remain in `backend_files` after this loop are
+            # considered obsolete and are deleted
+            del backend_files[backend_media_id]
+
+        # Remove back-end orphan files previously uploaded through KPI
+        for backend_media_id, backend_file in backend_files.items():
+            if backend_file['from_kpi']:
+                plan[backend_media_id].append(
+                    (self.MEDIA_FILE_DELETE, None, backend_file, None)
+                )
+
+        return [steps for steps in plan.values() if steps]
+
+    def _get_attachment_url_templates(self, request) -> dict:
+        """
+        Return what `_rewrite_json_attachment_urls()` needs to rewrite the
+        attachments of any submission of this asset, i.e. the attachment
+        XPaths of the deployed version and the URL and filename templates.
+
+        Results are computed once per request to avoid resolving the XPaths
+        and reversing the URLs for each attachment of each submission.
+        """
+        cached_request, templates = self.__attachment_url_templates
+        if templates is not None and cached_request is request:
+            return templates
+
+        # We should use 'attachment-list' with `?xpath=` but we do not
+        # know what the XPath is here. Since the primary key is already
+        # exposed, let's use it to build the url with 'attachment-detail'.
+        # Placeholders are used instead of real ids to reverse the URL only
+        # once. They are replaced by format fields afterwards because `{}`
+        # would be URL-encoded by `reverse()`.
+        url = reverse(
+            'attachment-detail',
+            args=(
+                self.asset.uid,
+                'SUBMISSIONIDPLACEHOLDER',
+                'ATTACHMENTIDPLACEHOLDER',
+            ),
+            request=request,
+        )
+        templates = {
+            'attachment_xpaths': self.asset.get_attachment_xpaths(
+                deployed=True
+            ),
+            'url': url.replace(
+                'SUBMISSIONIDPLACEHOLDER', '{submission_id}'
+            ).replace('ATTACHMENTIDPLACEHOLDER', '{attachment_id}'),
+            'url_keys': [
+                f'download{suffix}_url'
+                for suffix in settings.KOBOCAT_THUMBNAILS_SUFFIX_MAPPING.values()
+            ],
+            'filename_prefix': os.path.join(
+                self.asset.owner.username, 'attachments'
+            ),
+        }
+        self.__attachment_url_templates = (request, templates)
+        return templates
+
+    @abc.abstractmethod
+    def _sync_media_file(
+        self,
+        action: str,
+        file_: Optional[SyncBackendMediaInterface],
+        backend_file: Optional[dict],
+        md5_hash: Optional[str],
+    ):
+        """
+        Send `action` (any `MEDIA_FILE_*` but `MEDIA_FILE_VACUUM`) to the back
+        end. It may run in a worker thread (see `sync_media_files()`) and must
+        not save anything in KPI.
+        """
+        pass
+
+    def _sync_media_file_steps(self, steps: list[tuple]) -> list[tuple]:
+        """
+        Send `steps`, i.e. the actions on one file, to the back end in order
+        and return each of them with its error, if any. Actions following
+        a failure are not sent.
+        """
+        results = []
+        error = None
+        for step in steps:
+            action, file_, backend_file, md5_hash = step
+            if error is not None:
+                results.append((step, 'Skipped after a previous failure'))
+                continue
+
+            if action != self.MEDIA_FILE_VACUUM:
+                try:
+                    self._sync_media_file(action, file_, backend_file, md5_hash)
+                except Exception as e:
+                    error = str(e) or e.__class__.__name__
+                    logging.error(
+                        f'Could not synchronize media file of asset '
+                        f'{self.asset.uid} ({action})',
+                        exc_info=True,
+                    )
+            results.append((step, error))
+
+        return results
+
+    def _sync_media_file_steps_in_thread(self, steps: list[tuple]) -> list:
+        """
+        Wrap `_sync_media_file_steps()` to close the DB connections opened by
+        the worker thread.
+        """
+        try:
+            return self._sync_media_file_steps(steps)
+        finally:
+            connections.close_all()
+
     def _rewrite_json_attachment_urls(
         self, submission: dict, request
     ) -> dict:
-        if not request or '_attachments' not in submission:
+        if not request or not submission.get('_attachments'):
             return submission
 
-        attachment_xpaths = self.asset.get_attachment_xpaths(deployed=True)
-        filenames_and_xpaths = get_attachment_filenames_and_xpaths(
-            submission, attachment_xpaths
+        templates = self._get_attachment_url_templates(request)
+        if templates['attachment_xpaths']:
+            filenames_and_xpaths = get_attachment_filenames_and_xpaths(
+                submission, templates['attachment_xpaths']
+            )
+        else:
+            filenames_and_xpaths = {}
+
+        url_template = templates['url']
+        filename_prefix = os.path.join(
+            templates['filename_prefix'],
+            submission['formhub/uuid'],
+            submission['_uuid'],
+            '',
         )
+        submission_id = submission['_id']
 
         for attachment in submission['_attachments']:
-            for size, suffix in settings.KOBOCAT_THUMBNAILS_SUFFIX_MAPPING.items():
-                # We should use 'attachment-list' with `?xpath=` but we do not
-                # know what the XPath is here. Since the primary key is already
-                # exposed, let's use it to build the url with 'attachment-detail'
-                kpi_url = reverse(
-                    'attachment-detail',
-                    args=(self.asset.uid, submission['_id'], attachment['id']),
-                    request=request,
-                )
-                key = f'download{suffix}_url'
-                try:
-                    attachment[key] = kpi_url
-                except KeyError:
-                    continue
-            filename = attachment['filename']
-            attachment['filename'] = os.path.join(
-                self.asset.owner.username,
-                'attachments',
-                submission['formhub/uuid'],
-                submission['_uuid'],
-                os.path.basename(filename)
+            kpi_url = url_template.format(
+                submission_id=submission_id, attachment_id=attachment['id']
             )
+            for key in templates['url_keys']:
+                attachment[key] = kpi_url
 
-            # Retrieve XPath and add it to attachment dictionary
             basename = os.path.basename(attachment['filename'])
-            attachment['question_xpath'] = filenames_and_xpaths.get(basename, '')
+            attachment['filename'] = filename_prefix + basename
+            # Retrieve XPath and add it to attachment dictionary
+            attachment['question_xpath'] = filenames_and_xpaths.get(
+                basename, ''
+            )
 
         return submission
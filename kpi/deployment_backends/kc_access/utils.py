@@ -1,15 +1,18 @@
 # coding: utf-8
+from __future__ import annotations
+
 import json
 import logging
+from collections import defaultdict
 from contextlib import ContextDecorator
-from typing import Union
+from typing import Iterable, Optional, Union
 
 import requests
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser, User
 from django.core.exceptions import ImproperlyConfigured
 from django.db import ProgrammingError, transaction
-from django.db.models import Model
+from django.db.models import Model, Q
 from kobo_service_account.utils import get_request_headers
 from rest_framework.authtoken.models import Token
 
@@ -171,6 +174,34 @@ def _get_applicable_kc_permissions(obj, kpi_codenames):
     return permissions
 
 
+def _get_applicable_kc_permissions_bulk(
+    obj: Model, kpi_codenames_by_user_id: dict[int, Iterable[str]]
+) -> tuple[dict[str, KobocatPermission], Optional[int]]:
+    """
+    Return the KC permissions applicable to all the KPI codenames of
+    `kpi_codenames_by_user_id`, mapped by KPI codename, alongside the primary
+    key of the KC `XForm` associated with `obj`.
+    """
+    kpi_codenames = set()
+    for codenames in kpi_codenames_by_user_id.values():
+        kpi_codenames.update(codenames)
+    permissions = _get_applicable_kc_permissions(obj, list(kpi_codenames))
+    if not permissions:
+        return {}, None
+    xform_id = _get_xform_id_for_asset(obj)
+    if not xform_id:
+        return {}, None
+
+    kpi_codenames_by_kc_codename = defaultdict(list)
+    for kpi_codename, kc_codename in obj.KC_PERMISSIONS_MAP.items():
+        kpi_codenames_by_kc_codename[kc_codename].append(kpi_codename)
+    permissions_by_kpi_codename = {}
+    for permission in permissions:
+        for kpi_codename in kpi_codenames_by_kc_codename[permission.codename]:
+            permissions_by_kpi_codename[kpi_codename] = permission
+    return permissions_by_kpi_codename, xform_id
+
+
 def _get_xform_id_for_asset(asset):
     if not asset.has_deployment:
         return None
@@ -367,6 +398,122 @@ def remove_applicable_kc_permissions(
     ).delete()
 
 
+def assign_applicable_kc_permissions_bulk(
+    obj: Model,
+    kpi_codenames_by_user_id: dict[int, Iterable[str]],
+):
+    """
+    Bulk counterpart of `assign_applicable_kc_permissions()`.
+
+    Assign each user of `kpi_codenames_by_user_id` the applicable KC
+    permissions to `obj` with a constant number of queries, whatever the number
+    of users. If `obj` is not a :py:class:`Asset` or does not have a
+    deployment, take no action.
+    """
+    if not obj._meta.model_name == 'asset' or not kpi_codenames_by_user_id:
+        return
+
+    permissions, xform_id = _get_applicable_kc_permissions_bulk(
+        obj, kpi_codenames_by_user_id
+    )
+    if not permissions or not xform_id:
+        return
+
+    kpi_codenames_by_user_id = dict(kpi_codenames_by_user_id)
+    anonymous_codenames = kpi_codenames_by_user_id.pop(
+        settings.ANONYMOUS_USER_ID, None
+    )
+    if anonymous_codenames:
+        set_kc_anonymous_permissions_xform_flags(
+            obj, list(anonymous_codenames), xform_id
+        )
+    if not kpi_codenames_by_user_id:
+        return
+
+    xform_content_type = KobocatContentType.objects.get(
+        **obj.KC_CONTENT_TYPE_KWARGS)
+    kc_permissions_already_assigned = set(
+        KobocatUserObjectPermission.objects.filter(
+            user_id__in=kpi_codenames_by_user_id.keys(),
+            permission__in=permissions.values(),
+            object_pk=xform_id,
+        ).values_list('user_id', 'permission_id')
+    )
+    permissions_to_create = []
+    for user_id, kpi_codenames in kpi_codenames_by_user_id.items():
+        for kpi_codename in set(kpi_codenames):
+            try:
+                permission = permissions[kpi_codename]
+            except KeyError:
+                continue
+            if (user_id, permission.pk) in kc_permissions_already_assigned:
+                continue
+            permissions_to_create.append(KobocatUserObjectPermission(
+                user_id=user_id, permission=permission, object_pk=xform_id,
+                content_type=xform_content_type
+            ))
+    KobocatUserObjectPermission.objects.bulk_create(permissions_to_create)
+
+
+def remove_applicable_kc_permissions_bulk(
+    obj: Model,
+    kpi_codenames_by_user_id: dict[int, Iterable[str]],
+):
+    """
+    Bulk counterpart of `remove_applicable_kc_permissions()`.
+
+    Remove from each user of `kpi_codenames_by_user_id` the applicable KC
+    permissions to `obj` with a single `DELETE` query. If `obj` is not a
+    :py:class:`Asset` or does not have a deployment, take no action.
+    """
+    if not obj._meta.model_name == 'asset' or not kpi_codenames_by_user_id:
+        return
+
+    permissions, xform_id = _get_applicable_kc_permissions_bulk(
+        obj, kpi_codenames_by_user_id
+    )
+    if not permissions or not xform_id:
+        return
+
+    kpi_codenames_by_user_id = dict(kpi_codenames_by_user_id)
+    anonymous_codenames = kpi_codenames_by_user_id.pop(
+        settings.ANONYMOUS_USER_ID, None
+    )
+    if anonymous_codenames:
+        set_kc_anonymous_permissions_xform_flags(
+            obj, list(anonymous_codenames), xform_id, remove=True
+        )
+
+    # Users are grouped by identical sets of permissions to keep the
+    # `WHERE` clause short; most of the time, there is only one group.
+    user_ids_by_permission_ids = defaultdict(list)
+    for user_id, kpi_codenames in kpi_codenames_by_user_id.items():
+        permission_ids = frozenset(
+            permissions[kpi_codename].pk
+            for kpi_codename in kpi_codenames
+            if kpi_codename in permissions
+        )
+        if permission_ids:
+            user_ids_by_permission_ids[permission_ids].append(user_id)
+
+    if not user_ids_by_permission_ids:
+        return
+
+    user_permissions_filter = Q()
+    for permission_ids, user_ids in user_ids_by_permission_ids.items():
+        user_permissions_filter |= Q(
+            user_id__in=user_ids, permission_id__in=permission_ids
+        )
+
+    content_type_kwargs = _get_content_type_kwargs_for_related(obj)
+    KobocatUserObjectPermission.objects.filter(
+        user_permissions_filter,
+        object_pk=xform_id,
+        # `permission` has a FK to `ContentType`, but I'm paranoid
+        **content_type_kwargs
+    ).delete()
+
+
 def reset_kc_permissions(
     obj: Model,
     user: Union[AnonymousUser, User, int],
@@ -3,7 +3,6 @@ from __future__ import annotations
 import io
 import json
 import re
-from collections import defaultdict
 from contextlib import contextmanager
 from datetime import date, datetime
 from typing import Generator, Optional, Union
@@ -19,7 +18,7 @@ from defusedxml import ElementTree as DET
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.core.files import File
-from django.db.models import Sum, F
+from django.db.models import Count, F, Max, Q, Sum
 from django.db.models.functions import Coalesce
 from django.db.models.query import QuerySet
 from django.utils import timezone
@@ -51,12 +50,22 @@ from kpi.exceptions import (
 from kpi.interfaces.sync_backend_media import SyncBackendMediaInterface
 from kpi.models.asset_file import AssetFile
 from kpi.models.object_permission import ObjectPermission
-from kpi.models.paired_data import PairedData
 from kpi.utils.django_orm_helper import UpdateJSONFieldAttributes
+from kpi.utils.enketo import (
+    cache_enketo_links,
+    enketo_request,
+    get_cached_enketo_links,
+    is_enketo_outage,
+    is_enketo_unavailable,
+    mark_enketo_unavailable,
+    void_cached_enketo_links,
+)
 from kpi.utils.log import logging
 from kpi.utils.mongo_helper import MongoHelper
 from kpi.utils.object_permission import get_database_user
 from kpi.utils.permissions import is_user_anonymous
+from kpi.utils import server_timing
+from kpi.utils.submission_id_cache import void_cached_submission_ids
 from kpi.utils.xml import fromstring_preserve_root_xmlns, xml_tostring
 from .base_backend import BaseDeploymentBackend
 from .kc_access.shadow_models import (
@@ -266,6 +275,7 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
             else:
                 raise
 
+        self.__void_cached_enketo_links()
         super().delete()
 
     def delete_submission(self, submission_id: int, user: 'auth.User') -> dict:
@@ -447,6 +457,8 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
             method='POST', url=self.submission_url, files=files
         )
         kc_response = self.__kobocat_proxy_request(kc_request, user)
+        # The edited submission gets a new `_uuid`
+        void_cached_submission_ids(self.asset.uid, [deprecated_uuid])
         return self.__prepare_as_drf_response_signature(
             kc_response, expected_response_format='xml'
         )
@@ -477,39 +489,14 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
         Return an object which can be retrieved by its primary key or by XPath.
         An exception is raised when the submission or the attachment is not found.
         """
-        submission_id = None
-        submission_uuid = None
         try:
             submission_id = int(submission_id_or_uuid)
         except ValueError:
-            submission_uuid = submission_id_or_uuid
-        if submission_uuid:
-            # `_uuid` is the legacy identifier that changes (per OpenRosa spec)
-            # after every edit; `meta/rootUuid` remains consistent across
-            # edits. prefer the latter when fetching by UUID.
-            candidates = list(
-                self.get_submissions(
-                    user,
-                    query={
-                        '$or': [
-                            {'meta/rootUuid': submission_uuid},
-                            {'_uuid': submission_uuid},
-                        ]
-                    },
-                    fields=['_id', 'meta/rootUuid', '_uuid'],
-                )
+            submission_id = self.get_submission_id_by_uuid(
+                submission_id_or_uuid, user
             )
-            if not candidates:
+            if submission_id is None:
                 raise SubmissionNotFoundException
-            for submission in candidates:
-                if submission.get('meta/rootUuid') == submission_uuid:
-                    submission_id = submission['_id']
-                    break
-            else:
-                # no submissions with matching `meta/rootUuid` were found;
-                # get the "first" result, despite there being no order
-                # specified, just for consistency with previous code
-                submission_id = candidates[0]['_id']
 
         submission_xml = self.get_submission(
             submission_id, user, format_type=SUBMISSION_FORMAT_TYPE_XML
@@ -660,25 +647,33 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
             return {}
 
         data = {
-            'server_url': '{}/{}'.format(
-                settings.KOBOCAT_URL.rstrip('/'),
-                self.asset.owner.username
-            ),
+            'server_url': self.__enketo_server_url,
             'form_id': self.backend_response['id_string']
         }
 
+        # Links of a form only change when it is redeployed or archived, which
+        # voids the cache. `enketo_id` is only stored on a cache miss.
+        if self.get_data('enketo_id') and (
+            (links := get_cached_enketo_links(**data)) is not None
+        ):
+            return links
+
+        # Don't wait for Enketo again if it has just been found unreachable
+        if is_enketo_unavailable():
+            return {}
+
         try:
-            response = requests.post(
-                f'{settings.ENKETO_URL}/{settings.ENKETO_SURVEY_ENDPOINT}',
-                # bare tuple implies basic auth
-                auth=(settings.ENKETO_API_TOKEN, ''),
-                data=data
+            response = enketo_request(
+                'POST', settings.ENKETO_SURVEY_ENDPOINT, data=data
             )
             response.raise_for_status()
-        except requests.exceptions.RequestException:
+        except requests.exceptions.RequestException as e:
             # Don't 500 the entire asset view if Enketo is unreachable
             logging.error(
                 'Failed to retrieve links from Enketo', exc_info=True)
+            # A client error only concerns this form, not other projects
+            if is_enketo_outage(e):
+                mark_enketo_unavailable()
             return {}
         try:
             links = response.json()
@@ -717,6 +712,8 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
                 del links[discard]
             except KeyError:
                 pass
+
+        cache_enketo_links(links=links, **data)
         return links
 
     def get_orphan_postgres_submissions(self) -> Optional[QuerySet, bool]:
@@ -754,6 +751,26 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
         )
         return url
 
+    def get_submission_watermark(self) -> str:
+        """
+        Return the number of instances, the last time one of them was
+        modified and the submission change token.
+
+        KoBoCAT updates `date_modified` of instances whenever they are saved,
+        but not on bulk updates (e.g. of validation statuses), which are
+        recorded with `record_submission_changes()` instead.
+        """
+        try:
+            xform_id = self.xform_id
+        except InvalidXFormException:
+            return ''
+
+        watermark = ReadOnlyKobocatInstance.objects.filter(
+            xform_id=xform_id
+        ).aggregate(count=Count('pk'), last_modified=Max('date_modified'))
+        watermark['changes'] = self.get_submission_change_token()
+        return '{count}:{last_modified}:{changes}'.format(**watermark)
+
     def get_submissions(
         self,
         user: 'auth.User',
@@ -798,6 +815,77 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
             )
         return submissions
 
+    @classmethod
+    def get_usage_by_asset_id(
+        cls,
+        assets: list['kpi.models.Asset'],
+        start_dates: dict[str, Optional[date]],
+    ) -> dict[int, dict]:
+        """
+        Return attachment storage and submission counts of `assets` with two
+        queries: one to resolve their `XForm`s (which store the attachment
+        storage) and one to sum their daily submission counters, grouped by
+        `XForm`. See `BaseDeploymentBackend.get_usage_by_asset_id()`.
+        """
+        usage = {
+            asset.pk: {
+                'storage_bytes': 0,
+                'submission_counts': {key: 0 for key in start_dates},
+            }
+            for asset in assets
+        }
+        assets_by_xform_id = {}
+        for asset in assets:
+            try:
+                assets_by_xform_id[
+                    asset.deployment.backend_response['formid']
+                ] = asset
+            except KeyError:
+                continue
+
+        if not assets_by_xform_id:
+            return usage
+
+        xforms = (
+            KobocatXForm.objects.filter(pk__in=assets_by_xform_id.keys())
+            .only('user__username', 'id_string', 'attachment_storage_bytes')
+            .select_related('user')
+        )
+        xform_ids = []
+        for xform in xforms:
+            asset = assets_by_xform_id[xform.pk]
+            # Same validation as `xform` property, deployments linked to an
+            # unexpected `XForm` count as empty.
+            if not (
+                xform.user.username == asset.owner.username
+                and xform.id_string == asset.deployment.xform_id_string
+            ):
+                continue
+            xform_ids.append(xform.pk)
+            usage[asset.pk]['storage_bytes'] = xform.attachment_storage_bytes
+
+        if not xform_ids:
+            return usage
+
+        today = timezone.now().date()
+        aggregates = {}
+        for key, start_date in start_dates.items():
+            filter_ = Q(date__range=[start_date, today]) if start_date else None
+            aggregates[key] = Coalesce(Sum('counter', filter=filter_), 0)
+
+        for counters in (
+            KobocatDailyXFormSubmissionCounter.objects.filter(
+                xform_id__in=xform_ids
+            )
+            .values('xform_id')
+            .annotate(**aggregates)
+            .order_by()
+        ):
+            asset = assets_by_xform_id[counters.pop('xform_id')]
+            usage[asset.pk]['submission_counts'] = counters
+
+        return usage
+
     def get_validation_status(self, submission_id: int, user: 'auth.User') -> dict:
         url = self.get_submission_validation_status_url(submission_id)
         kc_request = requests.Request(method='GET', url=url)
@@ -856,6 +944,7 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
         })
 
         self.set_asset_uid()
+        self.__void_cached_enketo_links()
 
     def remove_from_kc_only_flag(self,
                                  specific_user: Union[int, 'User'] = None):
@@ -923,6 +1012,7 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
             'active': json_response['downloadable'],
             'backend_response': json_response,
         })
+        self.__void_cached_enketo_links()
 
     def set_asset_uid(self, force: bool = False) -> bool:
         """
@@ -1041,6 +1131,8 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
 
         kc_request = requests.Request(**kc_request_params)
         kc_response = self.__kobocat_proxy_request(kc_request, user)
+        # KoBoCAT does not update `date_modified` of the instance
+        self.record_submission_changes()
         return self.__prepare_as_drf_response_signature(kc_response)
 
     def set_validation_statuses(self, user: 'auth.User', data: dict) -> dict:
@@ -1074,6 +1166,8 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
         url = self.submission_list_url
         kc_request = requests.Request(method='PATCH', url=url, json=data)
         kc_response = self.__kobocat_proxy_request(kc_request, user)
+        # KoBoCAT updates instances in bulk, without their `date_modified`
+        self.record_submission_changes()
         return self.__prepare_as_drf_response_signature(kc_response)
 
     def store_submission(
@@ -1117,84 +1211,6 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
         )
         return url
 
-    def sync_media_files(self, file_type: str = AssetFile.FORM_MEDIA):
-
-        url = self.normalize_internal_url(self.backend_response['url'])
-        response = self._kobocat_request('GET', url)
-        kc_files = defaultdict(dict)
-
-        # Build a list of KoBoCAT metadata to compare with KPI
-        for metadata in response.get('metadata', []):
-            if metadata['data_type'] == self.SYNCED_DATA_FILE_TYPES[file_type]:
-                kc_files[metadata['data_value']] = {
-                    'pk': metadata['id'],
-                    'url': metadata['url'],
-                    'md5': metadata['file_hash'],
-                    'from_kpi': metadata['from_kpi'],
-                }
-
-        kc_filenames = kc_files.keys()
-
-        queryset = self._get_metadata_queryset(file_type=file_type)
-
-        for media_file in queryset:
-
-            backend_media_id = media_file.backend_media_id
-
-            # File does not exist in KC
-            if backend_media_id not in kc_filenames:
-                if media_file.deleted_at is None:
-                    # New file
-                    self.__save_kc_metadata(media_file)
-                else:
-                    # Orphan, delete it
-                    media_file.delete(force=True)
-                continue
-
-            # Existing file
-            if backend_media_id in kc_filenames:
-                kc_file = kc_files[backend_media_id]
-                if media_file.deleted_at is None:
-                    # If md5 differs, we need to re-upload it.
-                    if media_file.md5_hash != kc_file['md5']:
-                        if media_file.file_type == AssetFile.PAIRED_DATA:
-                            self.__update_kc_metadata_hash(
-                                media_file, kc_file['pk']
-                            )
-                        else:
-                            self.__delete_kc_metadata(kc_file)
-                            self.__save_kc_metadata(media_file)
-                elif kc_file['from_kpi']:
-                    self.__delete_kc_metadata(kc_file, media_file)
-                else:
-                    # Remote file has been uploaded directly to KC. We
-                    # cannot delete it, but we need to vacuum KPI.
-                    media_file.delete(force=True)
-                    # Skip deletion of key corresponding to `backend_media_id`
-                    # in `kc_files` to avoid unique constraint failure in case
-                    # user deleted
-                    # and re-uploaded the same file in a row between
-                    # two deployments
-                    # Example:
-                    # - User uploads file1.jpg (pk == 1)
-                    # - User deletes file1.jpg (pk == 1)
-                    # - User re-uploads file1.jpg (pk == 2)
-                    # Next time, 'file1.jpg' is encountered in this loop,
-                    # it would try to re-upload to KC if its hash differs
-                    # from KC version and would fail because 'file1.jpg'
-                    # already exists in KC db.
-                    continue
-
-                # Remove current filename from `kc_files`.
-                # All files which will remain in this dict (after this loop)
-                # will be considered obsolete and will be deleted
-                del kc_files[backend_media_id]
-
-        # Remove KC orphan files previously uploaded through KPI
-        for kc_file in kc_files.values():
-            if kc_file['from_kpi']:
-                self.__delete_kc_metadata(kc_file)
-
     @property
     def xform(self):
         if not hasattr(self, '_xform'):
@@ -1305,6 +1321,26 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
             + self.xform.attachment_storage_bytes
         )
 
+    def _get_backend_media_files(self, file_type: str) -> dict:
+        """
+        Implements `BaseDeploymentBackend._get_backend_media_files()` with
+        the KoBoCAT metadata of the form
+        """
+        url = self.normalize_internal_url(self.backend_response['url'])
+        response = self._kobocat_request('GET', url)
+        kc_files = {}
+
+        for metadata in response.get('metadata', []):
+            if metadata['data_type'] == self.SYNCED_DATA_FILE_TYPES[file_type]:
+                kc_files[metadata['data_value']] = {
+                    'pk': metadata['id'],
+                    'url': metadata['url'],
+                    'md5': metadata['file_hash'],
+                    'from_kpi': metadata['from_kpi'],
+                }
+
+        return kc_files
+
     def _kobocat_request(self, method, url, expect_formid=True, **kwargs):
         """
         Make a POST or PATCH request and return parsed JSON. Keyword arguments,
@@ -1386,23 +1422,42 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
     def _open_rosa_server_storage(self):
         return default_kobocat_storage
 
-    def __delete_kc_metadata(
-        self, kc_file_: dict, file_: Union[AssetFile, PairedData] = None
+    def _sync_media_file(
+        self,
+        action: str,
+        file_: Optional[SyncBackendMediaInterface],
+        backend_file: Optional[dict],
+        md5_hash: Optional[str],
     ):
         """
-        A simple utility to delete metadata in KoBoCAT through proxy.
-        If related KPI file is provided (i.e. `file_`), it is deleted too.
+        Implements `BaseDeploymentBackend._sync_media_file()`
         """
-        # Delete file in KC
+        if action == self.MEDIA_FILE_ADD:
+            self.__save_kc_metadata(file_, md5_hash)
+        elif action == self.MEDIA_FILE_REPLACE:
+            self.__delete_kc_metadata(backend_file)
+            self.__save_kc_metadata(file_, md5_hash)
+        elif action == self.MEDIA_FILE_UPDATE_HASH:
+            self.__update_kc_metadata_hash(md5_hash, backend_file['pk'])
+        elif action == self.MEDIA_FILE_DELETE:
+            self.__delete_kc_metadata(backend_file)
+        else:
+            raise NotImplementedError(
+                f'This backend does not implement the {action} action'
+            )
 
+    def __delete_kc_metadata(self, kc_file_: dict):
+        """
+        A simple utility to delete metadata in KoBoCAT through proxy.
+        """
         delete_url = self.normalize_internal_url(kc_file_['url'])
         self._kobocat_request('DELETE', url=delete_url, expect_formid=False)
 
-        if file_ is None:
-            return
-
-        # Delete file in KPI if requested
-        file_.delete(force=True)
+    @property
+    def __enketo_server_url(self) -> str:
+        return '{}/{}'.format(
+            settings.KOBOCAT_URL.rstrip('/'), self.asset.owner.username
+        )
 
     def __get_submissions_in_json(
         self,
@@ -1493,6 +1548,7 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
         return (lazy_instance.xml for lazy_instance in queryset)
 
     @staticmethod
+    @server_timing.timed('kobocat')
     def __kobocat_proxy_request(kc_request, user=None):
         """
         Send `kc_request`, which must specify `method` and `url` at a minimum.
@@ -1611,7 +1667,9 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
             },
         }
 
-    def __save_kc_metadata(self, file_: SyncBackendMediaInterface):
+    def __save_kc_metadata(
+        self, file_: SyncBackendMediaInterface, md5_hash: str
+    ):
         """
         Prepares request and data corresponding to the kind of media file
         (i.e. FileStorage or remote URL) to `POST` to KC through proxy.
@@ -1627,7 +1685,7 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
                 'from_kpi': True,
                 'data_filename': file_.filename,
                 'data_file_type': file_.mimetype,
-                'file_hash': file_.md5_hash,
+                'file_hash': md5_hash,
             }
         }
 
@@ -1645,22 +1703,19 @@ class KobocatDeploymentBackend(BaseDeploymentBackend):
                               expect_formid=False,
                               **kwargs)
 
-        file_.synced_with_backend = True
-        file_.save(update_fields=['synced_with_backend'])
-
-    def __update_kc_metadata_hash(
-        self, file_: SyncBackendMediaInterface, kc_metadata_id: int
-    ):
+    def __update_kc_metadata_hash(self, md5_hash: str, kc_metadata_id: int):
         """
         Update metadata hash in KC
         """
         server = settings.KOBOCAT_INTERNAL_URL
         metadata_detail_url = f'{server}/api/v1/metadata/{kc_metadata_id}'
-        data = {'file_hash': file_.md5_hash}
+        data = {'file_hash': md5_hash}
         self._kobocat_request('PATCH',
                               url=metadata_detail_url,
                               expect_formid=False,
                               data=data)
 
-        file_.synced_with_backend = True
-        file_.save(update_fields=['synced_with_backend'])
+    def __void_cached_enketo_links(self):
+        void_cached_enketo_links(
+            self.__enketo_server_url, self.backend_response['id_string']
+        )
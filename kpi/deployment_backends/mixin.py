@@ -3,8 +3,13 @@ import celery
 from django.utils import timezone
 
 from kpi.constants import ASSET_TYPE_SURVEY
-from kpi.exceptions import BadAssetTypeException, DeploymentNotFound
+from kpi.exceptions import (
+    BadAssetTypeException,
+    DeploymentNotFound,
+    MediaFileSyncError,
+)
 from kpi.models.asset_file import AssetFile
+from kpi.utils.log import logging
 
 from .backends import DEPLOYMENT_BACKENDS
 from .base_backend import BaseDeploymentBackend
@@ -24,6 +29,23 @@ class DeployableMixin:
             # Not using .delay() due to circular import in tasks.py
             celery.current_app.send_task('kpi.tasks.sync_media_files', (self.uid,))
 
+    def sync_media_files_or_retry(self, file_type: str = AssetFile.FORM_MEDIA):
+        """
+        Synchronize media files of `file_type` with deployment backend, and
+        retry asynchronously the ones which failed
+        """
+        try:
+            self.deployment.sync_media_files(file_type)
+        except MediaFileSyncError as e:
+            logging.warning(
+                f'Media files of asset {self.uid} are not synchronized: {e}',
+                exc_info=True,
+            )
+            # Not using .delay() due to circular import in tasks.py
+            celery.current_app.send_task(
+                'kpi.tasks.sync_media_files', (self.uid, file_type)
+            )
+
     @property
     def can_be_deployed(self):
         return self.asset_type and self.asset_type == ASSET_TYPE_SURVEY
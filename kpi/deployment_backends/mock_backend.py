@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import copy
+import hashlib
 import os
 import time
 import uuid
@@ -14,6 +15,7 @@ try:
 except ImportError:
     from backports.zoneinfo import ZoneInfo
 
+from bson import json_util
 from deepmerge import always_merger
 from dict2xml import dict2xml as dict2xml_real
 from django.conf import settings
@@ -266,20 +268,16 @@ class MockDeploymentBackend(BaseDeploymentBackend):
 
         submission_json = None
         # First try to get the json version of the submission.
-        # It helps to retrieve the id if `submission_id_or_uuid` is a `UUIDv4`
         try:
-            submission_id_or_uuid = int(submission_id_or_uuid)
+            submission_id = int(submission_id_or_uuid)
         except ValueError:
-            submissions = self.get_submissions(
-                user,
-                format_type=SUBMISSION_FORMAT_TYPE_JSON,
-                query={'_uuid': submission_id_or_uuid},
+            submission_id = self.get_submission_id_by_uuid(
+                submission_id_or_uuid, user, root_uuid=False
             )
-            if submissions:
-                submission_json = submissions[0]
-        else:
+
+        if submission_id is not None:
             submission_json = self.get_submission(
-                submission_id_or_uuid, user, format_type=SUBMISSION_FORMAT_TYPE_JSON
+                submission_id, user, format_type=SUBMISSION_FORMAT_TYPE_JSON
             )
 
         if not submission_json:
@@ -360,6 +358,18 @@ class MockDeploymentBackend(BaseDeploymentBackend):
 
         return daily_counts
 
+    def get_submission_watermark(self) -> str:
+        # Mock submissions carry no modification date, hash them instead
+        submissions = settings.MONGO_DB.instances.find(
+            {MongoHelper.USERFORM_ID: self.mongo_userform_id},
+            sort=[('_id', 1)],
+        )
+        return hashlib.md5(
+            json_util.dumps(
+                [list(submissions), self.get_submission_change_token()]
+            ).encode()
+        ).hexdigest()
+
     def get_submissions(
         self,
         user: 'auth.User',
@@ -641,11 +651,6 @@ class MockDeploymentBackend(BaseDeploymentBackend):
         finally:
             pass
 
-    def sync_media_files(self, file_type: str = AssetFile.FORM_MEDIA):
-        queryset = self._get_metadata_queryset(file_type=file_type)
-        for obj in queryset:
-            assert issubclass(obj.__class__, SyncBackendMediaInterface)
-
     def transfer_counters_ownership(self, new_owner: 'auth.User'):
         NLPUsageCounter.objects.filter(
             asset=self.asset, user=self.asset.owner
@@ -685,6 +690,23 @@ class MockDeploymentBackend(BaseDeploymentBackend):
     def xform_id_string(self):
         return self.asset.uid
 
+    def _get_backend_media_files(self, file_type: str) -> dict:
+        """
+        The mock back end does not store media files, every file of KPI is
+        (re-)uploaded on each synchronization
+        """
+        return {}
+
+    def _sync_media_file(
+        self,
+        action: str,
+        file_: Optional[SyncBackendMediaInterface],
+        backend_file: Optional[dict],
+        md5_hash: Optional[str],
+    ):
+        if file_ is not None:
+            assert issubclass(file_.__class__, SyncBackendMediaInterface)
+
     @classmethod
     def __prepare_bulk_update_data(cls, updates: dict) -> dict:
         """
@@ -134,6 +134,15 @@ class KobocatProfileException(Exception):
     pass
 
 
+class MediaFileSyncError(Exception):
+
+    def __init__(
+        self, message='Could not synchronize media files', outcomes=None
+    ):
+        super().__init__(message)
+        self.outcomes = outcomes or []
+
+
 class NotSupportedFormatException(Exception):
     pass
 
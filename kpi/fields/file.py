@@ -28,21 +28,24 @@ class ExtendedFieldFile(FieldFile):
             self.name = new_path
             return True
 
-        upload_to = self.field.upload_to
-        # Temporary change `upload_to` - which is called internally by
-        # `self.save()` below - to new target folder
-        self.field.upload_to = lambda i, fn: posixpath.join(target_folder, fn)
+        # Do not alter `self.field.upload_to` (as `self.save()` would need) to
+        # let files of the same field be moved concurrently from several
+        # threads.
+        name = self.storage.generate_filename(
+            posixpath.join(target_folder, filename)
+        )
         success = False
         try:
             with self.storage.open(old_path, 'rb') as f:
-                self.save(filename, f, save=False)
+                self.name = self.storage.save(
+                    name, f, max_length=self.field.max_length
+                )
+            setattr(self.instance, self.field.attname, self.name)
+            self._committed = True
             self.storage.delete(old_path)
             success = True
         except FileNotFoundError:
             pass
-        finally:
-            # Restore `upload_to`
-            self.field.upload_to = upload_to
 
         return success
 
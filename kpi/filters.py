@@ -33,6 +33,7 @@ from kpi.exceptions import (
     SearchQueryTooShortException,
 )
 from kpi.models.asset import AssetDeploymentStatus, UserAssetSubscription
+from kpi.models.user_asset_access import UserAssetAccess
 from kpi.utils.django_orm_helper import OrderCustomCharField
 from kpi.utils.query_parser import get_parsed_parameters, parse, ParseError
 from kpi.utils.object_permission import (
@@ -160,31 +161,19 @@ class KpiObjectPermissionsFilter:
         if self._return_queryset:
             return queryset.distinct()
 
-        owned_and_explicit_shared = self._get_owned_and_explicitly_shared(user)
-
         if view.action != 'list':
             # Not a list, so discoverability doesn't matter
-            assets = owned_and_explicit_shared.union(self._get_publics())
-            return queryset.filter(pk__in=assets)
-
-        subscribed = self._get_subscribed(user)
-
-        # As other places in the code, coerce `asset_ids` as a list to force
-        # the query to be processed right now. Otherwise, because queryset is
-        # a lazy query, Django creates (left) joins on tables when queryset is
-        # interpreted and it is way slower than running this extra query.
-        asset_ids = list(
-            (
-                owned_and_explicit_shared
-                    .union(subscribed)
-                    # Since user would be subscribed to a collection and not
-                    # the assets themselves, we append children of subscribed
-                    # collections to the queryset in order for `?q=parent__uid`
-                    # queries to return the collection's children
-                    .union(queryset.filter(parent__in=subscribed).values('pk'))
-            ).values_list('id', flat=True)
-        )
-        return queryset.filter(pk__in=asset_ids)
+            accessible_assets = self._get_owned_explicitly_shared_and_publics(
+                user
+            )
+        else:
+            accessible_assets = self._get_owned_explicitly_shared_and_subscribed(
+                user
+            )
+
+        # `UserAssetAccess` is indexed by user, thus PostgreSQL resolves this
+        # sub-query with a semi-join instead of a long list of ids.
+        return queryset.filter(pk__in=accessible_assets.values('asset_id'))
 
     def _get_queryset_for_data_sharing_enabled(
         self, request: Request, queryset: QuerySet
@@ -318,19 +307,29 @@ class KpiObjectPermissionsFilter:
         return queryset
 
     @staticmethod
-    def _get_owned_and_explicitly_shared(user):
-        view_asset_perm_id = get_perm_ids_from_code_names(PERM_VIEW_ASSET)
+    def _get_owned_explicitly_shared_and_publics(user) -> QuerySet:
+        user_ids = [settings.ANONYMOUS_USER_ID]
+        if not is_user_anonymous(user):
+            user_ids.append(user.pk)
+
+        return UserAssetAccess.objects.filter(
+            user_id__in=user_ids, via_subscription=False
+        )
+
+    @staticmethod
+    def _get_owned_explicitly_shared_and_subscribed(user) -> QuerySet:
         if is_user_anonymous(user):
             # Avoid giving anonymous users special treatment when viewing
             # public objects
-            perms = ObjectPermission.objects.none()
-        else:
-            perms = ObjectPermission.objects.filter(
-                deny=False,
-                user=user,
-                permission_id=view_asset_perm_id)
+            return UserAssetAccess.objects.filter(
+                user_id=settings.ANONYMOUS_USER_ID, via_subscription=True
+            )
 
-        return perms.values('asset')
+        # Since user would be subscribed to a collection and not the assets
+        # themselves, `UserAssetAccess` contains also the children of
+        # subscribed collections in order for `?q=parent__uid` queries to
+        # return the collection's children
+        return UserAssetAccess.objects.filter(user_id=user.pk)
 
     @staticmethod
     def _get_publics():
@@ -1,10 +1,15 @@
 import constance
 from datetime import timedelta
 
-from django.db.models import Exists, OuterRef, Q
+from django.db.models import Exists, OuterRef, ProtectedError, Q
 from django.utils import timezone
 
-from kpi.models import AssetSnapshot
+from kpi.models import (
+    AssetSnapshot,
+    AssetVersion,
+    AssetVersionContent,
+    ExportArtifact,
+)
 
 
 def remove_old_asset_snapshots():
@@ -26,3 +31,46 @@ def remove_old_asset_snapshots():
         ).delete()
         if not count:
             break
+
+
+def remove_orphan_asset_version_contents(chunk_size: int = 1000) -> int:
+    """
+    Delete the contents not referenced by any asset version anymore, e.g.
+    after their assets were deleted. Return the number of deleted contents.
+    """
+    # Recent contents are kept: the version referencing a new content is
+    # saved right after the content itself
+    orphans = AssetVersionContent.objects.filter(
+        ~Exists(AssetVersion.objects.filter(content_blob=OuterRef('pk'))),
+        date_created__lt=timezone.now() - timedelta(days=1),
+    ).order_by('pk')
+
+    deleted_count = 0
+    last_hash = ''
+    while True:
+        hashes = list(
+            orphans.filter(pk__gt=last_hash).values_list('pk', flat=True)[
+                :chunk_size
+            ]
+        )
+        if not hashes:
+            break
+        last_hash = hashes[-1]
+        try:
+            count, _ = orphans.filter(pk__in=hashes).delete()
+        except ProtectedError:
+            # A new version reuses one of these contents in the meantime.
+            # Leave the whole batch to the next run.
+            continue
+        deleted_count += count
+
+    return deleted_count
+
+
+def remove_unreferenced_export_artifacts() -> int:
+    """
+    Delete the shared export files no export references anymore. Exports
+    release their artifact when they are deleted one by one, but not when
+    they are deleted in cascade, e.g. with their user.
+    """
+    return ExportArtifact.delete_unreferenced()
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from kobo.apps.trackers.models import MonthlyUsageRollup
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Compare monthly usage roll-ups with the raw submission and NLP '
+        'counters they are computed from'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+
+        parser.add_argument(
+            '--since',
+            type=lambda value: datetime.strptime(value, '%Y-%m').date(),
+            help='First month to check (YYYY-MM). Defaults to the first counter.',
+        )
+        parser.add_argument(
+            '--username',
+            action='append',
+            dest='usernames',
+            help='Check only the roll-ups of this user. Can be repeated.',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            default=False,
+            help='Recompute the months with mismatches.',
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        since = options['since']
+        user_ids = None
+        if usernames := options['usernames']:
+            user_ids = list(
+                User.objects.filter(
+                    username__in=usernames
+                ).values_list('pk', flat=True)
+            )
+            if len(user_ids) != len(usernames):
+                raise CommandError('Some users do not exist')
+
+        mismatches = MonthlyUsageRollup.check_consistency(
+            since=since, user_ids=user_ids
+        )
+        if verbosity >= 2:
+            for mismatch in mismatches:
+                self.stdout.write(
+                    '\tUser #{user_id}, {month:%Y-%m}, {field}: '
+                    '{rollup} rolled up, {raw} counted'.format(**mismatch)
+                )
+
+        if not mismatches:
+            if verbosity >= 1:
+                self.stdout.write('Done! Roll-ups match raw counters.')
+            return
+
+        if not options['fix']:
+            raise CommandError(
+                f'{len(mismatches)} mismatches found. '
+                f'Run with `--fix` to recompute them.'
+            )
+
+        mismatched_user_ids = {mismatch['user_id'] for mismatch in mismatches}
+        first_month = min(mismatch['month'] for mismatch in mismatches)
+        MonthlyUsageRollup.roll_up(
+            since=first_month, user_ids=mismatched_user_ids
+        )
+        if verbosity >= 1:
+            self.stdout.write(
+                f'Done! {len(mismatches)} mismatches fixed for '
+                f'{len(mismatched_user_ids)} users.'
+            )
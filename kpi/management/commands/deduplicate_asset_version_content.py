@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from kpi.maintenance_tasks import remove_orphan_asset_version_contents
+from kpi.models.asset_version import AssetVersion, AssetVersionContent
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Move the content of asset versions saved before deduplication to '
+        'shared `AssetVersionContent` rows'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+
+        parser.add_argument(
+            '--chunks',
+            default=500,
+            type=int,
+            help='Update only records by batch of `chunks` versions.',
+        )
+
+        parser.add_argument(
+            '--delete-orphans',
+            action='store_true',
+            default=False,
+            help=(
+                'Delete contents not referenced by any version anymore, e.g. '
+                'after their assets were deleted. Daily maintenance does it '
+                'as well.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        chunks = options['chunks']
+
+        last_version_id = 0
+        moved_count = 0
+        while True:
+            versions = list(
+                AssetVersion.objects.filter(
+                    pk__gt=last_version_id, _version_content__isnull=False
+                )
+                .only('pk', '_version_content')
+                .order_by('pk')[:chunks]
+            )
+            if not versions:
+                break
+
+            self._move_content(versions)
+            last_version_id = versions[-1].pk
+            moved_count += len(versions)
+            if verbosity >= 2:
+                self.stdout.write(f'\t{moved_count} versions processed...')
+
+        if verbosity >= 1:
+            self.stdout.write(
+                f'Done! Content of {moved_count} versions has been moved.'
+            )
+
+        if options['delete_orphans']:
+            deleted_count = remove_orphan_asset_version_contents(chunks)
+            if verbosity >= 1:
+                self.stdout.write(f'{deleted_count} orphan contents deleted.')
+
+    @staticmethod
+    @transaction.atomic
+    def _move_content(versions: list[AssetVersion]):
+        contents = {}
+        for version in versions:
+            content = version._version_content
+            version.content_blob_id = AssetVersionContent.get_hash(content)
+            version._version_content = None
+            contents[version.content_blob_id] = content
+
+        existing_hashes = set(
+            AssetVersionContent.objects.filter(
+                pk__in=contents.keys()
+            ).values_list('pk', flat=True)
+        )
+        AssetVersionContent.objects.bulk_create(
+            [
+                AssetVersionContent(hash=hash_, content=content)
+                for hash_, content in contents.items()
+                if hash_ not in existing_hashes
+            ],
+            ignore_conflicts=True,
+        )
+        AssetVersion.objects.bulk_update(
+            versions, ['content_blob', '_version_content']
+        )
@@ -0,0 +1,120 @@
+import json
+
+from bson import json_util
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from kpi.utils.mongo_indexes import (
+    create_missing_indexes,
+    get_missing_indexes,
+    get_slow_queries,
+    suggest_indexes,
+)
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Create the MongoDB indexes required by KPI, and suggest additional '
+        'ones from the slow queries recorded by the database profiler'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help='List the missing indexes without creating them.',
+        )
+
+        parser.add_argument(
+            '--suggest',
+            action='store_true',
+            default=False,
+            help=(
+                'Suggest indexes for the slow queries recorded by the '
+                'profiler. Enable it first with '
+                '`db.setProfilingLevel(1, {slowms: 100})`.'
+            ),
+        )
+
+        parser.add_argument(
+            '--slow-ms',
+            default=100,
+            type=int,
+            help='Minimum duration of the queries to analyze, in milliseconds.',
+        )
+
+        parser.add_argument(
+            '--sample-size',
+            default=1000,
+            type=int,
+            help='Number of the most recent slow queries to analyze.',
+        )
+
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            default=False,
+            help=(
+                'Explain the slow queries again with the current indexes '
+                'instead of relying on the plans recorded by the profiler.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        db = settings.MONGO_DB
+        collection = db.instances
+
+        if options['dry_run']:
+            missing_indexes = get_missing_indexes(collection)
+            for name, keys in missing_indexes.items():
+                self.stdout.write(f'Missing index `{name}`: {keys}')
+            if not missing_indexes and verbosity >= 1:
+                self.stdout.write('No missing indexes.')
+        else:
+            created_indexes = create_missing_indexes(collection)
+            if verbosity >= 1:
+                self.stdout.write(
+                    f'Done! {len(created_indexes)} indexes created'
+                    + (f': {", ".join(created_indexes)}.' if created_indexes else '.')
+                )
+
+        if not options['suggest']:
+            return
+
+        slow_queries = get_slow_queries(
+            db,
+            collection.name,
+            slow_ms=options['slow_ms'],
+            sample_size=options['sample_size'],
+        )
+        if not slow_queries:
+            self.stdout.write(
+                'No slow queries found. Is the profiler enabled? See '
+                '`--help`.'
+            )
+            return
+
+        suggestions = suggest_indexes(
+            collection, slow_queries, use_explain=options['explain']
+        )
+        if verbosity >= 1:
+            self.stdout.write(
+                f'{len(slow_queries)} slow queries analyzed, '
+                f'{len(suggestions)} indexes suggested.'
+            )
+        for suggestion in suggestions:
+            keys = json.dumps(dict(suggestion['keys']))
+            self.stdout.write(
+                f'\n{keys}\n'
+                f'\t{suggestion["count"]} queries, '
+                f'{suggestion["millis"]} ms in total'
+            )
+            if verbosity >= 2:
+                self.stdout.write(
+                    f'\te.g. {json_util.dumps(suggestion["example"])}'
+                )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from kpi.models.asset import Asset
+from kpi.models.user_asset_access import UserAssetAccess
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Rebuild `UserAssetAccess`, the index of assets each user can list, '
+        'from permissions and subscriptions'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+
+        parser.add_argument(
+            '--chunks',
+            default=2000,
+            type=int,
+            help='Rebuild only records by batch of `chunks` assets.',
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        chunks = options['chunks']
+
+        last_asset_id = 0
+        rebuilt_count = 0
+        while True:
+            asset_ids = list(
+                Asset.all_objects.filter(pk__gt=last_asset_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunks]
+            )
+            if not asset_ids:
+                break
+
+            UserAssetAccess.refresh(asset_ids)
+            last_asset_id = asset_ids[-1]
+            rebuilt_count += len(asset_ids)
+            if verbosity >= 2:
+                self.stdout.write(f'\t{rebuilt_count} assets processed...')
+
+        if verbosity >= 1:
+            self.stdout.write(
+                f'Done! Access to {rebuilt_count} assets has been rebuilt.'
+            )
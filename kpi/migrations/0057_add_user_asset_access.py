@@ -0,0 +1,136 @@
+# Generated by Django 4.2.11 on 2024-06-03 14:12
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from kpi.constants import PERM_VIEW_ASSET
+
+CHUNK_SIZE = 2000
+
+
+def populate_user_asset_access(apps, schema_editor):
+    # Not skipped with `SKIP_HEAVY_MIGRATIONS`: asset lists are filtered with
+    # `UserAssetAccess` only, they would be empty until the table is populated.
+    Asset = apps.get_model('kpi', 'Asset')  # noqa
+    ObjectPermission = apps.get_model('kpi', 'ObjectPermission')  # noqa
+    Permission = apps.get_model('auth', 'Permission')  # noqa
+    UserAssetAccess = apps.get_model('kpi', 'UserAssetAccess')  # noqa
+    UserAssetSubscription = apps.get_model('kpi', 'UserAssetSubscription')  # noqa
+
+    view_asset_perm_id = Permission.objects.get(
+        content_type__app_label='kpi', codename=PERM_VIEW_ASSET
+    ).pk
+    publics = ObjectPermission.objects.filter(
+        deny=False,
+        user_id=settings.ANONYMOUS_USER_ID,
+        permission_id=view_asset_perm_id,
+    ).values('asset')
+
+    def bulk_create(accesses_iter):
+        while True:
+            accesses = list(islice(accesses_iter, CHUNK_SIZE))
+            if not accesses:
+                break
+            UserAssetAccess.objects.bulk_create(
+                [
+                    UserAssetAccess(
+                        user_id=user_id,
+                        asset_id=asset_id,
+                        via_subscription=via_subscription,
+                    )
+                    for user_id, asset_id, via_subscription in accesses
+                ],
+                ignore_conflicts=True,
+            )
+
+    # Owned and explicitly shared assets
+    bulk_create(
+        (user_id, asset_id, False)
+        for user_id, asset_id in ObjectPermission.objects.filter(
+            deny=False, permission_id=view_asset_perm_id
+        )
+        .values_list('user_id', 'asset_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    # Subscribed public collections
+    bulk_create(
+        (user_id, asset_id, True)
+        for user_id, asset_id in UserAssetSubscription.objects.filter(
+            asset__in=publics
+        )
+        .values_list('user_id', 'asset_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    # Children of subscribed public collections
+    children_by_parent_id = defaultdict(list)
+    for asset_id, parent_id in (
+        Asset.objects.filter(parent__in=publics)
+        .values_list('pk', 'parent_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+    ):
+        children_by_parent_id[parent_id].append(asset_id)
+
+    bulk_create(
+        (user_id, asset_id, True)
+        for user_id, parent_id in UserAssetSubscription.objects.filter(
+            asset_id__in=publics
+        )
+        .values_list('user_id', 'asset_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+        for asset_id in children_by_parent_id[parent_id]
+    )
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('kpi', '0056_fix_add_submission_bad_permission_assignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAssetAccess',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('via_subscription', models.BooleanField(default=False)),
+                (
+                    'asset',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='user_accesses',
+                        to='kpi.asset',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='asset_accesses',
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'unique_together': {('user', 'via_subscription', 'asset')},
+            },
+        ),
+        migrations.RunPython(populate_user_asset_access, noop),
+    ]
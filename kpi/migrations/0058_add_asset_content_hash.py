@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2024-06-12 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kpi', '0057_add_user_asset_access'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='_content_hash',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2024-06-14 08:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kpi', '0058_add_asset_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetVersionContent',
+            fields=[
+                ('hash', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('content', models.JSONField()),
+                ('date_created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RenameField(
+            model_name='assetversion',
+            old_name='version_content',
+            new_name='_version_content',
+        ),
+        migrations.AlterField(
+            model_name='assetversion',
+            name='_version_content',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='content_blob',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='asset_versions', to='kpi.assetversioncontent'),
+        ),
+    ]
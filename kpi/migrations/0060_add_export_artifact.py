@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import kpi.models.import_export_task
+import private_storage.fields
+import private_storage.storage.files
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kpi', '0059_add_asset_version_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportArtifact',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('result', private_storage.fields.PrivateFileField(max_length=380, storage=private_storage.storage.files.PrivateFileSystemStorage(), upload_to=kpi.models.import_export_task.export_artifact_upload_to)),
+                ('last_submission_time', models.DateTimeField(null=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='exporttask',
+            name='artifact',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exporttasks', to='kpi.exportartifact'),
+        ),
+        migrations.AddField(
+            model_name='synchronousexport',
+            name='artifact',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='synchronousexports', to='kpi.exportartifact'),
+        ),
+    ]
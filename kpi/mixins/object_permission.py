@@ -23,14 +23,18 @@ from kpi.constants import (
 )
 from kpi.deployment_backends.kc_access.utils import (
     remove_applicable_kc_permissions,
+    remove_applicable_kc_permissions_bulk,
     assign_applicable_kc_permissions,
+    assign_applicable_kc_permissions_bulk,
     kc_transaction_atomic,
 )
 from kpi.models.object_permission import ObjectPermission
+from kpi.utils.cache import void_cache_for_request
 from kpi.utils.object_permission import (
     get_database_user,
     perm_parse,
     post_assign_perm,
+    post_recalculate_perms,
     post_remove_perm,
 )
 from kpi.utils.permissions import is_user_anonymous
@@ -150,12 +154,16 @@ class ObjectPermissionMixin:
                         })
                     self.assign_perm(**kwargs)
             self._recalculate_inherited_perms()
+            post_recalculate_perms.send(sender=self.__class__, instance=self)
             return True
         else:
             return False
 
     @transaction.atomic
     def save(self, *args, **kwargs):
+        previous_parent_and_owner = self._get_saved_parent_and_owner(
+            kwargs.get('update_fields')
+        )
         # Make sure we exist in the database before proceeding
         super().save(*args, **kwargs)
         # Recalculate self and all descendants
@@ -163,6 +171,47 @@ class ObjectPermissionMixin:
         # collection was renamed
         self._recalculate_inherited_perms()
         self.recalculate_descendants_perms()
+        # Only new objects, and objects whose parent or owner has changed,
+        # gain or lose (inherited) permissions
+        if previous_parent_and_owner != (self.parent_id, self.owner_id):
+            post_recalculate_perms.send(sender=self.__class__, instance=self)
+
+    def _get_saved_parent_and_owner(
+        self, update_fields: Optional[list] = None
+    ) -> Optional[tuple]:
+        """
+        Return the parent and owner ids stored in the database, or `None` if
+        the object has not been saved yet. The database is only queried if
+        the model does not track them (see `_get_tracked_parent_and_owner()`).
+        """
+        if self._state.adding:
+            return None
+
+        if update_fields is not None and not {
+            'parent',
+            'parent_id',
+            'owner',
+            'owner_id',
+        }.intersection(update_fields):
+            # Neither of them can change
+            return self.parent_id, self.owner_id
+
+        if (tracked := self._get_tracked_parent_and_owner()) is not None:
+            return tracked
+
+        return (
+            type(self)
+            ._base_manager.filter(pk=self.pk)
+            .values_list('parent_id', 'owner_id')
+            .first()
+        )
+
+    def _get_tracked_parent_and_owner(self) -> Optional[tuple]:
+        """
+        Return the parent and owner ids the object has been loaded (or last
+        saved) with, if the model keeps track of them, `None` otherwise.
+        """
+        return None
 
     def _filter_anonymous_perms(self, unfiltered_set):
         """
@@ -553,6 +602,7 @@ class ObjectPermissionMixin:
 
         # Recalculate all descendants
         self.recalculate_descendants_perms()
+        post_recalculate_perms.send(sender=self.__class__, instance=self)
         return new_permission
 
     def get_perms(self, user_obj: 'auth.User') -> list[str]:
@@ -719,6 +769,311 @@ class ObjectPermissionMixin:
 
         # Recalculate all descendants
         self.recalculate_descendants_perms()
+        post_recalculate_perms.send(sender=self.__class__, instance=self)
+
+    @transaction.atomic
+    @kc_transaction_atomic
+    @void_cache_for_request(keys=('__get_all_object_permissions',
+                                  '__get_all_user_permissions',))
+    def assign_perms_bulk(
+        self,
+        assignments: list[tuple],
+        defer_recalc: bool = False,
+        skip_kc: bool = False,
+    ) -> list[ObjectPermission]:
+        r"""
+            Set-based counterpart of `assign_perm()`, meant to grant many
+            permissions to many users at once (e.g. sharing a project with
+            hundreds of enumerators) with a constant number of queries.
+
+            Implied permissions are expanded once per codename, contradictory
+            assignments are deleted and new assignments are created in bulk,
+            partial permissions are updated in bulk and applicable KC
+            permissions are pushed in one batch. Descendants are recalculated
+            only once.
+
+            Unlike `assign_perm()`, denying permissions is not supported.
+
+            :param assignments: list. `(user_obj, perm)` or
+                `(user_obj, perm, partial_perms)` tuples
+            :param defer_recalc: bool. When `True`, skip recalculating
+                descendants
+            :param skip_kc: bool. When `True`, skip assignment of applicable KC
+                permissions
+            :return: list. The newly created `ObjectPermission` objects
+        """
+        assignable_permissions = self.get_assignable_permissions()
+        implied_perms_cache = {}
+        users = {}
+        top_level_assignments = []
+        # Acts as an ordered set of `(user_id, codename)` to grant. When
+        # contradictory permissions are requested for the same user, the last
+        # one wins, as it would with successive calls to `assign_perm()`.
+        grants = {}
+
+        for user_obj, perm, *partial_perms in assignments:
+            app_label, codename = perm_parse(perm, self)
+            if codename not in assignable_permissions:
+                # Some permissions are calculated and not stored in the database
+                raise serializers.ValidationError({
+                    'permission': f'{codename} cannot be assigned explicitly to {self}'
+                })
+            is_anonymous = is_user_anonymous(user_obj)
+            user_obj = get_database_user(user_obj)
+            if is_anonymous:
+                # Is an anonymous user allowed to have this permission?
+                fq_permission = f'{app_label}.{codename}'
+                if fq_permission not in settings.ALLOWED_ANONYMOUS_PERMISSIONS:
+                    raise serializers.ValidationError({
+                        'permission': f'Anonymous users cannot be granted the permission {codename}.'
+                    })
+
+            users[user_obj.pk] = user_obj
+            top_level_assignments.append(
+                (user_obj, codename, partial_perms[0] if partial_perms else None)
+            )
+            try:
+                implied_perms = implied_perms_cache[codename]
+            except KeyError:
+                implied_perms = implied_perms_cache[codename] = (
+                    self.get_implied_perms(
+                        codename, for_instance=self
+                    ).intersection(assignable_permissions)
+                )
+            for codename_ in (codename, *implied_perms):
+                for contradictory_codename in self.CONTRADICTORY_PERMISSIONS.get(
+                    codename_, ()
+                ):
+                    grants.pop((user_obj.pk, contradictory_codename), None)
+                grants[(user_obj.pk, codename_)] = None
+
+        if not grants:
+            return []
+
+        existing_perms = self.__get_existing_perms_by_user(users.keys())
+        perm_ids_to_delete = set()
+        new_grants = []
+        for user_id, codename in grants:
+            contradictory_codenames = self.CONTRADICTORY_PERMISSIONS.get(
+                codename, ()
+            )
+            contradictory_perm_ids = []
+            for perm_id, codename_, deny, inherited in existing_perms[user_id]:
+                if codename_ == codename and not inherited:
+                    if not deny:
+                        # The user already has this permission directly
+                        # applied
+                        break
+                    contradictory_perm_ids.append(perm_id)
+                elif codename_ in contradictory_codenames:
+                    contradictory_perm_ids.append(perm_id)
+            else:
+                perm_ids_to_delete.update(contradictory_perm_ids)
+                new_grants.append((user_id, codename))
+
+        # Remove any explicitly-defined contradictory grants or denials
+        if perm_ids_to_delete:
+            self.permissions.filter(pk__in=perm_ids_to_delete).delete()
+
+        new_permissions = []
+        if new_grants:
+            content_type = ContentType.objects.get_for_model(self)
+            perm_model_ids = dict(
+                Permission.objects.filter(
+                    content_type=content_type,
+                    codename__in={codename for _, codename in new_grants},
+                ).values_list('codename', 'pk')
+            )
+            for user_id, codename in new_grants:
+                new_permission = ObjectPermission()
+                new_permission.asset = self
+                new_permission.user_id = user_id
+                new_permission.permission_id = perm_model_ids[codename]
+                new_permission.uid = new_permission._meta.get_field(
+                    'uid').generate_uid()
+                new_permissions.append(new_permission)
+            ObjectPermission.objects.bulk_create(new_permissions)
+
+        # Assign any applicable KC permissions
+        if new_grants and not skip_kc:
+            kc_codenames_by_user_id = defaultdict(list)
+            for user_id, codename in new_grants:
+                kc_codenames_by_user_id[user_id].append(codename)
+            assign_applicable_kc_permissions_bulk(self, kc_codenames_by_user_id)
+
+        # We might have been called by ourselves to assign a related
+        # permission. In that case, don't recalculate here.
+        if defer_recalc:
+            return new_permissions
+
+        self._update_partial_permissions_bulk(top_level_assignments)
+
+        new_grants = set(new_grants)
+        for user_obj, codename, _ in top_level_assignments:
+            if (user_obj.pk, codename) not in new_grants:
+                continue
+            post_assign_perm.send(
+                sender=self.__class__,
+                instance=self,
+                user=user_obj,
+                codename=codename,
+            )
+
+        # Recalculate all descendants
+        self.recalculate_descendants_perms()
+        post_recalculate_perms.send(sender=self.__class__, instance=self)
+        return new_permissions
+
+    @transaction.atomic
+    @kc_transaction_atomic
+    @void_cache_for_request(keys=('__get_all_object_permissions',
+                                  '__get_all_user_permissions',))
+    def remove_perms_bulk(
+        self,
+        removals: list[tuple],
+        defer_recalc: bool = False,
+        skip_kc: bool = False,
+    ):
+        r"""
+            Set-based counterpart of `remove_perm()`, meant to revoke many
+            permissions from many users at once with a constant number of
+            queries.
+
+            Implied permissions are expanded once per codename, direct
+            assignments are deleted in bulk, deny assignments blocking
+            inherited ones are created in bulk, partial permissions are
+            cleaned up in bulk and applicable KC permissions are removed in
+            one batch. Descendants are recalculated only once.
+
+            :param removals: list. `(user_obj, perm)` tuples
+            :param defer_recalc: bool. When `True`, skip recalculating
+                descendants
+            :param skip_kc: bool. When `True`, skip removal of applicable KC
+                permissions
+        """
+        # Get all assignable permissions, regardless of asset type. That way,
+        # we can allow invalid permissions to be removed
+        removable_permissions = self.get_assignable_permissions(
+            ignore_type=True
+        )
+        assignable_permissions = self.get_assignable_permissions()
+        implied_perms_cache = {}
+        users = {}
+        top_level_removals = []
+        # Acts as an ordered set of `(user_id, codename)` to revoke
+        revocations = {}
+
+        for user_obj, perm in removals:
+            user_obj = get_database_user(user_obj)
+            app_label, codename = perm_parse(perm, self)
+            if codename not in removable_permissions:
+                # Some permissions are calculated and not stored in the database
+                raise serializers.ValidationError({
+                    'permission': f'{codename} cannot be removed explicitly.'
+                })
+            users[user_obj.pk] = user_obj
+            top_level_removals.append((user_obj, codename, None))
+            # Resolve implied permissions, e.g. revoking view implies revoking
+            # change
+            try:
+                implied_perms = implied_perms_cache[codename]
+            except KeyError:
+                implied_perms = implied_perms_cache[codename] = (
+                    self.get_implied_perms(
+                        codename, reverse=True, for_instance=self
+                    )
+                )
+            for codename_ in (codename, *implied_perms):
+                revocations[(user_obj.pk, codename_)] = None
+
+        if not revocations:
+            return
+
+        existing_perms = self.__get_existing_perms_by_user(users.keys())
+        perm_ids_to_delete = []
+        # Acts as an ordered set of `(user_id, codename)` to deny
+        denials = {}
+        for user_id, codename in revocations:
+            has_inherited_perm = False
+            for perm_id, codename_, deny, inherited in existing_perms[user_id]:
+                if codename_ != codename or deny:
+                    continue
+                perm_ids_to_delete.append(perm_id)
+                has_inherited_perm = has_inherited_perm or inherited
+
+            if not has_inherited_perm or codename not in assignable_permissions:
+                continue
+
+            # Add deny permissions to block future inheritance
+            try:
+                implied_perms = implied_perms_cache[codename]
+            except KeyError:
+                implied_perms = implied_perms_cache[codename] = (
+                    self.get_implied_perms(
+                        codename, reverse=True, for_instance=self
+                    )
+                )
+            for codename_ in (codename, *implied_perms):
+                if codename_ in assignable_permissions:
+                    denials[(user_id, codename_)] = None
+
+        # Delete directly assigned and inherited permissions, if any
+        if perm_ids_to_delete:
+            self.permissions.filter(pk__in=perm_ids_to_delete).delete()
+
+        new_denials = [
+            (user_id, codename)
+            for user_id, codename in denials
+            if not any(
+                codename_ == codename and deny and not inherited
+                for _, codename_, deny, inherited in existing_perms[user_id]
+            )
+        ]
+        if new_denials:
+            content_type = ContentType.objects.get_for_model(self)
+            perm_model_ids = dict(
+                Permission.objects.filter(
+                    content_type=content_type,
+                    codename__in={codename for _, codename in new_denials},
+                ).values_list('codename', 'pk')
+            )
+            new_permissions = []
+            for user_id, codename in new_denials:
+                new_permission = ObjectPermission()
+                new_permission.asset = self
+                new_permission.user_id = user_id
+                new_permission.permission_id = perm_model_ids[codename]
+                new_permission.deny = True
+                new_permission.uid = new_permission._meta.get_field(
+                    'uid').generate_uid()
+                new_permissions.append(new_permission)
+            ObjectPermission.objects.bulk_create(new_permissions)
+
+        # Remove any applicable KC permissions
+        if not skip_kc:
+            kc_codenames_by_user_id = defaultdict(list)
+            for user_id, codename in revocations:
+                kc_codenames_by_user_id[user_id].append(codename)
+            remove_applicable_kc_permissions_bulk(self, kc_codenames_by_user_id)
+
+        # We might have been called by ourself to assign a related
+        # permission. In that case, don't recalculate here.
+        if defer_recalc:
+            return
+
+        self._update_partial_permissions_bulk(top_level_removals, remove=True)
+
+        for user_obj, codename, _ in top_level_removals:
+            post_remove_perm.send(
+                sender=self.__class__,
+                instance=self,
+                user=user_obj,
+                codename=codename,
+            )
+
+        # Recalculate all descendants
+        self.recalculate_descendants_perms()
+        post_recalculate_perms.send(sender=self.__class__, instance=self)
 
     def _update_partial_permissions(
         self,
@@ -731,6 +1086,39 @@ class ObjectPermissionMixin:
         # Let the dev implement within the classes that inherit from this mixin
         pass
 
+    def _update_partial_permissions_bulk(
+        self,
+        assignments: list[tuple[User, str, Optional[dict]]],
+        remove: bool = False,
+    ):
+        """
+        Bulk counterpart of `_update_partial_permissions()`.
+        `assignments` is a list of `(user, codename, partial_perms)` tuples.
+
+        Falls back on `_update_partial_permissions()` for each assignment.
+        Classes that inherit from this mixin should override it with a
+        set-based implementation.
+        """
+        for user, perm, partial_perms in assignments:
+            self._update_partial_permissions(
+                user, perm, remove=remove, partial_perms=partial_perms
+            )
+
+    def __get_existing_perms_by_user(self, user_ids) -> dict[int, list]:
+        """
+        Return all the permission assignments of users `user_ids` on this
+        object, with a single query, as a dictionary where keys are user ids
+        and values are lists of `(pk, codename, deny, inherited)` tuples.
+        """
+        existing_perms = defaultdict(list)
+        for pk, user_id, codename, deny, inherited in self.permissions.filter(
+            user_id__in=user_ids
+        ).values_list(
+            'pk', 'user_id', 'permission__codename', 'deny', 'inherited'
+        ):
+            existing_perms[user_id].append((pk, codename, deny, inherited))
+        return existing_perms
+
     @staticmethod
     @cache_for_request
     def __get_all_object_permissions(object_id):
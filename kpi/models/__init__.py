@@ -2,17 +2,19 @@
 from .asset import Asset
 from .asset import UserAssetSubscription
 from .asset_export_settings import AssetExportSettings
-from .asset_version import AssetVersion
+from .asset_version import AssetVersion, AssetVersionContent
 from .asset_file import AssetFile
 from .asset_snapshot import AssetSnapshot
 from .asset_user_partial_permission import AssetUserPartialPermission
 from .object_permission import ObjectPermission
 from .import_export_task import (
+    ExportArtifact,
     ExportTask,
     ImportTask,
     ProjectViewExportTask,
     SynchronousExport,
 )
 from .tag_uid import TagUid
+from .user_asset_access import UserAssetAccess
 from .authorized_application import AuthorizedApplication
 from .paired_data import PairedData
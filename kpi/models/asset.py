@@ -1,6 +1,7 @@
 # coding: utf-8
 # 😬
 import copy
+import json
 import re
 from functools import reduce
 from operator import add
@@ -12,6 +13,7 @@ from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.db import transaction
 from django.db.models import Prefetch, Q, F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as t
 from django_request_cache import cache_for_request
 from taggit.managers import TaggableManager, _TaggableManager
@@ -79,6 +81,7 @@ from kpi.models.asset_snapshot import AssetSnapshot
 from kpi.models.asset_user_partial_permission import AssetUserPartialPermission
 from kpi.models.asset_version import AssetVersion
 from kpi.utils.asset_content_analyzer import AssetContentAnalyzer
+from kpi.utils.hash import calculate_hash
 from kpi.utils.object_permission import get_cached_code_names
 from kpi.utils.sluggify import sluggify_label
 
@@ -218,6 +221,11 @@ class Asset(ObjectPermissionMixin,
         db_index=True
     )
 
+    # Hash of `content` as stored in the database, used by `save()` to skip
+    # content processing when it has not changed. It should **NOT** be set
+    # directly.
+    _content_hash = models.CharField(max_length=40, null=True, blank=True)
+
     objects = AssetWithoutPendingDeletedManager()
     all_objects = AssetAllManager()
 
@@ -427,7 +435,10 @@ class Asset(ObjectPermissionMixin,
         # They must be set with an invalid value for their counterparts to
         # be the comparison is accurate.
         self.__parent_id_copy = -1
+        self.__owner_id_copy = -1
         self.__deployment_data_copy = None
+        self.__settings_copy = None
+        self.__name_copy = None
         self.__copy_hidden_fields()
 
     def __str__(self):
@@ -564,7 +575,9 @@ class Asset(ObjectPermissionMixin,
         if len(self.advanced_features) == 0:
             NO_FEATURES_MSG = 'no advanced features activated for this form'
             return {'type': 'object', '$description': NO_FEATURES_MSG}
-        last_deployed_version = self.deployed_versions.first()
+        last_deployed_version = self.deployed_versions.select_related(
+            'content_blob'
+        ).first()
         if content:
             return advanced_submission_jsonschema(
                 content, self.advanced_features, url=url
@@ -818,6 +831,12 @@ class Asset(ObjectPermissionMixin,
         )
         return queryset
 
+    def _get_tracked_parent_and_owner(self) -> Optional[tuple]:
+        if self.__parent_id_copy == -1 or self.__owner_id_copy == -1:
+            # Deferred when the object was loaded
+            return None
+        return self.__parent_id_copy, self.__owner_id_copy
+
     def refresh_from_db(self, using=None, fields=None):
         super().refresh_from_db(using=using, fields=fields)
         # Refresh hidden fields too
@@ -898,9 +917,20 @@ class Asset(ObjectPermissionMixin,
         ):
             self.content = {}
 
+        # Content pipelines below are skipped when the content has not changed
+        # since it was loaded from the database, e.g. on a rename.
+        content_changed = True
+        settings_changed = True
+        name_changed = self.name != self.__name_copy
+        if not update_fields:
+            content_changed = (
+                is_new or self.__get_content_hash() != self._content_hash
+            )
+            settings_changed = is_new or self.settings != self.__settings_copy
+
         # in certain circumstances, we don't want content to
         # be altered on save. (e.g. on asset.deploy())
-        if adjust_content:
+        if adjust_content and content_changed:
             self.adjust_content_on_save()
 
         if (
@@ -911,7 +941,10 @@ class Asset(ObjectPermissionMixin,
 
         # standardize settings (only when required)
         if (
-            (not update_fields or update_fields and 'settings' in update_fields)
+            (
+                not update_fields and settings_changed
+                or update_fields and 'settings' in update_fields
+            )
             and self.asset_type in [ASSET_TYPE_COLLECTION, ASSET_TYPE_SURVEY]
         ):
             self.standardize_json_field('settings', 'country', list)
@@ -927,7 +960,10 @@ class Asset(ObjectPermissionMixin,
             self.standardize_json_field('settings', 'organization', str)
 
         # populate summary (only when required)
-        if not update_fields or update_fields and 'summary' in update_fields:
+        if (
+            not update_fields and content_changed
+            or update_fields and 'summary' in update_fields
+        ):
             self._populate_summary()
             self.standardize_json_field('summary', 'languages', list)
 
@@ -945,7 +981,7 @@ class Asset(ObjectPermissionMixin,
 
         # populate report styles (only when required)
         if (
-            not update_fields
+            not update_fields and content_changed
             or update_fields and 'report_styles' in update_fields
         ):
             self._populate_report_styles()
@@ -961,10 +997,18 @@ class Asset(ObjectPermissionMixin,
                 raise DeploymentDataException
             else:
                 self._deployment_data.pop('_stored_data_key', None)
-                self.__copy_hidden_fields()
+                self.__copy_hidden_fields(['_deployment_data'])
 
         self.set_deployment_status()
 
+        if content_changed and (
+            not update_fields or update_content_field
+        ):
+            # Content may have been adjusted above
+            self._content_hash = self.__get_content_hash()
+            if update_content_field:
+                update_fields.append('_content_hash')
+
         super().save(
             force_insert=force_insert,
             force_update=force_update,
@@ -999,10 +1043,20 @@ class Asset(ObjectPermissionMixin,
                 # children.
                 self.parent.update_languages()
 
-        if self.has_deployment:
-            self.deployment.sync_media_files(AssetFile.PAIRED_DATA)
+        if not update_fields or {'parent', 'parent_id'} & set(update_fields):
+            self.__parent_id_copy = self.parent_id
+        if not update_fields or {'owner', 'owner_id'} & set(update_fields):
+            self.__owner_id_copy = self.owner_id
+
+        if not update_fields:
+            self.__settings_copy = copy.deepcopy(self.settings)
+            self.__name_copy = self.name
 
-        if create_version:
+        if self.has_deployment and content_changed:
+            self.sync_media_files_or_retry(AssetFile.PAIRED_DATA)
+
+        # Do not create a version identical to the previous one
+        if create_version and (content_changed or name_changed):
             self.create_version()
 
     def set_deployment_status(self):
@@ -1222,7 +1276,9 @@ class Asset(ObjectPermissionMixin,
         root_node_name: Optional[str] = None,
     ) -> AssetSnapshot:
         if version_uid:
-            asset_version = self.asset_versions.get(uid=version_uid)
+            asset_version = self.asset_versions.select_related(
+                'content_blob'
+            ).get(uid=version_uid)
         else:
             asset_version = self.latest_version
 
@@ -1357,13 +1413,103 @@ class Asset(ObjectPermissionMixin,
         elif perm in self.CONTRADICTORY_PERMISSIONS.get(PERM_PARTIAL_SUBMISSIONS):
             clean_up_table()
 
+    def _update_partial_permissions_bulk(
+        self,
+        assignments: list[tuple['auth.User', str, Optional[dict]]],
+        remove: bool = False,
+    ):
+        """
+        Set-based counterpart of `_update_partial_permissions()`, used by
+        `assign_perms_bulk()` and `remove_perms_bulk()`.
+
+        `assignments` is a list of `(user, codename, partial_perms)` tuples,
+        processed in order. Partial permissions are cleaned up with one query
+        and stored with another one, whatever the number of users.
+        """
+        users = {}
+        # `None` means that partial permissions must be deleted
+        partial_perms_by_user_id = {}
+        contradictory_perms = self.CONTRADICTORY_PERMISSIONS.get(
+            PERM_PARTIAL_SUBMISSIONS
+        )
+        for user, perm, partial_perms in assignments:
+            if perm == PERM_PARTIAL_SUBMISSIONS:
+
+                if remove:
+                    partial_perms_by_user_id[user.pk] = None
+                    continue
+
+                if user.pk == self.owner_id:
+                    raise BadPermissionsException(
+                        t("Can not assign '{}' permission to owner".format(perm)))
+
+                if not partial_perms:
+                    raise BadPermissionsException(
+                        t("Can not assign '{}' permission. "
+                          "Partial permissions are missing.".format(perm)))
+
+                users[user.pk] = user
+                partial_perms_by_user_id[user.pk] = AssetUserPartialPermission\
+                    .update_partial_perms_to_include_implied(
+                        self,
+                        partial_perms
+                    )
+
+            elif perm in contradictory_perms:
+                partial_perms_by_user_id[user.pk] = None
+
+        user_ids_to_clean_up = [
+            user_id
+            for user_id, partial_perms in partial_perms_by_user_id.items()
+            if partial_perms is None
+        ]
+        if user_ids_to_clean_up:
+            self.asset_partial_permissions.filter(
+                user_id__in=user_ids_to_clean_up
+            ).delete()
+
+        now = timezone.now()
+        new_partial_perms = [
+            AssetUserPartialPermission(
+                asset_id=self.pk,
+                user_id=user_id,
+                permissions=partial_perms,
+                date_created=now,
+                date_modified=now,
+            )
+            for user_id, partial_perms in partial_perms_by_user_id.items()
+            if partial_perms is not None
+        ]
+        if not new_partial_perms:
+            return
+
+        AssetUserPartialPermission.objects.bulk_create(
+            new_partial_perms,
+            update_conflicts=True,
+            unique_fields=['asset', 'user'],
+            update_fields=['permissions', 'date_modified'],
+        )
+
+        # See `_update_partial_permissions()` about 'add_submissions'
+        self.assign_perms_bulk(
+            [
+                (users[partial_perm.user_id], PERM_ADD_SUBMISSIONS)
+                for partial_perm in new_partial_perms
+                if PERM_ADD_SUBMISSIONS in partial_perm.permissions
+            ],
+            defer_recalc=True,
+        )
+
     def __copy_hidden_fields(self, fields: Optional[list] = None):
         """
-        Save a copy of `parent_id` and `_deployment_data` for these purposes
-        `save()` respectively.
+        Save a copy of `parent_id`, `owner_id` and `_deployment_data` for
+        these purposes `save()` respectively.
 
         - `self.__parent_id_copy` is used to detect whether asset is linked a
            different parent
+        - `self.__parent_id_copy` and `self.__owner_id_copy` spare a query to
+          `ObjectPermissionMixin.save()` (see
+          `_get_tracked_parent_and_owner()`)
         - `self.__deployment_data_copy` is used to detect whether
           `_deployment_data` has been altered directly
         """
@@ -1381,6 +1527,11 @@ class Asset(ObjectPermissionMixin,
             or fields and 'parent_id' in fields
         ):
             self.__parent_id_copy = self.parent_id
+        if (
+            fields is None and 'owner_id' not in self.get_deferred_fields()
+            or fields and 'owner_id' in fields
+        ):
+            self.__owner_id_copy = self.owner_id
         if (
             fields is None and '_deployment_data' not in self.get_deferred_fields()
             or fields and '_deployment_data' in fields
@@ -1388,6 +1539,33 @@ class Asset(ObjectPermissionMixin,
             self.__deployment_data_copy = copy.deepcopy(
                 self._deployment_data)
 
+        # Copies below are only useful to compare with the database values,
+        # i.e. not for new objects
+        if self.pk is None:
+            return
+
+        if (
+            fields is None and 'settings' not in self.get_deferred_fields()
+            or fields and 'settings' in fields
+        ):
+            self.__settings_copy = copy.deepcopy(self.settings)
+        if (
+            fields is None and 'name' not in self.get_deferred_fields()
+            or fields and 'name' in fields
+        ):
+            self.__name_copy = self.name
+
+    def __get_content_hash(self) -> str:
+        # `asset_type` and `report_styles` are part of the hash because the
+        # content pipelines of `save()` depend on them as well
+        return calculate_hash(
+            json.dumps(
+                [self.asset_type, self.content, self.report_styles],
+                sort_keys=True,
+            ),
+            'sha1',
+        )
+
 
 class UserAssetSubscription(models.Model):
     """ Record a user's subscription to a publicly-discoverable collection,
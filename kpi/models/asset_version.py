@@ -7,6 +7,7 @@ from django.utils import timezone
 from formpack.utils.expand_content import expand_content
 from reversion.models import Version
 
+from kpi.constants import ASSET_TYPES_WITH_CONTENT
 from kpi.fields import KpiUidField
 from kpi.utils.hash import calculate_hash
 from kpi.utils.kobo_to_xlsform import to_xlsform_structure
@@ -14,6 +15,36 @@ from kpi.utils.kobo_to_xlsform import to_xlsform_structure
 DEFAULT_DATETIME = datetime.datetime(2010, 1, 1)
 
 
+class AssetVersionContent(models.Model):
+    """
+    Content of asset versions, stored once for all the versions sharing the
+    same content. Rows are addressed by the hash of their content and are
+    never modified.
+    """
+
+    hash = models.CharField(max_length=40, primary_key=True)
+    content = models.JSONField()
+    date_created = models.DateTimeField(default=timezone.now)
+
+    @staticmethod
+    def get_hash(content: dict) -> str:
+        _json_string = json.dumps(content, sort_keys=True)
+        return calculate_hash(_json_string, 'sha1')
+
+    @classmethod
+    def get_or_create_for(cls, content: dict) -> 'AssetVersionContent':
+        """
+        Return the row of `content`, creating it if it does not exist yet,
+        without reading the (potentially large) stored content back.
+        """
+        version_content = cls(hash=cls.get_hash(content), content=content)
+        if not cls.objects.filter(hash=version_content.hash).exists():
+            # Another version may have been created with the same content
+            # in the meantime
+            cls.objects.bulk_create([version_content], ignore_conflicts=True)
+        return version_content
+
+
 class AssetVersion(models.Model):
     uid = KpiUidField(uid_prefix='v')
     asset = models.ForeignKey('Asset', related_name='asset_versions',
@@ -27,7 +58,14 @@ class AssetVersion(models.Model):
                                               null=True,
                                               on_delete=models.SET_NULL,
                                               )
-    version_content = models.JSONField()
+    # Content of versions saved before deduplication. See `version_content`
+    _version_content = models.JSONField(null=True)
+    content_blob = models.ForeignKey(
+        AssetVersionContent,
+        null=True,
+        related_name='asset_versions',
+        on_delete=models.PROTECT,
+    )
     uid_aliases = models.JSONField(null=True)
     deployed_content = models.JSONField(null=True)
     _deployment_data = models.JSONField(default=dict)
@@ -58,8 +96,9 @@ class AssetVersion(models.Model):
     def content_hash(self):
         # used to determine changes in the content from version to version
         # not saved, only compared with other asset_versions
-        _json_string = json.dumps(self.version_content, sort_keys=True)
-        return calculate_hash(_json_string, 'sha1')
+        if self.content_blob_id:
+            return self.content_blob_id
+        return AssetVersionContent.get_hash(self.version_content)
 
     @property
     def form_title(self):
@@ -75,6 +114,73 @@ class AssetVersion(models.Model):
             self.date_modified.strftime('%Y-%m-%d %H:%M'),
             ' (deployed)' if self.deployed else '')
 
+    @property
+    def version_content(self):
+        if self._version_content is None and self.content_blob_id:
+            return self.content_blob.content
+        return self._version_content
+
+    @version_content.setter
+    def version_content(self, content):
+        # Content is moved to a shared `AssetVersionContent` on save
+        self._version_content = content
+        self.content_blob = None
+
+    @classmethod
+    def bulk_create_for(cls, assets: list) -> list:
+        """
+        Create the first version of each of `assets`, i.e. what
+        `Asset.create_version()` does, in a few queries. Useful when assets
+        are saved with `create_version=False` by batches, e.g. on import.
+        """
+        hashes = {
+            asset: AssetVersionContent.get_hash(asset.content)
+            for asset in assets
+            if asset.asset_type in ASSET_TYPES_WITH_CONTENT
+        }
+        existing_hashes = set(
+            AssetVersionContent.objects.filter(
+                hash__in=hashes.values()
+            ).values_list('hash', flat=True)
+        )
+        new_contents = {
+            hash_: asset.content
+            for asset, hash_ in hashes.items()
+            if hash_ not in existing_hashes
+        }
+        # Another version may have been created with the same content in the
+        # meantime
+        AssetVersionContent.objects.bulk_create(
+            [
+                AssetVersionContent(hash=hash_, content=content)
+                for hash_, content in new_contents.items()
+            ],
+            ignore_conflicts=True,
+        )
+        now = timezone.now()
+        return cls.objects.bulk_create(
+            [
+                cls(
+                    asset=asset,
+                    name=asset.name,
+                    content_blob_id=hash_,
+                    _deployment_data=asset._deployment_data,
+                    # Any new version starts out as not-deployed
+                    deployed=False,
+                    date_modified=now,
+                )
+                for asset, hash_ in hashes.items()
+            ]
+        )
+
     def save(self, *args, **kwargs):
         self.date_modified = timezone.now()
+        if (
+            kwargs.get('update_fields') is None
+            and self._version_content is not None
+        ):
+            self.content_blob = AssetVersionContent.get_or_create_for(
+                self._version_content
+            )
+            self._version_content = None
         super().save(*args, **kwargs)
@@ -1,27 +1,36 @@
 # coding: utf-8
 import base64
+import csv
 import datetime
 import dateutil.parser
+import hashlib
+import json
+import math
 import os
 import posixpath
 import re
+import shutil
 import tempfile
 from collections import defaultdict
-from io import BytesIO
+from contextlib import contextmanager
+from itertools import islice
 from os.path import split, splitext
-from typing import List, Dict, Optional, Tuple, Generator
+from typing import BinaryIO, List, Dict, Optional, Tuple, Generator, Union
 try:
     from zoneinfo import ZoneInfo
 except ImportError:
     from backports.zoneinfo import ZoneInfo
 
+import billiard
 import constance
+import django
 import requests
+from bson import json_util
 from django.conf import settings
 from django.contrib.postgres.indexes import BTreeIndex, HashIndex
 from django.core.files.storage import FileSystemStorage
-from django.db import models, transaction
-from django.db.models import F
+from django.db import connections, models, transaction
+from django.db.models import Count, F, Max
 from django.urls import reverse
 from django.utils.translation import gettext as t
 import formpack
@@ -50,13 +59,19 @@ from kpi.constants import (
     ASSET_TYPE_EMPTY,
     ASSET_TYPE_SURVEY,
     ASSET_TYPE_TEMPLATE,
+    EXPORT_TYPE_PARQUET,
     PERM_CHANGE_ASSET,
     PERM_PARTIAL_SUBMISSIONS,
     PERM_VIEW_SUBMISSIONS,
 )
 from kpi.exceptions import XlsFormatException
 from kpi.fields import KpiUidField
-from kpi.models import Asset
+from kpi.models import Asset, AssetVersion
+from kpi.utils.django_orm_helper import UpdateJSONFieldAttributes
+from kpi.utils.export_task import (
+    VALID_EXPORT_TYPES,
+    format_exception_values,
+)
 from kpi.utils.log import logging
 from kpi.utils.models import (
     _load_library_content,
@@ -69,9 +84,9 @@ from kpi.utils.rename_xls_sheet import (
     NoFromSheetError,
     ConflictSheetError,
 )
+from kpi.utils.parquet_export import get_question_types, write_parquet_export
 from kpi.utils.project_view_exports import create_project_view_export
-from kpi.utils.strings import to_str
-from kpi.zip_importer import HttpContentParse
+from kpi.zip_importer import ImportFile, TemporaryFileParse
 
 
 def utcnow(*args, **kwargs):
@@ -169,14 +184,21 @@ class ImportExportTask(models.Model):
 
         return self
 
-    def get_absolute_filepath(self, filename: str) -> str:
+    def get_absolute_filepath(
+        self, filename: str, instance: Optional[models.Model] = None
+    ) -> str:
         """
         Get absolute filepath related to storage root.
+
+        The file is located by the `result` field of `instance`, which
+        defaults to this task.
         """
+        if instance is None:
+            instance = self
 
-        storage_class = self.result.storage
-        filename = self.result.field.generate_filename(
-            self, storage_class.get_valid_name(filename)
+        storage_class = instance.result.storage
+        filename = instance.result.field.generate_filename(
+            instance, storage_class.get_valid_name(filename)
         )
         # We cannot call `self.result.save()` before reopening the file
         # in write mode (i.e. open(filename, 'wb')). because it does not work
@@ -239,6 +261,28 @@ class ImportTask(ImportExportTask):
             ),
         ]
 
+    # Size, in bytes, of the chunks written to temporary files when
+    # downloading a file to import
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    # Length of the chunks of base64-encoded uploads decoded at once. It must
+    # be a multiple of 4, i.e. the length of a group of base64 characters.
+    BASE64_DECODE_CHUNK_SIZE = 4 * 1024 * 1024
+
+    def resume(self):
+        """
+        Run again an import which failed. Assets created by the batches
+        completed by previous attempts (see `_save_progress()`) are not
+        created again.
+        """
+        if self.status != self.ERROR:
+            raise Exception('only failed imports can be resumed')
+
+        self.status = self.CREATED
+        self.messages.pop('error', None)
+        self.messages.pop('error_type', None)
+        self.save(update_fields=['status', 'messages'])
+        return self.run()
+
     def _run_task(self, messages):
         self.status = self.PROCESSING
         self.save(update_fields=['status'])
@@ -268,114 +312,181 @@ class ImportTask(ImportExportTask):
         except KeyError:
             filename = None
 
+        # The uploaded file is written to a temporary file, instead of being
+        # held in memory (several times) while it is parsed
         if 'single_xls_url' in self.data:
             # Retrieve file name from URL
             # TODO: merge with `url` handling above; currently kept separate
             # because `_load_assets_from_url()` uses complex logic to deal with
             # multiple XLS files in a directory structure within a ZIP archive
-            response = requests.get(self.data['single_xls_url'])
-            response.raise_for_status()
-            encoded_xls = to_str(base64.b64encode(response.content))
-
-            # if filename is empty or None, try to retrieve
-            # file name from the response headers
-            if not filename:
-                filename_from_header = parse_options_header(
-                    response.headers['Content-Disposition']
-                )
-
-                try:
-                    filename = filename_from_header[1]['filename']
-                except (TypeError, IndexError, KeyError):
-                    pass
-
-            self.data['base64Encoded'] = encoded_xls
-
-        if 'base64Encoded' in self.data:
+            xls_file_context = _download_to_temporary_file(
+                self.data['single_xls_url']
+            )
+        elif 'base64Encoded' in self.data:
             # When a file is uploaded as base64,
             # no name is provided in the encoded string
             # We should rely on self.data.get(:filename:)
+            xls_file_context = _b64_decode_to_temporary_file(
+                self.data['base64Encoded']
+            )
+        else:
+            raise Exception(
+                'ImportTask data must contain `base64Encoded`, `url`, or '
+                '`single_xls_url`'
+            )
 
-            self._parse_b64_upload(
-                base64_encoded_upload=self.data['base64Encoded'],
-                filename=filename,
+        with xls_file_context as (xls_file, filename_from_header):
+            # if filename is empty or None, try to retrieve
+            # file name from the response headers
+            self._parse_upload(
+                xls_file=xls_file,
+                filename=filename or filename_from_header,
                 messages=messages,
                 library=self.data.get('library', False),
                 desired_type=self.data.get('desired_type', None),
                 destination=dest_item,
                 has_necessary_perm=has_necessary_perm,
             )
-            return
-
-        raise Exception(
-            'ImportTask data must contain `base64Encoded`, `url`, or '
-            '`single_xls_url`'
-        )
 
     def _load_assets_from_url(self, url, messages, **kwargs):
         destination = kwargs.get('destination', False)
         has_necessary_perm = kwargs.get('has_necessary_perm', False)
-        req = requests.get(url, allow_redirects=True)
-        fif = HttpContentParse(request=req).parse()
-        fif.remove_invalid_assets()
-        fif.remove_empty_collections()
+        with _download_to_temporary_file(url) as (
+            zip_file,
+            _,
+        ), TemporaryFileParse(
+            readable=zip_file, name=posixpath.basename(url)
+        ) as fif:
+            fif.parse()
+            fif.remove_invalid_assets()
+            fif.remove_empty_collections()
+            self._load_assets_from_parsed_file(
+                fif, messages, destination, has_necessary_perm
+            )
 
+    def _load_assets_from_parsed_file(
+        self,
+        fif: TemporaryFileParse,
+        messages: dict,
+        destination: Union[Asset, bool],
+        has_necessary_perm: bool,
+    ):
         destination_collection = destination \
-            if destination.asset_type == ASSET_TYPE_COLLECTION else False
+            if destination and destination.asset_type == ASSET_TYPE_COLLECTION \
+            else False
 
         if destination_collection and not has_necessary_perm:
             # redundant check
             raise exceptions.PermissionDenied('user cannot load assets into this collection')
 
-        collections_to_assign = []
-        for item in fif._parsed:
-            extra_args = {
-                'owner': self.user,
-                'name': item._name_base,
-            }
-
-            if item.get_type() == 'collection':
-                # FIXME: seems to allow importing nested collections, even
-                # though uploading from a file does not (`_parse_b64_upload()`
-                # raises `NotImplementedError`)
-                item._orm = create_assets(item.get_type(), extra_args)
-            elif item.get_type() == 'asset':
-                try:
-                    kontent = xlsx_to_dict(item.readable)
-                except InvalidFileException:
-                    kontent = xls_to_dict(item.readable)
+        # Items are imported by batches, each of them in its own transaction.
+        # Assets created by a previous attempt are reused, see `resume()`
+        progress = self.data.setdefault('progress', {'imported': 0, 'uids': {}})
+        imported_assets = Asset.objects.filter(
+            uid__in=progress['uids'].values()
+        ).in_bulk(field_name='uid')
+        batch_size = settings.IMPORT_TASK_BATCH_SIZE
 
-                if not destination:
-                    extra_args['content'] = _strip_header_keys(kontent)
-                    item._orm = create_assets(item.get_type(), extra_args)
-                else:
-                    # The below is copied from `_parse_b64_upload` pretty much as is
-                    # TODO: review and test carefully
-                    asset = destination
-                    asset.content = kontent
-                    asset.save()
-                    messages['updated'].append({
-                            'uid': asset.uid,
-                            'kind': 'asset',
-                            'owner__username': self.user.username,
-                        })
-
-            if item.parent:
-                collections_to_assign.append([
-                    item._orm,
-                    item.parent._orm,
-                ])
-            elif destination_collection:
-                collections_to_assign.append([
-                    item._orm,
-                    destination_collection,
-                ])
+        collections_to_assign = []
+        for start in range(0, len(fif._parsed), batch_size):
+            batch = fif._parsed[start:start + batch_size]
+            with transaction.atomic():
+                created_assets = []
+                for index, item in enumerate(batch, start):
+                    if index < progress['imported']:
+                        item._orm = imported_assets.get(
+                            progress['uids'].get(item.own_path)
+                        )
+                    else:
+                        self._load_asset_from_parsed_item(
+                            item, messages, destination
+                        )
+                        if item._orm:
+                            created_assets.append(item._orm)
+                            progress['uids'][item.own_path] = item._orm.uid
+
+                    if not item._orm:
+                        # `destination` has been updated instead
+                        continue
+                    if item.parent:
+                        collections_to_assign.append([
+                            item._orm,
+                            item.parent._orm,
+                        ])
+                    elif destination_collection:
+                        collections_to_assign.append([
+                            item._orm,
+                            destination_collection,
+                        ])
+
+                AssetVersion.bulk_create_for(created_assets)
+                progress['imported'] = max(
+                    progress['imported'], start + len(batch)
+                )
+                self._save_progress(progress)
 
         for (orm_obj, parent_item) in collections_to_assign:
+            if orm_obj.parent_id == parent_item.pk:
+                # Already assigned by a previous attempt
+                continue
             orm_obj.parent = parent_item
             orm_obj.save()
 
-    def _parse_b64_upload(self, base64_encoded_upload, messages, **kwargs):
+    def _load_asset_from_parsed_item(
+        self, item: ImportFile, messages: dict, destination: Union[Asset, bool]
+    ):
+        """
+        Create the asset (or collection) of `item`, saved as `item._orm`, or
+        update `destination` with its content.
+        The first version of a created asset is left to the caller, which
+        creates them in bulk.
+        """
+        item._orm = None
+        extra_args = {
+            'owner': self.user,
+            'name': item._name_base,
+        }
+        if parent := getattr(item.parent, '_orm', None):
+            # Avoids saving the asset again to assign its parent afterwards
+            extra_args['parent'] = parent
+
+        if item.get_type() == 'collection':
+            # FIXME: seems to allow importing nested collections, even
+            # though uploading from a file does not (`_parse_upload()`
+            # raises `NotImplementedError`)
+            item._orm = create_assets(item.get_type(), extra_args)
+            return
+
+        if item.get_type() != 'asset':
+            return
+
+        with _open_parsed_item(item) as xls_file:
+            try:
+                kontent = xlsx_to_dict(xls_file)
+            except InvalidFileException:
+                xls_file.seek(0)
+                kontent = xls_to_dict(xls_file)
+
+        if not destination:
+            extra_args['content'] = _strip_header_keys(kontent)
+            if 'library' in extra_args['content']:
+                item._orm = create_assets(item.get_type(), extra_args)
+            else:
+                item._orm = Asset(**extra_args)
+                item._orm.save(force_insert=True, create_version=False)
+        else:
+            # The below is copied from `_parse_upload` pretty much as is
+            # TODO: review and test carefully
+            asset = destination
+            asset.content = kontent
+            asset.save()
+            messages['updated'].append({
+                    'uid': asset.uid,
+                    'kind': 'asset',
+                    'owner__username': self.user.username,
+                })
+
+    def _parse_upload(self, xls_file, messages, **kwargs):
         filename = kwargs.get('filename', False)
         desired_type = kwargs.get('desired_type')
         # don't try to splitext() on None, False, etc.
@@ -384,7 +495,7 @@ class ImportTask(ImportExportTask):
         else:
             filename = ''
         library = kwargs.get('library')
-        survey_dict = _b64_xls_to_dict(base64_encoded_upload)
+        survey_dict = _xls_to_dict(xls_file)
         survey_dict_keys = survey_dict.keys()
 
         destination = kwargs.get('destination', False)
@@ -404,11 +515,15 @@ class ImportTask(ImportExportTask):
                                  ' form list')
             if destination:
                 raise SyntaxError('libraries cannot be imported into assets')
-            collection = _load_library_content({
-                'content': survey_dict,
-                'owner': self.user,
-                'name': filename
-            })
+            collection = _load_library_content(
+                {
+                    'content': survey_dict,
+                    'owner': self.user,
+                    'name': filename
+                },
+                progress=self.data.setdefault('progress', {}),
+                save_progress=self._save_progress,
+            )
             messages['created'].append({
                 'uid': collection.uid,
                 'kind': 'collection',
@@ -427,9 +542,7 @@ class ImportTask(ImportExportTask):
                     asset_type = 'survey'
 
                 if asset_type in [ASSET_TYPE_SURVEY, ASSET_TYPE_TEMPLATE]:
-                    _append_kobo_locking_profiles(
-                        base64_encoded_upload, survey_dict
-                    )
+                    _append_kobo_locking_profiles(xls_file, survey_dict)
                 asset = Asset.objects.create(
                     owner=self.user,
                     content=survey_dict,
@@ -444,9 +557,7 @@ class ImportTask(ImportExportTask):
                 if asset.asset_type == ASSET_TYPE_EMPTY:
                     asset.asset_type = ASSET_TYPE_SURVEY
                 if asset.asset_type in [ASSET_TYPE_SURVEY, ASSET_TYPE_TEMPLATE]:
-                    _append_kobo_locking_profiles(
-                        base64_encoded_upload, survey_dict
-                    )
+                    _append_kobo_locking_profiles(xls_file, survey_dict)
                 asset.content = survey_dict
                 asset.save()
                 msg_key = 'updated'
@@ -461,6 +572,16 @@ class ImportTask(ImportExportTask):
             raise SyntaxError('xls upload must have one of these sheets: {}'
                               .format('survey, library'))
 
+    def _save_progress(self, progress: dict):
+        """
+        Store `progress` without overwriting the rest of `data`, which may
+        contain a large base64-encoded upload
+        """
+        self.data['progress'] = progress
+        ImportTask.objects.filter(pk=self.pk).update(
+            data=UpdateJSONFieldAttributes('data', updates={'progress': progress})
+        )
+
 
 def export_upload_to(self, filename):
     """
@@ -473,6 +594,71 @@ def export_upload_to(self, filename):
     return posixpath.join(self.user.username, 'exports', filename)
 
 
+def export_artifact_upload_to(self, filename):
+    return posixpath.join(ExportArtifact.DIRECTORY, filename)
+
+
+class ExportArtifact(models.Model):
+    """
+    The file generated by an export, shared by all the exports (`ExportTask`
+    and `SynchronousExport`) which would generate the same file, i.e. which
+    have the same fingerprint (see `ExportTaskBase._get_fingerprint()`).
+
+    Exports reference their artifact with their `artifact` field and point
+    their `result` at its file. The artifact and its file are deleted along
+    with the last export referencing it.
+    """
+
+    # Not a username, see `kpi.utils.private_storage`
+    DIRECTORY = '~shared/exports'
+
+    fingerprint = models.CharField(max_length=64, unique=True)
+    result = PrivateFileField(
+        upload_to=export_artifact_upload_to, max_length=380
+    )
+    last_submission_time = models.DateTimeField(null=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def delete(self, *args, **kwargs):
+        # removing exported file from storage
+        self.result.delete(save=False)
+        super().delete(*args, **kwargs)
+
+    @classmethod
+    def delete_unreferenced(cls, **filters) -> int:
+        """
+        Delete the artifacts matching `filters`, and their files, which no
+        exports reference anymore. Returns the number of artifacts deleted.
+        """
+        deleted = 0
+        with transaction.atomic():
+            # Lock the artifacts to prevent exports from referencing them
+            # while they are deleted
+            artifacts = cls.objects.select_for_update(of=('self',)).filter(
+                exporttasks__isnull=True,
+                synchronousexports__isnull=True,
+                **filters,
+            )
+            for artifact in artifacts:
+                # An export may have referenced the artifact before it was
+                # locked
+                if artifact.reference_count:
+                    continue
+                artifact.delete()
+                deleted += 1
+        return deleted
+
+    def is_referenced_by(self, user: 'auth.User') -> bool:
+        return (
+            self.exporttasks.filter(user=user).exists()
+            or self.synchronousexports.filter(user=user).exists()
+        )
+
+    @property
+    def reference_count(self) -> int:
+        return self.exporttasks.count() + self.synchronousexports.count()
+
+
 class ProjectViewExportTask(ImportExportTask):
     uid = KpiUidField(uid_prefix='pve')
     result = PrivateFileField(upload_to=export_upload_to, max_length=380)
@@ -545,6 +731,13 @@ class ExportTaskBase(ImportExportTask):
     uid = KpiUidField(uid_prefix='e')
     last_submission_time = models.DateTimeField(null=True)
     result = PrivateFileField(upload_to=export_upload_to, max_length=380)
+    # Set when `result` is shared with other exports, see `ExportArtifact`
+    artifact = models.ForeignKey(
+        ExportArtifact,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='%(class)ss',
+    )
 
     COPY_FIELDS = (
         IdCopyField,
@@ -569,10 +762,16 @@ class ExportTaskBase(ImportExportTask):
         '_xml': formpack.constants.UNSPECIFIED_TRANSLATION,
     }
 
+    # Passed to formpack `Export.to_csv()`
+    CSV_OPTIONS = {'sep': ';', 'quote': '"'}
+
     TIMESTAMP_KEY = '_submission_time'
     # Above 244 seems to cause 'Download error' in Chrome 64/Linux
     MAXIMUM_FILENAME_LENGTH = 240
 
+    # Keys of `data` which do not change the content of the export
+    FINGERPRINT_IGNORED_KEYS = ('name', 'processing_time_seconds', 'source')
+
     class InaccessibleData(Exception):
         def __str__(self):
             return t('This data does not exist or you do not have access to it')
@@ -600,7 +799,7 @@ class ExportTaskBase(ImportExportTask):
 
         if export_type == 'xls':
             extension = 'xlsx'
-        elif export_type == 'spss_labels':
+        elif export_type in ('spss_labels', EXPORT_TYPE_PARQUET):
             extension = 'zip'
         else:
             extension = export_type
@@ -709,6 +908,128 @@ class ExportTaskBase(ImportExportTask):
         fields += list(field_groups) + additional_fields
         return fields
 
+    def _get_export_partitions(
+        self
+    ) -> List[Tuple[Optional[int], Optional[int], int]]:
+        """
+        Split the submissions to export into `_id` ranges of similar size, one
+        per worker, and return them as a list of
+        `(lower_id, upper_id, index_offset)` tuples, where `lower_id` is
+        inclusive, `upper_id` is exclusive and `index_offset` is the number of
+        submissions in the previous ranges.
+
+        Return an empty list (i.e. export serially) when parallel exports are
+        disabled or when there are fewer submissions than
+        `settings.EXPORT_PARALLEL_MIN_SUBMISSIONS`.
+        """
+        max_workers = settings.EXPORT_PARALLEL_MAX_WORKERS
+        if max_workers < 2:
+            return []
+
+        source = self._get_source()
+        query = self.data.get('query', {})
+        submission_ids = self.data.get('submission_ids', [])
+        submission_count = source.deployment.calculated_submission_count(
+            user=self.user, query=query, submission_ids=submission_ids
+        )
+        if submission_count < settings.EXPORT_PARALLEL_MIN_SUBMISSIONS:
+            return []
+
+        # Find the lower bound of each range with one Mongo-side probe, rather
+        # than loading all the `_id`s of the export
+        partition_size = math.ceil(submission_count / max_workers)
+        offsets = list(range(0, submission_count, partition_size))
+        lower_ids = [None]
+        for offset in offsets[1:]:
+            probe = list(
+                source.deployment.get_submissions(
+                    user=self.user,
+                    fields=['_id'],
+                    query=query,
+                    submission_ids=submission_ids,
+                    sort={'_id': 1},
+                    start=offset,
+                    limit=1,
+                    skip_count=True,
+                )
+            )
+            if not probe:
+                # Submissions were deleted in the meantime
+                break
+            lower_ids.append(probe[0]['_id'])
+
+        # Leave the last range open-ended to include submissions received in
+        # the meantime, as the serial export does
+        upper_ids = lower_ids[1:] + [None]
+        partitions = list(zip(lower_ids, upper_ids, offsets))
+
+        return partitions
+
+    def _get_fingerprint(
+        self, source: Asset, export_type: str
+    ) -> Optional[str]:
+        """
+        Return a digest of everything the content of the export depends on:
+        - the source, its deployed form and its advanced features,
+        - the export settings, i.e. `data`,
+        - the submissions and their supplemental details, through watermarks
+          which change whenever they are added, edited or deleted,
+        - the partial permissions of `self.user`, which restrict the
+          submissions they can export.
+
+        Exports with the same fingerprint, whatever their user, share the
+        same file (see `ExportArtifact`). Return `None` if
+        `settings.EXPORT_DEDUPLICATION_ENABLED` is not set.
+        """
+        if not settings.EXPORT_DEDUPLICATION_ENABLED:
+            return None
+
+        # Raise the same errors as `get_formpack_and_submission_stream()`
+        # before the result of another export is used
+        self._validate_source(source)
+
+        export_settings = {
+            key: value
+            for key, value in self.data.items()
+            if key not in self.FINGERPRINT_IGNORED_KEYS
+        }
+        export_settings['type'] = export_type
+
+        supplemental_details_watermark = None
+        if source.has_advanced_features:
+            supplemental_details_watermark = (
+                source.submission_extras.aggregate(
+                    count=Count('pk'), last_modified=Max('date_modified')
+                )
+            )
+
+        components = {
+            'asset': source.uid,
+            'name': source.name,
+            'version': source.latest_deployed_version_uid,
+            'advanced_features': source.advanced_features,
+            'export_settings': export_settings,
+            'submissions': source.deployment.get_submission_watermark(),
+            'supplemental_details': supplemental_details_watermark,
+            'permission_filters': source.get_filters_for_partial_perm(
+                self.user.pk, perm=PERM_VIEW_SUBMISSIONS
+            ),
+        }
+        return hashlib.sha256(
+            json.dumps(
+                components, sort_keys=True, default=json_util.default
+            ).encode()
+        ).hexdigest()
+
+    def _get_source(self) -> Asset:
+        source_url = self.data.get('source', False)
+        if not source_url:
+            raise Exception('no source specified for the export')
+        try:
+            return resolve_url_to_asset(source_url)
+        except Asset.DoesNotExist:
+            raise self.InaccessibleData
+
     @property
     def _hierarchy_in_labels(self) -> bool:
         hierarchy_in_labels = self.data.get('hierarchy_in_labels', False)
@@ -754,19 +1075,42 @@ class ExportTaskBase(ImportExportTask):
             # Excel exports are always returned in XLSX format, but they're
             # referred to internally as `xls`
             export_type = 'xls'
-        if export_type not in ('xls', 'csv', 'geojson', 'spss_labels'):
+        if export_type not in VALID_EXPORT_TYPES:
             raise NotImplementedError(
-                'only `xls`, `csv`, `geojson`, and `spss_labels` '
-                'are valid export types'
+                'only {} are valid export types'.format(
+                    format_exception_values(VALID_EXPORT_TYPES, 'and')
+                )
             )
 
-        export, submission_stream = self.get_export_object()
+        source = self._get_source()
+        fingerprint = self._get_fingerprint(source, export_type)
+        if fingerprint and self._use_shared_result(fingerprint):
+            return
+
+        pack, submission_stream = self.get_formpack_and_submission_stream(
+            source
+        )
+        export = pack.export(**self._build_export_options(pack))
         filename = self._build_export_filename(export, export_type)
-        absolute_filepath = self.get_absolute_filepath(filename)
+        if fingerprint:
+            # Write the file where it can be shared with other exports
+            absolute_filepath = self.get_absolute_filepath(
+                filename, ExportArtifact(fingerprint=fingerprint)
+            )
+        else:
+            absolute_filepath = self.get_absolute_filepath(filename)
+        # Large CSV exports are generated in parallel, by range of `_id`
+        partitions = []
+        if export_type == 'csv':
+            partitions = self._get_export_partitions()
 
         with self.result.storage.open(absolute_filepath, 'wb') as output_file:
-            if export_type == 'csv':
-                for line in export.to_csv(submission_stream):
+            if partitions:
+                self._write_csv_partitions(export, partitions, output_file)
+            elif export_type == 'csv':
+                for line in export.to_csv(
+                    submission_stream, **self.CSV_OPTIONS
+                ):
                     output_file.write((line + "\r\n").encode('utf-8'))
             elif export_type == 'geojson':
                 for line in export.to_geojson(
@@ -796,26 +1140,226 @@ class ExportTaskBase(ImportExportTask):
                     output_file.write(xlsx_output_file.read())
             elif export_type == 'spss_labels':
                 export.to_spss_labels(output_file)
+            elif export_type == EXPORT_TYPE_PARQUET:
+                self._write_parquet(
+                    source, pack, export, submission_stream, output_file
+                )
 
         self.result = absolute_filepath
+        if fingerprint:
+            self._share_result(fingerprint)
+        else:
+            self._save_result()
 
+    def _save_result(self):
         if not self.pk:
             # In tests, exports are not saved into the DB before calling this
             # method, thus we cannot update only specific fields.
             self.save()
         else:
-            self.save(update_fields=['result', 'last_submission_time'])
+            self.save(
+                update_fields=['result', 'last_submission_time', 'artifact']
+            )
+
+    def _share_result(self, fingerprint: str):
+        """
+        Register the file of `self.result` as the artifact of `fingerprint`.
+        If another export registered one in the meantime, use the latter
+        instead.
+        """
+        with transaction.atomic():
+            artifact, created = (
+                ExportArtifact.objects.select_for_update().get_or_create(
+                    fingerprint=fingerprint,
+                    defaults={
+                        'result': self.result.name,
+                        'last_submission_time': self.last_submission_time,
+                    },
+                )
+            )
+            if not created:
+                self.result.delete(save=False)
+                self.result = artifact.result.name
+                self.last_submission_time = artifact.last_submission_time
+            self.artifact = artifact
+            self._save_result()
+
+    def _use_shared_result(self, fingerprint: str) -> bool:
+        """
+        Point `self.result` at the file of the artifact of `fingerprint`, if
+        any. Return whether it exists.
+        """
+        with transaction.atomic():
+            # Lock the artifact to prevent it from being deleted meanwhile
+            try:
+                artifact = ExportArtifact.objects.select_for_update().get(
+                    fingerprint=fingerprint
+                )
+            except ExportArtifact.DoesNotExist:
+                return False
+
+            if not artifact.result.storage.exists(artifact.result.name):
+                # The file is gone, let this export generate it again
+                artifact.delete()
+                return False
+
+            self.result = artifact.result.name
+            self.last_submission_time = artifact.last_submission_time
+            self.artifact = artifact
+            self._save_result()
+
+        return True
+
+    def _write_csv_partitions(
+        self,
+        export: formpack.reporting.Export,
+        partitions: List[Tuple[Optional[int], Optional[int], int]],
+        output_file,
+    ):
+        """
+        Generate the CSV rows of each partition (see `_get_export_partitions()`)
+        in a pool of processes, and concatenate them in order to `output_file`
+        after the headers.
+        """
+        header_lines = list(export.to_csv([], **self.CSV_OPTIONS))
+        for line in header_lines:
+            output_file.write((line + '\r\n').encode('utf-8'))
+
+        # Rendering rows with formpack is CPU-bound, threads would be
+        # serialized by the GIL
+        with _get_export_pool(len(partitions)) as pool:
+            results = pool.starmap(
+                _write_csv_partition,
+                [
+                    (
+                        self.user.pk,
+                        self.data,
+                        lower_id,
+                        upper_id,
+                        index_offset,
+                        header_lines,
+                    )
+                    for lower_id, upper_id, index_offset in partitions
+                ],
+            )
+
+        try:
+            for partition_path, last_submission_time in results:
+                with open(partition_path, 'rb') as partition_file:
+                    shutil.copyfileobj(partition_file, output_file)
+                if last_submission_time and (
+                    self.last_submission_time is None
+                    or last_submission_time > self.last_submission_time
+                ):
+                    self.last_submission_time = last_submission_time
+        finally:
+            for partition_path, _ in results:
+                os.remove(partition_path)
+
+    def _validate_source(self, source: Asset):
+        source_perms = source.get_perms(self.user)
+        if (
+            PERM_VIEW_SUBMISSIONS not in source_perms
+            and PERM_PARTIAL_SUBMISSIONS not in source_perms
+        ):
+            raise self.InaccessibleData
+
+        if not source.has_deployment:
+            raise Exception('the source must be deployed prior to export')
+
+    def _write_parquet(
+        self,
+        source: Asset,
+        pack: formpack.FormPack,
+        export: formpack.reporting.Export,
+        submission_stream: Generator,
+        output_file,
+    ):
+        """
+        Write the export to `output_file` as a ZIP archive of Parquet files,
+        one per section, with typed columns
+        """
+        # Build the same export with XPaths instead of labels to match each
+        # column with its question
+        options = self._build_export_options(pack)
+        options.update(
+            {
+                'lang': formpack.constants.UNSPECIFIED_TRANSLATION,
+                'hierarchy_in_labels': True,
+                'group_sep': '/',
+            }
+        )
+        column_xpaths = pack.export(**options).labels
+
+        versions = source.deployed_versions.select_related('content_blob')
+        if not self._fields_from_all_versions:
+            versions = [versions.first()]
+
+        write_parquet_export(
+            export,
+            column_xpaths,
+            get_question_types(versions),
+            submission_stream,
+            output_file,
+        )
 
     def delete(self, *args, **kwargs):
-        # removing exported file from storage
-        self.result.delete(save=False)
+        artifact_id = self.artifact_id
+        if artifact_id is None:
+            # removing exported file from storage
+            self.result.delete(save=False)
         super().delete(*args, **kwargs)
+        if artifact_id is not None:
+            # The file may be shared with other exports
+            ExportArtifact.delete_unreferenced(pk=artifact_id)
+
+    def release_result(self):
+        """
+        Remove the file of `self.result` from storage, unless other exports
+        share it
+        """
+        artifact_id = self.artifact_id
+        if artifact_id is None:
+            self.result.delete(save=False)
+            return
+
+        self.result = None
+        self.artifact = None
+        self._meta.model.objects.filter(pk=self.pk).update(
+            result='', artifact=None
+        )
+        ExportArtifact.delete_unreferenced(pk=artifact_id)
 
     def get_export_object(
-        self, source: Optional[Asset] = None
+        self,
+        source: Optional[Asset] = None,
+        submission_id_range: Optional[
+            Tuple[Optional[int], Optional[int]]
+        ] = None,
     ) -> Tuple[formpack.reporting.Export, Generator]:
         """
         Get the formpack Export object and submission stream for processing.
+
+        If `submission_id_range` is provided, only submissions whose `_id` is
+        greater than or equal to its first item and lower than its second item
+        are streamed. Either of them can be `None` to leave the range open.
+        """
+        pack, submission_stream = self.get_formpack_and_submission_stream(
+            source, submission_id_range
+        )
+        options = self._build_export_options(pack)
+        return pack.export(**options), submission_stream
+
+    def get_formpack_and_submission_stream(
+        self,
+        source: Optional[Asset] = None,
+        submission_id_range: Optional[
+            Tuple[Optional[int], Optional[int]]
+        ] = None,
+    ) -> Tuple[formpack.FormPack, Generator]:
+        """
+        Get the FormPack object and submission stream from which the export
+        object is built. See `get_export_object()`.
         """
 
         fields = self.data.get('fields', [])
@@ -823,23 +1367,21 @@ class ExportTaskBase(ImportExportTask):
         submission_ids = self.data.get('submission_ids', [])
 
         if source is None:
-            source_url = self.data.get('source', False)
-            if not source_url:
-                raise Exception('no source specified for the export')
-            try:
-                source = resolve_url_to_asset(source_url)
-            except Asset.DoesNotExist:
-                raise self.InaccessibleData
-
-        source_perms = source.get_perms(self.user)
-        if (
-            PERM_VIEW_SUBMISSIONS not in source_perms
-            and PERM_PARTIAL_SUBMISSIONS not in source_perms
-        ):
-            raise self.InaccessibleData
-
-        if not source.has_deployment:
-            raise Exception('the source must be deployed prior to export')
+            source = self._get_source()
+
+        self._validate_source(source)
+
+        if submission_id_range is not None:
+            if isinstance(query, str):
+                query = json.loads(query, object_hook=json_util.object_hook)
+            lower_id, upper_id = submission_id_range
+            id_filter = {}
+            if lower_id is not None:
+                id_filter['$gte'] = lower_id
+            if upper_id is not None:
+                id_filter['$lt'] = upper_id
+            if id_filter:
+                query = {'$and': [query, {'_id': id_filter}]}
 
         # Include the group name in `fields` for Mongo to correctly filter
         # for repeat groups
@@ -867,8 +1409,7 @@ class ExportTaskBase(ImportExportTask):
             submission_stream
         )
 
-        options = self._build_export_options(pack)
-        return pack.export(**options), submission_stream
+        return pack, submission_stream
 
     @classmethod
     @transaction.atomic
@@ -916,6 +1457,11 @@ class ExportTaskBase(ImportExportTask):
         settings.MAXIMUM_EXPORTS_PER_USER_PER_FORM exports for a particular
         form. Returns the number of exports removed.
 
+        Files shared with the exports of other users are only removed with
+        the last of them (see `ExportArtifact`). Artifacts of exports deleted
+        in cascade, e.g. with their user, are removed by daily maintenance
+        (see `remove_unreferenced_export_artifacts()`).
+
         `source` is the source URL as included in the `data` attribute.
         """
         user_source_exports = cls.objects.filter(
@@ -966,6 +1512,11 @@ class SynchronousExport(ExportTaskBase):
     class Meta:
         unique_together = (('user', 'asset_export_settings', 'format_type'),)
 
+    def _get_export_partitions(self):
+        # Synchronous exports run within web workers, which must not start
+        # a pool of processes per request. Always export serially.
+        return []
+
     @classmethod
     def generate_or_return_existing(cls, user, asset_export_settings):
         age_cutoff = utcnow() - datetime.timedelta(
@@ -999,12 +1550,65 @@ class SynchronousExport(ExportTaskBase):
             export.data = data
             export.status = cls.CREATED
             export.date_created = utcnow()
-            export.result.delete(save=False)
+            export.release_result()
             export.save()
             export.run()
             return export
 
 
+def _append_kobo_locking_profiles(
+    xls_file: BinaryIO, survey_dict: dict
+) -> None:
+    xls_file.seek(0)
+    kobo_locks = get_kobo_locking_profiles(xls_file)
+    if kobo_locks:
+        survey_dict[KOBO_LOCK_SHEET] = kobo_locks
+
+
+@contextmanager
+def _b64_decode_to_temporary_file(
+    base64_encoded_upload: str,
+) -> Generator[Tuple[BinaryIO, None], None, None]:
+    """
+    Decode `base64_encoded_upload` to a temporary file, by chunks, to avoid
+    holding a decoded copy of the whole upload in memory
+    """
+    with tempfile.TemporaryFile() as xls_file:
+        # Chunks must contain whole groups of 4 base64 characters
+        chunk_size = ImportTask.BASE64_DECODE_CHUNK_SIZE
+        for start in range(0, len(base64_encoded_upload), chunk_size):
+            xls_file.write(
+                base64.b64decode(
+                    base64_encoded_upload[start:start + chunk_size]
+                )
+            )
+        xls_file.seek(0)
+        yield xls_file, None
+
+
+@contextmanager
+def _download_to_temporary_file(
+    url: str,
+) -> Generator[Tuple[BinaryIO, Optional[str]], None, None]:
+    """
+    Stream the file at `url` to a temporary file, and yield it with the file
+    name found in the `Content-Disposition` header of the response, if any
+    """
+    with requests.get(url, stream=True, allow_redirects=True) as response:
+        # fail if 404 file not found
+        response.raise_for_status()
+        _, options = parse_options_header(
+            response.headers.get('Content-Disposition')
+        )
+        with tempfile.TemporaryFile() as downloaded_file:
+            for chunk in response.iter_content(
+                chunk_size=ImportTask.DOWNLOAD_CHUNK_SIZE
+            ):
+                downloaded_file.write(chunk)
+            downloaded_file.seek(0)
+            yield downloaded_file, options.get('filename')
+
+
 def _get_xls_format(decoded_str):
     first_bytes = decoded_str[:2]
     if first_bytes == b'PK':
@@ -1029,13 +1633,48 @@ def _get_xls_to_dict(decoded_str):
     )
 
 
-def _b64_xls_to_dict(base64_encoded_upload):
-    decoded_str = base64.b64decode(base64_encoded_upload)
-    _xls_sheet_renamer = _get_xls_sheet_renamer(decoded_str)
-    _xls_to_dict = _get_xls_to_dict(decoded_str)
+@contextmanager
+def _open_parsed_item(
+    item: ImportFile,
+) -> Generator[BinaryIO, None, None]:
+    """
+    Yield a seekable file with the content of `item`: the downloaded file
+    itself, or a temporary copy of a ZIP subfile. Subfiles are extracted one
+    at a time, to never hold more than one of them in memory.
+    """
+    if item.is_root:
+        item.readable.seek(0)
+        yield item.readable
+        return
+
+    with tempfile.TemporaryFile() as xls_file:
+        with item.readable as readable:
+            shutil.copyfileobj(readable, xls_file)
+        xls_file.seek(0)
+        yield xls_file
+
+
+def _strip_header_keys(survey_dict):
+    survey_dict_copy = dict(survey_dict)
+    for sheet_name, sheet in survey_dict_copy.items():
+        if re.search(r'_header$', sheet_name):
+            del survey_dict[sheet_name]
+    return survey_dict
+
+
+def _xls_to_dict(xls_file: BinaryIO) -> dict:
+    """
+    Parse `xls_file`. A "library" sheet is returned as `library` instead of
+    `survey`; it is renamed before parsing because pyxform only accepts
+    "survey" sheets.
+    """
+    first_bytes = xls_file.read(2)
+    xls_file.seek(0)
+    _xls_sheet_renamer = _get_xls_sheet_renamer(first_bytes)
+    _xls_to_dict = _get_xls_to_dict(first_bytes)
     try:
         xls_with_renamed_sheet = _xls_sheet_renamer(
-            BytesIO(decoded_str), from_sheet='library', to_sheet='survey'
+            xls_file, from_sheet='library', to_sheet='survey'
         )
     except ConflictSheetError:
         raise ValueError(
@@ -1043,7 +1682,8 @@ def _b64_xls_to_dict(base64_encoded_upload):
         )
     except NoFromSheetError:
         # library did not exist in the xls file
-        survey_dict = _xls_to_dict(BytesIO(decoded_str))
+        xls_file.seek(0)
+        survey_dict = _xls_to_dict(xls_file)
     else:
         survey_dict = _xls_to_dict(xls_with_renamed_sheet)
         survey_dict['library'] = survey_dict.pop('survey')
@@ -1051,18 +1691,74 @@ def _b64_xls_to_dict(base64_encoded_upload):
     return _strip_header_keys(survey_dict)
 
 
-def _append_kobo_locking_profiles(
-    base64_encoded_upload: BytesIO, survey_dict: dict
-) -> None:
-    decoded_bytes = base64.b64decode(base64_encoded_upload)
-    kobo_locks = get_kobo_locking_profiles(BytesIO(decoded_bytes))
-    if kobo_locks:
-        survey_dict[KOBO_LOCK_SHEET] = kobo_locks
+def _get_export_pool(processes: int):
+    """
+    Return a pool of `processes` processes to generate the partitions of an
+    export (see `ExportTaskBase._write_csv_partitions()`).
 
+    Celery prefork workers are daemonic processes, which `multiprocessing`
+    does not let have children, while `billiard` does. Processes are spawned,
+    not forked, to not share the database and Mongo connections of the
+    worker, and set Django up before running anything else.
+    """
+    return billiard.get_context('spawn').Pool(
+        processes=processes, initializer=django.setup
+    )
 
-def _strip_header_keys(survey_dict):
-    survey_dict_copy = dict(survey_dict)
-    for sheet_name, sheet in survey_dict_copy.items():
-        if re.search(r'_header$', sheet_name):
-            del survey_dict[sheet_name]
-    return survey_dict
+
+def _write_csv_partition(
+    user_id: int,
+    data: dict,
+    lower_id: Optional[int],
+    upper_id: Optional[int],
+    index_offset: int,
+    header_lines: List[str],
+) -> Tuple[str, Optional[datetime.datetime]]:
+    """
+    Write the CSV rows, without headers, of the submissions exported by
+    `data` whose `_id` is within `[lower_id, upper_id[` to a temporary file.
+
+    Run in a worker process by `ExportTaskBase._write_csv_partitions()`.
+    Return the path of the temporary file and the most recent submission
+    time of the range.
+    """
+    sep = ExportTaskBase.CSV_OPTIONS['sep']
+    quote = ExportTaskBase.CSV_OPTIONS['quote']
+
+    # formpack numbers `_index` from 1 for each export. Continue the
+    # numbering of the previous ranges instead.
+    columns = next(csv.reader([header_lines[0]], delimiter=sep, quotechar=quote))
+    try:
+        index_column = columns.index('_index')
+    except ValueError:
+        index_column = None
+
+    try:
+        export_task = ExportTask(user_id=user_id, data=data)
+        export, submission_stream = export_task.get_export_object(
+            submission_id_range=(lower_id, upper_id)
+        )
+        rows = islice(
+            export.to_csv(submission_stream, **ExportTaskBase.CSV_OPTIONS),
+            len(header_lines),
+            None,
+        )
+        with tempfile.NamedTemporaryFile(
+            prefix='export_csv_partition', suffix='.csv', delete=False
+        ) as partition_file:
+            for index, line in enumerate(rows, start=index_offset + 1):
+                if index_column is not None:
+                    cells = next(
+                        csv.reader([line], delimiter=sep, quotechar=quote)
+                    )
+                    cells[index_column] = str(index)
+                    # Same quoting as formpack
+                    line = sep.join(
+                        quote + cell.replace(quote, quote * 2) + quote
+                        for cell in cells
+                    )
+                partition_file.write((line + '\r\n').encode('utf-8'))
+
+        return partition_file.name, export_task.last_submission_time
+    finally:
+        connections.close_all()
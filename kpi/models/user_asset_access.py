@@ -0,0 +1,135 @@
+# coding: utf-8
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import models, transaction
+
+from kpi.constants import ASSET_TYPES_WITH_CHILDREN, PERM_VIEW_ASSET
+from kpi.models.asset import Asset, UserAssetSubscription
+from kpi.models.object_permission import ObjectPermission
+from kpi.utils.object_permission import get_perm_ids_from_code_names
+
+
+class UserAssetAccess(models.Model):
+    """
+    Materialized index of the assets each user can list, i.e.:
+        - assets owned by or explicitly shared with the user
+          (`view_asset` granted, directly or by inheritance);
+        - public collections the user has subscribed to, and their children.
+
+    It lets `KpiObjectPermissionsFilter` narrow down asset lists with one
+    indexed lookup instead of merging permissions and subscriptions on every
+    request.
+
+    Rows are never edited directly: they are rebuilt per asset with
+    `refresh()` whenever permissions or subscriptions change (see
+    `kpi.signals`). The `rebuild_user_asset_access` management command
+    reconciles the whole table.
+    """
+
+    user = models.ForeignKey(
+        'auth.User',
+        related_name='asset_accesses',
+        on_delete=models.CASCADE,
+    )
+    asset = models.ForeignKey(
+        'kpi.Asset',
+        related_name='user_accesses',
+        on_delete=models.CASCADE,
+    )
+    via_subscription = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = [['user', 'via_subscription', 'asset']]
+
+    @classmethod
+    @transaction.atomic
+    def refresh(
+        cls,
+        asset_ids: Iterable[int],
+        user_ids: Optional[Iterable[int]] = None,
+    ):
+        """
+        Rebuild the rows of assets `asset_ids` from permissions and
+        subscriptions. If `user_ids` is provided, only the rows of these
+        users are rebuilt.
+        """
+        asset_ids = list(asset_ids)
+        if not asset_ids:
+            return
+
+        user_filters = {}
+        if user_ids is not None:
+            user_filters['user_id__in'] = list(user_ids)
+
+        view_asset_perm_id = get_perm_ids_from_code_names(PERM_VIEW_ASSET)
+        publics = ObjectPermission.objects.filter(
+            deny=False,
+            user_id=settings.ANONYMOUS_USER_ID,
+            permission_id=view_asset_perm_id,
+        ).values('asset')
+
+        accesses = set()
+        for user_id, asset_id in ObjectPermission.objects.filter(
+            asset_id__in=asset_ids,
+            deny=False,
+            permission_id=view_asset_perm_id,
+            **user_filters,
+        ).values_list('user_id', 'asset_id'):
+            accesses.add((user_id, asset_id, False))
+
+        for user_id, asset_id in UserAssetSubscription.objects.filter(
+            asset_id__in=asset_ids, asset__in=publics, **user_filters
+        ).values_list('user_id', 'asset_id'):
+            accesses.add((user_id, asset_id, True))
+
+        # Users subscribe to collections, not to their children. Children are
+        # indexed too to let `?q=parent__uid` queries return them.
+        children_by_parent_id = defaultdict(list)
+        for asset_id, parent_id in Asset.all_objects.filter(
+            pk__in=asset_ids, parent__in=publics
+        ).values_list('pk', 'parent_id'):
+            children_by_parent_id[parent_id].append(asset_id)
+
+        if children_by_parent_id:
+            for user_id, parent_id in UserAssetSubscription.objects.filter(
+                asset_id__in=children_by_parent_id.keys(), **user_filters
+            ).values_list('user_id', 'asset_id'):
+                for asset_id in children_by_parent_id[parent_id]:
+                    accesses.add((user_id, asset_id, True))
+
+        cls.objects.filter(asset_id__in=asset_ids, **user_filters).delete()
+        cls.objects.bulk_create(
+            [
+                cls(
+                    user_id=user_id,
+                    asset_id=asset_id,
+                    via_subscription=via_subscription,
+                )
+                for user_id, asset_id, via_subscription in accesses
+            ]
+        )
+
+    @classmethod
+    def refresh_tree(
+        cls, asset: Asset, user_ids: Optional[Iterable[int]] = None
+    ):
+        """
+        Rebuild the rows of `asset` and all its descendants, whose inherited
+        permissions may have changed as well.
+        """
+        asset_ids = [asset.pk]
+        if asset.asset_type in ASSET_TYPES_WITH_CHILDREN:
+            parent_ids = [asset.pk]
+            while parent_ids:
+                parent_ids = list(
+                    Asset.all_objects.filter(
+                        parent_id__in=parent_ids
+                    ).values_list('pk', flat=True)
+                )
+                asset_ids.extend(parent_ids)
+
+        cls.refresh(asset_ids, user_ids=user_ids)
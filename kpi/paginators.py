@@ -1,9 +1,10 @@
 # coding: utf-8
 from collections import OrderedDict
-from typing import Union
+from typing import Generator, Iterable, Union
 
 from django.conf import settings
 from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
 from django_request_cache import cache_for_request
 from rest_framework.pagination import (
     LimitOffsetPagination,
@@ -13,6 +14,8 @@ from rest_framework.response import Response
 from rest_framework.reverse import reverse_lazy
 from rest_framework.serializers import SerializerMethodField
 
+from kpi.utils.json import fast_json_dumps
+
 
 class DataPagination(LimitOffsetPagination):
     """
@@ -22,6 +25,49 @@ class DataPagination(LimitOffsetPagination):
     offset_query_param = 'start'
     max_limit = settings.SUBMISSION_LIST_LIMIT
 
+    # Size of the chunks sent by `get_streaming_paginated_response()`
+    STREAMING_CHUNK_SIZE = 64 * 1024
+
+    def get_streaming_paginated_response(
+        self, data: Iterable[dict]
+    ) -> StreamingHttpResponse:
+        """
+        Same as `get_paginated_response()` with `JSONRenderer`, byte for byte,
+        but items of `data` are encoded one at a time while the response is
+        sent instead of being rendered at once
+        """
+        envelope = fast_json_dumps(
+            OrderedDict(
+                [
+                    ('count', self.count),
+                    ('next', self.get_next_link()),
+                    ('previous', self.get_previous_link()),
+                    ('results', []),
+                ]
+            )
+        )
+        # Split the envelope around the (empty) results
+        head, tail = envelope[:-2], envelope[-2:]
+        return StreamingHttpResponse(
+            self._stream_results(head, data, tail),
+            content_type='application/json',
+        )
+
+    def _stream_results(
+        self, head: bytes, data: Iterable[dict], tail: bytes
+    ) -> Generator[bytes, None, None]:
+        chunk = bytearray(head)
+        separator = b''
+        for item in data:
+            chunk += separator
+            chunk += fast_json_dumps(item)
+            separator = b','
+            if len(chunk) >= self.STREAMING_CHUNK_SIZE:
+                yield bytes(chunk)
+                chunk.clear()
+        chunk += tail
+        yield bytes(chunk)
+
 
 class Paginated(LimitOffsetPagination):
     """ Adds 'root' to the wrapping response object. """
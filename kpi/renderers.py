@@ -11,9 +11,7 @@ from rest_framework import renderers, status
 from rest_framework.exceptions import ErrorDetail
 from rest_framework_xml.renderers import XMLRenderer as DRFXMLRenderer
 
-import formpack
-from kobo.apps.reports.report_data import build_formpack
-from kpi.constants import GEO_QUESTION_TYPES
+from kpi.utils.geojson import get_geojson_stream
 from kpi.utils.xml import add_xml_declaration
 
 
@@ -98,6 +96,11 @@ class SSJsonRenderer(renderers.JSONRenderer):
 
 
 class SubmissionGeoJsonRenderer(renderers.BaseRenderer):
+    """
+    `DataViewSet` streams GeoJSON responses itself (see
+    `kpi.utils.geojson.get_geojson_stream()`). This renderer handles the
+    responses which still go through DRF, e.g. errors.
+    """
     media_type = 'application/json'
     format = 'geojson'
 
@@ -109,32 +112,13 @@ class SubmissionGeoJsonRenderer(renderers.BaseRenderer):
             # We're ending up with stuff like `{u'detail': u'Not found.'}` in
             # `data`. Is this the best way to handle that?
             return None
-        pack, submission_stream = build_formpack(asset, data)
-        # Right now, we're more-or-less mirroring the JSON renderer. In the
-        # future, we could expose more export options (e.g. label language)
-        export = pack.export(
-            versions=pack.versions.keys(),
-            group_sep='/',
-            lang=formpack.constants.UNSPECIFIED_TRANSLATION,
-            hierarchy_in_labels=True,
-        )
-        geo_question_name = view.request.query_params.get('geo_question_name')
-        if not geo_question_name:
-            # No geo question specified; use the first one in the latest
-            # version of the form
-            latest_version = next(reversed(list(pack.versions.values())))
-            first_section = next(iter(latest_version.sections.values()))
-            geo_questions = (field for field in first_section.fields.values()
-                             if field.data_type in GEO_QUESTION_TYPES)
-            try:
-                geo_question_name = next(geo_questions).name
-            except StopIteration:
-                # formpack will gracefully return an empty `features` array
-                geo_question_name = None
         return ''.join(
-            export.to_geojson(
-                submission_stream,
-                geo_question_name=geo_question_name,
+            get_geojson_stream(
+                asset,
+                data,
+                geo_question_name=view.request.query_params.get(
+                    'geo_question_name'
+                ),
             )
         )
 
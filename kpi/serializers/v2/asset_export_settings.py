@@ -17,13 +17,15 @@ from formpack.constants import (
     REQUIRED_EXPORT_SETTINGS,
     VALID_DEFAULT_LANGUAGES,
     VALID_EXPORT_SETTINGS,
-    VALID_EXPORT_TYPES,
     VALID_MULTIPLE_SELECTS,
 )
 
 from kpi.fields import WritableJSONField
 from kpi.models import Asset, AssetExportSettings
-from kpi.utils.export_task import format_exception_values
+from kpi.utils.export_task import (
+    VALID_EXPORT_TYPES,
+    format_exception_values,
+)
 
 
 class AssetExportSettingsSerializer(serializers.ModelSerializer):
@@ -345,13 +345,20 @@ class AssetBulkInsertPermissionSerializer(serializers.Serializer):
         )
 
         # Perform the removals
-        for removal in existing_assignments.difference(incoming_assignments):
-            asset.remove_perm(
-                user_pk_to_obj_cache[removal.user_pk],
-                removal.permission_codename,
-            )
+        asset.remove_perms_bulk(
+            [
+                (
+                    user_pk_to_obj_cache[removal.user_pk],
+                    removal.permission_codename,
+                )
+                for removal in existing_assignments.difference(
+                    incoming_assignments
+                )
+            ]
+        )
 
         # Perform the new assignments
+        additions = []
         for addition in incoming_assignments.difference(existing_assignments):
             if asset.owner_id == addition.user_pk:
                 raise serializers.ValidationError(
@@ -361,11 +368,14 @@ class AssetBulkInsertPermissionSerializer(serializers.Serializer):
                 partial_perms = json.loads(addition.partial_permissions_json)
             else:
                 partial_perms = None
-            asset.assign_perm(
-                user_obj=user_pk_to_obj_cache[addition.user_pk],
-                perm=addition.permission_codename,
-                partial_perms=partial_perms,
+            additions.append(
+                (
+                    user_pk_to_obj_cache[addition.user_pk],
+                    addition.permission_codename,
+                    partial_perms,
+                )
             )
+        asset.assign_perms_bulk(additions)
 
         # Return nothing, in a nice way, because the view is responsible for
         # calling `list()` to return the assignments as they actually exist in
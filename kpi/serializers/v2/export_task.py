@@ -23,14 +23,16 @@ from formpack.constants import (
     REQUIRED_EXPORT_SETTINGS,
     VALID_DEFAULT_LANGUAGES,
     VALID_EXPORT_SETTINGS,
-    VALID_EXPORT_TYPES,
     VALID_MULTIPLE_SELECTS,
 )
 
 from kpi.fields import ReadOnlyJSONField
 from kpi.models import ExportTask, Asset
 from kpi.tasks import export_in_background
-from kpi.utils.export_task import format_exception_values
+from kpi.utils.export_task import (
+    VALID_EXPORT_TYPES,
+    format_exception_values,
+)
 from kpi.utils.object_permission import get_database_user
 
 
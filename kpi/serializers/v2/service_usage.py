@@ -1,19 +1,21 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+from typing import Optional
+
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db.models import Sum, Q, OuterRef, Subquery, QuerySet
+from django.db.models import Exists, Sum, Q, OuterRef, Subquery, QuerySet
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.fields import empty
 
-from kobo.apps.organizations.models import Organization
+from kobo.apps.organizations.models import Organization, OrganizationUser
 from kobo.apps.stripe.constants import ACTIVE_STRIPE_STATUSES
-from kobo.apps.trackers.models import NLPUsageCounter
-from kpi.deployment_backends.kc_access.shadow_models import (
-    KobocatXForm,
-    KobocatDailyXFormSubmissionCounter,
-)
-from kpi.deployment_backends.kobocat_backend import KobocatDeploymentBackend
+from kobo.apps.trackers.models import MonthlyUsageRollup, NLPUsageCounter
+from kpi.deployment_backends.kc_access.shadow_models import KobocatXForm
 from kpi.models.asset import Asset
 
 
@@ -52,50 +54,118 @@ class AssetUsageSerializer(serializers.HyperlinkedModelSerializer):
         self._now = timezone.now().date()
 
     def get_nlp_usage_current_month(self, asset):
-        start_date = self._now.replace(day=1)
-        return self._get_nlp_tracking_data(asset, start_date)
+        return self._get_usage(asset)['nlp_usage']['current_month']
 
     def get_nlp_usage_current_year(self, asset):
-        start_date = self._now.replace(day=1, month=1)
-        return self._get_nlp_tracking_data(asset, start_date)
+        return self._get_usage(asset)['nlp_usage']['current_year']
 
     def get_nlp_usage_all_time(self, asset):
-        return self._get_nlp_tracking_data(asset)
+        return self._get_usage(asset)['nlp_usage']['all_time']
 
     def get_submission_count_current_month(self, asset):
-        if not asset.has_deployment:
-            return 0
-        start_date = self._now.replace(day=1)
-        return asset.deployment.submission_count_since_date(start_date)
+        return self._get_usage(asset)['submission_counts']['current_month']
 
     def get_submission_count_current_year(self, asset):
-        if not asset.has_deployment:
-            return 0
-        start_date = self._now.replace(day=1, month=1)
-        return asset.deployment.submission_count_since_date(start_date)
+        return self._get_usage(asset)['submission_counts']['current_year']
 
     def get_submission_count_all_time(self, asset):
-        if not asset.has_deployment:
-            return 0
-
-        return asset.deployment.submission_count_since_date()
+        return self._get_usage(asset)['submission_counts']['all_time']
 
     def get_storage_bytes(self, asset):
-        # Get value from asset deployment (if it has deployment)
-        if not asset.has_deployment:
-            return 0
+        return self._get_usage(asset)['storage_bytes']
 
-        return asset.deployment.attachment_storage_bytes
+    @classmethod
+    def get_usage_by_asset_id(
+        cls, assets: list[Asset], today: Optional[date] = None
+    ) -> dict[int, dict]:
+        """
+        Compute the usage of all `assets` at once, with a few grouped queries
+        instead of several ones per asset.
 
-    def _get_nlp_tracking_data(self, asset, start_date=None):
-        if not asset.has_deployment:
-            return {
-                'total_nlp_asr_seconds': 0,
-                'total_nlp_mt_characters': 0,
+        Meant to be passed to the serializer context as `usage_by_asset_id`.
+        """
+        if today is None:
+            today = timezone.now().date()
+
+        start_dates = {
+            'current_month': today.replace(day=1),
+            'current_year': today.replace(day=1, month=1),
+            'all_time': None,
+        }
+        usage_by_asset_id = {
+            asset.pk: {
+                'nlp_usage': {
+                    key: {
+                        'total_nlp_asr_seconds': 0,
+                        'total_nlp_mt_characters': 0,
+                    }
+                    for key in start_dates
+                },
+                'storage_bytes': 0,
+                'submission_counts': {key: 0 for key in start_dates},
             }
-        return KobocatDeploymentBackend.nlp_tracking_data(
-            asset_ids=[asset.id], start_date=start_date
-        )
+            for asset in assets
+        }
+
+        deployed_assets_by_backend = defaultdict(list)
+        for asset in assets:
+            if asset.has_deployment:
+                deployed_assets_by_backend[type(asset.deployment)].append(asset)
+
+        for backend_class, deployed_assets in deployed_assets_by_backend.items():
+            for asset_id, usage in backend_class.get_usage_by_asset_id(
+                deployed_assets, start_dates
+            ).items():
+                usage_by_asset_id[asset_id].update(usage)
+
+        deployed_asset_ids = [
+            asset.pk
+            for deployed_assets in deployed_assets_by_backend.values()
+            for asset in deployed_assets
+        ]
+        if not deployed_asset_ids:
+            return usage_by_asset_id
+
+        aggregates = {}
+        for key, start_date in start_dates.items():
+            filter_ = Q(date__gte=start_date) if start_date else None
+            aggregates[f'asr_seconds_{key}'] = Coalesce(
+                Sum('total_asr_seconds', filter=filter_), 0
+            )
+            aggregates[f'mt_characters_{key}'] = Coalesce(
+                Sum('total_mt_characters', filter=filter_), 0
+            )
+
+        for nlp_counters in (
+            NLPUsageCounter.objects.filter(asset_id__in=deployed_asset_ids)
+            .values('asset_id')
+            .annotate(**aggregates)
+            .order_by()
+        ):
+            nlp_usage = usage_by_asset_id[nlp_counters['asset_id']]['nlp_usage']
+            for key in start_dates:
+                nlp_usage[key] = {
+                    'total_nlp_asr_seconds': nlp_counters[
+                        f'asr_seconds_{key}'
+                    ],
+                    'total_nlp_mt_characters': nlp_counters[
+                        f'mt_characters_{key}'
+                    ],
+                }
+
+        return usage_by_asset_id
+
+    def _get_usage(self, asset) -> dict:
+        # The view should pass the usage of all the assets of the page through
+        # the context. Compute it for `asset` alone otherwise.
+        usage_by_asset_id = self.context.setdefault('usage_by_asset_id', {})
+        try:
+            return usage_by_asset_id[asset.pk]
+        except KeyError:
+            usage_by_asset_id.update(
+                self.get_usage_by_asset_id([asset], self._now)
+            )
+            return usage_by_asset_id[asset.pk]
 
 
 class ServiceUsageSerializer(serializers.Serializer):
@@ -118,6 +188,8 @@ class ServiceUsageSerializer(serializers.Serializer):
         self._period_start = None
         self._period_end = None
         self._subscription_interval = None
+        self._usage_totals = None
+        self._user_ids = None
         self._now = timezone.now().date()
         self._get_per_asset_usage(instance)
 
@@ -175,97 +247,92 @@ class ServiceUsageSerializer(serializers.Serializer):
             return self._anchor_date.replace(year=self._now.year - 1)
         return self._anchor_date.replace(year=self._now.year)
 
-    def _filter_by_user(self, user_ids: list) -> Q:
+    def _get_nlp_user_counters(self, month_start, year_start):
+        usage_totals = self._get_usage_totals(month_start, year_start)
+        for key, totals in usage_totals.items():
+            self._total_nlp_usage[f'asr_seconds_{key}'] = totals[
+                'total_asr_seconds'
+            ]
+            self._total_nlp_usage[f'mt_characters_{key}'] = totals[
+                'total_mt_characters'
+            ]
+
+    def _get_organization_details(self, user_id: int) -> Optional[list]:
         """
-        Turns a list of user ids into a query object to filter by
+        Read the billing details of the organization passed in the context
+        and return the ids of its users if it has an enterprise plan, i.e. the
+        users whose usage is counted altogether
         """
-        return Q(user_id__in=user_ids)
-
-    def _get_nlp_user_counters(self, month_filter, year_filter):
-        nlp_tracking = NLPUsageCounter.objects.only(
-            'date', 'total_asr_seconds', 'total_mt_characters'
-        ).filter(self._user_id_query).aggregate(
-            asr_seconds_current_year=Coalesce(
-                Sum('total_asr_seconds', filter=year_filter), 0
-            ),
-            mt_characters_current_year=Coalesce(
-                Sum('total_mt_characters', filter=year_filter), 0
-            ),
-            asr_seconds_current_month=Coalesce(
-                Sum('total_asr_seconds', filter=month_filter), 0
-            ),
-            mt_characters_current_month=Coalesce(
-                Sum('total_mt_characters', filter=month_filter), 0
-            ),
-            asr_seconds_all_time=Coalesce(Sum('total_asr_seconds'), 0),
-            mt_characters_all_time=Coalesce(Sum('total_mt_characters'), 0),
-        )
-
-        for nlp_key, count in nlp_tracking.items():
-            self._total_nlp_usage[nlp_key] = count if count is not None else 0
-
-    def _get_organization_details(self, user_id: int):
         # Get the organization ID from the request
         organization_id = self.context.get(
             'organization_id', None
         )
 
-        if not organization_id:
+        # Billing details and enterprise plans both come from Stripe
+        if not organization_id or not settings.STRIPE_ENABLED:
             return
 
         organization = Organization.objects.filter(
             organization_users__user_id=user_id,
             id=organization_id,
-        ).first()
+        ).only('pk').first()
 
         if not organization:
             # Couldn't find organization, proceed as normal
             return
 
         # If they have a subscription, use its start date to calculate beginning of current month/year's usage
-        if billing_details := organization.active_subscription_billing_details:
-            self._anchor_date = billing_details['billing_cycle_anchor'].date()
-            self._period_start = billing_details['current_period_start'].date()
-            self._period_end = billing_details['current_period_end'].date()
-            self._subscription_interval = billing_details['recurring_interval']
-
-        if settings.STRIPE_ENABLED:
-            # if the user is in an organization and has an enterprise plan, get all org users
-            # we evaluate this queryset instead of using it as a subquery because it's referencing
-            # fields from the auth_user tables on kpi *and* kobocat, making getting results in a
-            # single query not feasible until those tables are combined
-            user_ids = list(
-                User.objects.filter(
-                    organizations_organization__id=organization_id,
-                    organizations_organization__djstripe_customers__subscriptions__status__in=ACTIVE_STRIPE_STATUSES,
-                    organizations_organization__djstripe_customers__subscriptions__items__price__product__metadata__has_key='plan_type',
-                    organizations_organization__djstripe_customers__subscriptions__items__price__product__metadata__plan_type='enterprise',
-                ).values_list('pk', flat=True)[:settings.ORGANIZATION_USER_LIMIT]
-            )
-            if user_ids:
-                self._user_id_query = self._filter_by_user(user_ids)
+        billing_details = organization.active_subscription_billing_details
+        if not billing_details:
+            # No active subscription, thus no enterprise plan either
+            return
+
+        self._anchor_date = billing_details['billing_cycle_anchor'].date()
+        self._period_start = billing_details['current_period_start'].date()
+        self._period_end = billing_details['current_period_end'].date()
+        self._subscription_interval = billing_details['recurring_interval']
+
+        # If the organization has an enterprise plan, get all its users.
+        # The plan is checked once with `Exists()`, instead of joining each
+        # user with all the subscriptions, items, prices and products of the
+        # organization.
+        # We evaluate this queryset instead of using it as a subquery because
+        # usage is read from tables of both kpi *and* kobocat, making getting
+        # results in a single query not feasible until those are combined
+        enterprise_subscriptions = Organization.objects.filter(
+            id=organization_id,
+            djstripe_customers__subscriptions__status__in=ACTIVE_STRIPE_STATUSES,
+            djstripe_customers__subscriptions__items__price__product__metadata__plan_type='enterprise',
+        )
+        user_ids = list(
+            OrganizationUser.objects.filter(
+                Exists(enterprise_subscriptions),
+                organization_id=organization_id,
+            ).values_list('user_id', flat=True)[
+                :settings.ORGANIZATION_USER_LIMIT
+            ]
+        )
+        return user_ids or None
 
     def _get_per_asset_usage(self, user):
         self._user_id = user.pk
-        self._user_id_query = self._filter_by_user([self._user_id])
         # get the billing data and list of organization users (if applicable)
-        self._get_organization_details(self._user_id)
+        self._user_ids = self._get_organization_details(self._user_id) or [
+            self._user_id
+        ]
 
         self._get_storage_usage()
 
         self._current_month_start = self._get_current_month_start_date()
         self._current_year_start = self._get_current_year_start_date()
 
-        current_month_filter = Q(
-            date__range=[self._current_month_start, self._now]
+        self._get_submission_counters(
+            self._current_month_start, self._current_year_start
         )
-        current_year_filter = Q(
-            date__range=[self._current_year_start, self._now]
+        self._get_nlp_user_counters(
+            self._current_month_start, self._current_year_start
         )
 
-        self._get_submission_counters(current_month_filter, current_year_filter)
-        self._get_nlp_user_counters(current_month_filter, current_year_filter)
-
     def _get_storage_usage(self):
         """
         Get the storage used by non-(soft-)deleted projects for all users
@@ -274,7 +341,7 @@ class ServiceUsageSerializer(serializers.Serializer):
         """
         xforms = KobocatXForm.objects.only('attachment_storage_bytes', 'id').exclude(
             pending_delete=True
-        ).filter(self._user_id_query)
+        ).filter(user_id__in=self._user_ids)
 
         total_storage_bytes = xforms.aggregate(
             bytes_sum=Coalesce(Sum('attachment_storage_bytes'), 0),
@@ -282,25 +349,29 @@ class ServiceUsageSerializer(serializers.Serializer):
 
         self._total_storage_bytes = total_storage_bytes['bytes_sum'] or 0
 
-    def _get_submission_counters(self, month_filter, year_filter):
+    def _get_submission_counters(self, month_start, year_start):
         """
         Calculate submissions for all users' projects even their deleted ones
 
         Users are represented by their ids with `self._user_ids`
         """
-        submission_count = KobocatDailyXFormSubmissionCounter.objects.only(
-            'counter', 'user_id'
-        ).filter(self._user_id_query).aggregate(
-            all_time=Coalesce(Sum('counter'), 0),
-            current_year=Coalesce(
-                Sum('counter', filter=year_filter), 0
-            ),
-            current_month=Coalesce(
-                Sum('counter', filter=month_filter), 0
-            ),
-        )
+        usage_totals = self._get_usage_totals(month_start, year_start)
+        for key, totals in usage_totals.items():
+            self._total_submission_count[key] = totals['submission_count']
 
-        for submission_key, count in submission_count.items():
-            self._total_submission_count[submission_key] = (
-                count if count is not None else 0
+    def _get_usage_totals(self, month_start, year_start) -> dict:
+        """
+        Read submission and NLP usage from the monthly roll-ups (see
+        `MonthlyUsageRollup`), once for both kinds of counters
+        """
+        if self._usage_totals is None:
+            self._usage_totals = MonthlyUsageRollup.get_usage_totals(
+                self._user_ids,
+                {
+                    'all_time': None,
+                    'current_year': year_start,
+                    'current_month': month_start,
+                },
+                self._now,
             )
+        return self._usage_totals
@@ -2,6 +2,7 @@ from typing import Union
 
 from django.conf import settings
 from django.contrib.auth.models import User, AnonymousUser
+from django.db.models import Q
 from django.db.models.signals import post_save, post_delete
 
 from django.dispatch import receiver
@@ -19,8 +20,17 @@ from kpi.deployment_backends.kc_access.utils import (
     kc_transaction_atomic,
 )
 from kpi.exceptions import DeploymentNotFound
-from kpi.models import Asset, TagUid
-from kpi.utils.object_permission import post_assign_perm, post_remove_perm
+from kpi.models import (
+    Asset,
+    TagUid,
+    UserAssetAccess,
+    UserAssetSubscription,
+)
+from kpi.utils.object_permission import (
+    post_assign_perm,
+    post_recalculate_perms,
+    post_remove_perm,
+)
 from kpi.utils.permissions import (
     grant_default_model_level_perms,
     is_user_anonymous,
@@ -144,3 +154,26 @@ def post_remove_asset_perm(
         instance.deployment.set_enketo_open_rosa_server(require_auth=True)
     except DeploymentNotFound:
         return
+
+
+@receiver(post_recalculate_perms, sender=Asset)
+def post_recalculate_asset_perms(sender, instance, **kwargs):
+    UserAssetAccess.refresh_tree(instance)
+
+
+@receiver(post_save, sender=UserAssetSubscription)
+def post_save_asset_subscription(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    UserAssetAccess.refresh_tree(instance.asset, user_ids=[instance.user_id])
+
+
+@receiver(post_delete, sender=UserAssetSubscription)
+def post_delete_asset_subscription(sender, instance, **kwargs):
+    # Only delete rows: the asset itself may be in the middle of being deleted,
+    # so nothing should be written for it.
+    UserAssetAccess.objects.filter(
+        Q(asset_id=instance.asset_id) | Q(asset__parent_id=instance.asset_id),
+        user_id=instance.user_id,
+        via_subscription=True,
+    ).delete()
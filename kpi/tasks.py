@@ -1,6 +1,5 @@
 # coding: utf-8
 import constance
-import requests
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.mail import send_mail
@@ -9,13 +8,20 @@ from django.core.management import call_command
 from kobo.apps.markdownx_uploader.tasks import remove_unused_markdown_files
 from kobo.celery import celery_app
 from kpi.constants import LIMIT_HOURS_23
-from kpi.maintenance_tasks import remove_old_asset_snapshots
+from kpi.exceptions import MediaFileSyncError
+from kpi.maintenance_tasks import (
+    remove_old_asset_snapshots,
+    remove_orphan_asset_version_contents,
+    remove_unreferenced_export_artifacts,
+)
 from kpi.models.asset import Asset
+from kpi.models.asset_file import AssetFile
 from kpi.models.import_export_task import (
     ExportTask,
     ImportTask,
     ProjectViewExportTask,
 )
+from kpi.utils.enketo import enketo_request
 
 
 @celery_app.task
@@ -71,10 +77,15 @@ def sync_kobocat_xforms(
     )
 
 
-@celery_app.task
-def sync_media_files(asset_uid):
+@celery_app.task(
+    autoretry_for=(MediaFileSyncError,),
+    max_retries=5,
+    retry_backoff=60,
+    retry_jitter=False,
+)
+def sync_media_files(asset_uid, file_type=AssetFile.FORM_MEDIA):
     asset = Asset.objects.get(uid=asset_uid)
-    asset.deployment.sync_media_files()
+    asset.deployment.sync_media_files(file_type)
 
 
 @celery_app.task
@@ -86,10 +97,9 @@ def enketo_flush_cached_preview(server_url, form_id):
     Intended to be run with Celery's `apply_async(countdown=…)` shortly after
     preview generation.
     """
-    response = requests.delete(
-        f'{settings.ENKETO_URL}/{settings.ENKETO_FLUSH_CACHE_ENDPOINT}',
-        # bare tuple implies basic auth
-        auth=(settings.ENKETO_API_TOKEN, ''),
+    response = enketo_request(
+        'DELETE',
+        settings.ENKETO_FLUSH_CACHE_ENDPOINT,
         data=dict(server_url=server_url, form_id=form_id),
     )
     response.raise_for_status()
@@ -103,3 +113,5 @@ def perform_maintenance():
     """
     remove_unused_markdown_files()
     remove_old_asset_snapshots()
+    remove_orphan_asset_version_contents()
+    remove_unreferenced_export_artifacts()
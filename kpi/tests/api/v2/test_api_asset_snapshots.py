@@ -1,6 +1,8 @@
 # coding: utf-8
 import re
 
+import responses
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
@@ -173,6 +175,36 @@ class TestAssetSnapshotList(AssetSnapshotBase):
             assert 'X-OpenRosa-Accept-Content-Length' in response
             assert 'X-OpenRosa-Version' in response
 
+    @responses.activate
+    def test_preview_links_are_cached(self):
+        preview_url = f'{settings.ENKETO_URL}/preview/::abcd'
+        responses.add(
+            responses.POST,
+            f'{settings.ENKETO_URL}/{settings.ENKETO_PREVIEW_ENDPOINT}',
+            json={'preview_url': preview_url, 'code': 201},
+            status=201,
+        )
+        # Celery tasks are run synchronously in tests
+        responses.add(
+            responses.DELETE,
+            f'{settings.ENKETO_URL}/{settings.ENKETO_FLUSH_CACHE_ENDPOINT}',
+            status=204,
+        )
+        creation_response = self._create_asset_snapshot_from_asset()
+        preview_url_ = reverse(
+            self._get_endpoint('assetsnapshot-preview'),
+            args=(creation_response.data['uid'],),
+        )
+        self.client.login(username='someuser', password='someuser')
+        for _ in range(2):
+            response = self.client.get(preview_url_)
+            assert response.status_code == status.HTTP_302_FOUND
+            assert response['Location'] == preview_url
+
+        # Enketo has been called only once
+        assert len(responses.calls) == 2
+        assert responses.calls[0].request.method == 'POST'
+
     def test_xml_renderer(self):
         """
         Make sure the API endpoint returns the same XML as the ORM
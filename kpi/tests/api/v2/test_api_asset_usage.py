@@ -5,6 +5,8 @@ from dateutil.relativedelta import relativedelta
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
@@ -178,6 +180,28 @@ class AssetUsageAPITestCase(BaseAssetTestCase):
         assert response.data['results'][0]['submission_count_current_month'] == 2
         assert response.data['results'][0]['submission_count_all_time'] == 2
 
+    def test_query_count_does_not_depend_on_asset_count(self):
+        """
+        Test the usage of all assets of the page is computed at once
+        """
+        url = reverse(self._get_endpoint('asset-usage-list'))
+
+        def get_query_count():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            return len(queries)
+
+        self.__create_asset()
+        self.__add_nlp_trackers()
+        query_count = get_query_count()
+
+        for i in range(3):
+            self.__create_asset()
+            self.__add_nlp_trackers()
+
+        assert get_query_count() == query_count
+
     def test_no_data(self):
         """
         Test the endpoint functions when assets have no data
@@ -1,5 +1,7 @@
+import timeit
 import uuid
 
+import pytest
 from django.contrib.auth.models import User
 from django.http import QueryDict
 from django.urls import reverse
@@ -261,3 +263,41 @@ class AttachmentApiTests(BaseAssetTestCase):
         response = self.client.get(url)
         assert response.status_code == status.HTTP_200_OK
         assert response['Content-Type'] == 'video/3gpp'
+
+    @pytest.mark.performance
+    def test_rewrite_attachment_urls_speed(self):
+        v_uid = self.asset.latest_deployed_version.uid
+        submissions = []
+        for idx in range(1000):
+            _uuid = str(uuid.uuid4())
+            submissions.append(
+                {
+                    '__version__': v_uid,
+                    'formhub/uuid': 'c1aae157497d477aa3443b2ca9306e2e',
+                    'q1': f'audio_{idx}.3gp',
+                    'q2': f'image_{idx}.jpg',
+                    '_uuid': _uuid,
+                    'meta/instanceID': f'uuid:{_uuid}',
+                    '_attachments': [
+                        {
+                            'id': idx * 5 + attachment_idx,
+                            'download_url': f'http://testserver/someuser/{idx}.jpg',
+                            'filename': f'someuser/{idx}_{attachment_idx}.jpg',
+                            'mimetype': 'image/jpeg',
+                        }
+                        for attachment_idx in range(5)
+                    ],
+                    '_submitted_by': 'someuser',
+                }
+            )
+        self.asset.deployment.mock_submissions(submissions)
+
+        # Get the request time for a page of 1,000 submissions with 5
+        # attachments each
+        duration = timeit.timeit(
+            lambda: self.client.get(
+                self.submission_list_url, {'limit': 1000, 'format': 'json'}
+            ),
+            number=1,
+        )
+        assert duration < 2
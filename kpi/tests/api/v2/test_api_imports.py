@@ -6,14 +6,16 @@ import responses
 import unittest
 import openpyxl
 import xlwt
+from unittest import mock
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import transaction
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.reverse import reverse
 
 from kpi.constants import ASSET_TYPE_BLOCK, ASSET_TYPE_QUESTION
-from kpi.models import Asset
+from kpi.models import Asset, AssetVersion, ImportTask
 from kpi.tests.base_test_case import BaseTestCase
 from kpi.urls.router_api_v2 import URL_NAMESPACE as ROUTER_URL_NAMESPACE
 from kpi.utils.strings import to_str
@@ -899,6 +901,50 @@ class AssetImportTaskTest(BaseTestCase):
     def test_import_library_bulk_xlsx(self):
         self._test_import_library_bulk('xlsx')
 
+    @override_settings(IMPORT_TASK_BATCH_SIZE=1)
+    def test_resume_failed_library_import(self):
+        content = (
+            ('library', [
+                ['name', 'type', 'label'],
+                ['q1', 'text', 'Question 1'],
+                ['q2', 'text', 'Question 2'],
+                ['q3', 'text', 'Question 3'],
+            ]),
+        )
+        task_data = self._construct_xlsx_for_import(
+            content, name='Resumed library'
+        )
+        bulk_create_for = AssetVersion.bulk_create_for
+
+        def fail_on_second_batch(assets):
+            collection = Asset.objects.get(name='Resumed library')
+            if collection.children.count() > 1:
+                raise RuntimeError('interrupted')
+            return bulk_create_for(assets)
+
+        with mock.patch.object(
+            AssetVersion, 'bulk_create_for', side_effect=fail_on_second_batch
+        ):
+            response = self.client.post(
+                reverse('api_v2:importtask-list'), task_data
+            )
+        import_task = ImportTask.objects.get(uid=response.data['uid'])
+        assert import_task.status == ImportTask.ERROR
+        assert import_task.data['progress']['imported'] == 1
+
+        import_task.resume()
+        import_task.refresh_from_db()
+        assert import_task.status == ImportTask.COMPLETE
+        collection = Asset.objects.get(name='Resumed library')
+        children = collection.children.order_by('date_created')
+        assert [child.content['survey'][0]['name'] for child in children] == [
+            'q1',
+            'q2',
+            'q3',
+        ]
+        for child in children:
+            assert child.asset_versions.count() == 1
+
     def test_import_asset_xls(self):
         xlsx_io = self.asset.to_xlsx_io()
         task_data = {
@@ -10,7 +10,7 @@ from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 
-from kobo.apps.trackers.models import NLPUsageCounter
+from kobo.apps.trackers.models import MonthlyUsageRollup, NLPUsageCounter
 from kpi.deployment_backends.kc_access.shadow_models import (
     KobocatXForm,
     KobocatDailyXFormSubmissionCounter,
@@ -322,3 +322,75 @@ class ServiceUsageAPITestCase(ServiceUsageAPIBase):
         assert response.data['total_submission_count']['all_time'] == 0
         assert response.data['total_nlp_usage']['asr_seconds_all_time'] == 0
         assert response.data['total_storage_bytes'] == 0
+
+    def test_rolled_up_usage_matches_raw_counters(self):
+        """
+        Test the endpoint returns the same usage once counters are rolled up,
+        including the days counted after the last roll-up
+        """
+        self._create_asset()
+        self.add_nlp_trackers()
+        self.add_submissions(count=2)
+
+        url = reverse(self._get_endpoint('service-usage-list'))
+        expected = self.client.get(url).data
+
+        # Roll up everything but today, then add today's usage
+        MonthlyUsageRollup.roll_up()
+        assert MonthlyUsageRollup.objects.filter(
+            user=self.anotheruser
+        ).exists()
+        assert MonthlyUsageRollup.check_consistency() == []
+
+        response = self.client.get(url)
+        assert (
+            response.data['total_submission_count']
+            == expected['total_submission_count']
+        )
+        assert response.data['total_nlp_usage'] == expected['total_nlp_usage']
+
+        self.add_submissions(count=1)
+        response = self.client.get(url)
+        assert response.data['total_submission_count']['current_month'] == 3
+        assert response.data['total_submission_count']['all_time'] == 3
+
+    def test_usage_totals_of_period_starting_mid_month(self):
+        self._create_asset()
+        self.add_nlp_trackers()
+        today = timezone.now().date()
+        MonthlyUsageRollup.roll_up(until=today)
+
+        last_month = today - relativedelta(months=1)
+        totals = MonthlyUsageRollup.get_usage_totals(
+            [self.anotheruser.pk],
+            {
+                'since_last_month': last_month,
+                'since_next_day': last_month + relativedelta(days=1),
+            },
+            today,
+        )
+        # The last month's counter is dated `last_month`
+        assert totals['since_last_month']['total_asr_seconds'] == 4728
+        assert totals['since_next_day']['total_asr_seconds'] == 4586
+
+    def test_consistency_check_detects_stale_rollups(self):
+        self._create_asset()
+        self.add_nlp_trackers()
+        today = timezone.now().date()
+        MonthlyUsageRollup.roll_up(until=today)
+        NLPUsageCounter.objects.filter(date=today).update(total_asr_seconds=1)
+
+        mismatches = MonthlyUsageRollup.check_consistency()
+        assert mismatches == [
+            {
+                'user_id': self.anotheruser.pk,
+                'month': today.replace(day=1),
+                'field': 'total_asr_seconds',
+                'rollup': 4586,
+                'raw': 1,
+            }
+        ]
+        MonthlyUsageRollup.roll_up(
+            since=today, user_ids=[self.anotheruser.pk]
+        )
+        assert MonthlyUsageRollup.check_consistency() == []
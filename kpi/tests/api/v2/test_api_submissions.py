@@ -18,6 +18,7 @@ import responses
 from dict2xml import dict2xml
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from django.urls import reverse
 from django_digest.test import Client as DigestClient
 from rest_framework import status
@@ -39,7 +40,13 @@ from kpi.models import Asset
 from kpi.tests.base_test_case import BaseTestCase
 from kpi.tests.utils.xml import get_form_and_submission_tag_names
 from kpi.urls.router_api_v2 import URL_NAMESPACE as ROUTER_URL_NAMESPACE
+from kpi.utils.geojson import get_bbox_query
 from kpi.utils.object_permission import get_anonymous_user
+from kpi.utils.submission_id_cache import (
+    cache_submission_ids,
+    get_cached_submission_id,
+    void_cached_submission_ids,
+)
 from kpi.tests.utils.mock import (
     enketo_edit_instance_response,
     enketo_edit_instance_response_with_root_name_validation,
@@ -510,11 +517,13 @@ class SubmissionApiTests(BaseSubmissionTestCase):
         asset.deployment.mock_submissions(submissions)
 
         # Server-wide limit should apply if no limit specified
+        # Large pages are streamed, see `SUBMISSION_LIST_STREAMING_THRESHOLD`
         response = self.client.get(
             asset.deployment.submission_list_url, {'format': 'json'}
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['results']), limit)
+        results = json.loads(b''.join(response.streaming_content))['results']
+        self.assertEqual(len(results), limit)
         # Limit specified in query parameters should not be able to exceed
         # server-wide limit
         response = self.client.get(
@@ -523,7 +532,29 @@ class SubmissionApiTests(BaseSubmissionTestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['results']), limit)
+        results = json.loads(b''.join(response.streaming_content))['results']
+        self.assertEqual(len(results), limit)
+
+    def test_list_submissions_streamed(self):
+        """
+        someuser is the owner of the project.
+        Streamed pages are identical to rendered ones
+        """
+        params = {'format': 'json', 'start': 1, 'limit': 5}
+        with override_settings(SUBMISSION_LIST_STREAMING_THRESHOLD=0):
+            response = self.client.get(self.submission_list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.streaming)
+        rendered_content = response.content
+
+        with override_settings(SUBMISSION_LIST_STREAMING_THRESHOLD=5):
+            response = self.client.get(self.submission_list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(
+            b''.join(response.streaming_content), rendered_content
+        )
 
     def test_list_submissions_not_shared_as_anotheruser(self):
         """
@@ -713,6 +744,91 @@ class SubmissionApiTests(BaseSubmissionTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, submission)
 
+    def test_retrieve_submission_by_uuid_caches_its_id(self):
+        submission = self.submissions[0]
+        url = self.asset.deployment.get_submission_detail_url(submission['_uuid'])
+
+        response = self.client.get(url, {'format': 'json'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        assert (
+            get_cached_submission_id(self.asset.uid, submission['_uuid'])
+            == submission['_id']
+        )
+
+        # Second request is narrowed down to the cached id
+        with mock.patch.object(
+            self.asset.deployment.__class__,
+            'get_submissions',
+            autospec=True,
+            side_effect=self.asset.deployment.__class__.get_submissions,
+        ) as patched_get_submissions:
+            response = self.client.get(url, {'format': 'json'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, submission)
+        assert patched_get_submissions.call_count == 1
+        assert patched_get_submissions.call_args.kwargs['submission_ids'] == [
+            submission['_id']
+        ]
+
+    def test_retrieve_submission_by_uuid_with_stale_cached_id(self):
+        submission = self.submissions[0]
+        other_submission = self.submissions[1]
+        cache_submission_ids(
+            self.asset.uid, {submission['_uuid']: other_submission['_id']}
+        )
+        url = self.asset.deployment.get_submission_detail_url(submission['_uuid'])
+
+        response = self.client.get(url, {'format': 'json'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, submission)
+        assert (
+            get_cached_submission_id(self.asset.uid, submission['_uuid'])
+            == submission['_id']
+        )
+
+    def test_list_submissions_warms_up_submission_id_cache(self):
+        response = self.client.get(self.submission_list_url, {'format': 'json'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for submission in response.data['results']:
+            assert (
+                get_cached_submission_id(self.asset.uid, submission['_uuid'])
+                == submission['_id']
+            )
+
+    def test_submission_id_cache_keeps_uuids_and_root_uuids_apart(self):
+        submission = self.submissions[0]
+        other_submission = self.submissions[1]
+        cache_submission_ids(
+            self.asset.uid, {submission['_uuid']: submission['_id']}
+        )
+        cache_submission_ids(
+            self.asset.uid,
+            {submission['_uuid']: other_submission['_id']},
+            root=True,
+        )
+        assert (
+            get_cached_submission_id(self.asset.uid, submission['_uuid'])
+            == submission['_id']
+        )
+        assert (
+            get_cached_submission_id(
+                self.asset.uid, submission['_uuid'], root=True
+            )
+            == other_submission['_id']
+        )
+
+        void_cached_submission_ids(self.asset.uid, [submission['_uuid']])
+        assert (
+            get_cached_submission_id(self.asset.uid, submission['_uuid'])
+            is None
+        )
+        assert (
+            get_cached_submission_id(
+                self.asset.uid, submission['_uuid'], root=True
+            )
+            is None
+        )
+
     def test_retrieve_submission_not_shared_as_anotheruser(self):
         """
         someuser is the owner of the project.
@@ -777,6 +893,20 @@ class SubmissionApiTests(BaseSubmissionTestCase):
 
         self.assertEqual(response.data['count'], len(self.submissions) - 1)
 
+    def test_delete_submission_voids_cached_id(self):
+        submission = self.submissions_submitted_by_someuser[0]
+        cache_submission_ids(
+            self.asset.uid, {submission['_uuid']: submission['_id']}
+        )
+        url = self.asset.deployment.get_submission_detail_url(submission['_id'])
+
+        response = self.client.delete(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        assert (
+            get_cached_submission_id(self.asset.uid, submission['_uuid'])
+            is None
+        )
+
     def test_audit_log_on_delete(self):
         """
         Validate that the submission id is logged in AuditLog table when it is
@@ -1545,8 +1675,9 @@ class SubmissionEditApiTests(BaseSubmissionTestCase):
 
         # redeploy the asset to create a new deployment version
         self.asset.deploy(active=True)
+        # Content has not changed since the deployment, no versions are created
         self.asset.save()
-        assert self.asset.asset_versions.count() == original_versions_count + 2
+        assert self.asset.asset_versions.count() == original_versions_count + 1
         assert (
             self.asset.deployed_versions.count()
             == original_deployed_versions_count + 1
@@ -2094,6 +2225,25 @@ class SubmissionValidationStatusApiTests(BaseSubmissionTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, self.submission.get("_validation_status"))
 
+    def test_retrieve_status_by_uuid_as_owner(self):
+        validation_status_url = (
+            self._deployment.get_submission_validation_status_url(
+                self.submission['_uuid']
+            )
+        )
+        response = self.client.get(validation_status_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.submission.get('_validation_status'))
+
+        # Unknown UUIDs are not found
+        validation_status_url = (
+            self._deployment.get_submission_validation_status_url(
+                str(uuid.uuid4())
+            )
+        )
+        response = self.client.get(validation_status_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_cannot_retrieve_status_of_not_shared_submission_as_anotheruser(self):
         """
         someuser is the owner of the project.
@@ -2761,6 +2911,12 @@ class SubmissionGeoJsonApiTests(BaseTestCase):
         a.deployment.set_namespace(self.URL_NAMESPACE)
         self.submission_list_url = a.deployment.submission_list_url
 
+    @staticmethod
+    def _get_feature_collection(response) -> dict:
+        assert response.status_code == status.HTTP_200_OK
+        # GeoJSON is streamed
+        return json.loads(b''.join(response.streaming_content))
+
     def test_list_submissions_geojson_defaults(self):
         response = self.client.get(
             self.submission_list_url,
@@ -2796,7 +2952,7 @@ class SubmissionGeoJsonApiTests(BaseTestCase):
                 },
             ],
         }
-        assert expected_output == json.loads(response.content)
+        assert expected_output == self._get_feature_collection(response)
 
     def test_list_submissions_geojson_other_geo_question(self):
         response = self.client.get(
@@ -2833,4 +2989,126 @@ class SubmissionGeoJsonApiTests(BaseTestCase):
                 },
             ],
         }
-        assert expected_output == json.loads(response.content)
+        assert expected_output == self._get_feature_collection(response)
+
+    def test_list_submissions_geojson_with_bbox(self):
+        with mock.patch(
+            'kpi.views.v2.data.get_bbox_query', wraps=get_bbox_query
+        ) as patched_get_bbox_query:
+            response = self.client.get(
+                self.submission_list_url,
+                {'format': 'geojson', 'bbox': '15,15,35,35'},
+            )
+            # `_geolocation` cannot be used with two geopoint questions
+            patched_get_bbox_query.assert_not_called()
+        feature_collection = self._get_feature_collection(response)
+        assert [
+            feature['properties']['text']
+            for feature in feature_collection['features']
+        ] == ['Relieved', 'Excited']
+
+        response = self.client.get(
+            self.submission_list_url,
+            {
+                'format': 'geojson',
+                'geo_question_name': 'geo2',
+                'bbox': '20.2,20.2,20.3,20.3',
+            },
+        )
+        feature_collection = self._get_feature_collection(response)
+        assert [
+            feature['properties']['text']
+            for feature in feature_collection['features']
+        ] == ['Relieved']
+
+    def test_list_submissions_geojson_with_bbox_and_limit(self):
+        # The first submission is outside `bbox`. `limit` and `start` must
+        # apply to the submissions inside `bbox`, not to those read from Mongo
+        response = self.client.get(
+            self.submission_list_url,
+            {'format': 'geojson', 'bbox': '15,15,35,35', 'limit': 1},
+        )
+        feature_collection = self._get_feature_collection(response)
+        assert [
+            feature['properties']['text']
+            for feature in feature_collection['features']
+        ] == ['Relieved']
+
+        response = self.client.get(
+            self.submission_list_url,
+            {
+                'format': 'geojson',
+                'bbox': '15,15,35,35',
+                'start': 1,
+                'limit': 1,
+            },
+        )
+        feature_collection = self._get_feature_collection(response)
+        assert [
+            feature['properties']['text']
+            for feature in feature_collection['features']
+        ] == ['Excited']
+
+    def test_list_submissions_geojson_with_bbox_pushed_down_to_mongo(self):
+        asset = Asset.objects.create(
+            name='One point and one text',
+            owner=self.someuser,
+            asset_type='survey',
+            content={
+                'survey': [
+                    {'name': 'geo', 'type': 'geopoint', 'label': 'Where?'},
+                    {'name': 'text', 'type': 'text', 'label': 'How are you?'},
+                ]
+            },
+        )
+        asset.deploy(backend='mock', active=True)
+        asset.save()
+        v_uid = asset.latest_deployed_version.uid
+        asset.deployment.mock_submissions(
+            [
+                {
+                    '__version__': v_uid,
+                    'geo': f'{lat} {lon} 0 0',
+                    '_geolocation': [lat, lon],
+                    'text': text,
+                }
+                for lat, lon, text in [
+                    (45.5, -73.6, 'Montréal'),
+                    (-33.9, 151.2, 'Sydney'),
+                    (64.8, -147.7, 'Fairbanks'),
+                ]
+            ]
+        )
+        asset.deployment.set_namespace(self.URL_NAMESPACE)
+        with mock.patch(
+            'kpi.views.v2.data.get_bbox_query', wraps=get_bbox_query
+        ) as patched_get_bbox_query:
+            # Crosses the antimeridian
+            response = self.client.get(
+                asset.deployment.submission_list_url,
+                {'format': 'geojson', 'bbox': '150,-40,-140,70'},
+            )
+            patched_get_bbox_query.assert_called_once()
+        feature_collection = self._get_feature_collection(response)
+        assert [
+            feature['properties']['text']
+            for feature in feature_collection['features']
+        ] == ['Sydney', 'Fairbanks']
+
+    def test_list_submissions_geojson_with_fields(self):
+        response = self.client.get(
+            self.submission_list_url,
+            {'format': 'geojson', 'fields': '["geo1"]'},
+        )
+        feature_collection = self._get_feature_collection(response)
+        assert len(feature_collection['features']) == 3
+        for feature in feature_collection['features']:
+            assert feature['geometry']['type'] == 'Point'
+            assert feature['properties'] == {}
+
+    def test_list_submissions_geojson_with_invalid_bbox(self):
+        response = self.client.get(
+            self.submission_list_url,
+            {'format': 'geojson', 'bbox': '10,20,30'},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
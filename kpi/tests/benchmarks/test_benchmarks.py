@@ -0,0 +1,560 @@
+# coding: utf-8
+"""
+Benchmarks of hot paths, on top of `MockDeploymentBackend` and mongomock.
+
+They are not run by default, use `pytest -m performance kpi/tests/benchmarks`
+to run them. See `kpi.tests.utils.benchmark.BenchmarkMixin` for the baseline.
+"""
+import base64
+import random
+import time
+import uuid
+import zipfile
+from collections import defaultdict
+from io import BytesIO
+from unittest.mock import patch
+
+import openpyxl
+import pytest
+import responses
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from kpi.constants import (
+    PERM_ADD_SUBMISSIONS,
+    PERM_CHANGE_ASSET,
+    PERM_VIEW_ASSET,
+    PERM_VIEW_SUBMISSIONS,
+)
+from kpi.models import Asset, AssetFile, AssetSnapshot, ExportTask, ImportTask
+from kpi.tests.base_test_case import BaseTestCase
+from kpi.tests.utils.benchmark import BenchmarkMixin
+from kpi.urls.router_api_v2 import URL_NAMESPACE as ROUTER_URL_NAMESPACE
+
+User = get_user_model()
+
+ASSET_COUNT = 100
+IMPORT_FORM_QUESTION_COUNT = 1000
+IMPORT_ZIP_ASSET_COUNT = 200
+MEDIA_FILE_COUNT = 500
+# Simulated duration of a round trip to KoBoCAT, per media file
+MEDIA_FILE_SYNC_LATENCY = 0.005
+SUBMISSION_COUNT = 1000
+# Sizes of the pages of `LargeSubmissionListBenchmarkTestCase`
+SUBMISSION_LIST_PAGE_SIZES = (10000, 30000)
+USER_COUNT = 20
+
+BENCHMARK_FORM = {
+    'survey': [
+        {'name': 'start', 'type': 'start'},
+        {'name': 'end', 'type': 'end'},
+        {'name': 'name', 'type': 'text', 'label': 'Name'},
+        {'name': 'age', 'type': 'integer', 'label': 'Age'},
+        {
+            'name': 'colour',
+            'type': 'select_one',
+            'select_from_list_name': 'colours',
+            'label': 'Favourite colour',
+        },
+        {'name': 'household', 'type': 'begin_repeat', 'label': 'Household'},
+        {'name': 'member', 'type': 'text', 'label': 'Member'},
+        {'type': 'end_repeat'},
+    ],
+    'choices': [
+        {'list_name': 'colours', 'name': 'red', 'label': 'Red'},
+        {'list_name': 'colours', 'name': 'green', 'label': 'Green'},
+        {'list_name': 'colours', 'name': 'blue', 'label': 'Blue'},
+    ],
+    'settings': {},
+}
+
+
+def get_benchmark_submissions(
+    asset: Asset, count: int = SUBMISSION_COUNT
+) -> list:
+    """
+    Return `count` submissions to `asset`, always the same ones
+    """
+    rand = random.Random(count)
+    version_uid = asset.latest_deployed_version.uid
+    submissions = []
+    for _ in range(count):
+        uuid_ = str(uuid.UUID(int=rand.getrandbits(128)))
+        submissions.append(
+            {
+                '__version__': version_uid,
+                'start': '2024-01-01T10:00:00.000-04:00',
+                'end': '2024-01-01T10:05:00.000-04:00',
+                'name': f'Name {rand.randint(0, 10000)}',
+                'age': str(rand.randint(0, 99)),
+                'colour': rand.choice(['red', 'green', 'blue']),
+                'household': [
+                    {'household/member': f'Member {idx}'}
+                    for idx in range(rand.randint(0, 4))
+                ],
+                'meta/instanceID': f'uuid:{uuid_}',
+                '_uuid': uuid_,
+                '_submission_time': '2024-01-01T14:05:00',
+                '_submitted_by': 'someuser',
+                '_attachments': [],
+                '_validation_status': {},
+            }
+        )
+    return submissions
+
+
+@pytest.mark.performance
+class AssetBenchmarkTestCase(BenchmarkMixin, BaseTestCase):
+
+    fixtures = ['test_data']
+
+    URL_NAMESPACE = ROUTER_URL_NAMESPACE
+
+    def setUp(self):
+        self.someuser = User.objects.get(username='someuser')
+        self.anotheruser = User.objects.get(username='anotheruser')
+        self.asset = Asset.objects.create(
+            owner=self.someuser,
+            name='Benchmark',
+            asset_type='survey',
+            content=BENCHMARK_FORM,
+        )
+
+    def test_asset_list_with_permissions(self):
+        for idx in range(ASSET_COUNT):
+            asset = Asset.objects.create(
+                owner=self.someuser,
+                name=f'Benchmark {idx}',
+                asset_type='survey',
+                content=BENCHMARK_FORM,
+            )
+            # Share every other asset with anotheruser
+            if idx % 2:
+                asset.assign_perm(self.anotheruser, PERM_VIEW_ASSET)
+
+        self.client.login(username='anotheruser', password='anotheruser')
+        list_url = reverse(self._get_endpoint('asset-list'))
+
+        def list_assets():
+            response = self.client.get(
+                list_url, {'limit': ASSET_COUNT}, format='json'
+            )
+            assert response.status_code == status.HTTP_200_OK
+
+        self.benchmark('asset_list_with_permissions', list_assets)
+
+    def test_permission_assignment(self):
+        users = [
+            User.objects.create_user(username=f'user{idx}', password='user')
+            for idx in range(USER_COUNT)
+        ]
+        self.client.login(username='someuser', password='someuser')
+        url = reverse(
+            self._get_endpoint('asset-permission-assignment-bulk-assignments'),
+            kwargs={'parent_lookup_asset': self.asset.uid},
+        )
+        permission_urls = [
+            reverse(
+                self._get_endpoint('permission-detail'),
+                kwargs={'codename': codename},
+            )
+            for codename in Permission.objects.filter(
+                codename__in=[
+                    PERM_VIEW_ASSET,
+                    PERM_CHANGE_ASSET,
+                    PERM_VIEW_SUBMISSIONS,
+                ]
+            ).values_list('codename', flat=True)
+        ]
+        data = [
+            {
+                'user': reverse(
+                    self._get_endpoint('user-detail'),
+                    kwargs={'username': user.username},
+                ),
+                'permission': permission_url,
+            }
+            for user in users
+            for permission_url in permission_urls
+        ]
+
+        def assign_permissions():
+            response = self.client.post(url, data, format='json')
+            assert response.status_code == status.HTTP_200_OK
+
+        self.benchmark('permission_assignment', assign_permissions)
+
+    def test_snapshot_xform_compilation(self):
+        def create_snapshot():
+            snapshot = AssetSnapshot.objects.create(asset=self.asset)
+            assert snapshot.xml
+
+        self.benchmark('snapshot_xform_compilation', create_snapshot)
+
+
+@pytest.mark.performance
+class SubmissionBenchmarkTestCase(BenchmarkMixin, BaseTestCase):
+
+    fixtures = ['test_data']
+
+    URL_NAMESPACE = ROUTER_URL_NAMESPACE
+
+    def setUp(self):
+        self.someuser = User.objects.get(username='someuser')
+        self.asset = Asset.objects.create(
+            owner=self.someuser,
+            name='Benchmark',
+            asset_type='survey',
+            content=BENCHMARK_FORM,
+        )
+        self.asset.deploy(backend='mock', active=True)
+        self.asset.save()
+        self.asset.deployment.mock_submissions(
+            get_benchmark_submissions(self.asset)
+        )
+        self.asset.deployment.set_namespace(self.URL_NAMESPACE)
+        self.client.login(username='someuser', password='someuser')
+
+    def _get_submission_list_url(self, format_: str) -> str:
+        return reverse(
+            self._get_endpoint('submission-list'),
+            kwargs={'parent_lookup_asset': self.asset.uid, 'format': format_},
+        )
+
+    def _benchmark_request(
+        self, name: str, method: str, url: str, data: dict = None
+    ):
+        def request():
+            response = getattr(self.client, method)(url, data, format='json')
+            assert response.status_code == status.HTTP_200_OK
+
+        self.benchmark(name, request)
+
+    def test_data_list_json(self):
+        self._benchmark_request(
+            'data_list_json', 'get', self._get_submission_list_url('json')
+        )
+
+    def test_data_list_xml(self):
+        self._benchmark_request(
+            'data_list_xml', 'get', self._get_submission_list_url('xml')
+        )
+
+    def test_data_retrieve_json(self):
+        url = self.asset.deployment.get_submission_detail_url(
+            SUBMISSION_COUNT // 2
+        )
+        self._benchmark_request(
+            'data_retrieve_json', 'get', f'{url}?format=json'
+        )
+
+    def test_data_retrieve_xml(self):
+        url = self.asset.deployment.get_submission_detail_url(
+            SUBMISSION_COUNT // 2
+        )
+        self._benchmark_request(
+            'data_retrieve_xml', 'get', f'{url}?format=xml'
+        )
+
+    def test_bulk_validation_status_update(self):
+        url = reverse(
+            self._get_endpoint('submission-validation-statuses'),
+            kwargs={'parent_lookup_asset': self.asset.uid, 'format': 'json'},
+        )
+        data = {
+            'payload': {
+                'validation_status.uid': 'validation_status_approved',
+                'confirm': True,
+            }
+        }
+        self._benchmark_request(
+            'bulk_validation_status_update', 'patch', url, data
+        )
+
+    def test_bulk_submission_update(self):
+        url = reverse(
+            self._get_endpoint('submission-bulk'),
+            kwargs={'parent_lookup_asset': self.asset.uid},
+        )
+        data = {
+            'payload': {
+                'submission_ids': list(range(1, 101)),
+                'data': {'name': 'Updated name'},
+            }
+        }
+        self._benchmark_request('bulk_submission_update', 'patch', url, data)
+
+    def _benchmark_export(self, name: str, export_type: str):
+        def export():
+            export_task = ExportTask()
+            export_task.user = self.someuser
+            export_task.data = {
+                'source': reverse('asset-detail', args=[self.asset.uid]),
+                'type': export_type,
+            }
+            messages = defaultdict(list)
+            export_task._run_task(messages)
+            assert not messages
+
+        self.benchmark(name, export, rounds=3)
+
+    def test_csv_export(self):
+        self._benchmark_export('csv_export', 'csv')
+
+    def test_xlsx_export(self):
+        self._benchmark_export('xlsx_export', 'xls')
+
+
+@pytest.mark.performance
+class LargeSubmissionListBenchmarkTestCase(BenchmarkMixin, BaseTestCase):
+    """
+    Compare large pages of submissions rendered by DRF with streamed ones
+    (see `SUBMISSION_LIST_STREAMING_THRESHOLD`)
+    """
+
+    fixtures = ['test_data']
+
+    URL_NAMESPACE = ROUTER_URL_NAMESPACE
+
+    def setUp(self):
+        self.someuser = User.objects.get(username='someuser')
+        self.asset = Asset.objects.create(
+            owner=self.someuser,
+            name='Benchmark',
+            asset_type='survey',
+            content=BENCHMARK_FORM,
+        )
+        self.asset.deploy(backend='mock', active=True)
+        self.asset.save()
+        self.asset.deployment.mock_submissions(
+            get_benchmark_submissions(
+                self.asset, max(SUBMISSION_LIST_PAGE_SIZES)
+            )
+        )
+        self.asset.deployment.set_namespace(self.URL_NAMESPACE)
+        self.client.login(username='someuser', password='someuser')
+
+    def _benchmark_list(self, name: str, page_size: int, streaming: bool):
+        url = self.asset.deployment.submission_list_url
+
+        def request():
+            response = self.client.get(
+                url, {'format': 'json', 'limit': page_size}
+            )
+            assert response.status_code == status.HTTP_200_OK
+            assert response.streaming == streaming
+            # Consume the whole response, like a client would
+            if streaming:
+                b''.join(response.streaming_content)
+
+        with override_settings(
+            SUBMISSION_LIST_STREAMING_THRESHOLD=1 if streaming else 0
+        ):
+            self.benchmark(name, request, rounds=3)
+
+    def test_data_list_json_rendered(self):
+        for page_size in SUBMISSION_LIST_PAGE_SIZES:
+            self._benchmark_list(
+                f'data_list_json_{page_size}_rendered', page_size, False
+            )
+
+    def test_data_list_json_streamed(self):
+        for page_size in SUBMISSION_LIST_PAGE_SIZES:
+            self._benchmark_list(
+                f'data_list_json_{page_size}_streamed', page_size, True
+            )
+
+
+@pytest.mark.performance
+class PairedDataBenchmarkTestCase(BenchmarkMixin, BaseTestCase):
+
+    fixtures = ['test_data']
+
+    URL_NAMESPACE = ROUTER_URL_NAMESPACE
+
+    def setUp(self):
+        self.someuser = User.objects.get(username='someuser')
+        self.anotheruser = User.objects.get(username='anotheruser')
+        self.source_asset = Asset.objects.create(
+            owner=self.someuser,
+            name='Benchmark source',
+            asset_type='survey',
+            content=BENCHMARK_FORM,
+            data_sharing={'enabled': True, 'fields': []},
+        )
+        self.source_asset.deploy(backend='mock', active=True)
+        self.source_asset.save()
+        self.source_asset.deployment.mock_submissions(
+            get_benchmark_submissions(self.source_asset)
+        )
+        self.source_asset.assign_perm(self.anotheruser, PERM_VIEW_SUBMISSIONS)
+
+        self.destination_asset = Asset.objects.create(
+            owner=self.anotheruser,
+            name='Benchmark destination',
+            asset_type='survey',
+            content=BENCHMARK_FORM,
+        )
+        self.destination_asset.deploy(backend='mock', active=True)
+        self.destination_asset.save()
+
+        self.client.login(username='anotheruser', password='anotheruser')
+        response = self.client.post(
+            reverse(
+                self._get_endpoint('paired-data-list'),
+                args=[self.destination_asset.uid],
+            ),
+            data={
+                'source': reverse(
+                    self._get_endpoint('asset-detail'),
+                    args=[self.source_asset.uid],
+                ),
+                'fields': [],
+                'filename': 'paired_data.xml',
+            },
+            format='json',
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        self.external_xml_url = f"{response.data['url']}external.xml"
+        self.destination_asset.assign_perm(
+            self.anotheruser, PERM_ADD_SUBMISSIONS
+        )
+
+    @override_settings(PAIRED_DATA_EXPIRATION=0)
+    def test_paired_data_generation(self):
+        def get_paired_data():
+            response = self.client.get(self.external_xml_url)
+            assert response.status_code == status.HTTP_200_OK
+
+        self.benchmark('paired_data_generation', get_paired_data)
+
+
+@pytest.mark.performance
+class MediaFileSyncBenchmarkTestCase(BenchmarkMixin, BaseTestCase):
+
+    fixtures = ['test_data']
+
+    def setUp(self):
+        self.someuser = User.objects.get(username='someuser')
+        self.asset = Asset.objects.create(
+            owner=self.someuser,
+            name='Benchmark',
+            asset_type='survey',
+            content=BENCHMARK_FORM,
+        )
+        self.asset.deploy(backend='mock', active=True)
+        self.asset.save()
+        AssetFile.objects.bulk_create(
+            [
+                AssetFile(
+                    asset=self.asset,
+                    user=self.someuser,
+                    file_type=AssetFile.FORM_MEDIA,
+                    metadata={
+                        'redirect_url': f'https://example.org/{idx}.png',
+                        'filename': f'{idx}.png',
+                        'hash': f'md5:{idx}',
+                        'mimetype': 'image/png',
+                    },
+                )
+                for idx in range(MEDIA_FILE_COUNT)
+            ]
+        )
+
+    def _benchmark_sync(self, name: str) -> dict:
+        def sync_media_file(*args):
+            time.sleep(MEDIA_FILE_SYNC_LATENCY)
+
+        def sync_media_files():
+            # The mock back end does not store anything, all files are
+            # uploaded again on each run
+            outcomes = self.asset.deployment.sync_media_files()
+            assert len(outcomes) == MEDIA_FILE_COUNT
+            assert all(outcome['success'] for outcome in outcomes)
+
+        with patch.object(
+            self.asset.deployment.__class__,
+            '_sync_media_file',
+            sync_media_file,
+        ):
+            return self.benchmark(name, sync_media_files, rounds=3)
+
+    def test_media_file_sync(self):
+        with override_settings(MEDIA_FILE_SYNC_MAX_WORKERS=1):
+            self._benchmark_sync('media_file_sync_sequential')
+        with override_settings(MEDIA_FILE_SYNC_MAX_WORKERS=8):
+            self._benchmark_sync('media_file_sync_concurrent')
+
+
+@pytest.mark.performance
+class ImportBenchmarkTestCase(BenchmarkMixin, BaseTestCase):
+
+    fixtures = ['test_data']
+
+    def setUp(self):
+        self.someuser = User.objects.get(username='someuser')
+
+    @staticmethod
+    def _get_xlsx(survey_rows: list) -> bytes:
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        worksheet.title = 'survey'
+        worksheet.append(['type', 'name', 'label'])
+        for row in survey_rows:
+            worksheet.append(row)
+        stream = BytesIO()
+        workbook.save(stream)
+        return stream.getvalue()
+
+    def _import(self, data: dict) -> ImportTask:
+        import_task = ImportTask.objects.create(user=self.someuser, data=data)
+        import_task.run()
+        assert import_task.status == ImportTask.COMPLETE, import_task.messages
+        return import_task
+
+    def test_import_large_form(self):
+        xlsx = self._get_xlsx(
+            [
+                ['text', f'question_{idx}', f'Question {idx}']
+                for idx in range(IMPORT_FORM_QUESTION_COUNT)
+            ]
+        )
+        data = {
+            'base64Encoded': base64.b64encode(xlsx).decode(),
+            'filename': 'Large form',
+            'library': False,
+        }
+        self.benchmark('import_large_form', lambda: self._import(data))
+
+    @responses.activate
+    def test_import_collection_zip(self):
+        zip_stream = BytesIO()
+        with zipfile.ZipFile(zip_stream, 'w') as zip_file:
+            zip_file.writestr('forms/', '')
+            for idx in range(IMPORT_ZIP_ASSET_COUNT):
+                zip_file.writestr(
+                    f'forms/form_{idx}.xlsx',
+                    self._get_xlsx(
+                        [['text', 'name', 'Name'], ['integer', 'age', 'Age']]
+                    ),
+                )
+        url = 'https://example.org/forms.zip'
+        responses.add(
+            responses.GET,
+            url,
+            body=zip_stream.getvalue(),
+            content_type='application/zip',
+        )
+
+        def import_zip():
+            import_task = self._import({'url': url})
+            # All forms, their parent folder and the root collection
+            assert (
+                len(import_task.data['progress']['uids'])
+                == IMPORT_ZIP_ASSET_COUNT + 2
+            )
+
+        self.benchmark('import_collection_zip', import_zip, rounds=3)
@@ -1,20 +1,24 @@
 # coding: utf-8
 import json
+import timeit
 from copy import deepcopy
-from datetime import datetime
+from datetime import datetime, timedelta
 try:
     from zoneinfo import ZoneInfo
 except ImportError:
     from backports.zoneinfo import ZoneInfo
 
+import pytest
+from django.core.management import call_command
 from django.test import TestCase
 from django.utils import timezone
 
 from formpack.utils.expand_content import SCHEMA_VERSION
 from kpi.exceptions import BadAssetTypeException
+from kpi.maintenance_tasks import remove_orphan_asset_version_contents
 from kpi.utils.hash import calculate_hash
 from ..models import Asset
-from ..models import AssetVersion
+from ..models import AssetVersion, AssetVersionContent
 
 
 class AssetVersionTestCase(TestCase):
@@ -85,6 +89,10 @@ class AssetVersionTestCase(TestCase):
         self.template_asset = Asset.objects.create(asset_type='template')
         self.assertEqual(self.template_asset.asset_versions.count(), 1)
         self.assertEqual(self.template_asset.latest_version.deployed, False)
+        # Content has not changed, no versions are created
+        self.template_asset.save()
+        self.assertEqual(self.template_asset.asset_versions.count(), 1)
+        self.template_asset.name = 'renamed'
         self.template_asset.save()
         self.assertEqual(self.template_asset.asset_versions.count(), 2)
         self.assertEqual(self.template_asset.latest_version.deployed, False)
@@ -136,3 +144,95 @@ class AssetVersionTestCase(TestCase):
         new_asset.latest_version.save()
         assert new_asset.latest_version.date_modified != date_forced
         assert new_asset.latest_version.date_modified >= now
+
+    def test_identical_contents_are_stored_once(self):
+        content = {
+            'survey': [{'type': 'note', 'label': 'Read me', 'name': 'n1'}],
+        }
+        new_asset = Asset.objects.create(asset_type='survey', content=content)
+        for i in range(3):
+            new_asset.name = f'Version {i}'
+            new_asset.save()
+
+        versions = new_asset.asset_versions.all()
+        assert versions.count() == 4
+        assert (
+            AssetVersionContent.objects.filter(asset_versions__in=versions)
+            .distinct()
+            .count()
+            == 1
+        )
+        assert all(v._version_content is None for v in versions)
+        assert versions[0].version_content == new_asset.content
+
+    def test_deduplicate_legacy_version_content(self):
+        content = {
+            'survey': [{'type': 'note', 'label': 'Read me', 'name': 'n1'}],
+        }
+        new_asset = Asset.objects.create(asset_type='survey', content=content)
+        version = new_asset.latest_version
+        # Simulate a version saved before deduplication
+        AssetVersion.objects.filter(pk=version.pk).update(
+            _version_content=version.version_content, content_blob=None
+        )
+        AssetVersionContent.objects.all().delete()
+        version.refresh_from_db()
+        assert version.version_content == new_asset.content
+        assert version.content_hash == calculate_hash(
+            json.dumps(new_asset.content, sort_keys=True), 'sha1'
+        )
+
+        call_command('deduplicate_asset_version_content', verbosity=0)
+        version.refresh_from_db()
+        assert version._version_content is None
+        assert version.content_blob_id == version.content_hash
+        assert version.version_content == new_asset.content
+
+    def test_remove_orphan_version_contents(self):
+        content = {
+            'survey': [{'type': 'note', 'label': 'Read me', 'name': 'n1'}],
+        }
+        kept_asset = Asset.objects.create(asset_type='survey', content=content)
+        deleted_asset = Asset.objects.create(
+            asset_type='survey',
+            content={
+                'survey': [{'type': 'note', 'label': 'Bye', 'name': 'n1'}],
+            },
+        )
+        orphan_hash = deleted_asset.latest_version.content_blob_id
+        deleted_asset.delete()
+
+        # Contents younger than one day are kept
+        assert remove_orphan_asset_version_contents() == 0
+        assert AssetVersionContent.objects.filter(pk=orphan_hash).exists()
+
+        AssetVersionContent.objects.update(
+            date_created=timezone.now() - timedelta(days=2)
+        )
+        assert remove_orphan_asset_version_contents() == 1
+        assert not AssetVersionContent.objects.filter(pk=orphan_hash).exists()
+        assert kept_asset.latest_version.version_content == content
+
+    @pytest.mark.performance
+    def test_version_storage_and_formpack_schema_speed(self):
+        content = {
+            'survey': [
+                {'type': 'text', 'label': f'Question {i}', 'name': f'q{i}'}
+                for i in range(2000)
+            ],
+        }
+        new_asset = Asset.objects.create(asset_type='survey', content=content)
+        for i in range(20):
+            new_asset.name = f'Version {i}'
+            new_asset.save()
+
+        versions = list(
+            new_asset.asset_versions.select_related('content_blob')
+        )
+        assert len(versions) == 21
+        assert len({v.content_blob_id for v in versions}) == 1
+
+        duration = timeit.timeit(
+            lambda: [v.to_formpack_schema() for v in versions], number=1
+        )
+        assert duration < 5
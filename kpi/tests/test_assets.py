@@ -2,10 +2,13 @@
 import base64
 import datetime
 import json
+import timeit
 from collections import OrderedDict
 from copy import deepcopy
+from unittest.mock import patch
 
 import openpyxl
+import pytest
 from django.contrib.auth.models import User, AnonymousUser
 from django.test import TestCase
 from django.urls import reverse
@@ -148,6 +151,67 @@ class CreateAssetVersions(AssetsTestCase):
         self.assertEqual(anon_asset.owner, None)
 
 
+class AssetSaveTests(AssetsTestCase):
+
+    def test_unchanged_content_is_not_processed(self):
+        self.asset.name = 'renamed'
+        with patch.object(
+            Asset, 'adjust_content_on_save'
+        ) as adjust_content_on_save, patch.object(
+            Asset, '_populate_summary'
+        ) as populate_summary:
+            self.asset.save()
+        adjust_content_on_save.assert_not_called()
+        populate_summary.assert_not_called()
+
+        # Loaded from the database
+        asset = Asset.objects.get(pk=self.asset.pk)
+        asset.content['survey'][0]['label'] = 'Question one'
+        with patch.object(
+            Asset, 'adjust_content_on_save'
+        ) as adjust_content_on_save:
+            asset.save()
+        adjust_content_on_save.assert_called_once()
+
+    def test_settings_are_standardized_when_changed(self):
+        asset = Asset.objects.get(pk=self.asset.pk)
+        asset.settings['sector'] = 'Health'
+        asset.save()
+        asset.refresh_from_db()
+        assert asset.settings['sector'] == {}
+
+    def test_versions_are_deduplicated(self):
+        versions_count = self.asset.asset_versions.count()
+        self.asset.save()
+        Asset.objects.get(pk=self.asset.pk).save()
+        assert self.asset.asset_versions.count() == versions_count
+
+        self.asset.content['survey'].pop()
+        self.asset.save()
+        assert self.asset.asset_versions.count() == versions_count + 1
+
+    @pytest.mark.performance
+    def test_unchanged_content_save_speed(self):
+        asset = Asset.objects.create(
+            content={
+                'survey': [
+                    {'type': 'text', 'label': f'Question {i}', 'name': f'q{i}'}
+                    for i in range(2000)
+                ]
+            },
+            owner=self.user,
+            asset_type='survey',
+        )
+
+        def _save_changed_content():
+            asset.content['survey'][0]['label'] = str(timeit.default_timer())
+            asset.save()
+
+        changed_duration = timeit.timeit(_save_changed_content, number=3)
+        unchanged_duration = timeit.timeit(asset.save, number=3)
+        assert unchanged_duration < changed_duration / 5
+
+
 class AssetContentTests(AssetsTestCase):
     def _wrap_field(self, field_name, value):
         return {'survey': [
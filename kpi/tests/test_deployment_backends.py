@@ -1,9 +1,13 @@
 # coding: utf-8
+from unittest.mock import patch
+
 import pytest
 from django.test import TestCase
+from django.utils import timezone
 
-from kpi.exceptions import DeploymentDataException
+from kpi.exceptions import DeploymentDataException, MediaFileSyncError
 from kpi.models.asset import Asset
+from kpi.models.asset_file import AssetFile
 from kpi.models.asset_version import AssetVersion
 
 
@@ -109,6 +113,15 @@ class MockDeployment(TestCase):
         other_deployment_data = self.asset.deployment.get_data()
         self.assertEqual(other_deployment_data['version'], original_version)
 
+    def test_submission_watermark_follows_recorded_changes(self):
+        watermark = self.asset.deployment.get_submission_watermark()
+        assert self.asset.deployment.get_submission_watermark() == watermark
+
+        self.asset.deployment.record_submission_changes()
+        new_watermark = self.asset.deployment.get_submission_watermark()
+        assert new_watermark != watermark
+        assert self.asset.deployment.get_submission_watermark() == new_watermark
+
     def test_save_to_db_with_quote(self):
         new_key = 'dummy'
         new_value = "I'm in love with Apostrophe"
@@ -148,3 +161,129 @@ class MockDeployment(TestCase):
         # altered directly
         with self.assertRaises(DeploymentDataException) as e:
             asset.save()
+
+
+class MediaFileSync(TestCase):
+
+    fixtures = ['test_data']
+
+    def setUp(self):
+        self.asset = Asset.objects.get(pk=1)
+        self.asset.deploy(backend='mock', active=True)
+        self.asset.save()
+
+    def _create_media_file(self, name: str, deleted: bool = False):
+        return AssetFile.objects.create(
+            asset=self.asset,
+            user=self.asset.owner,
+            file_type=AssetFile.FORM_MEDIA,
+            metadata={
+                'redirect_url': f'https://example.org/{name}',
+                'filename': name,
+                'hash': f'md5:{name}',
+                'mimetype': 'image/png',
+            },
+            date_deleted=timezone.now() if deleted else None,
+        )
+
+    @staticmethod
+    def _get_backend_file(name: str, md5: str = None, from_kpi: bool = True):
+        return {
+            'pk': name,
+            'url': f'https://kc.example.org/{name}',
+            'md5': md5 or f'md5:{name}',
+            'from_kpi': from_kpi,
+        }
+
+    def test_sync_media_files(self):
+        new_file = self._create_media_file('new.png')
+        changed_file = self._create_media_file('changed.png')
+        self._create_media_file('unchanged.png')
+        deleted_file = self._create_media_file('deleted.png', deleted=True)
+        vacuumed_file = self._create_media_file('vacuumed.png', deleted=True)
+        backend_files = {
+            f'https://example.org/{name}': self._get_backend_file(name)
+            for name in ['unchanged.png', 'deleted.png', 'orphan.png']
+        }
+        backend_files['https://example.org/changed.png'] = (
+            self._get_backend_file('changed.png', md5='md5:old')
+        )
+        backend_files['https://example.org/vacuumed.png'] = (
+            self._get_backend_file('vacuumed.png', from_kpi=False)
+        )
+        backend_files['https://example.org/kc_only.png'] = (
+            self._get_backend_file('kc_only.png', from_kpi=False)
+        )
+
+        with patch.object(
+            self.asset.deployment.__class__,
+            '_get_backend_media_files',
+            return_value=backend_files,
+        ):
+            outcomes = self.asset.deployment.sync_media_files()
+
+        assert sorted(
+            (outcome['backend_media_id'], outcome['action'])
+            for outcome in outcomes
+            if outcome['success']
+        ) == [
+            ('https://example.org/changed.png', 'replace'),
+            ('https://example.org/deleted.png', 'delete'),
+            ('https://example.org/new.png', 'add'),
+            ('https://example.org/orphan.png', 'delete'),
+            ('https://example.org/vacuumed.png', 'vacuum'),
+        ]
+        assert len(outcomes) == 5
+
+        new_file.refresh_from_db()
+        changed_file.refresh_from_db()
+        assert new_file.synced_with_backend
+        assert changed_file.synced_with_backend
+        assert not AssetFile.objects.filter(
+            pk__in=[deleted_file.pk, vacuumed_file.pk]
+        ).exists()
+
+    def test_sync_media_files_with_failure(self):
+        failing_file = self._create_media_file('failing.png')
+        other_file = self._create_media_file('other.png')
+        deployment_class = self.asset.deployment.__class__
+        original_sync_media_file = deployment_class._sync_media_file
+
+        def sync_media_file(deployment, action, file_, *args):
+            if file_.pk == failing_file.pk:
+                raise Exception('Connection refused')
+            return original_sync_media_file(deployment, action, file_, *args)
+
+        with patch.object(
+            deployment_class, '_sync_media_file', sync_media_file
+        ), self.assertRaises(MediaFileSyncError) as e:
+            self.asset.deployment.sync_media_files()
+
+        outcomes = {
+            outcome['backend_media_id']: outcome
+            for outcome in e.exception.outcomes
+        }
+        assert outcomes['https://example.org/failing.png']['success'] is False
+        assert (
+            outcomes['https://example.org/failing.png']['error']
+            == 'Connection refused'
+        )
+        assert outcomes['https://example.org/other.png']['success'] is True
+
+        failing_file.refresh_from_db()
+        other_file.refresh_from_db()
+        assert not failing_file.synced_with_backend
+        assert other_file.synced_with_backend
+
+    def test_failed_sync_is_retried_asynchronously(self):
+        with patch.object(
+            self.asset.deployment.__class__,
+            'sync_media_files',
+            side_effect=MediaFileSyncError(),
+        ), patch('kpi.deployment_backends.mixin.celery') as celery:
+            self.asset.sync_media_files_or_retry(AssetFile.PAIRED_DATA)
+
+        celery.current_app.send_task.assert_called_once_with(
+            'kpi.tasks.sync_media_files',
+            (self.asset.uid, AssetFile.PAIRED_DATA),
+        )
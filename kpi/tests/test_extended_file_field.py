@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.test import override_settings, TestCase
@@ -36,3 +38,46 @@ class ExtendedFileFieldTestCase(TestCase):
                 default_storage.delete(path)
             if default_storage.exists(new_path):
                 default_storage.delete(new_path)
+
+    def test_move_files_concurrently(self):
+        asset = Asset.objects.get(pk=1)
+        field = AssetFile._meta.get_field('content')
+        upload_to = field.upload_to
+        asset_files = []
+        for i in range(5):
+            asset_file = AssetFile(
+                asset=asset, user=asset.owner, file_type=AssetFile.FORM_MEDIA
+            )
+            asset_file.content = ContentFile(
+                f'foo{i}'.encode(), name=f'foo{i}.txt'
+            )
+            asset_file.save()
+            asset_files.append(asset_file)
+
+        old_paths = [asset_file.content.name for asset_file in asset_files]
+        new_paths = [f'__pytest_moved/foo{i}.txt' for i in range(5)]
+
+        try:
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                results = list(
+                    executor.map(
+                        lambda asset_file: asset_file.content.move(
+                            '__pytest_moved'
+                        ),
+                        asset_files,
+                    )
+                )
+
+            assert all(results)
+            # The field is shared by all files and must be left untouched
+            assert field.upload_to == upload_to
+            for i, asset_file in enumerate(asset_files):
+                assert asset_file.content.name == new_paths[i]
+                assert not default_storage.exists(old_paths[i])
+                with default_storage.open(new_paths[i], 'r') as f:
+                    assert f.read() == f'foo{i}'
+        finally:
+            # Clean-up
+            for path in old_paths + new_paths:
+                if default_storage.exists(path):
+                    default_storage.delete(path)
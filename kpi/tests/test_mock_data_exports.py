@@ -2,6 +2,8 @@
 import os
 import zipfile
 from collections import defaultdict
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
 try:
     from zoneinfo import ZoneInfo
 except ImportError:
@@ -10,10 +12,12 @@ except ImportError:
 import datetime
 import mock
 import openpyxl
+import pyarrow as pa
+import pyarrow.parquet as pq
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 
 from kobo.apps.reports import report_data
 from kpi.constants import (
@@ -22,7 +26,9 @@ from kpi.constants import (
     PERM_VIEW_ASSET,
     PERM_VIEW_SUBMISSIONS,
 )
-from kpi.models import Asset, ExportTask
+from kpi.maintenance_tasks import remove_unreferenced_export_artifacts
+from kpi.models import Asset, ExportArtifact, ExportTask
+from kpi.models.import_export_task import _write_csv_partition
 from kpi.utils.object_permission import get_anonymous_user
 from kpi.utils.mongo_helper import drop_mock_only
 
@@ -932,6 +938,46 @@ class MockDataExports(MockDataExportsBase):
                 '\r\n'.join(content_lines)
             )
 
+    def test_export_parquet(self):
+        export_task = ExportTask()
+        export_task.user = self.user
+        export_task.data = {
+            'source': reverse('asset-detail', args=[self.asset.uid]),
+            'type': 'parquet',
+            'lang': 'English',
+        }
+        messages = defaultdict(list)
+        export_task._run_task(messages)
+        self.assertFalse(messages)
+        assert export_task.result.name.endswith('.zip')
+
+        result_zip = zipfile.ZipFile(export_task.result, 'r')
+        assert result_zip.namelist() == [f'{self.asset.name}.parquet']
+        table = pq.read_table(
+            BytesIO(result_zip.read(f'{self.asset.name}.parquet'))
+        )
+        # Columns are typed after their question, other ones are strings
+        assert table.schema.field(
+            'How many segments does your body have?'
+        ).type == pa.int64()
+        assert table.schema.field('_id').type == pa.int64()
+        assert table.schema.field('_index').type == pa.int64()
+        assert table.schema.field(
+            'Do you descend from an ancestral unicellular organism?'
+        ).type == pa.string()
+
+        data = table.to_pydict()
+        assert data['How many segments does your body have?'] == [6, 3, 2]
+        assert data['_id'] == [61, 62, 63]
+        assert data['_index'] == [1, 2, 3]
+        assert data['Do you descend from an ancestral unicellular organism?'] == [
+            'No',
+            'No',
+            'Yes',
+        ]
+        assert data['_submitted_by'] == [None, None, 'anotheruser']
+
+    @override_settings(EXPORT_DEDUPLICATION_ENABLED=False)
     def test_remove_excess_exports(self):
         task_data = {
             'source': reverse('asset-detail', args=[self.asset.uid]),
@@ -975,6 +1021,125 @@ class MockDataExports(MockDataExportsBase):
             ),
         )
 
+    def test_exports_share_identical_results(self):
+        task_data = {
+            'source': reverse('asset-detail', args=[self.asset.uid]),
+            'type': 'csv',
+        }
+        # Give anotheruser the same access as the owner
+        self.asset.remove_perm(self.anotheruser, PERM_PARTIAL_SUBMISSIONS)
+        self.asset.assign_perm(self.anotheruser, PERM_VIEW_SUBMISSIONS)
+
+        export_tasks = []
+        for user in (self.user, self.anotheruser):
+            export_task = ExportTask.objects.create(
+                user=user, data=dict(task_data)
+            )
+            export_task.run()
+            assert export_task.status == ExportTask.COMPLETE
+            export_tasks.append(export_task)
+
+        someuser_export, anotheruser_export = export_tasks
+        assert someuser_export.artifact is not None
+        assert anotheruser_export.artifact == someuser_export.artifact
+        assert anotheruser_export.result.name == someuser_export.result.name
+        assert someuser_export.artifact.reference_count == 2
+
+        # The file is deleted with the last export referencing it
+        result = someuser_export.result
+        someuser_export.delete()
+        assert result.storage.exists(result.name)
+        anotheruser_export.delete()
+        assert not result.storage.exists(result.name)
+        assert not ExportArtifact.objects.filter(
+            fingerprint=someuser_export.artifact.fingerprint
+        ).exists()
+
+    def test_exports_do_not_share_results_across_partial_permissions(self):
+        task_data = {
+            'source': reverse('asset-detail', args=[self.asset.uid]),
+            'type': 'csv',
+        }
+        export_tasks = []
+        # anotheruser can only view their own submissions
+        for user in (self.user, self.anotheruser):
+            export_task = ExportTask.objects.create(
+                user=user, data=dict(task_data)
+            )
+            export_task.run()
+            export_tasks.append(export_task)
+
+        someuser_export, anotheruser_export = export_tasks
+        assert anotheruser_export.artifact != someuser_export.artifact
+        assert anotheruser_export.result.name != someuser_export.result.name
+
+    def test_exports_do_not_share_outdated_results(self):
+        task_data = {
+            'source': reverse('asset-detail', args=[self.asset.uid]),
+            'type': 'csv',
+        }
+        export_task = ExportTask.objects.create(
+            user=self.user, data=dict(task_data)
+        )
+        export_task.run()
+        first_result_name = export_task.result.name
+
+        self.asset.deployment.mock_submissions(
+            [
+                {
+                    '__version__': self.asset.latest_deployed_version_uid,
+                    'Do_you_descend_from_unicellular_organism': 'yes',
+                }
+            ],
+            flush_db=False,
+        )
+        export_task = ExportTask.objects.create(
+            user=self.user, data=dict(task_data)
+        )
+        export_task.run()
+        assert export_task.result.name != first_result_name
+
+    def test_exports_do_not_share_results_after_bulk_updates(self):
+        task_data = {
+            'source': reverse('asset-detail', args=[self.asset.uid]),
+            'type': 'csv',
+        }
+        export_task = ExportTask.objects.create(
+            user=self.user, data=dict(task_data)
+        )
+        export_task.run()
+        first_result_name = export_task.result.name
+
+        # Bulk updates do not change `date_modified` of KoBoCAT instances,
+        # the back end records them instead
+        self.asset.deployment.record_submission_changes()
+        export_task = ExportTask.objects.create(
+            user=self.user, data=dict(task_data)
+        )
+        export_task.run()
+        assert export_task.result.name != first_result_name
+
+    def test_remove_unreferenced_export_artifacts(self):
+        task_data = {
+            'source': reverse('asset-detail', args=[self.asset.uid]),
+            'type': 'csv',
+        }
+        export_task = ExportTask.objects.create(
+            user=self.user, data=dict(task_data)
+        )
+        export_task.run()
+        result = export_task.result
+        artifact = export_task.artifact
+
+        # Deleted in bulk, as in cascade, without releasing the artifact
+        ExportTask.objects.filter(pk=export_task.pk).delete()
+        ExportTask.remove_excess(self.user, task_data['source'])
+        assert ExportArtifact.objects.filter(pk=artifact.pk).exists()
+
+        assert remove_unreferenced_export_artifacts() == 1
+        assert not ExportArtifact.objects.filter(pk=artifact.pk).exists()
+        assert not result.storage.exists(result.name)
+
     def test_log_and_mark_stuck_exports_as_errored(self):
         task_data = {
             'source': reverse('asset-detail', args=[self.asset.uid]),
@@ -1161,3 +1326,64 @@ class MockDataExports(MockDataExportsBase):
 
         # testing anotheruser can export data
         self.run_csv_export_test(user=self.anotheruser)
+
+
+class MockDataParallelExports(TransactionTestCase):
+    """
+    Workers of parallel exports use their own DB connections, which only see
+    committed data.
+
+    Spawned processes would not see the mock Mongo database nor the test
+    database, use a pool of threads instead.
+    """
+
+    fixtures = ['test_data']
+
+    def setUp(self):
+        self.user = User.objects.get(username='someuser')
+        settings.MONGO_DB.instances.drop()
+        name, form = next(iter(MockDataExportsBase.forms.items()))
+        self.asset = MockDataExportsBase._create_asset_with_submissions(
+            user=self.user,
+            content=form['content'],
+            name=name,
+            submissions=form['submissions'],
+        )
+
+    def _export_csv(self) -> list:
+        export_task = ExportTask()
+        export_task.user = self.user
+        export_task.data = {
+            'source': reverse('asset-detail', args=[self.asset.uid]),
+            'type': 'csv',
+        }
+        messages = defaultdict(list)
+        export_task._run_task(messages)
+        self.assertFalse(messages)
+        return list(export_task.result)
+
+    @override_settings(EXPORT_DEDUPLICATION_ENABLED=False)
+    def test_csv_export_in_parallel(self):
+        """
+        Exporting by ranges of `_id` must produce the same file as exporting
+        serially.
+        """
+        serial_lines = self._export_csv()
+
+        with override_settings(
+            EXPORT_PARALLEL_MAX_WORKERS=2, EXPORT_PARALLEL_MIN_SUBMISSIONS=1
+        ), mock.patch(
+            'kpi.models.import_export_task._get_export_pool', ThreadPool
+        ), mock.patch(
+            'kpi.models.import_export_task._write_csv_partition',
+            wraps=_write_csv_partition,
+        ) as write_csv_partition:
+            parallel_lines = self._export_csv()
+
+        assert parallel_lines == serial_lines
+        # 3 submissions, split into 2 ranges
+        assert write_csv_partition.call_count == 2
+        index_offsets = sorted(
+            call.args[4] for call in write_csv_partition.call_args_list
+        )
+        assert index_offsets == [0, 2]
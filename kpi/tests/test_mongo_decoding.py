@@ -1,8 +1,12 @@
 # coding: utf-8
+import copy
+import timeit
+
+import pytest
 from django.conf import settings
 from django.test import TestCase
 
-from kpi.utils.mongo_helper import MongoHelper
+from kpi.utils.mongo_helper import MongoHelper, _get_readable_key
 
 
 def get_instances_from_mongo():
@@ -153,3 +157,68 @@ class MongoBase64Decoding(TestCase):
         decoded = list(get_instances_from_mongo())
         expected_results = decoded_results
         self.assertEqual(decoded, expected_results)
+
+    def test_decoding_without_encoded_keys_keeps_dict(self):
+        submission = {
+            '_id': 190,
+            '_validation_status': {'uid': 'validation_status_approved'},
+            'group/question': 'answer',
+            'repeat': [{'repeat/question': 'answer'}],
+        }
+        expected = copy.deepcopy(submission)
+        decoded = MongoHelper.to_readable_dict(submission)
+        assert decoded is submission
+        assert decoded == expected
+        assert list(decoded) == list(expected)
+
+    def test_key_translation_is_memoized(self):
+        submission = {
+            '_id': 190,
+            'dotLg==dotLg==dot': 'encoded',
+            'group/question': 'answer',
+        }
+        _get_readable_key.cache_clear()
+        for _ in range(10):
+            decoded = MongoHelper.to_readable_dict(copy.deepcopy(submission))
+            assert decoded['dot.dot.dot'] == 'encoded'
+
+        # Each distinct key is decoded once, then read from the cache
+        cache_info = _get_readable_key.cache_info()
+        assert cache_info.misses == len(submission)
+        assert cache_info.hits == 9 * len(submission)
+
+    @pytest.mark.performance
+    def test_decoding_speed(self):
+        submission = {
+            '__version__': 'vPtjMxE37b4kgqoCBFEkeb',
+            '_attachments': [],
+            '_geolocation': [None, None],
+            '_id': 190,
+            '_notes': [],
+            '_status': 'submitted_via_web',
+            '_submission_time': '2017-12-20T07:19:38',
+            '_submitted_by': None,
+            '_tags': [],
+            '_uuid': 'f9753a6e-abd3-47e3-a218-9ad1adfa2688',
+            '_validation_status': {'uid': 'validation_status_approved'},
+            '_xform_id_string': 'afgNxNby4VxHJ4STM2LmVz',
+            'formhub/uuid': 'c1aae157497d477aa3443b2ca9306e2e',
+            'meta/instanceID': 'uuid:f9753a6e-abd3-47e3-a218-9ad1adfa2688',
+            'dotLg==dotLg==dot': 'encoded',
+            'household': [
+                {
+                    'household/name': 'Jane',
+                    'household/age': '32',
+                    'household/dottyLg==name': 'encoded',
+                },
+            ] * 5,
+        }
+        for i in range(50):
+            submission[f'group_{i}/question_{i}'] = str(i)
+
+        submissions = [copy.deepcopy(submission) for _ in range(10000)]
+        duration = timeit.timeit(
+            lambda: [MongoHelper.to_readable_dict(s) for s in submissions],
+            number=1,
+        )
+        assert duration < 1
@@ -0,0 +1,119 @@
+# coding: utf-8
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from kpi.utils.mongo_indexes import (
+    REQUIRED_INDEXES,
+    check_required_indexes,
+    create_missing_indexes,
+    get_missing_indexes,
+    get_query_shape,
+    suggest_indexes,
+)
+
+
+class MongoIndexesTestCase(TestCase):
+    def setUp(self):
+        settings.MONGO_DB.instances.drop()
+        self.collection = settings.MONGO_DB.instances
+
+    def test_create_missing_indexes(self):
+        assert get_missing_indexes(self.collection) == REQUIRED_INDEXES
+        assert sorted(create_missing_indexes(self.collection)) == sorted(
+            REQUIRED_INDEXES
+        )
+        assert get_missing_indexes(self.collection) == {}
+        # Idempotent
+        assert create_missing_indexes(self.collection) == []
+
+    def test_existing_index_with_other_name_serves_required_index(self):
+        self.collection.create_index(
+            [('_userform_id', 1), ('_uuid', 1), ('_id', 1)], name='legacy'
+        )
+        assert 'kpi_userform_uuid' not in get_missing_indexes(self.collection)
+
+    @override_settings(TESTING=False, MONGO_AUTO_CREATE_INDEXES=False)
+    def test_check_warns_about_missing_indexes(self):
+        warnings = check_required_indexes(None)
+        assert len(warnings) == 1
+        assert warnings[0].id == 'KPI.W002'
+        create_missing_indexes(self.collection)
+        assert check_required_indexes(None) == []
+
+    @override_settings(TESTING=False, MONGO_AUTO_CREATE_INDEXES=True)
+    def test_check_creates_missing_indexes(self):
+        assert check_required_indexes(None) == []
+        assert get_missing_indexes(self.collection) == {}
+
+    def test_command_dry_run(self):
+        out = StringIO()
+        call_command('mongo_indexes', dry_run=True, stdout=out)
+        for name in REQUIRED_INDEXES:
+            assert f'Missing index `{name}`' in out.getvalue()
+        assert get_missing_indexes(self.collection) == REQUIRED_INDEXES
+
+        call_command('mongo_indexes', stdout=out)
+        assert get_missing_indexes(self.collection) == {}
+
+    def test_get_query_shape(self):
+        query = {
+            '$and': [
+                {'_userform_id': 'someuser_form'},
+                {
+                    '$or': [
+                        {'_submitted_by': 'someuser'},
+                        {'_submitted_by': 'anotheruser'},
+                    ]
+                },
+            ],
+            'q1': {'$in': ['a', 'b']},
+            '_submission_time': {'$gte': '2024-01-01'},
+        }
+        assert get_query_shape(query, {'_id': -1}) == (
+            ('_userform_id', 'q1'),
+            (('_id', -1),),
+            ('_submission_time',),
+        )
+
+    def test_suggest_indexes(self):
+        create_missing_indexes(self.collection)
+        slow_queries = [
+            {
+                'filter': {
+                    '_userform_id': 'someuser_form',
+                    'q1': 'yes',
+                    '_submission_time': {'$lt': '2024-01-01'},
+                },
+                'sort': {'_id': 1},
+                'millis': millis,
+                'inefficient': True,
+            }
+            for millis in (200, 300)
+        ] + [
+            # Served by a required index
+            {
+                'filter': {'_userform_id': 'someuser_form', '_uuid': 'abc'},
+                'sort': None,
+                'millis': 1000,
+                'inefficient': True,
+            },
+            {
+                'filter': {'_userform_id': 'someuser_form', 'q2': 'no'},
+                'sort': None,
+                'millis': 150,
+                'inefficient': False,
+            },
+        ]
+        suggestions = suggest_indexes(self.collection, slow_queries)
+        assert len(suggestions) == 1
+        assert suggestions[0]['keys'] == [
+            ('_userform_id', 1),
+            ('q1', 1),
+            ('_id', 1),
+            ('_submission_time', 1),
+        ]
+        assert suggestions[0]['count'] == 2
+        assert suggestions[0]['millis'] == 500
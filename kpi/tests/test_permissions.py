@@ -1,7 +1,9 @@
 # coding: utf-8
 import unittest
 from django.contrib.auth.models import User, AnonymousUser
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from kpi.constants import (
     ASSET_TYPE_COLLECTION,
@@ -862,3 +864,77 @@ class PermissionsTestCase(BasePermissionsTestCase):
         self.assertTrue(grantee.has_perm(PERM_VIEW_SUBMISSIONS, asset))
         self.assertTrue(asset.get_perms(grantee),
                         asset.get_perms(anonymous_user))
+
+    def test_assign_and_remove_perms_in_bulk(self):
+        asset = self.admin_asset
+        partial_perms = {
+            PERM_VIEW_SUBMISSIONS: [{
+                '_submitted_by': self.anotheruser.username
+            }]
+        }
+        asset.assign_perms_bulk([
+            (self.someuser, PERM_PARTIAL_SUBMISSIONS, partial_perms),
+            (self.anotheruser, PERM_CHANGE_SUBMISSIONS),
+        ])
+        self.assertTrue(self.someuser.has_perm(PERM_PARTIAL_SUBMISSIONS, asset))
+        self.assertTrue(self.someuser.has_perm(PERM_VIEW_ASSET, asset))
+        self.assertTrue(
+            asset.asset_partial_permissions.filter(user=self.someuser).exists()
+        )
+        # Implied permissions are assigned too
+        self.assertTrue(self.anotheruser.has_perm(PERM_VIEW_SUBMISSIONS, asset))
+        self.assertTrue(self.anotheruser.has_perm(PERM_VIEW_ASSET, asset))
+
+        asset.remove_perms_bulk([
+            (self.someuser, PERM_PARTIAL_SUBMISSIONS),
+            (self.anotheruser, PERM_VIEW_ASSET),
+        ])
+        self.assertFalse(
+            self.someuser.has_perm(PERM_PARTIAL_SUBMISSIONS, asset)
+        )
+        self.assertFalse(asset.asset_partial_permissions.exists())
+        # Revoking `view_asset` revokes everything that implies it
+        self.assertFalse(
+            self.anotheruser.has_perm(PERM_CHANGE_SUBMISSIONS, asset)
+        )
+        self.assertFalse(self.anotheruser.has_perm(PERM_VIEW_ASSET, asset))
+
+    def test_remove_inherited_perms_in_bulk(self):
+        self.admin_collection.children.add(self.admin_asset)
+        self.admin_collection.assign_perm(self.someuser, PERM_CHANGE_ASSET)
+        self.assertTrue(
+            self.someuser.has_perm(PERM_CHANGE_ASSET, self.admin_asset)
+        )
+        self.admin_asset.remove_perms_bulk([(self.someuser, PERM_VIEW_ASSET)])
+        self.assertFalse(
+            self.someuser.has_perm(PERM_VIEW_ASSET, self.admin_asset)
+        )
+        self.assertFalse(
+            self.someuser.has_perm(PERM_CHANGE_ASSET, self.admin_asset)
+        )
+        # Deny permissions block inheritance from the parent
+        self.assertTrue(
+            self.admin_asset.permissions.filter(
+                user=self.someuser, deny=True
+            ).exists()
+        )
+
+    def test_bulk_perms_query_count_does_not_depend_on_user_count(self):
+        asset = self.admin_asset
+
+        def get_query_counts(user_count):
+            users = [
+                User.objects.create(username=f'bulk_user_{user_count}_{i}')
+                for i in range(user_count)
+            ]
+            with CaptureQueriesContext(connection) as assign_queries:
+                asset.assign_perms_bulk(
+                    [(user, PERM_CHANGE_SUBMISSIONS) for user in users]
+                )
+            with CaptureQueriesContext(connection) as remove_queries:
+                asset.remove_perms_bulk(
+                    [(user, PERM_VIEW_ASSET) for user in users]
+                )
+            return len(assign_queries), len(remove_queries)
+
+        self.assertEqual(get_query_counts(3), get_query_counts(300))
@@ -0,0 +1,153 @@
+# coding: utf-8
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.test import TestCase
+
+from kpi.constants import (
+    ASSET_TYPE_COLLECTION,
+    ASSET_TYPE_TEMPLATE,
+    PERM_CHANGE_ASSET,
+    PERM_DISCOVER_ASSET,
+    PERM_VIEW_ASSET,
+)
+from kpi.models import Asset, UserAssetAccess, UserAssetSubscription
+
+
+class UserAssetAccessTestCase(TestCase):
+    fixtures = ['test_data']
+
+    def setUp(self):
+        self.someuser = User.objects.get(username='someuser')
+        self.anotheruser = User.objects.get(username='anotheruser')
+        self.collection = Asset.objects.create(
+            asset_type=ASSET_TYPE_COLLECTION,
+            name='public collection',
+            owner=self.someuser,
+        )
+        self.child = Asset.objects.create(
+            asset_type=ASSET_TYPE_TEMPLATE,
+            name='public asset',
+            owner=self.someuser,
+            parent=self.collection,
+        )
+
+    def _get_accesses(self, user, via_subscription=False):
+        return set(
+            UserAssetAccess.objects.filter(
+                user=user, via_subscription=via_subscription
+            ).values_list('asset_id', flat=True)
+        )
+
+    def test_owner_and_explicitly_shared_assets(self):
+        self.assertEqual(
+            self._get_accesses(self.someuser),
+            {self.collection.pk, self.child.pk},
+        )
+        self.assertEqual(self._get_accesses(self.anotheruser), set())
+
+        # Inherited permissions are indexed too
+        self.collection.assign_perm(self.anotheruser, PERM_CHANGE_ASSET)
+        self.assertEqual(
+            self._get_accesses(self.anotheruser),
+            {self.collection.pk, self.child.pk},
+        )
+
+        self.collection.remove_perm(self.anotheruser, PERM_VIEW_ASSET)
+        self.assertEqual(self._get_accesses(self.anotheruser), set())
+
+    def test_refresh_only_on_permission_changes(self):
+        with patch.object(UserAssetAccess, 'refresh_tree') as refresh_tree:
+            # Renaming does not change permissions
+            self.child.name = 'renamed'
+            self.child.save()
+            refresh_tree.assert_not_called()
+
+            # Moving to another collection changes inherited permissions
+            other_collection = Asset.objects.create(
+                asset_type=ASSET_TYPE_COLLECTION,
+                name='other collection',
+                owner=self.someuser,
+            )
+            refresh_tree.reset_mock()
+            self.child.parent = other_collection
+            self.child.save()
+            refresh_tree.assert_called_with(self.child)
+
+            refresh_tree.reset_mock()
+            self.child.assign_perm(self.anotheruser, PERM_VIEW_ASSET)
+            refresh_tree.assert_called_with(self.child)
+
+    def test_save_compares_with_tracked_parent_and_owner(self):
+        child = Asset.objects.get(pk=self.child.pk)
+        assert child._get_tracked_parent_and_owner() == (
+            self.collection.pk,
+            self.someuser.pk,
+        )
+        with patch.object(UserAssetAccess, 'refresh_tree') as refresh_tree:
+            child.parent = None
+            child.save()
+            refresh_tree.assert_called_with(child)
+
+            # Tracked values are updated on save
+            assert child._get_tracked_parent_and_owner() == (
+                None,
+                self.someuser.pk,
+            )
+            refresh_tree.reset_mock()
+            child.save()
+            refresh_tree.assert_not_called()
+
+        # Deferred fields are not tracked, the database is queried instead
+        child = Asset.objects.only('pk', 'uid').get(pk=self.child.pk)
+        assert child._get_tracked_parent_and_owner() is None
+
+    def test_subscribed_collections(self):
+        self.collection.assign_perm(AnonymousUser(), PERM_DISCOVER_ASSET)
+        subscription = UserAssetSubscription.objects.create(
+            asset=self.collection, user=self.anotheruser
+        )
+        self.assertEqual(
+            self._get_accesses(self.anotheruser, via_subscription=True),
+            {self.collection.pk, self.child.pk},
+        )
+
+        # Subscriptions to collections which are not public anymore are
+        # ignored
+        self.collection.remove_perm(AnonymousUser(), PERM_VIEW_ASSET)
+        self.assertEqual(
+            self._get_accesses(self.anotheruser, via_subscription=True), set()
+        )
+
+        self.collection.assign_perm(AnonymousUser(), PERM_DISCOVER_ASSET)
+        self.assertEqual(
+            self._get_accesses(self.anotheruser, via_subscription=True),
+            {self.collection.pk, self.child.pk},
+        )
+        subscription.delete()
+        self.assertEqual(
+            self._get_accesses(self.anotheruser, via_subscription=True), set()
+        )
+
+    def test_rebuild_command(self):
+        self.collection.assign_perm(AnonymousUser(), PERM_DISCOVER_ASSET)
+        UserAssetSubscription.objects.create(
+            asset=self.collection, user=self.anotheruser
+        )
+        expected = set(
+            UserAssetAccess.objects.values_list(
+                'user_id', 'asset_id', 'via_subscription'
+            )
+        )
+        UserAssetAccess.objects.all().delete()
+
+        call_command('rebuild_user_asset_access', verbosity=0)
+        self.assertEqual(
+            set(
+                UserAssetAccess.objects.values_list(
+                    'user_id', 'asset_id', 'via_subscription'
+                )
+            ),
+            expected,
+        )
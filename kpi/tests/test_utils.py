@@ -4,10 +4,13 @@ import re
 from copy import deepcopy
 
 import pytest
+import requests
+import responses
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from kpi.exceptions import (
     SearchQueryTooShortException,
@@ -16,6 +19,17 @@ from kpi.exceptions import (
 from kpi.models.asset import Asset
 from kpi.utils.autoname import autoname_fields, autoname_fields_to_field
 from kpi.utils.autoname import autovalue_choices_in_place
+from kpi.utils.enketo import (
+    ENKETO_UNAVAILABLE_CACHE_KEY,
+    cache_enketo_links,
+    enketo_request,
+    get_cached_enketo_links,
+    get_enketo_session,
+    is_enketo_outage,
+    is_enketo_unavailable,
+    mark_enketo_unavailable,
+    void_cached_enketo_links,
+)
 from kpi.utils.pyxform_compatibility import allow_choice_duplicates
 from kpi.utils.query_parser import parse
 from kpi.utils.sluggify import sluggify, sluggify_label
@@ -305,6 +319,80 @@ class UtilsTestCase(TestCase):
         )
 
 
+class EnketoUtilsTestCase(TestCase):
+
+    server_url = 'http://kc.mock/someuser'
+
+    def setUp(self):
+        cache.delete(ENKETO_UNAVAILABLE_CACHE_KEY)
+        void_cached_enketo_links(self.server_url, 'a1b2c3')
+
+    @responses.activate
+    def test_enketo_request_uses_shared_session(self):
+        responses.add(
+            responses.POST,
+            f'{settings.ENKETO_URL}/{settings.ENKETO_SURVEY_ENDPOINT}',
+            json={'url': 'http://enketo.mock/x/a1b2c3'},
+            status=201,
+        )
+        assert get_enketo_session() is get_enketo_session()
+        response = enketo_request(
+            'POST', settings.ENKETO_SURVEY_ENDPOINT, data={'form_id': 'a1b2c3'}
+        )
+        assert response.json() == {'url': 'http://enketo.mock/x/a1b2c3'}
+        assert responses.calls[0].request.headers['Authorization']
+
+    def test_cached_enketo_links(self):
+        links = {'url': 'http://enketo.mock/x/a1b2c3'}
+        assert get_cached_enketo_links(self.server_url, 'a1b2c3') is None
+        cache_enketo_links(self.server_url, 'a1b2c3', links)
+        assert get_cached_enketo_links(self.server_url, 'a1b2c3') == links
+        # Links of another endpoint are cached separately
+        assert (
+            get_cached_enketo_links(
+                self.server_url,
+                'a1b2c3',
+                endpoint=settings.ENKETO_PREVIEW_ENDPOINT,
+            )
+            is None
+        )
+        void_cached_enketo_links(self.server_url, 'a1b2c3')
+        assert get_cached_enketo_links(self.server_url, 'a1b2c3') is None
+
+    def test_cached_enketo_links_follow_settings(self):
+        links = {'url': 'http://enketo.mock/x/a1b2c3'}
+        with override_settings(ENKETO_SURVEY_ENDPOINT='api/v2/survey/other'):
+            cache_enketo_links(self.server_url, 'a1b2c3', links)
+            assert get_cached_enketo_links(self.server_url, 'a1b2c3') == links
+        assert get_cached_enketo_links(self.server_url, 'a1b2c3') is None
+
+    @responses.activate
+    def test_is_enketo_outage(self):
+        for status_code, outage in ((400, False), (404, False), (503, True)):
+            endpoint = f'api/v2/mock/{status_code}'
+            responses.add(
+                responses.POST,
+                f'{settings.ENKETO_URL}/{endpoint}',
+                status=status_code,
+            )
+            response = enketo_request('POST', endpoint)
+            with pytest.raises(requests.exceptions.HTTPError) as e:
+                response.raise_for_status()
+            assert is_enketo_outage(e.value) is outage
+
+        assert is_enketo_outage(requests.exceptions.ConnectionError())
+        assert is_enketo_outage(requests.exceptions.ReadTimeout())
+
+    def test_mark_enketo_unavailable(self):
+        with override_settings(ENKETO_UNAVAILABLE_CACHE_TIMEOUT=0):
+            mark_enketo_unavailable()
+            assert not is_enketo_unavailable()
+
+        with override_settings(ENKETO_UNAVAILABLE_CACHE_TIMEOUT=30):
+            mark_enketo_unavailable()
+            assert is_enketo_unavailable()
+
+
 class XmlUtilsTestCase(TestCase):
 
     def setUp(self):
@@ -0,0 +1,164 @@
+# coding: utf-8
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from typing import Callable
+
+import pytest
+from django.conf import settings
+from django.db import connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+from kpi.utils.log import logging
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'benchmarks', 'baseline.json'
+)
+# Results of the current run, never written to `BASELINE_PATH`
+OUTPUT_PATH = os.getenv(
+    'KPI_BENCHMARK_OUTPUT',
+    os.path.join(tempfile.gettempdir(), 'kpi_benchmarks.json'),
+)
+# Durations and memory vary from a machine to another, query counts do not
+DURATION_TOLERANCE = float(os.getenv('KPI_BENCHMARK_DURATION_TOLERANCE', 1.5))
+MEMORY_TOLERANCE = float(os.getenv('KPI_BENCHMARK_MEMORY_TOLERANCE', 1.2))
+
+
+class BenchmarkMixin:
+    """
+    Measure hot paths and compare them against the stored baseline (see
+    `BASELINE_PATH`).
+
+    Results are written to `OUTPUT_PATH`, never to the baseline. To update
+    the baseline, e.g. after an intended change, run the benchmarks on the
+    reference environment and copy their results over it:
+
+        pytest -m performance kpi/tests/benchmarks
+        cp /tmp/kpi_benchmarks.json kpi/tests/benchmarks/baseline.json
+
+    Benchmarks without a baseline entry are skipped once measured.
+    """
+
+    BENCHMARK_ROUNDS = 5
+
+    # Count queries sent to every database, KoBoCAT's included
+    databases = '__all__'
+
+    def benchmark(self, name: str, func: Callable, rounds: int = None):
+        """
+        Run `func` and check its duration (median of `rounds` runs), its
+        number of queries and its peak memory allocation against the baseline
+        of `name`.
+
+        The first run, which also warms up caches, is the one measured for
+        queries and memory. `tracemalloc` slows execution down, therefore
+        durations are measured by the other runs. Changes made by each run
+        are rolled back, to let all of them do the same work.
+        """
+        rounds = rounds or self.BENCHMARK_ROUNDS
+
+        with self._benchmark_round(), ExitStack() as stack:
+            query_contexts = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in self.databases
+            ]
+            tracemalloc.start()
+            try:
+                func()
+                _, peak_memory = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        durations = []
+        for _ in range(rounds):
+            with self._benchmark_round():
+                start = time.perf_counter()
+                func()
+                durations.append(time.perf_counter() - start)
+
+        result = {
+            'duration': round(statistics.median(durations), 4),
+            'queries': sum(
+                len(query_context) for query_context in query_contexts
+            ),
+            'peak_memory': peak_memory,
+        }
+        _save_result(name, result)
+        self._compare_with_baseline(name, result)
+        return result
+
+    @contextmanager
+    def _benchmark_round(self):
+        """
+        Roll back changes made to the databases and to MongoDB by one run
+        """
+        submissions = list(settings.MONGO_DB.instances.find())
+        with ExitStack() as stack:
+            for alias in self.databases:
+                stack.enter_context(transaction.atomic(using=alias))
+            try:
+                yield
+            finally:
+                for alias in self.databases:
+                    transaction.set_rollback(True, using=alias)
+
+        settings.MONGO_DB.instances.drop()
+        if submissions:
+            settings.MONGO_DB.instances.insert_many(submissions)
+
+    @staticmethod
+    def _compare_with_baseline(name: str, result: dict):
+        expected = _load_baseline().get(name)
+        logging.info(
+            f'[benchmark] {name}: '
+            f"{result['duration'] * 1000:.1f} ms, "
+            f"{result['queries']} queries, "
+            f"{result['peak_memory'] / 1024:.0f} KiB"
+        )
+
+        if expected is None:
+            pytest.skip(
+                f'{name}: no baseline in {BASELINE_PATH}. Results of this '
+                f'run are in {OUTPUT_PATH}'
+            )
+        assert result['queries'] <= expected['queries'], (
+            f"{name}: {result['queries']} queries, "
+            f"expected at most {expected['queries']}"
+        )
+        assert (
+            result['duration'] <= expected['duration'] * DURATION_TOLERANCE
+        ), (
+            f"{name}: {result['duration']}s, "
+            f"baseline is {expected['duration']}s"
+        )
+        assert (
+            result['peak_memory'] <= expected['peak_memory'] * MEMORY_TOLERANCE
+        ), (
+            f"{name}: {result['peak_memory']} bytes allocated, "
+            f"baseline is {expected['peak_memory']} bytes"
+        )
+
+
+def _load_baseline() -> dict:
+    try:
+        with open(BASELINE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_result(name: str, result: dict):
+    try:
+        with open(OUTPUT_PATH) as f:
+            results = json.load(f)
+    except FileNotFoundError:
+        results = {}
+
+    results[name] = result
+    with open(OUTPUT_PATH, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -0,0 +1,133 @@
+# coding: utf-8
+from __future__ import annotations
+
+import hashlib
+from functools import lru_cache
+from typing import Optional
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+ENKETO_UNAVAILABLE_CACHE_KEY = 'enketo_unavailable'
+
+
+def cache_enketo_links(
+    server_url: str,
+    form_id: str,
+    links: dict,
+    endpoint: Optional[str] = None,
+    timeout: Optional[int] = None,
+):
+    """
+    Cache `links` returned by Enketo `endpoint` (survey endpoint by default)
+    for `form_id` of `server_url`
+    """
+    if timeout is None:
+        timeout = settings.ENKETO_LINKS_CACHE_TIMEOUT
+    if timeout:
+        cache.set(
+            _get_links_cache_key(server_url, form_id, endpoint), links, timeout
+        )
+
+
+def enketo_request(method: str, endpoint: str, **kwargs) -> requests.Response:
+    """
+    Send a request to Enketo API `endpoint` with the shared session.
+    `kwargs` are passed through to `requests.Session.request()`.
+    """
+    kwargs.setdefault(
+        'timeout',
+        (
+            settings.ENKETO_REQUEST_CONNECT_TIMEOUT,
+            settings.ENKETO_REQUEST_READ_TIMEOUT,
+        ),
+    )
+    return get_enketo_session().request(
+        method,
+        f'{settings.ENKETO_URL}/{endpoint}',
+        # bare tuple implies basic auth
+        auth=(settings.ENKETO_API_TOKEN, ''),
+        **kwargs,
+    )
+
+
+def get_cached_enketo_links(
+    server_url: str,
+    form_id: str,
+    endpoint: Optional[str] = None,
+) -> Optional[dict]:
+    return cache.get(_get_links_cache_key(server_url, form_id, endpoint))
+
+
+@lru_cache(maxsize=None)
+def get_enketo_session() -> requests.Session:
+    """
+    Return the session shared by all requests to Enketo, to reuse their
+    connections
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=settings.ENKETO_SESSION_POOL_MAXSIZE
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def is_enketo_unavailable() -> bool:
+    """
+    Return whether a recent request to Enketo has failed, see
+    `mark_enketo_unavailable()`
+    """
+    return bool(
+        settings.ENKETO_UNAVAILABLE_CACHE_TIMEOUT
+        and cache.get(ENKETO_UNAVAILABLE_CACHE_KEY)
+    )
+
+
+def is_enketo_outage(error: requests.exceptions.RequestException) -> bool:
+    """
+    Return whether `error` means that Enketo itself is unavailable, i.e. it
+    cannot be reached, it timed out or it answered with a server error.
+    Client errors (4xx) only concern the request which raised them.
+    """
+    if isinstance(
+        error,
+        (requests.exceptions.ConnectionError, requests.exceptions.Timeout),
+    ):
+        return True
+
+    return (
+        isinstance(error, requests.exceptions.HTTPError)
+        and error.response is not None
+        and error.response.status_code >= 500
+    )
+
+
+def mark_enketo_unavailable():
+    """
+    Skip requests to Enketo for `settings.ENKETO_UNAVAILABLE_CACHE_TIMEOUT`
+    seconds, to let pages which only display Enketo links degrade quickly
+    instead of waiting for a timeout on each request
+    """
+    if timeout := settings.ENKETO_UNAVAILABLE_CACHE_TIMEOUT:
+        cache.set(ENKETO_UNAVAILABLE_CACHE_KEY, True, timeout)
+
+
+def void_cached_enketo_links(
+    server_url: str,
+    form_id: str,
+    endpoint: Optional[str] = None,
+):
+    cache.delete(_get_links_cache_key(server_url, form_id, endpoint))
+
+
+def _get_links_cache_key(
+    server_url: str, form_id: str, endpoint: Optional[str] = None
+) -> str:
+    if endpoint is None:
+        endpoint = settings.ENKETO_SURVEY_ENDPOINT
+    hash_ = hashlib.md5(f'{server_url}|{form_id}'.encode()).hexdigest()
+    return f'enketo_links:{endpoint}:{hash_}'
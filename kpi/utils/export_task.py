@@ -1,4 +1,10 @@
 # coding: utf-8
+from formpack.constants import VALID_EXPORT_TYPES as FORMPACK_EXPORT_TYPES
+
+from kpi.constants import EXPORT_TYPE_PARQUET
+
+VALID_EXPORT_TYPES = [*FORMPACK_EXPORT_TYPES, EXPORT_TYPE_PARQUET]
+
 
 def format_exception_values(values: list, sep: str = 'or') -> str:
     return "{} {} '{}'".format(
@@ -0,0 +1,167 @@
+# coding: utf-8
+from __future__ import annotations
+
+from typing import Generator, Iterable, Optional
+
+import formpack
+
+from kobo.apps.reports.report_data import build_formpack
+from kpi.constants import GEO_QUESTION_TYPES
+from kpi.utils.absolute_paths import insert_full_paths_in_place
+
+# Coordinates (`[latitude, longitude]`) of the first geopoint answered in a
+# submission, stored by KoBoCAT
+GEOLOCATION_FIELD = '_geolocation'
+
+
+def filter_submissions_by_bbox(
+    submission_stream: Iterable[dict], xpaths: Iterable[str], bbox: tuple
+) -> Generator[dict, None, None]:
+    """
+    Yield the submissions of `submission_stream` which have at least one
+    point of the geographic question stored at one of `xpaths` inside `bbox`
+    """
+    for submission in submission_stream:
+        if any(_is_in_bbox(submission.get(xpath), bbox) for xpath in xpaths):
+            yield submission
+
+
+def get_bbox_query(bbox: tuple) -> dict:
+    """
+    Return a Mongo query matching submissions whose `_geolocation` is inside
+    `bbox`. `bbox` follows the GeoJSON order, i.e. `(west, south, east,
+    north)`.
+    """
+    west, south, east, north = bbox
+    query = {f'{GEOLOCATION_FIELD}.0': {'$gte': south, '$lte': north}}
+    if west <= east:
+        query[f'{GEOLOCATION_FIELD}.1'] = {'$gte': west, '$lte': east}
+    else:
+        # `bbox` crosses the antimeridian
+        query['$or'] = [
+            {f'{GEOLOCATION_FIELD}.1': {'$gte': west}},
+            {f'{GEOLOCATION_FIELD}.1': {'$lte': east}},
+        ]
+    return query
+
+
+def get_geo_questions(
+    versions: Iterable['kpi.models.AssetVersion'],
+) -> list[list[dict]]:
+    """
+    Return, for each of `versions`, its geographic questions in order, as
+    dictionaries with their `name`, `xpath` and `type`. Questions inside
+    repeat groups are left out: they cannot populate the geometry of a
+    feature.
+    """
+    geo_questions = []
+    for version in versions:
+        content = version.to_formpack_schema()['content']
+        insert_full_paths_in_place(content)
+        repeat_depth = 0
+        version_geo_questions = []
+        for row in content.get('survey', []):
+            type_ = row.get('type')
+            if type_ == 'begin_repeat':
+                repeat_depth += 1
+            elif type_ == 'end_repeat':
+                repeat_depth -= 1
+            elif not repeat_depth and type_ in GEO_QUESTION_TYPES:
+                version_geo_questions.append(
+                    {
+                        'name': row.get('name'),
+                        'xpath': row.get('$xpath'),
+                        'type': type_,
+                    }
+                )
+        geo_questions.append(version_geo_questions)
+    return geo_questions
+
+
+def get_geojson_stream(
+    asset: 'kpi.models.Asset',
+    submission_stream: Iterable[dict],
+    geo_question_name: Optional[str] = None,
+    fields: Optional[list] = None,
+) -> Generator[str, None, None]:
+    """
+    Return a generator of the chunks of the GeoJSON `FeatureCollection` of
+    `submission_stream`, where each submission is a feature. Submissions are
+    consumed one at a time.
+
+    If `geo_question_name` is not provided, the first geographic question of
+    the latest version of the form populates the geometries. If `fields`
+    (XPaths) is provided, the properties of the features are limited to them.
+    """
+    pack, submission_stream = build_formpack(asset, submission_stream)
+    # Right now, we're more-or-less mirroring the JSON renderer. In the
+    # future, we could expose more export options (e.g. label language)
+    export = pack.export(
+        versions=pack.versions.keys(),
+        group_sep='/',
+        lang=formpack.constants.UNSPECIFIED_TRANSLATION,
+        hierarchy_in_labels=True,
+        filter_fields=fields or [],
+    )
+    if not geo_question_name:
+        # No geo question specified; use the first one in the latest
+        # version of the form
+        latest_version = next(reversed(list(pack.versions.values())))
+        first_section = next(iter(latest_version.sections.values()))
+        geo_questions = (
+            field
+            for field in first_section.fields.values()
+            if field.data_type in GEO_QUESTION_TYPES
+        )
+        try:
+            geo_question_name = next(geo_questions).name
+        except StopIteration:
+            # formpack will gracefully return an empty `features` array
+            geo_question_name = None
+
+    return export.to_geojson(
+        submission_stream, geo_question_name=geo_question_name
+    )
+
+
+def parse_bbox(value: str) -> tuple:
+    """
+    Parse a bounding box formatted as `west,south,east,north`, in decimal
+    degrees. Raise `ValueError` if `value` is not valid.
+    """
+    west, south, east, north = (float(coord) for coord in value.split(','))
+    if not (
+        -180 <= west <= 180
+        and -180 <= east <= 180
+        and -90 <= south <= north <= 90
+    ):
+        raise ValueError(value)
+    return west, south, east, north
+
+
+def _get_points(value: Optional[str]) -> Generator[tuple, None, None]:
+    """
+    Yield the `(latitude, longitude)` of each point of a geopoint, geotrace
+    or geoshape answer, e.g. `'45.5 -73.6 0 0;45.6 -73.5 0 0'`
+    """
+    if not isinstance(value, str):
+        return
+    for point in value.split(';'):
+        try:
+            latitude, longitude = point.split()[:2]
+            yield float(latitude), float(longitude)
+        except ValueError:
+            continue
+
+
+def _is_in_bbox(value: Optional[str], bbox: tuple) -> bool:
+    west, south, east, north = bbox
+    for latitude, longitude in _get_points(value):
+        if not south <= latitude <= north:
+            continue
+        if west <= east:
+            if west <= longitude <= east:
+                return True
+        elif longitude >= west or longitude <= east:
+            return True
+    return False
@@ -3,6 +3,8 @@ import hashlib
 from typing import Union, BinaryIO, Optional
 
 import requests
+from django.conf import settings
+from django.core.cache import cache
 
 
 def calculate_hash(
@@ -19,7 +21,8 @@ def calculate_hash(
     - `Last-Modified`
     - `Content-Length`
     If none of them work, it falls back to the URL itself. Moreover, the hash is
-    suffixed with a keyword related to the detected header.
+    suffixed with a keyword related to the detected header. Hashes built from
+    headers are cached for `settings.REMOTE_FILE_HASH_CACHE_TIMEOUT` seconds.
     For example:
         - `ETag` => `aaaa1111111-etag`
         - `Last-Modified` => `aaaa1111111-last-modified`
@@ -66,6 +69,15 @@ def calculate_hash(
     if not source.startswith('http'):
         return _finalize_hash(source)
 
+    # Hashes of remote files are cached, failures are not
+    cache_timeout = settings.REMOTE_FILE_HASH_CACHE_TIMEOUT
+    cache_key = (
+        f'remote_file_hash:{algorithm}:{int(prefix)}:'
+        f'{hashlib.md5(source.encode()).hexdigest()}'
+    )
+    if cache_timeout and (hash_ := cache.get(cache_key)):
+        return hash_
+
     # Ensure we do not receive a gzip response to be able to read headers such
     # as `Content-Length`
     headers = {'Accept-Encoding': 'identity'}
@@ -80,27 +92,19 @@ def calculate_hash(
     except KeyError:
         return _finalize_hash(source, 'url')
 
-    try:
-        etag = response.headers['ETag']
-    except KeyError:
-        pass
-    else:
-        return _finalize_hash(f'{content_type}:{etag}', 'etag')
-
-    try:
-        last_modified = response.headers['Last-Modified']
-    except KeyError:
-        pass
-    else:
-        return _finalize_hash(f'{content_type}:{last_modified}', 'last-modified')
+    for header, suffix in (
+        ('ETag', 'etag'),
+        ('Last-Modified', 'last-modified'),
+        ('Content-Length', 'length'),
+    ):
+        try:
+            value = response.headers[header]
+        except KeyError:
+            continue
 
-    try:
-        content_length = response.headers['Content-Length']
-    except KeyError:
-        pass
-    else:
-        return _finalize_hash(f'{content_type}:{content_length}', 'length')
+        hash_ = _finalize_hash(f'{content_type}:{value}', suffix)
+        if cache_timeout:
+            cache.set(cache_key, hash_, cache_timeout)
+        return hash_
 
     return _finalize_hash(source, 'url')
-
-
@@ -4,11 +4,14 @@ import copy
 import re
 from abc import ABC
 from collections import defaultdict
+from itertools import islice
+from typing import Callable, Generator, Optional
 from urllib.parse import urlparse
 
 from django.apps import apps
 from django.conf import settings
-from django.db import models
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
 from django.urls import Resolver404, resolve
 from taggit.models import Tag, TaggedItem
 
@@ -17,9 +20,23 @@ from kpi.constants import ASSET_TYPE_COLLECTION
 TAG_RE = r'tag:(.*)'
 
 
-def _load_library_content(structure):
+def _load_library_content(
+    structure: dict,
+    progress: Optional[dict] = None,
+    save_progress: Optional[Callable] = None,
+):
+    """
+    Create a collection containing one asset per question or block of the
+    "library" sheet of `structure['content']`.
+
+    Assets are created by batches of `settings.IMPORT_TASK_BATCH_SIZE`.
+    `progress` is updated after each batch and passed to `save_progress()`,
+    if any, to let a failed import resume from its last completed batch by
+    passing the same `progress` again.
+    """
 
     Asset = apps.get_model('kpi', 'Asset')  # noqa
+    AssetVersion = apps.get_model('kpi', 'AssetVersion')  # noqa
 
     content = structure.get('content', {})
     if 'library' not in content:
@@ -59,33 +76,82 @@ def _load_library_content(structure):
             new_tag, created = Tag.objects.get_or_create(name=new_tag_name)
             tag_name_to_pk[new_tag_name] = new_tag.pk
 
-    collection_name = structure['name']
-    if not collection_name:
-        collection_name = 'Collection'
+    if progress is None:
+        progress = {}
 
-    collection = Asset.objects.create(
-        asset_type=ASSET_TYPE_COLLECTION, owner=structure['owner'],
-        name=collection_name
-    )
+    collection = None
+    if collection_uid := progress.get('collection'):
+        # Resume a previous import, see `ImportTask.resume()`
+        collection = Asset.objects.filter(uid=collection_uid).first()
 
-    for block_name, rows in grouped.items():
-        if block_name is None:
-            for (row, row_tags) in rows:
-                scontent = copy.deepcopy(content)
-                scontent['survey'] = [row]
-                sa = Asset.objects.create(
-                    content=scontent,
-                    asset_type='question',
+    if collection is None:
+        collection_name = structure['name']
+        if not collection_name:
+            collection_name = 'Collection'
+
+        collection = Asset.objects.create(
+            asset_type=ASSET_TYPE_COLLECTION, owner=structure['owner'],
+            name=collection_name
+        )
+        progress.update({'collection': collection.uid, 'imported': 0})
+
+    # Items are built lazily, one batch at a time, to avoid holding a copy of
+    # the whole library content per item in memory. Items imported by a
+    # previous attempt are skipped.
+    items = islice(
+        _get_library_items(content, grouped), progress['imported'], None
+    )
+    asset_content_type = ContentType.objects.get_for_model(Asset)
+    while batch := list(islice(items, settings.IMPORT_TASK_BATCH_SIZE)):
+        with transaction.atomic():
+            assets = []
+            tagged_items = []
+            for asset_kwargs, item_tags in batch:
+                # Versions are created in bulk below. Assets are still saved
+                # one by one because `Asset.save()` adjusts their content
+                sa = Asset(
                     owner=structure['owner'],
                     parent=collection,
+                    **asset_kwargs,
+                )
+                sa.save(
+                    force_insert=True,
+                    create_version=False,
                     update_parent_languages=False,
                 )
+                assets.append(sa)
                 created_asset_pks.append(sa.pk)
-                for tag_name in row_tags:
-                    ti = TaggedItem.objects.create(
-                        tag_id=tag_name_to_pk[tag_name],
-                        content_object=sa
+                for tag_name in item_tags:
+                    tagged_items.append(
+                        TaggedItem(
+                            tag_id=tag_name_to_pk[tag_name],
+                            content_type=asset_content_type,
+                            object_id=sa.pk,
+                        )
                     )
+            AssetVersion.bulk_create_for(assets)
+            TaggedItem.objects.bulk_create(tagged_items)
+            progress['imported'] += len(batch)
+            if save_progress:
+                save_progress(progress)
+
+    # To improve performance, we deferred this until the end using
+    # `update_parent_languages=False`
+    collection.update_languages()
+    return collection
+
+
+def _get_library_items(content: dict, grouped: dict) -> Generator:
+    """
+    Yield the keyword arguments and the tags of each asset of a library: one
+    question per row without block, one block per group of rows
+    """
+    for block_name, rows in grouped.items():
+        if block_name is None:
+            for (row, row_tags) in rows:
+                scontent = copy.deepcopy(content)
+                scontent['survey'] = [row]
+                yield {'content': scontent, 'asset_type': 'question'}, row_tags
         else:
             block_rows = []
             block_tags = set()
@@ -95,25 +161,11 @@ def _load_library_content(structure):
                 block_rows.append(row)
             scontent = copy.deepcopy(content)
             scontent['survey'] = block_rows
-            sa = Asset.objects.create(
-                content=scontent,
-                asset_type='block',
-                name=block_name,
-                parent=collection,
-                owner=structure['owner'],
-                update_parent_languages=False,
-            )
-            created_asset_pks.append(sa.pk)
-            for tag_name in block_tags:
-                ti = TaggedItem.objects.create(
-                    tag_id=tag_name_to_pk[tag_name],
-                    content_object=sa
-                )
-
-    # To improve performance, we deferred this until the end using
-    # `update_parent_languages=False`
-    collection.update_languages()
-    return collection
+            yield {
+                'content': scontent,
+                'asset_type': 'block',
+                'name': block_name,
+            }, block_tags
 
 
 def _set_auto_field_update(kls, field_name, val):
@@ -2,12 +2,14 @@
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from typing import Any, Dict, Optional, Union
 
 from django.conf import settings
 
 from kobo.celery import celery_app
 from kpi.constants import NESTED_MONGO_RESERVED_ATTRIBUTES
+from kpi.utils import server_timing
 from kpi.utils.strings import base64_encodestring
 
 PermissionFilter = Dict[str, Any]
@@ -71,10 +73,20 @@ class MongoHelper:
         (re.compile(base64_encodestring('.').strip()), '.'),
     ]
 
+    NESTED_RESERVED_ATTRIBUTE_PREFIXES = tuple(
+        f'{reserved_attribute}.'
+        for reserved_attribute in NESTED_MONGO_RESERVED_ATTRIBUTES
+    )
+
     # Match KoBoCAT's variables of ParsedInstance class
     USERFORM_ID = '_userform_id'
     DEFAULT_BATCHSIZE = 1000
 
+    # Number of distinct keys kept in the memoized key translation tables.
+    # Submissions of the same form share the same keys, thus a few thousand
+    # entries are enough to cover most of the forms processed by a worker.
+    KEY_TRANSLATION_CACHE_SIZE = 8192
+
     @classmethod
     def decode(cls, key):
         """
@@ -89,6 +101,7 @@ class MongoHelper:
         return key
 
     @classmethod
+    @server_timing.timed('mongo')
     def delete(cls, mongo_userform_id: str, submission_ids: list):
         query = {
             '_id': {cls.IN_OPERATOR: submission_ids},
@@ -109,6 +122,7 @@ class MongoHelper:
         return key
 
     @classmethod
+    @server_timing.timed('mongo')
     def get_count(
         cls,
         mongo_userform_id,
@@ -127,6 +141,7 @@ class MongoHelper:
         return total_count
 
     @classmethod
+    @server_timing.timed('mongo')
     def get_instances(
         cls,
         mongo_userform_id,
@@ -161,7 +176,8 @@ class MongoHelper:
         # set batch size
         cursor.batch_size = cls.DEFAULT_BATCHSIZE
 
-        return cursor, total_count
+        # Documents are fetched while the cursor is iterated
+        return server_timing.timed_iterator('mongo', cursor), total_count
 
     @staticmethod
     def get_max_time_ms():
@@ -189,20 +205,32 @@ class MongoHelper:
         Updates encoded attributes of a dict with human-readable attributes.
         For example:
         { "myLg==attribute": True } => { "my.attribute": True }
-        """
 
-        for key, value in list(d.items()):
+        Keys are translated through a memoized table (see
+        `_get_readable_key()`), and dicts without any encoded keys are left
+        untouched.
+        """
+        encoded_keys = None
+        for key, value in d.items():
             if isinstance(value, list):
-                value = [
-                    cls.to_readable_dict(e) if isinstance(e, dict) else e
-                    for e in value
-                ]
+                for element in value:
+                    if isinstance(element, dict):
+                        cls.to_readable_dict(element)
             elif isinstance(value, dict):
-                value = cls.to_readable_dict(value)
+                cls.to_readable_dict(value)
+
+            readable_key = _get_readable_key(key)
+            if readable_key != key:
+                if encoded_keys is None:
+                    encoded_keys = []
+                encoded_keys.append((key, readable_key))
 
-            if cls._is_attribute_encoded(key):
-                del d[key]
-                d[cls.decode(key)] = value
+        # Fast path, nothing to rename
+        if encoded_keys is None:
+            return d
+
+        for key, readable_key in encoded_keys:
+            d[readable_key] = d.pop(key)
 
         return d
 
@@ -280,9 +308,11 @@ class MongoHelper:
                     # elements
                     d[first_part].update(cls.to_safe_dict(tree[first_part]))
 
-            elif cls.is_attribute_invalid(key):
-                del d[key]
-                d[cls.encode(key)] = value
+            else:
+                safe_key = _get_safe_key(key)
+                if safe_key != key:
+                    del d[key]
+                    d[safe_key] = value
 
         return d
 
@@ -394,15 +424,35 @@ class MongoHelper:
             key.startswith('JA==') or key.count('Lg==') > 0
         )
 
-    @staticmethod
-    def _is_nested_reserved_attribute(key):
+    @classmethod
+    def _is_nested_reserved_attribute(cls, key):
         """
         Checks if key starts with one of variables values declared in NESTED_MONGO_RESERVED_ATTRIBUTES
 
         :param key: string
         :return: boolean
         """
-        for reserved_attribute in NESTED_MONGO_RESERVED_ATTRIBUTES:
-            if key.startswith('{}.'.format(reserved_attribute)):
-                return True
-        return False
+        return key.startswith(cls.NESTED_RESERVED_ATTRIBUTE_PREFIXES)
+
+
+@lru_cache(maxsize=MongoHelper.KEY_TRANSLATION_CACHE_SIZE)
+def _get_readable_key(key: str) -> str:
+    """
+    Return the human-readable version of a (possibly encoded) Mongo key.
+    Results are memoized because the same keys are repeated across all the
+    submissions of a form.
+    """
+    if MongoHelper._is_attribute_encoded(key):
+        return MongoHelper.decode(key)
+    return key
+
+
+@lru_cache(maxsize=MongoHelper.KEY_TRANSLATION_CACHE_SIZE)
+def _get_safe_key(key: str) -> str:
+    """
+    Return the Mongo-safe version of a key, i.e. with disallowed characters
+    encoded. See `_get_readable_key()` about memoization.
+    """
+    if MongoHelper.is_attribute_invalid(key):
+        return MongoHelper.encode(key)
+    return key
@@ -0,0 +1,324 @@
+# coding: utf-8
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.checks import Warning
+from django.utils.translation import gettext as t
+from pymongo import IndexModel
+from pymongo.errors import PyMongoError
+
+from kpi.utils.mongo_helper import MongoHelper
+
+# Indexes of the `instances` collection needed by the queries of KPI.
+# Submissions are always filtered by form first, see `MongoHelper`.
+REQUIRED_INDEXES = {
+    'kpi_userform_id': [(MongoHelper.USERFORM_ID, 1), ('_id', 1)],
+    'kpi_userform_submission_time': [
+        (MongoHelper.USERFORM_ID, 1),
+        ('_submission_time', 1),
+    ],
+    'kpi_userform_uuid': [(MongoHelper.USERFORM_ID, 1), ('_uuid', 1)],
+    'kpi_userform_submitted_by': [
+        (MongoHelper.USERFORM_ID, 1),
+        ('_submitted_by', 1),
+    ],
+    'kpi_userform_validation_status': [
+        (MongoHelper.USERFORM_ID, 1),
+        ('_validation_status.uid', 1),
+    ],
+}
+
+# Operators which select a range of values. Any other operator, or a bare
+# value, is an equality match from an index point of view.
+RANGE_OPERATORS = {
+    '$exists',
+    '$gt',
+    '$gte',
+    '$lt',
+    '$lte',
+    '$ne',
+    '$nin',
+    '$not',
+    '$regex',
+}
+
+# A query examining more documents than this many times the number of
+# documents it returns is not served by a selective enough index
+INEFFICIENT_QUERY_RATIO = 10
+
+
+def check_required_indexes(app_configs, **kwargs) -> list:
+    """
+    Warn about the required indexes which are missing, or create them if
+    `MONGO_AUTO_CREATE_INDEXES` is set. For use with
+    `django.core.checks.register()`.
+    """
+    if settings.TESTING:
+        return []
+
+    collection = settings.MONGO_DB.instances
+    try:
+        if settings.MONGO_AUTO_CREATE_INDEXES:
+            create_missing_indexes(collection)
+            return []
+        missing_indexes = get_missing_indexes(collection)
+    except PyMongoError as e:
+        return [
+            Warning(
+                t('Unable to check MongoDB indexes'),
+                hint=str(e),
+                id='KPI.W001',
+            )
+        ]
+
+    if not missing_indexes:
+        return []
+
+    return [
+        Warning(
+            t('MongoDB indexes are missing: {names}').format(
+                names=', '.join(missing_indexes)
+            ),
+            hint=t(
+                'Run `python manage.py mongo_indexes` to create them, or set '
+                '`MONGO_AUTO_CREATE_INDEXES`.'
+            ),
+            id='KPI.W002',
+        )
+    ]
+
+
+def create_missing_indexes(collection) -> list[str]:
+    """
+    Create the indexes of `REQUIRED_INDEXES` which `collection` does not
+    have yet, and return their names. Indexes are built in the background to
+    avoid locking the collection.
+    """
+    missing_indexes = get_missing_indexes(collection)
+    if missing_indexes:
+        collection.create_indexes(
+            [
+                IndexModel(keys, name=name, background=True)
+                for name, keys in missing_indexes.items()
+            ]
+        )
+    return list(missing_indexes)
+
+
+def get_index_keys(collection) -> list[list[tuple]]:
+    """
+    Return the keys of the existing indexes of `collection`
+    """
+    return [
+        [(field, direction) for field, direction in info['key']]
+        for info in collection.index_information().values()
+    ]
+
+
+def get_missing_indexes(collection) -> dict[str, list[tuple]]:
+    """
+    Return the indexes of `REQUIRED_INDEXES` which are not served by an
+    existing index of `collection`, whatever its name
+    """
+    index_keys = get_index_keys(collection)
+    return {
+        name: keys
+        for name, keys in REQUIRED_INDEXES.items()
+        if not _is_covered(keys, index_keys)
+    }
+
+
+def get_query_shape(query: dict, sort: Optional[dict] = None) -> tuple:
+    """
+    Return the shape of `query`, i.e. the fields it matches by equality,
+    the fields it is sorted by (with their direction) and the fields it
+    matches by range, in this order. Branches of `$or` are left out because
+    a single index cannot serve them.
+    """
+    equality_fields = set()
+    range_fields = set()
+
+    def _walk(query_: dict):
+        for field, value in query_.items():
+            if field == MongoHelper.AND_OPERATOR:
+                for sub_query in value:
+                    _walk(sub_query)
+            elif field.startswith('$'):
+                continue
+            elif isinstance(value, dict) and any(
+                operator in RANGE_OPERATORS for operator in value
+            ):
+                range_fields.add(field)
+            else:
+                equality_fields.add(field)
+
+    _walk(query)
+    sort_fields = tuple(
+        (field, int(direction))
+        for field, direction in (sort or {}).items()
+        if field not in equality_fields
+    )
+    sorted_field_names = {field for field, _ in sort_fields}
+    return (
+        tuple(sorted(equality_fields)),
+        sort_fields,
+        tuple(sorted(range_fields - equality_fields - sorted_field_names)),
+    )
+
+
+def get_slow_queries(
+    db, collection_name: str, slow_ms: int, sample_size: int
+) -> list[dict]:
+    """
+    Return the latest queries on `collection_name` which took at least
+    `slow_ms` milliseconds, as recorded by the database profiler
+    (`db.setProfilingLevel(1, {slowms: ...})`).
+
+    Each query is a dictionary with its `filter`, `sort`, `millis` and
+    whether it is `inefficient`, i.e. whether it scanned the whole collection
+    or way more documents than it returned.
+    """
+    profile = db['system.profile'].find(
+        {
+            'ns': f'{db.name}.{collection_name}',
+            'millis': {'$gte': slow_ms},
+            'op': {'$in': ['query', 'command']},
+        },
+        sort=[('ts', -1)],
+        limit=sample_size,
+    )
+    slow_queries = []
+    for entry in profile:
+        command = entry.get('command', {})
+        docs_examined = None
+        if 'find' in command:
+            filter_ = command.get('filter', {})
+            docs_examined = entry.get('docsExamined')
+        elif 'count' in command:
+            filter_ = command.get('query', {})
+        elif 'aggregate' in command:
+            # e.g. `count_documents()`, which matches documents first
+            pipeline = command.get('pipeline') or [{}]
+            filter_ = pipeline[0].get('$match')
+            if filter_ is None:
+                continue
+        else:
+            continue
+        # Counts examine every matching document by design, only a whole
+        # collection scan makes them inefficient
+        slow_queries.append(
+            {
+                'filter': filter_,
+                'sort': command.get('sort'),
+                'millis': entry['millis'],
+                'inefficient': _is_inefficient(
+                    entry.get('planSummary'),
+                    docs_examined,
+                    entry.get('nreturned'),
+                ),
+            }
+        )
+    return slow_queries
+
+
+def suggest_indexes(
+    collection, slow_queries: Iterable[dict], use_explain: bool = False
+) -> list[dict]:
+    """
+    Suggest indexes for the inefficient queries of `slow_queries` (see
+    `get_slow_queries()`), grouped by shape (see `get_query_shape()`).
+
+    Keys follow the equality, sort, range rule. Shapes already served by an
+    existing index are left out. If `use_explain` is `True`, queries are
+    explained again with the current indexes (e.g. after creating some of
+    them) instead of relying on the plan recorded by the profiler.
+
+    Suggestions are sorted by the cumulative duration of their queries, the
+    most expensive first.
+    """
+    index_keys = get_index_keys(collection)
+    suggestions = defaultdict(lambda: {'count': 0, 'millis': 0})
+    for query in slow_queries:
+        if use_explain:
+            inefficient = _explain_is_inefficient(
+                collection, query['filter'], query['sort']
+            )
+        else:
+            inefficient = query['inefficient']
+        if not inefficient:
+            continue
+
+        equality_fields, sort_fields, range_fields = get_query_shape(
+            query['filter'], query['sort']
+        )
+        # Forms are always the first filter
+        if MongoHelper.USERFORM_ID in equality_fields:
+            equality_fields = (MongoHelper.USERFORM_ID,) + tuple(
+                field
+                for field in equality_fields
+                if field != MongoHelper.USERFORM_ID
+            )
+        keys = (
+            [(field, 1) for field in equality_fields]
+            + list(sort_fields)
+            + [(field, 1) for field in range_fields]
+        )
+        if not keys or _is_covered(keys, index_keys):
+            continue
+
+        suggestion = suggestions[tuple(keys)]
+        suggestion['count'] += 1
+        suggestion['millis'] += query['millis']
+        suggestion.setdefault('example', query['filter'])
+
+    return sorted(
+        (
+            {'keys': list(keys), **suggestion}
+            for keys, suggestion in suggestions.items()
+        ),
+        key=lambda suggestion: suggestion['millis'],
+        reverse=True,
+    )
+
+
+def _explain_is_inefficient(
+    collection, filter_: dict, sort: Optional[dict]
+) -> bool:
+    cursor = collection.find(filter_)
+    if sort:
+        cursor = cursor.sort(list(sort.items()))
+    explanation = cursor.explain()
+    stats = explanation.get('executionStats', {})
+    winning_plan = explanation.get('queryPlanner', {}).get('winningPlan', {})
+    return _is_inefficient(
+        'COLLSCAN' if 'COLLSCAN' in str(winning_plan) else None,
+        stats.get('totalDocsExamined'),
+        stats.get('nReturned'),
+    )
+
+
+def _is_covered(keys: list[tuple], index_keys: list[list[tuple]]) -> bool:
+    """
+    Return whether an index of `index_keys` starts with the fields of `keys`,
+    and can therefore serve the same queries
+    """
+    fields = [field for field, _ in keys]
+    return any(
+        [field for field, _ in existing_keys[:len(fields)]] == fields
+        for existing_keys in index_keys
+    )
+
+
+def _is_inefficient(
+    plan_summary: Optional[str],
+    docs_examined: Optional[int],
+    returned: Optional[int],
+) -> bool:
+    if plan_summary and plan_summary.startswith('COLLSCAN'):
+        return True
+    if docs_examined is None:
+        return False
+    return docs_examined > max(returned or 0, 1) * INEFFICIENT_QUERY_RATIO
@@ -287,3 +287,6 @@ def perm_parse(perm, obj=None):
 
 post_assign_perm = django.dispatch.Signal()
 post_remove_perm = django.dispatch.Signal()
+# Sent once the permissions of an object and its descendants have been
+# (re)calculated
+post_recalculate_perms = django.dispatch.Signal()
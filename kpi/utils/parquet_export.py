@@ -0,0 +1,223 @@
+# coding: utf-8
+from __future__ import annotations
+
+import datetime
+import os
+import re
+import tempfile
+import zipfile
+from typing import BinaryIO, Callable, Iterable, Optional
+
+import formpack
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db.models import QuerySet
+
+from kpi.utils.absolute_paths import insert_full_paths_in_place
+
+# Number of rows buffered in memory, per section, before being written to the
+# Parquet file as a row group
+ROW_GROUP_SIZE = 50000
+COMPRESSION = 'zstd'
+
+QUESTION_TYPES_TO_ARROW_TYPES = {
+    'integer': pa.int64(),
+    'decimal': pa.float64(),
+    'range': pa.float64(),
+    'date': pa.date32(),
+}
+# Columns added by formpack, which do not belong to the survey
+COPY_FIELDS_TO_ARROW_TYPES = {
+    '_id': pa.int64(),
+    '_index': pa.int64(),
+    '_parent_index': pa.int64(),
+}
+
+
+def get_question_types(versions: Iterable['kpi.models.AssetVersion']) -> dict:
+    """
+    Return the type of each question of `versions`, by XPath. Questions whose
+    type differs from a version to another are left out.
+    """
+    if isinstance(versions, QuerySet):
+        versions = versions.select_related('content_blob')
+
+    question_types = {}
+    for version in versions:
+        content = version.to_formpack_schema()['content']
+        insert_full_paths_in_place(content)
+        for row in content.get('survey', []):
+            if xpath := row.get('$xpath'):
+                question_types.setdefault(xpath, set()).add(row.get('type'))
+
+    return {
+        xpath: types.pop()
+        for xpath, types in question_types.items()
+        if len(types) == 1
+    }
+
+
+def write_parquet_export(
+    export: formpack.reporting.Export,
+    column_xpaths: dict[str, list],
+    question_types: dict[str, str],
+    submission_stream: Iterable[dict],
+    output_file: BinaryIO,
+):
+    """
+    Write the rows of `export` to `output_file` as a ZIP archive containing
+    one Parquet file per section, i.e. one for the main section and one per
+    repeat group.
+
+    `column_xpaths` contains, for each section, the XPath of each column of
+    `export`. Columns of questions listed in `question_types` are typed
+    accordingly, all others are strings.
+    """
+    with tempfile.TemporaryDirectory(prefix='export_parquet') as tmp_dir:
+        writers = {}
+        for section_name, labels in export.labels.items():
+            arrow_types = [
+                QUESTION_TYPES_TO_ARROW_TYPES.get(
+                    question_types.get(xpath),
+                    COPY_FIELDS_TO_ARROW_TYPES.get(xpath, pa.string()),
+                )
+                for xpath in column_xpaths[section_name]
+            ]
+            filename = f'{_get_safe_filename(section_name)}.parquet'
+            writers[section_name] = _ParquetSectionWriter(
+                os.path.join(tmp_dir, filename), labels, arrow_types
+            )
+
+        try:
+            for chunk in export.parse_submissions(submission_stream):
+                for section_name, rows in chunk.items():
+                    writer = writers[section_name]
+                    for row in rows:
+                        writer.append(row)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        # Parquet files are already compressed
+        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_STORED) as zip_file:
+            for writer in writers.values():
+                zip_file.write(writer.path, os.path.basename(writer.path))
+
+
+class _ParquetSectionWriter:
+    """
+    Write the rows of one section to a Parquet file, `ROW_GROUP_SIZE` rows
+    at a time
+    """
+
+    def __init__(self, path: str, labels: list, arrow_types: list):
+        self.path = path
+        self._schema = pa.schema(
+            [
+                pa.field(label, arrow_type)
+                for label, arrow_type in zip(
+                    _get_unique_labels(labels), arrow_types
+                )
+            ]
+        )
+        self._converters = [
+            _CONVERTERS.get(arrow_type, _to_str) for arrow_type in arrow_types
+        ]
+        self._columns = [[] for _ in labels]
+        self._row_count = 0
+        self._writer = pq.ParquetWriter(
+            path, self._schema, compression=COMPRESSION
+        )
+
+    def append(self, row: list):
+        for column, converter, value in zip(
+            self._columns, self._converters, row
+        ):
+            column.append(converter(value))
+        self._row_count += 1
+        if self._row_count >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def flush(self):
+        if not self._row_count:
+            return
+        self._writer.write_table(
+            pa.Table.from_arrays(
+                [
+                    pa.array(column, type=field.type)
+                    for column, field in zip(self._columns, self._schema)
+                ],
+                schema=self._schema,
+            )
+        )
+        self._columns = [[] for _ in self._columns]
+        self._row_count = 0
+
+
+def _get_safe_filename(name: str) -> str:
+    return re.sub(r'[^\w\-. ]', '_', name)
+
+
+def _get_unique_labels(labels: list) -> list:
+    """
+    Suffix duplicate labels (e.g. two questions with the same label), which
+    most Parquet readers cannot load
+    """
+    unique_labels = []
+    seen = set()
+    for label in labels:
+        unique_label = label
+        suffix = 2
+        while unique_label in seen:
+            unique_label = f'{label} ({suffix})'
+            suffix += 1
+        seen.add(unique_label)
+        unique_labels.append(unique_label)
+    return unique_labels
+
+
+def _to_date(value) -> Optional[datetime.date]:
+    if value in ('', None):
+        return None
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _to_float(value) -> Optional[float]:
+    if value in ('', None):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> Optional[int]:
+    if value in ('', None):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        float_value = _to_float(value)
+        if float_value is not None and float_value.is_integer():
+            return int(float_value)
+        return None
+
+
+def _to_str(value) -> Optional[str]:
+    if value in ('', None):
+        return None
+    return str(value)
+
+
+_CONVERTERS: dict[pa.DataType, Callable] = {
+    pa.int64(): _to_int,
+    pa.float64(): _to_float,
+    pa.date32(): _to_date,
+}
@@ -2,6 +2,7 @@
 from rest_framework.request import Request as DRFRequest
 from rest_framework.settings import api_settings
 
+from kpi.models.import_export_task import ExportArtifact
 from kpi.utils.object_permission import get_database_user
 
 
@@ -37,6 +38,17 @@ def superuser_or_username_matches_prefix(private_file):
     if user.is_superuser:
         return True
 
+    # Exports of different users can share the same file, which lives out of
+    # any user's directory
+    if private_file.relative_name.startswith(f'{ExportArtifact.DIRECTORY}/'):
+        try:
+            artifact = ExportArtifact.objects.get(
+                result=private_file.relative_name
+            )
+        except ExportArtifact.DoesNotExist:
+            return False
+        return artifact.is_referenced_by(user)
+
     if private_file.relative_name.startswith(
         '{}/'.format(user.username)
     ):
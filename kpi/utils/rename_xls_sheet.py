@@ -21,13 +21,12 @@ def rename_xls_sheet(
     sheet names in pyxform inputs;
     see https://github.com/XLSForm/pyxform/issues/229.
     """
-    read_only_book = xlrd.open_workbook(file_contents=xls_stream.read())
-    book = xlutils.copy.copy(read_only_book)
+    read_only_book = xlrd.open_workbook(
+        file_contents=xls_stream.read(), on_demand=True
+    )
     sheet_names = read_only_book.sheet_names()
-    if from_sheet in sheet_names and to_sheet in sheet_names:
-        raise ConflictSheetError()
-    if from_sheet not in sheet_names:
-        raise NoFromSheetError(from_sheet)
+    _validate_sheet_names(sheet_names, from_sheet, to_sheet)
+    book = xlutils.copy.copy(read_only_book)
     index = sheet_names.index(from_sheet)
     book.get_sheet(index).name = to_sheet
     stream = BytesIO()
@@ -39,14 +38,23 @@ def rename_xls_sheet(
 def rename_xlsx_sheet(
     xls_stream: BytesIO, from_sheet: str, to_sheet: str
 ) -> BytesIO:
+    # Sheet names are read without loading the cells, which is much faster on
+    # large workbooks, most of which have no sheet to rename
+    read_only_book = openpyxl.load_workbook(xls_stream, read_only=True)
+    sheet_names = read_only_book.sheetnames
+    read_only_book.close()
+    _validate_sheet_names(sheet_names, from_sheet, to_sheet)
+    xls_stream.seek(0)
     book = openpyxl.load_workbook(xls_stream)
-    sheet_names = book.sheetnames
-    if from_sheet in sheet_names and to_sheet in sheet_names:
-        raise ConflictSheetError()
-    if from_sheet not in sheet_names:
-        raise NoFromSheetError(from_sheet)
     book[from_sheet].title = to_sheet
     stream = BytesIO()
     book.save(stream)
     stream.seek(0)
     return stream
+
+
+def _validate_sheet_names(sheet_names: list, from_sheet: str, to_sheet: str):
+    if from_sheet in sheet_names and to_sheet in sheet_names:
+        raise ConflictSheetError()
+    if from_sheet not in sheet_names:
+        raise NoFromSheetError(from_sheet)
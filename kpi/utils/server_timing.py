@@ -0,0 +1,212 @@
+# coding: utf-8
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar, Token
+from functools import wraps
+from typing import Callable, Generator, Iterable, Iterator, Optional
+
+from django.core.cache import caches
+from django.db import connections
+
+CACHE_HITS = 'cache_hits'
+CACHE_MISSES = 'cache_misses'
+
+_missing = object()
+
+# Timings of the request being processed, only set while
+# `hub.middleware.ServerTimingMiddleware` is enabled. Everything below is a
+# no-op otherwise.
+_current_timings: ContextVar[Optional[Timings]] = ContextVar(
+    'server_timings', default=None
+)
+
+
+class Timings:
+    """
+    Number of calls and cumulative duration (in seconds) of each metric
+    recorded during one request, e.g. `mongo` or `db_default`
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.durations = defaultdict(float)
+        self.start = time.perf_counter()
+
+    def add(self, metric: str, duration: float = 0.0, count: int = 1):
+        self.counts[metric] += count
+        self.durations[metric] += duration
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+
+def activate() -> Token:
+    """
+    Start recording timings for the current context. Pass the returned token
+    to `deactivate()` to stop.
+    """
+    return _current_timings.set(Timings())
+
+
+def deactivate(token: Token):
+    _current_timings.reset(token)
+
+
+def get_timings() -> Optional[Timings]:
+    return _current_timings.get()
+
+
+def instrument_caches():
+    """
+    Count hits and misses of the caches of the current thread. Django creates
+    cache instances per thread, thus the instrumented methods are set on the
+    instances themselves, once.
+    """
+    for cache in caches.all():
+        if getattr(cache, '_server_timing', False):
+            continue
+        cache.get = _count_cache_get(cache.get)
+        cache.get_many = _count_cache_get_many(cache.get_many)
+        cache._server_timing = True
+
+
+@contextmanager
+def record_database_queries() -> Generator[None, None, None]:
+    """
+    Record the queries sent to each database alias, as `db_<alias>`
+    """
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(
+                connections[alias].execute_wrapper(
+                    _DatabaseQueryRecorder(f'db_{alias}')
+                )
+            )
+        yield
+
+
+def timed(metric: str) -> Callable:
+    """
+    Decorator which records the duration of each call of the decorated
+    function as `metric`. See `timed_iterator()` for functions returning
+    lazy results, e.g. Mongo cursors.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current_timings.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.add(metric, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_iterator(metric: str, iterable: Iterable) -> Iterable:
+    """
+    Return `iterable`, wrapped to record the time spent fetching its items
+    as `metric` if timings are being recorded
+    """
+    if _current_timings.get() is None:
+        return iterable
+    return _TimedIterator(metric, iterable)
+
+
+class _DatabaseQueryRecorder:
+    """
+    Database execute wrapper, see
+    https://docs.djangoproject.com/en/4.2/topics/db/instrumentation/
+    """
+
+    def __init__(self, metric: str):
+        self.metric = metric
+
+    def __call__(self, execute, sql, params, many, context):
+        timings = _current_timings.get()
+        if timings is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timings.add(self.metric, time.perf_counter() - start)
+
+
+class _TimedIterator:
+    """
+    Iterator which records the time spent in `next()`. Other attributes are
+    looked up on the wrapped iterable, e.g. `Cursor.close()`.
+    """
+
+    def __init__(self, metric: str, iterable: Iterable):
+        self._metric = metric
+        self._iterable = iterable
+        self._iterator = None
+
+    def __getattr__(self, name: str):
+        return getattr(self._iterable, name)
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        if self._iterator is None:
+            self._iterator = iter(self._iterable)
+        timings = _current_timings.get()
+        if timings is None:
+            return next(self._iterator)
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            # Only count the calls, not each item
+            timings.add(self._metric, time.perf_counter() - start, count=0)
+
+
+def _count_cache_get(get: Callable) -> Callable:
+    @wraps(get)
+    def wrapper(key, default=None, *args, **kwargs):
+        timings = _current_timings.get()
+        if timings is None:
+            return get(key, default, *args, **kwargs)
+        start = time.perf_counter()
+        value = get(key, _missing, *args, **kwargs)
+        duration = time.perf_counter() - start
+        if value is _missing:
+            timings.add(CACHE_MISSES, duration)
+            return default
+        timings.add(CACHE_HITS, duration)
+        return value
+
+    return wrapper
+
+
+def _count_cache_get_many(get_many: Callable) -> Callable:
+    @wraps(get_many)
+    def wrapper(keys, *args, **kwargs):
+        timings = _current_timings.get()
+        if timings is None:
+            return get_many(keys, *args, **kwargs)
+        keys = list(keys)
+        start = time.perf_counter()
+        values = get_many(keys, *args, **kwargs)
+        # Split the duration of the call between hits and misses
+        duration = (time.perf_counter() - start) / max(len(keys), 1)
+        hits = len(values)
+        misses = len(keys) - hits
+        timings.add(CACHE_HITS, duration * hits, count=hits)
+        timings.add(CACHE_MISSES, duration * misses, count=misses)
+        return values
+
+    return wrapper
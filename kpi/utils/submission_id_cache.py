@@ -0,0 +1,113 @@
+# coding: utf-8
+from __future__ import annotations
+
+from typing import Generator, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Number of keys written at once when caching the ids of a page of submissions
+CACHE_BATCH_SIZE = 1000
+
+
+def cache_submission_ids(
+    asset_uid: str, submission_ids: dict, root: bool = False
+):
+    """
+    Cache `submission_ids`, a dictionary of `{uuid: submission_id}`, of the
+    submissions to asset `asset_uid`. UUIDs are `_uuid` values, or
+    `meta/rootUuid` ones if `root` is `True`.
+    """
+    if not (timeout := settings.SUBMISSION_ID_CACHE_TIMEOUT):
+        return
+    cache.set_many(
+        {
+            _get_cache_key(asset_uid, uuid_, root): submission_id
+            for uuid_, submission_id in submission_ids.items()
+        },
+        timeout,
+    )
+
+
+def get_cached_submission_id(
+    asset_uid: str, uuid_: str, root: bool = False
+) -> Optional[int]:
+    """
+    Return the primary key of the submission `uuid_` (its `_uuid`, or its
+    `meta/rootUuid` if `root` is `True`) to asset `asset_uid` if it is cached.
+
+    Submissions are edited (which gives them a new `_uuid`) and deleted in
+    KoBoCAT as well, thus callers must check that the cached submission still
+    matches `uuid_`, and call `void_cached_submission_ids()` if it does not.
+    """
+    if not settings.SUBMISSION_ID_CACHE_TIMEOUT:
+        return None
+    return cache.get(_get_cache_key(asset_uid, uuid_, root))
+
+
+def void_cached_submission_ids(asset_uid: str, uuids: Iterable[str]):
+    """
+    Void the cached primary keys of `uuids`, whether they are `_uuid` or
+    `meta/rootUuid` values
+    """
+    cache.delete_many(
+        [
+            _get_cache_key(asset_uid, uuid_, root)
+            for uuid_ in uuids
+            if uuid_
+            for root in (False, True)
+        ]
+    )
+
+
+def warm_up_submission_id_cache(
+    asset_uid: str, submissions: Iterable[dict]
+) -> Iterable[dict]:
+    """
+    Cache the primary keys of `submissions` by `_uuid` and `meta/rootUuid`,
+    e.g. while a page of submissions is listed, because clients usually
+    retrieve the same submissions (and their attachments) afterwards.
+
+    Lists are cached at once. Generators are wrapped to cache the ids by
+    batches while they are consumed, to not hold the whole page in memory.
+    """
+    if not settings.SUBMISSION_ID_CACHE_TIMEOUT:
+        return submissions
+
+    if isinstance(submissions, list):
+        _cache_submissions(asset_uid, submissions)
+        return submissions
+
+    return _warm_up_while_iterating(asset_uid, submissions)
+
+
+def _cache_submissions(asset_uid: str, submissions: Iterable[dict]):
+    submission_ids = {}
+    root_uuids = {}
+    for submission in submissions:
+        if (submission_id := submission.get('_id')) is None:
+            continue
+        if uuid_ := submission.get('_uuid'):
+            submission_ids[uuid_] = submission_id
+        if root_uuid := submission.get('meta/rootUuid'):
+            root_uuids[root_uuid] = submission_id
+    cache_submission_ids(asset_uid, submission_ids)
+    cache_submission_ids(asset_uid, root_uuids, root=True)
+
+
+def _get_cache_key(asset_uid: str, uuid_: str, root: bool) -> str:
+    kind = 'root' if root else 'uuid'
+    return f'submission_id:{asset_uid}:{kind}:{uuid_}'
+
+
+def _warm_up_while_iterating(
+    asset_uid: str, submissions: Iterable[dict]
+) -> Generator[dict, None, None]:
+    batch = []
+    for submission in submissions:
+        batch.append(submission)
+        yield submission
+        if len(batch) >= CACHE_BATCH_SIZE:
+            _cache_submissions(asset_uid, batch)
+            batch = []
+    _cache_submissions(asset_uid, batch)
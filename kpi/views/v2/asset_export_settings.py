@@ -99,6 +99,7 @@ class AssetExportSettingsViewSet(AssetNestedObjectViewsetMixin,
         * "type" (required) specifies the export format. Valid export formats include:
             * "csv",
             * "geojson",
+            * "parquet" (ZIP archive of Parquet files, one per repeat group),
             * "spss_labels", or
             * "xls"
         * "xls_types_as_text" (optional) is a boolean value that defaults to "false" and only affects "xls" export types.
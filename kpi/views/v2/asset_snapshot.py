@@ -4,7 +4,6 @@ import copy
 from xml.dom import Node
 from typing import Optional
 
-import requests
 from defusedxml import minidom
 from django.conf import settings
 from django.db.models import Q, F
@@ -30,6 +29,11 @@ from kpi.renderers import (
 from kpi.serializers.v2.asset_snapshot import AssetSnapshotSerializer
 from kpi.serializers.v2.open_rosa import FormListSerializer, ManifestSerializer
 from kpi.tasks import enketo_flush_cached_preview
+from kpi.utils.enketo import (
+    cache_enketo_links,
+    enketo_request,
+    get_cached_enketo_links,
+)
 from kpi.utils.object_permission import get_database_user
 from kpi.utils.project_views import (
     user_has_project_view_asset_perm,
@@ -182,25 +186,34 @@ class AssetSnapshotViewSet(OpenRosaViewSetMixin, NoUpdateModelViewSet):
                 'form_id': snapshot.uid,
             }
 
-            # Use Enketo API to create preview instead of `preview?form=`,
-            # which does not load any form media files.
-            response = requests.post(
-                f'{settings.ENKETO_URL}/{settings.ENKETO_PREVIEW_ENDPOINT}',
-                # bare tuple implies basic auth
-                auth=(settings.ENKETO_API_TOKEN, ''),
-                data=data
-            )
-            response.raise_for_status()
-
-            # Ask Celery to remove the preview from its XSLT cache after some
-            # reasonable delay; see
-            # https://github.com/enketo/enketo-express/issues/357
-            enketo_flush_cached_preview.apply_async(
-                kwargs=data,  # server_url and form_id
-                countdown=settings.ENKETO_FLUSH_CACHED_PREVIEW_DELAY,
-            )
+            endpoint = settings.ENKETO_PREVIEW_ENDPOINT
+            json_response = get_cached_enketo_links(endpoint=endpoint, **data)
+            if json_response is None:
+                # Use Enketo API to create preview instead of `preview?form=`,
+                # which does not load any form media files.
+                response = enketo_request('POST', endpoint, data=data)
+                response.raise_for_status()
+
+                # Ask Celery to remove the preview from its XSLT cache after
+                # some reasonable delay; see
+                # https://github.com/enketo/enketo-express/issues/357
+                enketo_flush_cached_preview.apply_async(
+                    kwargs=data,  # server_url and form_id
+                    countdown=settings.ENKETO_FLUSH_CACHED_PREVIEW_DELAY,
+                )
+
+                json_response = response.json()
+                # Do not keep the links once the preview has been flushed
+                cache_enketo_links(
+                    links=json_response,
+                    endpoint=endpoint,
+                    timeout=min(
+                        settings.ENKETO_LINKS_CACHE_TIMEOUT,
+                        settings.ENKETO_FLUSH_CACHED_PREVIEW_DELAY,
+                    ),
+                    **data,
+                )
 
-            json_response = response.json()
             preview_url = json_response.get('preview_url')
 
             return HttpResponseRedirect(preview_url)
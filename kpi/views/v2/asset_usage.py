@@ -1,5 +1,6 @@
 from rest_framework import renderers, viewsets
 from rest_framework.mixins import ListModelMixin
+from rest_framework.response import Response
 
 from kpi.models.asset import Asset
 from kpi.permissions import IsAuthenticated
@@ -48,4 +49,25 @@ class AssetUsageViewSet(ListModelMixin, viewsets.GenericViewSet):
     serializer_class = AssetUsageSerializer
 
     def get_queryset(self):
-        return Asset.objects.defer('content').filter(owner=self.request.user)
+        return (
+            Asset.objects.defer('content')
+            .select_related('owner')
+            .filter(owner=self.request.user)
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        assets = list(page if page is not None else queryset)
+
+        # Compute the usage of all the assets of the page at once, instead of
+        # letting the serializer run several queries per asset
+        context = self.get_serializer_context()
+        context['usage_by_asset_id'] = (
+            AssetUsageSerializer.get_usage_by_asset_id(assets)
+        )
+        serializer = self.get_serializer(assets, many=True, context=context)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
@@ -2,10 +2,11 @@
 import copy
 import json
 import re
+from itertools import islice
 
-import requests
+from bson import json_util
 from django.conf import settings
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django.utils.translation import gettext_lazy as t
 from pymongo.errors import OperationFailure
 from rest_framework import (
@@ -45,7 +46,21 @@ from kpi.renderers import (
     SubmissionGeoJsonRenderer,
     SubmissionXMLRenderer,
 )
+from kpi.utils.enketo import enketo_request
+from kpi.utils.geojson import (
+    filter_submissions_by_bbox,
+    get_bbox_query,
+    get_geo_questions,
+    get_geojson_stream,
+    parse_bbox,
+)
 from kpi.utils.log import logging
+from kpi.utils.submission_id_cache import (
+    cache_submission_ids,
+    get_cached_submission_id,
+    void_cached_submission_ids,
+    warm_up_submission_id_cache,
+)
 from kpi.utils.viewset_mixins import AssetNestedObjectViewsetMixin
 from kpi.utils.xml import (
     edit_submission_xml,
@@ -130,6 +145,15 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
     * `geotrace` to `LineString`;
     * `geoshape` to `Polygon`.
 
+    Features are streamed as they are read. Use the `bbox` query parameter
+    (`west,south,east,north`, in decimal degrees) to only get the features
+    with at least one point inside that bounding box, and the `fields` query
+    parameter (a JSON list of question paths) to limit their `properties`.
+
+    > Example
+    >
+    >       curl -X GET 'https://[kpi]/api/v2/assets/aSAvYreNzVEkrWg5Gdcvg/data.geojson?bbox=-74,45,-73,46&fields=["name"]'
+
     ## CRUD
 
     * `uid` - is the unique identifier of a specific asset
@@ -342,6 +366,7 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
         bulk_actions_validator = DataBulkActionsValidator(**kwargs)
         bulk_actions_validator.is_valid(raise_exception=True)
         audit_logs = []
+        deleted_uuids = []
         if request.method == 'DELETE':
             # Prepare audit logs
             data = copy.deepcopy(bulk_actions_validator.data)
@@ -353,13 +378,16 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
                 user=request.user,
                 submission_ids=data['submission_ids'],
                 query=data['query'],
-                fields=['_id', '_uuid']
+                fields=['_id', '_uuid', 'meta/rootUuid']
             )
             (
                 app_label,
                 model_name,
             ) = deployment.submission_model.get_app_label_and_model_name()
             for submission in submissions:
+                deleted_uuids.extend(
+                    [submission['_uuid'], submission.get('meta/rootUuid')]
+                )
                 audit_logs.append(AuditLog(
                     app_label=app_label,
                     model_name=model_name,
@@ -379,6 +407,7 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
         # If requests has succeeded, let's log deletions (if any)
         if json_response['status'] == status.HTTP_200_OK and audit_logs:
             AuditLog.objects.bulk_create(audit_logs)
+            void_cached_submission_ids(self.asset.uid, deleted_uuids)
 
         return Response(**json_response)
 
@@ -391,7 +420,7 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
         submission = deployment.get_submission(
             submission_id=submission_id,
             user=request.user,
-            fields=['_id', '_uuid']
+            fields=['_id', '_uuid', 'meta/rootUuid']
         )
 
         json_response = deployment.delete_submission(
@@ -414,6 +443,10 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
                 },
                 action=AuditAction.DELETE,
             )
+            void_cached_submission_ids(
+                self.asset.uid,
+                [submission['_uuid'], submission.get('meta/rootUuid')],
+            )
 
         return Response(**json_response)
 
@@ -425,7 +458,7 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
         url_path='(enketo/)?edit',
     )
     def enketo_edit(self, request, pk, *args, **kwargs):
-        submission_id = positive_int(pk)
+        submission_id = self._get_submission_id(request, pk)
         enketo_response = self._get_enketo_link(request, submission_id, 'edit')
         if enketo_response.status_code in (
             status.HTTP_201_CREATED, status.HTTP_200_OK
@@ -444,7 +477,7 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
         url_path='enketo/view',
     )
     def enketo_view(self, request, pk, *args, **kwargs):
-        submission_id = positive_int(pk)
+        submission_id = self._get_submission_id(request, pk)
         return self._get_enketo_link(request, submission_id, 'view')
 
     def get_queryset(self):
@@ -459,16 +492,9 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
         filters = self._filter_mongo_query(request)
 
         if format_type == 'geojson':
-            # For GeoJSON, get the submissions as JSON and let
-            # `SubmissionGeoJsonRenderer` handle the rest
-            return Response(
-                deployment.get_submissions(
-                    user=request.user,
-                    format_type=SUBMISSION_FORMAT_TYPE_JSON,
-                    request=request,
-                    **filters
-                )
-            )
+            # For GeoJSON, get the submissions as JSON and stream the features
+            # as they are read from Mongo, instead of rendering them at once
+            return self._get_geojson_response(request, deployment, filters)
 
         try:
             submissions = deployment.get_submissions(request.user,
@@ -482,12 +508,29 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
                 raise serializers.ValidationError(message)
             logging.warning(message, exc_info=True)
             raise serializers.ValidationError('Unsupported query')
+
+        if format_type == SUBMISSION_FORMAT_TYPE_JSON:
+            # Clients usually retrieve the listed submissions (or their
+            # attachments) by UUID afterwards
+            submissions = warm_up_submission_id_cache(
+                self.asset.uid, submissions
+            )
+
         # Create a dummy list to let the Paginator do all the calculation
         # for pagination because it does not need the list of real objects.
         # It avoids retrieving all the objects from MongoDB
         dummy_submissions_list = [None] * deployment.current_submission_count
         page = self.paginate_queryset(dummy_submissions_list)
         if page is not None:
+            if (
+                request.accepted_renderer.format == 'json'
+                and settings.SUBMISSION_LIST_STREAMING_THRESHOLD
+                and len(page) >= settings.SUBMISSION_LIST_STREAMING_THRESHOLD
+            ):
+                # Large pages are encoded as submissions are read from Mongo
+                return self.paginator.get_streaming_paginated_response(
+                    submissions
+                )
             return self.get_paginated_response(submissions)
 
         return Response(list(submissions))
@@ -528,7 +571,15 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
                 )
             query['_uuid'] = submission_id_or_uuid
             filters['query'] = query
+            submission_uuid = submission_id_or_uuid
+            # Narrow the query down to the primary key if it is known, `_uuid`
+            # still has to match in case the submission has been edited since
+            if cached_id := get_cached_submission_id(
+                self.asset.uid, submission_uuid
+            ):
+                params['submission_ids'] = [cached_id]
         else:
+            submission_uuid = None
             params['submission_ids'] = [submission_id_or_uuid]
 
         # Join all parameters to be passed to `deployment.get_submissions()`
@@ -540,10 +591,22 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
         # both. Since the number of submissions is be very small, it should not
         # have a big impact on memory (i.e. list vs generator)
         submissions = list(deployment.get_submissions(**params))
+        if submission_uuid and 'submission_ids' in params:
+            if submissions:
+                return Response(submissions[0])
+            # Stale cached id, look the submission up by its UUID again
+            void_cached_submission_ids(self.asset.uid, [submission_uuid])
+            del params['submission_ids']
+            submissions = list(deployment.get_submissions(**params))
+
         if not submissions:
             raise Http404
 
         submission = submissions[0]
+        if submission_uuid and format_type == SUBMISSION_FORMAT_TYPE_JSON:
+            cache_submission_ids(
+                self.asset.uid, {submission_uuid: submission['_id']}
+            )
         return Response(submission)
 
     @action(detail=True, methods=['POST'],
@@ -566,8 +629,7 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
             permission_classes=[SubmissionValidationStatusPermission])
     def validation_status(self, request, pk, *args, **kwargs):
         deployment = self._get_deployment()
-        # Coerce to int because back end only finds matches with same type
-        submission_id = positive_int(pk)
+        submission_id = self._get_submission_id(request, pk)
         if request.method == 'GET':
             json_response = deployment.get_validation_status(
                 submission_id=submission_id,
@@ -755,12 +817,7 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
                 request=request,
             )
 
-        response = requests.post(
-            f'{settings.ENKETO_URL}/{enketo_endpoint}',
-            # bare tuple implies basic auth
-            auth=(settings.ENKETO_API_TOKEN, ''),
-            data=data
-        )
+        response = enketo_request('POST', enketo_endpoint, data=data)
         if response.status_code != status.HTTP_201_CREATED:
             # Some Enketo errors are useful to the client. Attempt to pass them
             # along if possible
@@ -787,3 +844,147 @@ class DataViewSet(AssetNestedObjectViewsetMixin, NestedViewSetMixin,
                 'version_uid': version_uid,
             }
         )
+
+    def _get_geojson_response(
+        self, request: Request, deployment, filters: dict
+    ) -> StreamingHttpResponse:
+        """
+        Stream the GeoJSON `FeatureCollection` of the submissions matching
+        `filters`.
+
+        `bbox` (`west,south,east,north`) narrows down the features to those
+        with at least one point inside the bounding box. It is pushed down to
+        Mongo when the geometries come from the only geopoint question of the
+        form, whose coordinates KoBoCAT copies to `_geolocation`. Submissions
+        read from Mongo are filtered exactly anyway, therefore `start` and
+        `limit` are applied to the filtered submissions, not by Mongo.
+        `fields` narrows down the properties of the features to the given
+        XPaths. Unlike other formats, it does not narrow down the fields
+        retrieved from Mongo, because formpack needs the version keys.
+        """
+        geo_question_name = filters.pop('geo_question_name', None)
+        bbox = filters.pop('bbox', None)
+        fields = filters.pop('fields', None)
+
+        if bbox is not None:
+            try:
+                bbox = parse_bbox(bbox)
+            except ValueError:
+                raise serializers.ValidationError(
+                    {
+                        'bbox': t(
+                            'Value must be four comma-separated numbers: '
+                            'west,south,east,north'
+                        )
+                    }
+                )
+
+        if isinstance(fields, str):
+            try:
+                fields = json.loads(fields)
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'fields': t('Value must be valid JSON.')}
+                )
+        if fields is not None and not isinstance(fields, list):
+            raise serializers.ValidationError(
+                {'fields': t('Value must be a list.')}
+            )
+
+        geo_xpaths = []
+        if bbox or fields:
+            geo_questions = get_geo_questions(
+                self.asset.deployed_versions.select_related('content_blob')
+            )
+            if not geo_question_name and geo_questions and geo_questions[0]:
+                # Same default as `get_geojson_stream()`: the first geographic
+                # question of the latest version
+                geo_question_name = geo_questions[0][0]['name']
+            geo_xpaths = list(
+                {
+                    question['xpath']
+                    for version_geo_questions in geo_questions
+                    for question in version_geo_questions
+                    if question['name'] == geo_question_name
+                }
+            )
+            if fields:
+                # The geographic question is needed to build the geometries
+                fields = fields + geo_xpaths
+
+            if bbox and all(
+                [
+                    question['name']
+                    for question in version_geo_questions
+                    if question['type'] == 'geopoint'
+                ] == [geo_question_name]
+                for version_geo_questions in geo_questions
+            ):
+                query = filters.get('query', {})
+                if isinstance(query, str):
+                    try:
+                        query = json.loads(
+                            query, object_hook=json_util.object_hook
+                        )
+                    except ValueError:
+                        raise serializers.ValidationError(
+                            {'query': t('Value must be valid JSON.')}
+                        )
+                filters['query'] = {'$and': [query, get_bbox_query(bbox)]}
+
+        if bbox:
+            # Paging is done after filtering. Otherwise, Mongo would return
+            # `limit` submissions of which only a few could be inside `bbox`.
+            try:
+                start = positive_int(filters.pop('start', 0))
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'start': t('A positive integer is required.')}
+                )
+            limit = filters.pop('limit')
+
+        submission_stream = deployment.get_submissions(
+            user=request.user,
+            format_type=SUBMISSION_FORMAT_TYPE_JSON,
+            request=request,
+            **filters
+        )
+        if bbox:
+            # `islice()` stops reading from Mongo once `limit` submissions
+            # inside `bbox` have been yielded
+            submission_stream = islice(
+                filter_submissions_by_bbox(
+                    submission_stream, geo_xpaths, bbox
+                ),
+                start,
+                start + limit,
+            )
+
+        return StreamingHttpResponse(
+            get_geojson_stream(
+                self.asset,
+                submission_stream,
+                geo_question_name=geo_question_name,
+                fields=fields,
+            ),
+            content_type=SubmissionGeoJsonRenderer.media_type,
+        )
+
+    def _get_submission_id(self, request: Request, pk: str) -> int:
+        """
+        Return the primary key of the submission `pk`, which can also be the
+        `_uuid` of the submission.
+        """
+        try:
+            # Coerce to int because back end only finds matches with same type
+            return positive_int(pk)
+        except ValueError:
+            if not re.match(r'[a-z\d]{8}-([a-z\d]{4}-){3}[a-z\d]{12}', pk):
+                raise Http404
+
+        submission_id = self._get_deployment().get_submission_id_by_uuid(
+            pk, request.user, root_uuid=False
+        )
+        if submission_id is None:
+            raise Http404
+        return submission_id
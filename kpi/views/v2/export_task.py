@@ -100,6 +100,7 @@ class ExportTaskViewSet(
     * "type" (required) specifies the export format. Valid export formats include:
         * "csv",
         * "geojson",
+        * "parquet" (ZIP archive of Parquet files, one per repeat group),
         * "spss_labels", or
         * "xls"
     * "fields" (optional) is an array of column names to be included in the export (including their group hierarchy). Valid inputs include:
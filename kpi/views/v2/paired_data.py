@@ -299,7 +299,7 @@ class PairedDataViewset(AssetNestedObjectViewsetMixin,
         asset_file.save()
         if old_hash != asset_file.md5_hash:
             # resync paired data to the deployment backend
-            self.asset.deployment.sync_media_files(AssetFile.PAIRED_DATA)
+            self.asset.sync_media_files_or_retry(AssetFile.PAIRED_DATA)
 
         return Response(xml_)
 
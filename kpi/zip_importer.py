@@ -81,14 +81,7 @@ class ImportFile:
         if self.is_zip():
             self._type = 'collection'
             with zipfile.ZipFile(self.readable) as zfile:
-                infs = []
-                for fileinfo in zfile.infolist():
-                    basename = os.path.basename(fileinfo.filename)
-                    if basename.startswith('.') or basename.startswith('#'):
-                        continue
-                    infs.append(ImportZipSubfile(readable=fileinfo, name=fileinfo.filename, zfile=zfile, root=self.root, parent=self))
-                for inf in infs:
-                    inf.parse()
+                self._parse_zip(zfile)
                 self.store()
                 # self._remove_empty_collections()
         else:
@@ -106,6 +99,16 @@ class ImportFile:
                     self.parent = self.root.files_by_path[self.dirname]
         return self
 
+    def _parse_zip(self, zfile):
+        infs = []
+        for fileinfo in zfile.infolist():
+            basename = os.path.basename(fileinfo.filename)
+            if basename.startswith('.') or basename.startswith('#'):
+                continue
+            infs.append(ImportZipSubfile(readable=fileinfo, name=fileinfo.filename, zfile=zfile, root=self.root, parent=self))
+        for inf in infs:
+            inf.parse()
+
     def get_type(self):
         if not hasattr(self, '_type'):
             raise RuntimeError("cannot get type of item that has not been parsed")
@@ -225,3 +228,32 @@ class HttpContentParse(RootFileImport):
             kwargs['name'] = os.path.basename(self.request.url)
         super().__init__(*args, **kwargs)
 
+
+class TemporaryFileParse(RootFileImport):
+    """
+    Parses a ZIP archive (or a single XLS file) stored in a file, e.g. a
+    temporary file, without loading its subfiles in memory: they are read
+    from the archive when needed, which stays open until `close()` is called.
+
+    with TemporaryFileParse(readable=tmp_file, name=name) as importable:
+        importable.parse()
+        ...
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if getattr(self, '_zfile', None):
+            self._zfile.close()
+            self._zfile = None
+
+    def parse(self):
+        if not self.is_zip():
+            return super().parse()
+        self._type = 'collection'
+        self._zfile = zipfile.ZipFile(self.readable)
+        self._parse_zip(self._zfile)
+        return self